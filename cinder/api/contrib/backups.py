@@ -22,11 +22,13 @@ from webob import exc
 from cinder.api import common
 from cinder.api import extensions
 from cinder.api.openstack import wsgi
+from cinder.api.v2 import volumes
 from cinder.api.views import backups as backup_views
 from cinder.api import xmlutil
 from cinder import backup as backupAPI
 from cinder import exception
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import strutils
 from cinder import utils
 
 
@@ -91,7 +93,7 @@ class CreateDeserializer(wsgi.MetadataXMLDeserializer):
         backup_node = self.find_first_child_named(node, 'backup')
 
         attributes = ['container', 'display_name',
-                      'display_description', 'volume_id']
+                      'display_description', 'volume_id', 'incremental']
 
         for attr in attributes:
             if backup_node.getAttribute(attr):
@@ -164,7 +166,28 @@ class BackupsController(wsgi.Controller):
     def _get_backups(self, req, is_detail):
         """Returns a list of backups, transformed through view builder."""
         context = req.environ['cinder.context']
-        backups = self.backup_api.get_all(context)
+
+        params = req.params.copy()
+        marker = params.pop('marker', None)
+        limit = params.pop('limit', None)
+        sort_key = params.pop('sort_key', 'created_at')
+        sort_dir = params.pop('sort_dir', 'desc')
+        # Offset paging slices the full list, it can't be limited below.
+        if params.pop('offset', None) is not None:
+            limit = None
+        filters = params
+
+        volumes.remove_invalid_options(context, filters,
+                                       ('name', 'status', 'volume_id'))
+
+        if 'name' in filters:
+            filters['display_name'] = filters['name']
+            del filters['name']
+
+        backups = self.backup_api.get_all(context, search_opts=filters,
+                                          marker=marker, limit=limit,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir)
         limited_list = common.limited(backups, req)
 
         if is_detail:
@@ -197,6 +220,8 @@ class BackupsController(wsgi.Controller):
         container = backup.get('container', None)
         name = backup.get('name', None)
         description = backup.get('description', None)
+        incremental = strutils.bool_from_string(backup.get('incremental',
+                                                           False))
 
         LOG.audit(_("Creating backup of volume %(volume_id)s in container"
                     " %(container)s"),
@@ -205,9 +230,12 @@ class BackupsController(wsgi.Controller):
 
         try:
             new_backup = self.backup_api.create(context, name, description,
-                                                volume_id, container)
+                                                volume_id, container,
+                                                incremental=incremental)
         except exception.InvalidVolume as error:
             raise exc.HTTPBadRequest(explanation=error.msg)
+        except exception.InvalidBackup as error:
+            raise exc.HTTPBadRequest(explanation=error.msg)
         except exception.VolumeNotFound as error:
             raise exc.HTTPNotFound(explanation=error.msg)
         except exception.ServiceNotFound as error:
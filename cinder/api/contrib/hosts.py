@@ -26,7 +26,7 @@ from cinder.api import xmlutil
 from cinder import db
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import timeutils
+from cinder import servicegroup
 from cinder import utils
 from cinder.volume import api as volume_api
 
@@ -95,7 +95,6 @@ class HostDeserializer(wsgi.XMLDeserializer):
 
 def _list_hosts(req, service=None):
     """Returns a summary list of hosts."""
-    curr_time = timeutils.utcnow()
     context = req.environ['cinder.context']
     services = db.service_get_all(context, False)
     zone = ''
@@ -103,10 +102,10 @@ def _list_hosts(req, service=None):
         zone = req.GET['zone']
     if zone:
         services = [s for s in services if s['availability_zone'] == zone]
+    servicegroup_api = servicegroup.API()
     hosts = []
     for host in services:
-        delta = curr_time - (host['updated_at'] or host['created_at'])
-        alive = abs(utils.total_seconds(delta)) <= CONF.service_down_time
+        alive = servicegroup_api.service_is_up(host)
         status = (alive and "available") or "unavailable"
         active = 'enabled'
         if host['disabled']:
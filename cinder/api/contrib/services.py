@@ -25,8 +25,7 @@ from cinder.api import xmlutil
 from cinder import db
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import timeutils
-from cinder import utils
+from cinder import servicegroup
 
 
 CONF = cfg.CONF
@@ -74,7 +73,6 @@ class ServiceController(wsgi.Controller):
         """
         context = req.environ['cinder.context']
         authorize(context)
-        now = timeutils.utcnow()
         services = db.service_get_all(context)
 
         host = ''
@@ -96,10 +94,10 @@ class ServiceController(wsgi.Controller):
         if binary_key:
             services = [s for s in services if s['binary'] == binary_key]
 
+        servicegroup_api = servicegroup.API()
         svcs = []
         for svc in services:
-            delta = now - (svc['updated_at'] or svc['created_at'])
-            alive = abs(utils.total_seconds(delta)) <= CONF.service_down_time
+            alive = servicegroup_api.service_is_up(svc)
             art = (alive and "up") or "down"
             active = 'enabled'
             if svc['disabled']:
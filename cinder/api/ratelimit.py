@@ -0,0 +1,268 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Stores of the rate limits of the users, shared by the API versions.
+
+The state of the bucket of a limit is a single time, the "theoretical
+arrival time" (TAT) at which the bucket is empty again.  Each request
+pushes the TAT by the time one request is worth, and is refused when
+that would put the TAT further than the period of the limit from now.
+A bucket whose TAT is in the past is empty, as if it never existed, so
+idle buckets can be dropped without changing any limit.
+"""
+
+import collections
+import hashlib
+import math
+import re
+
+from oslo.config import cfg
+
+from cinder.openstack.common import importutils
+from cinder.openstack.common import log as logging
+from cinder.openstack.common import memorycache
+
+
+ratelimit_opts = [
+    cfg.StrOpt('api_rate_limit_backend',
+               default='cinder.api.ratelimit.MemoryBackend',
+               help='The full class name of the store of the rate limits '
+                    'of the users. cinder.api.ratelimit.MemcachedBackend '
+                    'shares them between the API workers and nodes'),
+    cfg.IntOpt('api_rate_limit_max_buckets',
+               default=100000,
+               help='Maximum number of rate limit buckets of the users '
+                    'kept in memory. Idle buckets are dropped first'),
+    cfg.IntOpt('api_rate_limit_cas_retries',
+               default=10,
+               help='Number of attempts to update a rate limit bucket of '
+                    'memcached which other API workers update at the same '
+                    'time'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(ratelimit_opts)
+
+LOG = logging.getLogger(__name__)
+
+_REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+
+
+def literal_prefix(regex):
+    """Return the literal text which every URL matching regex starts with.
+
+    Limits are matched with re.match, so the leading literal characters
+    of their regex are a prefix of the URLs they apply to.
+    """
+    if '|' in regex:
+        return ''
+    if regex.startswith('^'):
+        regex = regex[1:]
+    prefix = []
+    for char in regex:
+        if char in _REGEX_SPECIAL:
+            # The character before an optional quantifier may be absent.
+            if char in '*?{' and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+def consume(limit, tat, now):
+    """Account for a request in the bucket of limit.
+
+    @param tat: the TAT of the bucket, None for an empty bucket
+    @return: Tuple of the new TAT and None, or None and the delay in
+             seconds before the request would be accepted
+    """
+    if tat is None or tat < now:
+        tat = now
+    new_tat = tat + limit.request_value
+    difference = (new_tat - now) - limit.capacity
+    if difference > 0:
+        return None, difference
+    return new_tat, None
+
+
+def display(limit, tat, now):
+    """Return the representation of limit given the TAT of its bucket."""
+    level = 0
+    if tat is not None and tat > now:
+        level = tat - now
+    capacity = float(limit.capacity)
+    remaining = math.floor(((capacity - level) / capacity) * limit.value)
+    next_request = now + max(level + limit.request_value - capacity, 0)
+    return {
+        "verb": limit.verb,
+        "URI": limit.uri,
+        "regex": limit.regex,
+        "value": limit.value,
+        "remaining": int(remaining),
+        "unit": limit.display_unit(),
+        "resetTime": int(next_request),
+    }
+
+
+class LimitIndex(object):
+    """Limits indexed by HTTP verb and literal URI prefix.
+
+    The regexes are compiled once, and only the limits of the verb whose
+    prefix starts the URL are matched against it.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        index = collections.defaultdict(lambda: collections.defaultdict(list))
+        for position, limit in enumerate(limits):
+            prefix = literal_prefix(limit.regex)
+            index[limit.verb][prefix].append((position, limit,
+                                              re.compile(limit.regex)))
+        self._index = dict((verb, sorted(prefixes.items()))
+                           for verb, prefixes in index.items())
+
+    def match(self, verb, url):
+        """Yield the position in the limits and the limits of a request."""
+        for prefix, limits in self._index.get(verb, ()):
+            if not url.startswith(prefix):
+                continue
+            for position, limit, regex in limits:
+                if regex.match(url):
+                    yield position, limit
+
+
+class Backend(object):
+    """Base class of the stores of the buckets of the limits.
+
+    A bucket is identified by a key, the user and the position of the
+    limit in the limits of the user.
+    """
+
+    def get(self, key, now):
+        """Return the TAT of the bucket of key, or None."""
+        raise NotImplementedError()
+
+    def consume(self, key, limit, now):
+        """Account for a request of limit in the bucket of key.
+
+        @return: The delay in seconds before the request would be
+                 accepted, or None if it is accepted
+        """
+        raise NotImplementedError()
+
+
+class MemoryBackend(Backend):
+    """Buckets in the memory of the API process.
+
+    At most api_rate_limit_max_buckets buckets are kept.  The buckets are
+    ordered by last use, and the idle ones are dropped from the least
+    recently used end.  When all of them are busy the least recently used
+    bucket is dropped, which forgets the requests of its user.
+    """
+
+    def __init__(self, max_buckets=None):
+        self.max_buckets = max_buckets or CONF.api_rate_limit_max_buckets
+        self._buckets = collections.OrderedDict()
+
+    def get(self, key, now):
+        return self._buckets.get(key)
+
+    def consume(self, key, limit, now):
+        tat = self._buckets.pop(key, None)
+        new_tat, delay = consume(limit, tat, now)
+        if new_tat is None:
+            new_tat = tat
+        if new_tat is not None and new_tat > now:
+            self._buckets[key] = new_tat
+        self._evict(now)
+        return delay
+
+    def _evict(self, now):
+        while self._buckets:
+            key, tat = next(self._buckets.iteritems())
+            if tat > now and len(self._buckets) <= self.max_buckets:
+                break
+            del self._buckets[key]
+
+
+class MemcachedBackend(Backend):
+    """Buckets in memcached, shared by all the API workers.
+
+    The buckets expire once idle.  Concurrent requests of a user update
+    its buckets with compare-and-set, when the client supports it.
+    """
+
+    def __init__(self):
+        self.mc = memorycache.get_client()
+        self._cas = hasattr(self.mc, 'cas')
+        if self._cas:
+            self.mc.cache_cas = True
+
+    @staticmethod
+    def _key(key):
+        username, position = key
+        if isinstance(username, unicode):
+            username = username.encode('utf-8')
+        digest = hashlib.md5('%s:%d' % (username, position)).hexdigest()
+        return 'cinder-ratelimit-%s' % digest
+
+    def get(self, key, now):
+        value = self.mc.get(self._key(key))
+        if value is None:
+            return None
+        return float(value)
+
+    def consume(self, key, limit, now):
+        mc_key = self._key(key)
+        for _i in xrange(CONF.api_rate_limit_cas_retries):
+            if self._cas:
+                value = self.mc.gets(mc_key)
+            else:
+                value = self.mc.get(mc_key)
+            tat = None
+            if value is not None:
+                tat = float(value)
+            new_tat, delay = consume(limit, tat, now)
+            if new_tat is None:
+                return delay
+
+            ttl = int(math.ceil(new_tat - now)) + 1
+            if value is None:
+                stored = self.mc.add(mc_key, repr(new_tat), time=ttl)
+            elif self._cas:
+                stored = self.mc.cas(mc_key, repr(new_tat), time=ttl)
+            else:
+                stored = self.mc.set(mc_key, repr(new_tat), time=ttl)
+            if stored:
+                return delay
+
+        LOG.warn(_('Rate limit bucket %s is updated by too many API '
+                   'workers at once, request not accounted'), mc_key)
+        return None
+
+
+def get_backend():
+    return importutils.import_object(CONF.api_rate_limit_backend)
+
+
+class UserLimits(dict):
+    """Limits of the users, the default limits for the users without any."""
+
+    def __init__(self, default_limits):
+        super(UserLimits, self).__init__()
+        self.default_limits = default_limits
+
+    def __missing__(self, username):
+        return self.default_limits
@@ -17,8 +17,6 @@
 Module dedicated functions/classes dealing with rate limiting requests.
 """
 
-import collections
-import copy
 import httplib
 import math
 import re
@@ -28,6 +26,7 @@ import webob.dec
 import webob.exc
 
 from cinder.api.openstack import wsgi
+from cinder.api import ratelimit
 from cinder.api.views import limits as limits_views
 from cinder.api import xmlutil
 from cinder.openstack.common import importutils
@@ -210,7 +209,7 @@ DEFAULT_LIMITS = [
 class RateLimitingMiddleware(base_wsgi.Middleware):
     """Rate-limits requests passing through this middleware.
 
-    All limit information is stored in memory for this implementation.
+    The limit information is stored by the backend of the limiter.
     """
 
     def __init__(self, application, limits=None, limiter=None, **kwargs):
@@ -268,15 +267,21 @@ class RateLimitingMiddleware(base_wsgi.Middleware):
 
 
 class Limiter(object):
-    """Rate-limit checking class which handles limits in memory."""
+    """Rate-limit checking class which handles limits in a backend.
 
-    def __init__(self, limits, **kwargs):
+    The buckets of the limits are kept by the api_rate_limit_backend
+    store, in the memory of the process by default.
+    """
+
+    def __init__(self, limits, backend=None, **kwargs):
         """Initialize the new `Limiter`.
 
         @param limits: List of `Limit` objects
+        @param backend: `ratelimit.Backend` storing the buckets
         """
-        self.limits = copy.deepcopy(limits)
-        self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        self.limits = limits
+        self.levels = ratelimit.UserLimits(limits)
+        self.backend = backend or ratelimit.get_backend()
 
         # Pick up any per-user limit information
         for key, value in kwargs.items():
@@ -284,9 +289,18 @@ class Limiter(object):
                 username = key[len(LIMITS_PREFIX):]
                 self.levels[username] = self.parse_limits(value)
 
+        self._default_index = ratelimit.LimitIndex(limits)
+        self._indexes = dict((username, ratelimit.LimitIndex(user_limits))
+                             for username, user_limits in self.levels.items())
+
     def get_limits(self, username=None):
         """Return the limits for a given user."""
-        return [limit.display() for limit in self.levels[username]]
+        result = []
+        for position, limit in enumerate(self.levels[username]):
+            now = limit._get_time()
+            tat = self.backend.get((username, position), now)
+            result.append(ratelimit.display(limit, tat, now))
+        return result
 
     def check_for_delay(self, verb, url, username=None):
         """Check the given verb/user/user triplet for limit.
@@ -295,8 +309,10 @@ class Limiter(object):
         """
         delays = []
 
-        for limit in self.levels[username]:
-            delay = limit(verb, url)
+        index = self._indexes.get(username, self._default_index)
+        for position, limit in index.match(verb, url):
+            delay = self.backend.consume((username, position), limit,
+                                         limit._get_time())
             if delay:
                 delays.append((delay, limit.error_message))
 
@@ -27,7 +27,7 @@ from cinder import context
 from cinder.db import base
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder import utils
+from cinder import servicegroup
 
 import cinder.policy
 import cinder.volume
@@ -51,6 +51,7 @@ class API(base.Base):
     def __init__(self, db_driver=None):
         self.backup_rpcapi = backup_rpcapi.BackupAPI()
         self.volume_api = cinder.volume.API()
+        self.servicegroup_api = servicegroup.API()
         super(API, self).__init__(db_driver)
 
     def get(self, context, backup_id):
@@ -66,21 +67,48 @@ class API(base.Base):
             msg = _('Backup status must be available or error')
             raise exception.InvalidBackup(reason=msg)
 
+        # Incremental backups reference the objects of their parent
+        backups = self.db.backup_get_all_by_volume(context,
+                                                   backup['volume_id'])
+        if any(b['parent_id'] == backup_id for b in backups):
+            msg = _('Incremental backups exist for this backup')
+            raise exception.InvalidBackup(reason=msg)
+
         self.db.backup_update(context, backup_id, {'status': 'deleting'})
         self.backup_rpcapi.delete_backup(context,
                                          backup['host'],
                                          backup['id'])
 
-    # TODO(moorehef): Add support for search_opts, discarded atm
-    def get_all(self, context, search_opts=None):
-        if search_opts is None:
-            search_opts = {}
+    def get_all(self, context, search_opts=None, marker=None, limit=None,
+                sort_key='created_at', sort_dir='desc'):
         check_policy(context, 'get_all')
+
+        try:
+            if limit is not None:
+                limit = int(limit)
+                if limit < 0:
+                    msg = _('limit param must be positive')
+                    raise exception.InvalidInput(reason=msg)
+        except ValueError:
+            msg = _('limit param must be an integer')
+            raise exception.InvalidInput(reason=msg)
+
+        # The filters are applied by the database, so that pages are full.
+        filters = dict(search_opts or {})
+        filters.pop('all_tenants', None)
+
+        if filters:
+            LOG.debug(_("Searching by: %s") % str(filters))
+
         if context.is_admin:
-            backups = self.db.backup_get_all(context)
+            backups = self.db.backup_get_all(context, marker, limit, sort_key,
+                                             sort_dir, filters=filters)
         else:
             backups = self.db.backup_get_all_by_project(context,
-                                                        context.project_id)
+                                                        context.project_id,
+                                                        marker, limit,
+                                                        sort_key, sort_dir,
+                                                        filters=filters)
 
         return backups
 
@@ -92,13 +120,27 @@ class API(base.Base):
         for srv in services:
             if (srv['availability_zone'] == volume['availability_zone'] and
                     srv['host'] == volume_host and not srv['disabled'] and
-                    utils.service_is_up(srv)):
+                    self.servicegroup_api.service_is_up(srv)):
                 return True
         return False
 
+    def _get_latest_backup_id(self, context, volume_id):
+        """Return the id of the newest available backup of a volume."""
+        backups = [backup for backup in
+                   self.db.backup_get_all_by_volume(context, volume_id)
+                   if backup['status'] == 'available']
+        if not backups:
+            msg = _('No backups available to do an incremental backup')
+            raise exception.InvalidBackup(reason=msg)
+        return max(backups, key=lambda backup: backup['created_at'])['id']
+
     def create(self, context, name, description, volume_id,
-               container, availability_zone=None):
-        """Make the RPC call to create a volume backup."""
+               container, availability_zone=None, incremental=False):
+        """Make the RPC call to create a volume backup.
+
+        An incremental backup is based on the latest available backup of
+        the volume and only stores the data that changed since then.
+        """
         check_policy(context, 'create')
         volume = self.volume_api.get(context, volume_id)
         if volume['status'] != "available":
@@ -108,6 +150,10 @@ class API(base.Base):
         if not self._is_backup_service_enabled(volume, volume_host):
             raise exception.ServiceNotFound(service_id='cinder-backup')
 
+        parent_id = None
+        if incremental:
+            parent_id = self._get_latest_backup_id(context, volume_id)
+
         self.db.volume_update(context, volume_id, {'status': 'backing-up'})
 
         options = {'user_id': context.user_id,
@@ -118,7 +164,8 @@ class API(base.Base):
                    'status': 'creating',
                    'container': container,
                    'size': volume['size'],
-                   'host': volume_host, }
+                   'host': volume_host,
+                   'parent_id': parent_id, }
 
         backup = self.db.backup_create(context, options)
 
@@ -0,0 +1,131 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compression algorithms for volume backup data.
+
+A compressor provides compress() and decompress() for whole data chunks.
+Backup drivers record the algorithm name with every stored object, so that
+restores can pick the matching decompressor regardless of the compression
+settings in effect at restore time.
+
+zlib and bz2 are always available; lz4 and zstd are available when the lz4
+and zstandard python packages are installed.
+"""
+
+from cinder.openstack.common import importutils
+
+
+class Compressor(object):
+    """Base class for backup data compressors."""
+
+    def __init__(self, level=None):
+        self.level = level
+
+    def compress(self, data):
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        raise NotImplementedError()
+
+
+class ZlibCompressor(Compressor):
+    """zlib compression, levels 1 (fastest) to 9 (smallest)."""
+
+    def __init__(self, level=None):
+        super(ZlibCompressor, self).__init__(level)
+        self.zlib = importutils.import_module('zlib')
+
+    def compress(self, data):
+        if self.level is None:
+            return self.zlib.compress(data)
+        return self.zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return self.zlib.decompress(data)
+
+
+class Bz2Compressor(Compressor):
+    """bzip2 compression, levels 1 (fastest) to 9 (smallest)."""
+
+    def __init__(self, level=None):
+        super(Bz2Compressor, self).__init__(level)
+        self.bz2 = importutils.import_module('bz2')
+
+    def compress(self, data):
+        if self.level is None:
+            return self.bz2.compress(data)
+        return self.bz2.compress(data, self.level)
+
+    def decompress(self, data):
+        return self.bz2.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    """LZ4 frame compression, much faster but larger than zlib."""
+
+    def __init__(self, level=None):
+        super(LZ4Compressor, self).__init__(level)
+        self.lz4 = importutils.import_module('lz4.frame')
+
+    def compress(self, data):
+        if self.level is None:
+            return self.lz4.compress(data)
+        return self.lz4.compress(data, compression_level=self.level)
+
+    def decompress(self, data):
+        return self.lz4.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    """Zstandard compression, levels 1 (fastest) to 22 (smallest)."""
+
+    def __init__(self, level=None):
+        super(ZstdCompressor, self).__init__(level)
+        self.zstd = importutils.import_module('zstandard')
+
+    def compress(self, data):
+        if self.level is None:
+            compressor = self.zstd.ZstdCompressor()
+        else:
+            compressor = self.zstd.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def decompress(self, data):
+        return self.zstd.ZstdDecompressor().decompress(data)
+
+
+COMPRESSORS = {
+    'zlib': ZlibCompressor,
+    'gzip': ZlibCompressor,
+    'bz2': Bz2Compressor,
+    'bzip2': Bz2Compressor,
+    'lz4': LZ4Compressor,
+    'zstd': ZstdCompressor,
+}
+
+
+def get_compressor(algorithm, level=None):
+    """Return a compressor for the given algorithm name.
+
+    Returns None if compression is disabled, and raises ValueError if the
+    algorithm is unknown or its library is not installed.
+    """
+    algorithm = algorithm.lower()
+    if algorithm in ('none', 'off', 'no'):
+        return None
+    try:
+        return COMPRESSORS[algorithm](level)
+    except (KeyError, ImportError):
+        err = _('unsupported compression algorithm: %s') % algorithm
+        raise ValueError(unicode(err))
@@ -82,12 +82,24 @@ service_opts = [
                help='RBD stripe count to use when creating a backup image'),
     cfg.BoolOpt('restore_discard_excess_bytes', default=True,
                 help='If True, always discard excess bytes when restoring '
-                     'volumes.')
+                     'volumes.'),
+    cfg.IntOpt('backup_ceph_connection_pool_size', default=4,
+               help='maximum number of idle connections to the backup Ceph '
+                    'cluster kept for reuse by the backups and restores. '
+                    'Zero connects for each operation.'),
+    cfg.IntOpt('backup_ceph_connection_pool_max_idle', default=300,
+               help='number of seconds an idle connection to the backup '
+                    'Ceph cluster is kept for reuse before it is shut down. '
+                    'Zero keeps idle connections until they fail.')
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(service_opts)
 
+# A driver is made for each backup and restore, so the connections to the
+# backup clusters are pooled here, by (user, conf file).
+_RADOS_POOLS = {}
+
 
 class CephBackupDriver(BackupDriver):
     """Backup up Cinder volumes to Ceph Object Store.
@@ -178,25 +190,25 @@ class CephBackupDriver(BackupDriver):
 
         return (old_format, features)
 
+    def _get_rados_pool(self):
+        key = (self._ceph_backup_user, self._ceph_backup_conf)
+        rados_pool = _RADOS_POOLS.get(key)
+        if rados_pool is None or rados_pool.rados is not self.rados:
+            rados_pool = rbd_driver.RADOSConnectionPool(
+                self.rados, self._ceph_backup_user, self._ceph_backup_conf,
+                self._ceph_backup_pool, CONF.backup_ceph_connection_pool_size,
+                CONF.backup_ceph_connection_pool_max_idle)
+            _RADOS_POOLS[key] = rados_pool
+        return rados_pool
+
     def _connect_to_rados(self, pool=None):
-        """Establish connection to the backup Ceph cluster."""
-        client = self.rados.Rados(rados_id=self._ceph_backup_user,
-                                  conffile=self._ceph_backup_conf)
-        try:
-            client.connect()
-            pool_to_open = self._utf8(pool or self._ceph_backup_pool)
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
-        except self.rados.Error:
-            # shutdown cannot raise an exception
-            client.shutdown()
-            raise
+        """Get a connection to the backup Ceph cluster from the pool."""
+        pool_to_open = self._utf8(pool or self._ceph_backup_pool)
+        return self._get_rados_pool().get(pool_to_open)
 
-    def _disconnect_from_rados(self, client, ioctx):
-        """Terminate connection with the backup Ceph cluster."""
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+    def _disconnect_from_rados(self, client, ioctx, discard=False):
+        """Release a connection to the backup Ceph cluster to the pool."""
+        self._get_rados_pool().put(client, discard=discard)
 
     def _get_backup_base_name(self, volume_id, backup_id=None,
                               diff_format=False):
@@ -25,23 +25,51 @@
                                     operations (default: 10).
 :backup_swift_retry_backoff: The backoff time in seconds between retrying
                                     failed Swift operations (default: 10).
+:backup_swift_upload_concurrency: The number of Swift objects a single backup
+                                  uploads concurrently (default: 1).
+:backup_swift_restore_fsync_bytes: The number of bytes written to a volume
+                                   being restored between fsyncs
+                                   (default: 524288000).
 :backup_compression_algorithm: Compression algorithm to use for volume
                                backups. Supported options are:
-                               None (to disable), zlib and bz2 (default: zlib)
+                               None (to disable), zlib, bz2, and lz4 or zstd
+                               when installed (default: zlib)
+:backup_compression_level: Compression level of the compression algorithm
+                           (default: the library default).
+:backup_compression_native_threads: Compress and decompress in native threads
+                                    (default: True).
+
+Incremental backups are supported: each object records the SHA-256 of the
+uncompressed data it holds, and an incremental backup references the objects
+of its parent backup whose data has not changed instead of uploading them
+again.
+
+Chunks that contain only zeros are recorded as holes in the backup metadata
+and are not stored in Swift.  On restore, holes are zeroed out with the
+BLKZEROOUT ioctl on block devices and left sparse in regular files.
 """
 
+import errno
+import fcntl
 import hashlib
 import httplib
 import json
 import os
 import socket
+import stat
 import StringIO
+import struct
+import sys
 
 import eventlet
+from eventlet import pools
+from eventlet import tpool
 from oslo.config import cfg
 
+from cinder.backup import compression
 from cinder.backup.driver import BackupDriver
 from cinder import exception
+from cinder.openstack.common import excutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder import units
@@ -75,36 +103,46 @@ swiftbackup_service_opts = [
     cfg.IntOpt('backup_swift_retry_backoff',
                default=2,
                help='The backoff time in seconds between Swift retries'),
+    cfg.IntOpt('backup_swift_upload_concurrency',
+               default=1,
+               help='The number of Swift objects a single backup uploads '
+                    'concurrently'),
+    cfg.IntOpt('backup_swift_restore_fsync_bytes',
+               default=524288000,
+               help='The number of bytes written to a volume being restored '
+                    'between fsyncs'),
     cfg.StrOpt('backup_compression_algorithm',
                default='zlib',
                help='Compression algorithm (None to disable)'),
+    cfg.IntOpt('backup_compression_level',
+               default=None,
+               help='Compression level of the backup compression algorithm, '
+                    'the library default is used if not set'),
+    cfg.BoolOpt('backup_compression_native_threads',
+                default=True,
+                help='Compress and decompress backup data in native threads '
+                     'so that backups can use several CPU cores'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(swiftbackup_service_opts)
 
+# From linux/fs.h: _IO(0x12, 127)
+BLKZEROOUT = 0x127f
+
+ZERO_BLOCK = '\0' * 65536
+
 
 class SwiftBackupDriver(BackupDriver):
     """Provides backup, restore and delete of backup objects within Swift."""
 
-    DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    DRIVER_VERSION = '2.0.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '2.0.0': '_restore_v2'}
 
     def _get_compressor(self, algorithm):
-        try:
-            if algorithm.lower() in ('none', 'off', 'no'):
-                return None
-            elif algorithm.lower() in ('zlib', 'gzip'):
-                import zlib as compressor
-                return compressor
-            elif algorithm.lower() in ('bz2', 'bzip2'):
-                import bz2 as compressor
-                return compressor
-        except ImportError:
-            pass
-
-        err = _('unsupported compression algorithm: %s') % algorithm
-        raise ValueError(unicode(err))
+        return compression.get_compressor(algorithm,
+                                          CONF.backup_compression_level)
 
     def __init__(self, context, db_driver=None):
         self.context = context
@@ -114,6 +152,10 @@ class SwiftBackupDriver(BackupDriver):
         self.data_block_size_bytes = CONF.backup_swift_object_size
         self.swift_attempts = CONF.backup_swift_retry_attempts
         self.swift_backoff = CONF.backup_swift_retry_backoff
+        self.upload_concurrency = max(1, CONF.backup_swift_upload_concurrency)
+        self.restore_fsync_bytes = CONF.backup_swift_restore_fsync_bytes
+        self.compression_native_threads = \
+            CONF.backup_compression_native_threads
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
         LOG.debug('Connect to %s in "%s" mode' % (CONF.backup_swift_url,
@@ -124,19 +166,26 @@ class SwiftBackupDriver(BackupDriver):
                             "but %(param)s not set")
                           % {'param': 'backup_swift_user'})
                 raise exception.ParameterNotFound(param='backup_swift_user')
-            self.conn = swift.Connection(authurl=CONF.backup_swift_url,
-                                         user=CONF.backup_swift_user,
-                                         key=CONF.backup_swift_key,
-                                         retries=self.swift_attempts,
-                                         starting_backoff=self.swift_backoff)
-        else:
-            self.conn = swift.Connection(retries=self.swift_attempts,
-                                         preauthurl=self.swift_url,
-                                         preauthtoken=self.context.auth_token,
-                                         starting_backoff=self.swift_backoff)
+        self.conn = self._get_connection()
+        # A swift connection wraps a single HTTP connection, so every
+        # concurrent upload needs one of its own.
+        self.upload_conns = pools.Pool(max_size=self.upload_concurrency,
+                                       create=self._get_connection)
 
         super(SwiftBackupDriver, self).__init__(db_driver)
 
+    def _get_connection(self):
+        if CONF.backup_swift_auth == 'single_user':
+            return swift.Connection(authurl=CONF.backup_swift_url,
+                                    user=CONF.backup_swift_user,
+                                    key=CONF.backup_swift_key,
+                                    retries=self.swift_attempts,
+                                    starting_backoff=self.swift_backoff)
+        return swift.Connection(retries=self.swift_attempts,
+                                preauthurl=self.swift_url,
+                                preauthtoken=self.context.auth_token,
+                                starting_backoff=self.swift_backoff)
+
     def _check_container_exists(self, container):
         LOG.debug(_('_check_container_exists: container: %s') % container)
         try:
@@ -195,6 +244,7 @@ class SwiftBackupDriver(BackupDriver):
         metadata = {}
         metadata['version'] = self.DRIVER_VERSION
         metadata['backup_id'] = backup['id']
+        metadata['parent_id'] = backup['parent_id']
         metadata['volume_id'] = volume_id
         metadata['backup_name'] = backup['display_name']
         metadata['backup_description'] = backup['display_description']
@@ -258,22 +308,55 @@ class SwiftBackupDriver(BackupDriver):
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix}
         return object_meta, container
 
-    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
-        """Backup data chunk based on the object metadata and offset"""
+    def _prepare_chunk(self, data, data_offset, object_meta,
+                       fingerprint=None):
+        """Record a data chunk in the object metadata.
+
+        The object is added to the object list here, in the order the
+        volume is read, so the list stays ordered by offset whatever order
+        the uploads complete in.  Returns the object name and the metadata
+        entry of the object, which is completed when the chunk is
+        uploaded.
+        """
         object_prefix = object_meta['prefix']
         object_list = object_meta['list']
         object_id = object_meta['id']
         object_name = '%s-%05d' % (object_prefix, object_id)
+        if fingerprint is None:
+            fingerprint = hashlib.sha256(data).hexdigest()
         obj = {}
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
-        LOG.debug(_('reading chunk of data from volume'))
+        obj[object_name]['sha256'] = fingerprint
         if self.compressor is not None:
             algorithm = CONF.backup_compression_algorithm.lower()
             obj[object_name]['compression'] = algorithm
+        else:
+            obj[object_name]['compression'] = 'none'
+        object_list.append(obj)
+        object_id += 1
+        object_meta['list'] = object_list
+        object_meta['id'] = object_id
+        return object_name, obj[object_name]
+
+    def _run_compressor(self, func, data):
+        """Run a compressor function, in a native thread if configured.
+
+        zlib and bz2 release the GIL while they work, so compressing in
+        native threads lets backups use several cores without stalling the
+        other green threads.
+        """
+        if self.compression_native_threads:
+            return tpool.execute(func, data)
+        return func(data)
+
+    def _compress_chunk(self, object_name, data, object_info):
+        """Compress a data chunk and record the MD5 of the result."""
+        if self.compressor is not None:
+            algorithm = object_info['compression']
             data_size_bytes = len(data)
-            data = self.compressor.compress(data)
+            data = self._run_compressor(self.compressor.compress, data)
             comp_size_bytes = len(data)
             LOG.debug(_('compressed %(data_size_bytes)d bytes of data '
                         'to %(comp_size_bytes)d bytes using '
@@ -285,33 +368,127 @@ class SwiftBackupDriver(BackupDriver):
                       })
         else:
             LOG.debug(_('not compressing data'))
-            obj[object_name]['compression'] = 'none'
 
+        md5 = hashlib.md5(data).hexdigest()
+        object_info['md5'] = md5
+        LOG.debug(_('backup MD5 for %(object_name)s: %(md5)s') %
+                  {'object_name': object_name, 'md5': md5})
+        return data
+
+    def _upload_chunk(self, container, object_name, data, object_info):
+        """Compress a prepared data chunk, store it in swift and verify it."""
+        data = self._compress_chunk(object_name, data, object_info)
+        md5 = object_info['md5']
         reader = StringIO.StringIO(data)
         LOG.debug(_('About to put_object'))
         try:
-            etag = self.conn.put_object(container, object_name, reader,
-                                        content_length=len(data))
+            with self.upload_conns.item() as conn:
+                etag = conn.put_object(container, object_name, reader,
+                                       content_length=len(data))
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=str(err))
         LOG.debug(_('swift MD5 for %(object_name)s: %(etag)s') %
                   {'object_name': object_name, 'etag': etag, })
-        md5 = hashlib.md5(data).hexdigest()
-        obj[object_name]['md5'] = md5
-        LOG.debug(_('backup MD5 for %(object_name)s: %(md5)s') %
-                  {'object_name': object_name, 'md5': md5})
         if etag != md5:
             err = _('error writing object to swift, MD5 of object in '
                     'swift %(etag)s is not the same as MD5 of object sent '
                     'to swift %(md5)s') % {'etag': etag, 'md5': md5}
             raise exception.InvalidBackup(reason=err)
-        object_list.append(obj)
-        object_id += 1
-        object_meta['list'] = object_list
-        object_meta['id'] = object_id
+
+    @staticmethod
+    def _is_zero_chunk(data):
+        """Return whether a data chunk contains only zero bytes."""
+        for offset in xrange(0, len(data), len(ZERO_BLOCK)):
+            block = data[offset:offset + len(ZERO_BLOCK)]
+            if block != ZERO_BLOCK[:len(block)]:
+                return False
+        return True
+
+    def _add_hole(self, data_offset, length, object_meta):
+        """Record a chunk of zeros in the object metadata.
+
+        Holes get an object name like any other chunk, but nothing is
+        stored in swift for them.
+        """
+        object_name = '%s-%05d' % (object_meta['prefix'], object_meta['id'])
+        LOG.debug(_('not storing %(length)d zero bytes, recording '
+                    '%(object_name)s as a hole') %
+                  {'length': length, 'object_name': object_name})
+        obj = {}
+        obj[object_name] = {}
+        obj[object_name]['offset'] = data_offset
+        obj[object_name]['length'] = length
+        obj[object_name]['hole'] = True
+        object_meta['list'].append(obj)
+        object_meta['id'] += 1
+
+    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
+        """Backup data chunk based on the object metadata and offset"""
+        object_name, object_info = self._prepare_chunk(data, data_offset,
+                                                       object_meta)
+        self._upload_chunk(container, object_name, data, object_info)
         LOG.debug(_('Calling eventlet.sleep(0)'))
         eventlet.sleep(0)
 
+    def _upload_chunk_async(self, container, object_name, data,
+                            object_info):
+        """Upload a data chunk from a pool thread.
+
+        Failures are returned rather than raised so that the backup thread
+        can re-raise them; raising here would only get them logged by the
+        hub.
+        """
+        try:
+            self._upload_chunk(container, object_name, data, object_info)
+        except Exception:
+            return sys.exc_info()
+
+    @staticmethod
+    def _reap_uploads(uploads):
+        """Collect finished uploads, re-raising the first failure."""
+        for upload in [upload for upload in uploads if upload.dead]:
+            uploads.remove(upload)
+            exc_info = upload.wait()
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _get_parent_objects(self, backup):
+        """Return the objects of the parent backup, keyed by their extent.
+
+        Each object is returned as a metadata list entry that names the
+        container holding it, so that it can be referenced as is from the
+        metadata of the new backup.  If the parent backup cannot be used
+        the backup is detached from it and done in full.
+        """
+        parent_id = backup['parent_id']
+        if parent_id is None:
+            return {}
+        parent = self.db.backup_get(self.context, parent_id)
+        try:
+            metadata = self._read_metadata(parent)
+        except (swift.ClientException, socket.error, ValueError) as err:
+            LOG.warn(_('unable to read metadata of parent backup '
+                       '%(parent_id)s, doing a full backup: %(err)s') %
+                     {'parent_id': parent_id, 'err': err})
+            backup['parent_id'] = None
+            self.db.backup_update(self.context, backup['id'],
+                                  {'parent_id': None})
+            return {}
+
+        parent_objects = {}
+        for metadata_object in metadata['objects']:
+            for object_name, obj in metadata_object.items():
+                if 'sha256' not in obj:
+                    continue
+                obj = dict(obj)
+                obj.setdefault('container', parent['container'])
+                extent = (obj['offset'], obj['length'])
+                parent_objects[extent] = {object_name: obj}
+        LOG.debug(_('found %(count)d objects in parent backup '
+                    '%(parent_id)s') %
+                  {'count': len(parent_objects), 'parent_id': parent_id})
+        return parent_objects
+
     def _finalize_backup(self, backup, container, object_meta):
         """Finalize the backup by updating its metadata on Swift"""
         object_list = object_meta['list']
@@ -328,37 +505,143 @@ class SwiftBackupDriver(BackupDriver):
         LOG.debug(_('backup %s finished.') % backup['id'])
 
     def backup(self, backup, volume_file):
-        """Backup the given volume to swift using the given backup metadata."""
+        """Backup the given volume to swift using the given backup metadata.
+
+        Reading and compressing the next chunk overlaps with the upload of
+        the previous ones; at most upload_concurrency objects are in flight
+        at any time.  For an incremental backup, chunks whose data matches
+        the parent backup reference the parent's object instead.
+        """
         object_meta, container = self._prepare_backup(backup)
-        while True:
-            data = volume_file.read(self.data_block_size_bytes)
-            data_offset = volume_file.tell()
-            if data == '':
-                break
-            self._backup_chunk(backup, container, data,
-                               data_offset, object_meta)
+        parent_objects = self._get_parent_objects(backup)
+        pool = eventlet.GreenPool(self.upload_concurrency)
+        uploads = []
+        try:
+            while True:
+                data = volume_file.read(self.data_block_size_bytes)
+                data_offset = volume_file.tell()
+                if data == '':
+                    break
+                if self._is_zero_chunk(data):
+                    self._add_hole(data_offset, len(data), object_meta)
+                    continue
+                fingerprint = hashlib.sha256(data).hexdigest()
+                parent_object = parent_objects.get((data_offset, len(data)))
+                if (parent_object is not None and
+                        parent_object.values()[0]['sha256'] == fingerprint):
+                    object_meta['list'].append(parent_object)
+                    continue
+                object_name, object_info = self._prepare_chunk(data,
+                                                               data_offset,
+                                                               object_meta,
+                                                               fingerprint)
+                # spawn() blocks while the pool is full, which bounds the
+                # number of chunks held in memory.  Each upload compresses
+                # its own chunk, so compression runs in parallel too.
+                uploads.append(pool.spawn(self._upload_chunk_async,
+                                          container, object_name, data,
+                                          object_info))
+                # Let the upload start and other threads run
+                eventlet.sleep(0)
+                self._reap_uploads(uploads)
+            pool.waitall()
+            self._reap_uploads(uploads)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                pool.waitall()
         self._finalize_backup(backup, container, object_meta)
 
-    def _restore_v1(self, backup, volume_id, metadata, volume_file):
-        """Restore a v1 swift volume backup from swift."""
-        backup_id = backup['id']
-        LOG.debug(_('v1 swift volume backup restore of %s started'), backup_id)
-        container = backup['container']
-        metadata_objects = metadata['objects']
-        metadata_object_names = sum((obj.keys() for obj in metadata_objects),
-                                    [])
-        LOG.debug(_('metadata_object_names = %s') % metadata_object_names)
+    def _verify_object_list(self, backup, object_names):
+        """Check that swift holds exactly the objects of the backup."""
+        LOG.debug(_('metadata_object_names = %s') % object_names)
         prune_list = [self._metadata_filename(backup)]
         swift_object_names = [swift_object_name for swift_object_name in
                               self._generate_object_names(backup)
                               if swift_object_name not in prune_list]
-        if sorted(swift_object_names) != sorted(metadata_object_names):
+        if sorted(swift_object_names) != sorted(object_names):
             err = _('restore_backup aborted, actual swift object list in '
                     'swift does not match object list stored in metadata')
             raise exception.InvalidBackup(reason=err)
 
+    def _fsync(self, volume_file):
+        # Be tolerant to IO implementations that do not support fileno()
+        try:
+            fileno = volume_file.fileno()
+        except IOError:
+            LOG.info("volume_file does not support fileno() so skipping "
+                     "fsync()")
+        else:
+            os.fsync(fileno)
+
+    @staticmethod
+    def _get_file_mode(volume_file):
+        """Return the stat mode of the volume file, or None if unknown."""
+        try:
+            return os.fstat(volume_file.fileno()).st_mode
+        except (IOError, OSError, AttributeError):
+            return None
+
+    def _restore_hole(self, volume_file, length, file_mode):
+        """Restore a hole at the current position of the volume file.
+
+        Returns the number of bytes written through the page cache, which
+        is zero unless the hole had to be filled with zeros.
+        """
+        volume_file.flush()
+        offset = volume_file.tell()
+        if file_mode is not None and stat.S_ISBLK(file_mode):
+            try:
+                fcntl.ioctl(volume_file.fileno(), BLKZEROOUT,
+                            struct.pack('=QQ', offset, length))
+            except IOError as err:
+                if err.errno not in (errno.EINVAL, errno.ENOTTY,
+                                     errno.EOPNOTSUPP):
+                    raise
+                LOG.debug(_('BLKZEROOUT not supported (%s), writing zeros '
+                            'instead') % err)
+            else:
+                volume_file.seek(length, os.SEEK_CUR)
+                return 0
+        elif (file_mode is not None and stat.S_ISREG(file_mode) and
+                os.fstat(volume_file.fileno()).st_size <= offset):
+            # Past the end of a regular file, so the hole reads as zeros
+            volume_file.seek(length, os.SEEK_CUR)
+            return 0
+
+        remaining = length
+        while remaining > 0:
+            block = ZERO_BLOCK[:remaining]
+            volume_file.write(block)
+            remaining -= len(block)
+        return length
+
+    def _restore_objects(self, backup, volume_id, metadata_objects,
+                         volume_file):
+        """Write the given backup objects to the volume, in order.
+
+        Objects are read from the backup container unless their metadata
+        names another one.  The volume is fsynced every
+        restore_fsync_bytes bytes rather than after every object.
+        """
+        backup_id = backup['id']
+        file_mode = self._get_file_mode(volume_file)
+        unsynced_bytes = 0
         for metadata_object in metadata_objects:
             object_name = metadata_object.keys()[0]
+            if metadata_object[object_name].get('hole'):
+                length = metadata_object[object_name]['length']
+                LOG.debug(_('restoring hole %(object_name)s of %(length)d '
+                            'bytes to volume %(volume_id)s') %
+                          {
+                              'object_name': object_name,
+                              'length': length,
+                              'volume_id': volume_id,
+                          })
+                unsynced_bytes += self._restore_hole(volume_file, length,
+                                                     file_mode)
+                continue
+            container = metadata_object[object_name].get('container',
+                                                         backup['container'])
             LOG.debug(_('restoring object from swift. backup: %(backup_id)s, '
                         'container: %(container)s, swift object name: '
                         '%(object_name)s, volume: %(volume_id)s') %
@@ -377,30 +660,64 @@ class SwiftBackupDriver(BackupDriver):
             if decompressor is not None:
                 LOG.debug(_('decompressing data using %s algorithm') %
                           compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                volume_file.write(decompressed)
-            else:
-                volume_file.write(body)
+                body = self._run_compressor(decompressor.decompress, body)
+            volume_file.write(body)
 
             # force flush every write to avoid long blocking write on close
             volume_file.flush()
-
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.info("volume_file does not support fileno() so skipping "
-                         "fsync()")
-            else:
-                os.fsync(fileno)
+            unsynced_bytes += len(body)
+            if unsynced_bytes >= self.restore_fsync_bytes:
+                self._fsync(volume_file)
+                unsynced_bytes = 0
 
             # Restoring a backup to a volume can take some time. Yield so other
             # threads can run, allowing for among other things the service
             # status to be updated
             eventlet.sleep(0)
+
+        volume_file.flush()
+        if file_mode is not None and stat.S_ISREG(file_mode):
+            # A trailing hole leaves a regular file short of its full size
+            size = volume_file.tell()
+            if os.fstat(volume_file.fileno()).st_size < size:
+                volume_file.truncate(size)
+        self._fsync(volume_file)
+
+    def _restore_v1(self, backup, volume_id, metadata, volume_file):
+        """Restore a v1 swift volume backup from swift."""
+        backup_id = backup['id']
+        LOG.debug(_('v1 swift volume backup restore of %s started'), backup_id)
+        metadata_objects = metadata['objects']
+        metadata_object_names = sum((obj.keys() for obj in metadata_objects),
+                                    [])
+        self._verify_object_list(backup, metadata_object_names)
+        self._restore_objects(backup, volume_id, metadata_objects,
+                              volume_file)
         LOG.debug(_('v1 swift volume backup restore of %s finished'),
                   backup_id)
 
+    def _restore_v2(self, backup, volume_id, metadata, volume_file):
+        """Restore a v2 swift volume backup from swift.
+
+        v2 metadata may reference objects stored by the parent backups of
+        an incremental backup; those are marked with the container that
+        holds them and are not listed under this backup's prefix.  It may
+        also contain holes, which have no object in swift at all.
+        """
+        backup_id = backup['id']
+        LOG.debug(_('v2 swift volume backup restore of %s started'), backup_id)
+        metadata_objects = metadata['objects']
+        metadata_object_names = [object_name
+                                 for obj in metadata_objects
+                                 for object_name in obj
+                                 if 'container' not in obj[object_name] and
+                                 not obj[object_name].get('hole')]
+        self._verify_object_list(backup, metadata_object_names)
+        self._restore_objects(backup, volume_id, metadata_objects,
+                              volume_file)
+        LOG.debug(_('v2 swift volume backup restore of %s finished'),
+                  backup_id)
+
     def restore(self, backup, volume_id, volume_file):
         """Restore the given volume backup from swift."""
         backup_id = backup['id']
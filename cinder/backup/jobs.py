@@ -0,0 +1,202 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Scheduling and throttling of backup and restore jobs.
+
+The backup manager runs every backup and restore through a JobQueue, which
+limits the number of jobs running at once on a node.  Jobs waiting for a
+slot are queued per project and started round-robin across projects, so a
+burst of requests from one tenant does not starve the others.
+
+The volume data of running jobs is read and written through a ProgressFile,
+which shares a node wide Throttle between the jobs and periodically reports
+the bytes transferred and the transfer rate of the job.
+"""
+
+import collections
+import contextlib
+import time
+
+import eventlet
+from eventlet import event
+
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class JobQueue(object):
+    """Limits the number of concurrent jobs, fairly across projects.
+
+    A max_jobs of 0 or less runs every job immediately.
+    """
+
+    def __init__(self, max_jobs):
+        self.max_jobs = max_jobs
+        self.running = 0
+        # project_id -> waiters of the project, in the order the projects
+        # get their next turn.
+        self._waiters = collections.OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(w) for w in self._waiters.itervalues())
+
+    @contextlib.contextmanager
+    def job(self, project_id):
+        """Runs the body of the with statement as a job of the project."""
+        self._acquire(project_id)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, project_id):
+        if self.max_jobs <= 0 or (self.running < self.max_jobs and
+                                  not self._waiters):
+            self.running += 1
+            return
+        LOG.debug(_('Queueing job of project %(project_id)s, %(running)d '
+                    'jobs running and %(waiting)d waiting.') %
+                  {'project_id': project_id, 'running': self.running,
+                   'waiting': self.waiting})
+        waiter = event.Event()
+        self._waiters.setdefault(project_id,
+                                 collections.deque()).append(waiter)
+        waiter.wait()
+
+    def _release(self):
+        if not self._waiters:
+            self.running -= 1
+            return
+        # Hand the slot over to the first waiter of the next project, and
+        # send the project to the back of the line.
+        project_id, waiters = self._waiters.popitem(last=False)
+        waiter = waiters.popleft()
+        if waiters:
+            self._waiters[project_id] = waiters
+        waiter.send()
+
+
+class Throttle(object):
+    """Limits the combined transfer rate of the callers, in bytes/sec.
+
+    A rate of 0 or less disables throttling.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._next = 0.0
+
+    def consume(self, nbytes):
+        """Accounts for nbytes transferred, sleeping to keep to the rate."""
+        if self.rate <= 0 or nbytes <= 0:
+            return
+        now = time.time()
+        self._next = max(self._next, now) + float(nbytes) / self.rate
+        delay = self._next - now
+        if delay > 0:
+            eventlet.sleep(delay)
+
+
+class ProgressFile(object):
+    """Volume file wrapper that throttles and reports data transfers.
+
+    All other attributes are those of the wrapped file, so that backup
+    drivers can still use its fileno() or recognize special volume files.
+    progress_cb(bytes, rate) is called at most every interval seconds,
+    and when the transfer finishes.
+    """
+
+    def __init__(self, volume_file, throttle=None, progress_cb=None,
+                 interval=0):
+        self.volume_file = volume_file
+        self.throttle = throttle
+        self.progress_cb = progress_cb
+        self.interval = interval
+        self.bytes = 0
+        self.start = time.time()
+        self._last_report = self.start
+
+    def __getattr__(self, name):
+        return getattr(self.volume_file, name)
+
+    def __iter__(self):
+        return iter(self.volume_file)
+
+    def read(self, *args):
+        data = self.volume_file.read(*args)
+        self._transferred(len(data))
+        return data
+
+    def write(self, data):
+        self.volume_file.write(data)
+        self._transferred(len(data))
+
+    @property
+    def rate(self):
+        elapsed = time.time() - self.start
+        if elapsed <= 0:
+            return 0
+        return int(self.bytes / elapsed)
+
+    def _transferred(self, nbytes):
+        self.bytes += nbytes
+        if self.throttle is not None:
+            self.throttle.consume(nbytes)
+        if (self.progress_cb is not None and self.interval > 0 and
+                time.time() - self._last_report >= self.interval):
+            self.report()
+
+    def report(self):
+        """Reports the progress of the transfer."""
+        self._last_report = time.time()
+        if self.progress_cb is None:
+            return
+        try:
+            self.progress_cb(self.bytes, self.rate)
+        except Exception:
+            # Progress is informational only, never fail the job on it.
+            LOG.exception(_('Failed to report backup progress.'))
+
+
+class JobBackupDriver(object):
+    """Backup driver wrapper that passes on volume files as ProgressFiles.
+
+    Everything else is delegated to the wrapped backup driver.
+    """
+
+    def __init__(self, driver, throttle=None, progress_cb=None, interval=0):
+        self.driver = driver
+        self.throttle = throttle
+        self.progress_cb = progress_cb
+        self.interval = interval
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def _run(self, func, volume_file, *args):
+        progress_file = ProgressFile(volume_file, self.throttle,
+                                     self.progress_cb, self.interval)
+        try:
+            return func(*(args + (progress_file,)))
+        finally:
+            progress_file.report()
+
+    def backup(self, backup, volume_file):
+        return self._run(self.driver.backup, volume_file, backup)
+
+    def restore(self, backup, volume_id, volume_file):
+        return self._run(self.driver.restore, volume_file, backup, volume_id)
@@ -30,11 +30,18 @@ Volume backups can be created, restored, deleted and listed.
 :backup_manager:  The module name of a class derived from
                           :class:`manager.Manager` (default:
                           :class:`cinder.backup.manager.Manager`).
+:backup_max_concurrent_jobs:  Number of backups and restores that run at once
+                              on a node, 0 for no limit (default: 4).
+:backup_max_bytes_per_sec:  Combined transfer rate limit of the backups and
+                            restores of a node, 0 for no limit (default: 0).
+:backup_progress_interval:  Seconds between progress updates of the backup
+                            records, 0 to disable (default: 30).
 
 """
 
 from oslo.config import cfg
 
+from cinder.backup import jobs
 from cinder import context
 from cinder import exception
 from cinder import manager
@@ -50,6 +57,20 @@ backup_manager_opts = [
                default='cinder.backup.drivers.swift',
                help='Driver to use for backups.',
                deprecated_name='backup_service'),
+    cfg.IntOpt('backup_max_concurrent_jobs',
+               default=4,
+               help='Maximum number of backups and restores to run '
+                    'concurrently on this node, further jobs are queued '
+                    'fairly across projects. 0 means no limit.'),
+    cfg.IntOpt('backup_max_bytes_per_sec',
+               default=0,
+               help='Maximum combined rate in bytes per second at which the '
+                    'backups and restores of this node read and write '
+                    'volume data. 0 means no limit.'),
+    cfg.IntOpt('backup_progress_interval',
+               default=30,
+               help='Interval in seconds between updates of the progress of '
+                    'running backups and restores. 0 disables the updates.'),
 ]
 
 # This map doesn't need to be extended in the future since it's only
@@ -71,6 +92,8 @@ class BackupManager(manager.SchedulerDependentManager):
         self.az = CONF.storage_availability_zone
         self.volume_managers = {}
         self._setup_volume_drivers()
+        self.job_queue = jobs.JobQueue(CONF.backup_max_concurrent_jobs)
+        self.throttle = jobs.Throttle(CONF.backup_max_bytes_per_sec)
         super(BackupManager, self).__init__(service_name='backup',
                                             *args, **kwargs)
 
@@ -172,6 +195,23 @@ class BackupManager(manager.SchedulerDependentManager):
 
         driver.set_initialized()
 
+    def _get_job_backup_driver(self, context, backup_id):
+        """Returns the backup driver for a job on the given backup.
+
+        The volume data of the job is throttled to the bandwidth limit of
+        the node, and its progress is stored in the backup record.
+        """
+        def _update_progress(nbytes, rate):
+            self.db.backup_update(context, backup_id,
+                                  {'progress_bytes': nbytes,
+                                   'progress_rate': rate})
+
+        self.db.backup_update(context, backup_id, {'progress_bytes': 0,
+                                                   'progress_rate': 0})
+        return jobs.JobBackupDriver(self.service.get_backup_driver(context),
+                                    self.throttle, _update_progress,
+                                    CONF.backup_progress_interval)
+
     def init_host(self):
         """Do any initialization that needs to be run if this is a
            standalone service.
@@ -258,9 +298,11 @@ class BackupManager(manager.SchedulerDependentManager):
             raise exception.InvalidBackup(reason=err)
 
         try:
-            backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).backup_volume(context, backup,
-                                                    backup_service)
+            with self.job_queue.job(backup['project_id']):
+                backup_service = self._get_job_backup_driver(context,
+                                                             backup_id)
+                self._get_driver(backend).backup_volume(context, backup,
+                                                        backup_service)
         except Exception as err:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
@@ -334,10 +376,12 @@ class BackupManager(manager.SchedulerDependentManager):
             raise exception.InvalidBackup(reason=err)
 
         try:
-            backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).restore_backup(context, backup,
-                                                     volume,
-                                                     backup_service)
+            with self.job_queue.job(backup['project_id']):
+                backup_service = self._get_job_backup_driver(context,
+                                                             backup_id)
+                self._get_driver(backend).restore_backup(context, backup,
+                                                         volume,
+                                                         backup_service)
         except Exception as err:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
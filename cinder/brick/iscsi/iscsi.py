@@ -59,6 +59,80 @@ class TargetAdmin(executor.Executor):
         """Remove a iSCSI target and logical unit."""
         raise NotImplementedError()
 
+    def create_iscsi_targets(self, targets, **kwargs):
+        """Create many iSCSI targets and logical units.
+
+        :param targets: list of dicts with the name, tid, lun and path, and
+                        optionally the chap_auth and old_name, of each
+                        target, as taken by create_iscsi_target
+        :returns: dict of the tid of each target, by target name
+
+        Helpers override this to configure all of the targets with as few
+        invocations of the admin command as they can.
+        """
+        tids = {}
+        for target in targets:
+            target_kwargs = dict(kwargs)
+            target_kwargs.update(target)
+            tids[target['name']] = self.create_iscsi_target(**target_kwargs)
+        return tids
+
+    def remove_iscsi_targets(self, targets, **kwargs):
+        """Remove many iSCSI targets and logical units.
+
+        :param targets: list of dicts with the tid, lun, vol_id and vol_name
+                        of each target, as taken by remove_iscsi_target
+        """
+        for target in targets:
+            target_kwargs = dict(kwargs)
+            target_kwargs.update(target)
+            self.remove_iscsi_target(**target_kwargs)
+
+    def get_targets(self):
+        """Returns the tid of each target configured, by target name."""
+        raise NotImplementedError()
+
+    def _missing_targets(self, targets, actual):
+        """Returns the targets to (re)create, given the actual targets."""
+        return [target for target in targets if target['name'] not in actual]
+
+    def reconcile_iscsi_targets(self, targets, remove_prefix=None, **kwargs):
+        """Make the configured targets match the given targets.
+
+        The targets are compared with the targets actually configured, and
+        only the missing ones are created, in one batch.  Configured targets
+        whose name starts with remove_prefix and which are not in targets
+        are removed, in one batch.  Nothing is removed by default, as other
+        services may share the target daemon.
+
+        :param targets: list of the desired targets, as taken by
+                        create_iscsi_targets
+        :param remove_prefix: name prefix of the targets owned by the caller
+        :returns: dict of the tid of each of the targets, by target name
+        """
+        actual = self.get_targets()
+        missing = self._missing_targets(targets, actual)
+
+        tids = dict((target['name'], actual.get(target['name']))
+                    for target in targets)
+        if missing:
+            LOG.info(_('Creating %(missing)d of %(total)d iscsi targets') %
+                     {'missing': len(missing), 'total': len(targets)})
+            tids.update(self.create_iscsi_targets(missing, **kwargs))
+
+        if remove_prefix:
+            stale = []
+            for name, tid in actual.iteritems():
+                if name.startswith(remove_prefix) and name not in tids:
+                    vol_name = name[len(remove_prefix):]
+                    stale.append({'tid': tid, 'lun': 0,
+                                  'vol_id': vol_name, 'vol_name': vol_name})
+            if stale:
+                LOG.info(_('Removing %d stale iscsi targets') % len(stale))
+                self.remove_iscsi_targets(stale, **kwargs)
+
+        return tids
+
     def _new_target(self, name, tid, **kwargs):
         """Create a new iSCSI target."""
         raise NotImplementedError()
@@ -113,6 +187,20 @@ class TgtAdm(TargetAdmin):
 
         return None
 
+    def _show_targets(self):
+        """Returns the tid and the LUNs of each target, by target name."""
+        (out, err) = self._execute('tgt-admin', '--show', run_as_root=True)
+        targets = {}
+        luns = None
+        for line in out.split('\n'):
+            if line.startswith('Target '):
+                (tid, name) = line[len('Target '):].split(':', 1)
+                luns = []
+                targets[name.strip()] = (tid, luns)
+            elif luns is not None and line.strip().startswith('LUN: '):
+                luns.append(line.strip()[len('LUN: '):])
+        return targets
+
     def _verify_backing_lun(self, iqn, tid):
         backing_lun = True
         capture = False
@@ -158,13 +246,8 @@ class TgtAdm(TargetAdmin):
                         "id:%(vol_id)s: %(e)s")
                       % {'vol_id': name, 'e': str(e)})
 
-    def create_iscsi_target(self, name, tid, lun, path,
-                            chap_auth=None, **kwargs):
-        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
-        # compatibility
-
-        fileutils.ensure_tree(self.volumes_dir)
-
+    def _write_volume_conf(self, name, path, chap_auth=None):
+        """Writes the persistent config file of a target, returns its path."""
         vol_id = name.split(':')[1]
         if chap_auth is None:
             volume_conf = self.VOLUME_CONF % (name, path)
@@ -172,18 +255,30 @@ class TgtAdm(TargetAdmin):
             volume_conf = self.VOLUME_CONF_WITH_CHAP_AUTH % (name,
                                                              path, chap_auth)
 
-        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
-        volumes_dir = self.volumes_dir
-        volume_path = os.path.join(volumes_dir, vol_id)
+        volume_path = os.path.join(self.volumes_dir, vol_id)
 
         f = open(volume_path, 'w+')
         f.write(volume_conf)
         f.close()
+        return volume_path
 
-        old_persist_file = None
-        old_name = kwargs.get('old_name', None)
+    def _remove_old_persist_file(self, old_name):
         if old_name is not None:
-            old_persist_file = os.path.join(volumes_dir, old_name)
+            old_persist_file = os.path.join(self.volumes_dir, old_name)
+            if os.path.exists(old_persist_file):
+                os.unlink(old_persist_file)
+
+    def create_iscsi_target(self, name, tid, lun, path,
+                            chap_auth=None, **kwargs):
+        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
+        # compatibility
+
+        fileutils.ensure_tree(self.volumes_dir)
+
+        vol_id = name.split(':')[1]
+        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
+        volumes_dir = self.volumes_dir
+        volume_path = self._write_volume_conf(name, path, chap_auth)
 
         try:
             (out, err) = self._execute('tgt-admin',
@@ -243,11 +338,76 @@ class TgtAdm(TargetAdmin):
             os.unlink(volume_path)
             raise exception.ISCSITargetCreateFailed(volume_id=vol_id)
 
-        if old_persist_file is not None and os.path.exists(old_persist_file):
-            os.unlink(old_persist_file)
+        self._remove_old_persist_file(kwargs.get('old_name', None))
 
         return tid
 
+    def create_iscsi_targets(self, targets, **kwargs):
+        """Create many targets with one tgt-admin --update.
+
+        The config files of all of the targets are written and tgt-admin
+        applies them at once.  The targets are then verified with one
+        tgt-admin --show, and only the ones which are missing or have no
+        backing lun go through create_iscsi_target again.
+        """
+        if not targets:
+            return {}
+
+        fileutils.ensure_tree(self.volumes_dir)
+        LOG.info(_('Creating %d iscsi_targets') % len(targets))
+        for target in targets:
+            self._write_volume_conf(target['name'], target['path'],
+                                    target.get('chap_auth'))
+
+        try:
+            (out, err) = self._execute('tgt-admin', '--update', 'ALL',
+                                       run_as_root=True)
+            LOG.debug("StdOut from tgt-admin --update ALL: %s" % out)
+            LOG.debug("StdErr from tgt-admin --update ALL: %s" % err)
+        except putils.ProcessExecutionError as e:
+            LOG.warning(_("Failed to update the iscsi targets, creating "
+                          "them one at a time: %s") % str(e))
+            return super(TgtAdm, self).create_iscsi_targets(targets,
+                                                            **kwargs)
+
+        actual = self.get_targets()
+        tids = {}
+        failed = []
+        for target in targets:
+            tid = actual.get(target['name'])
+            if tid is None:
+                failed.append(target)
+                continue
+            tids[target['name']] = tid
+            self._remove_old_persist_file(target.get('old_name'))
+
+        if failed:
+            LOG.warning(_("%d iscsi targets not created by the update, "
+                          "creating them one at a time") % len(failed))
+            tids.update(super(TgtAdm, self).create_iscsi_targets(failed,
+                                                                 **kwargs))
+        return tids
+
+    def get_targets(self):
+        # Targets without their backing lun (lun 1) need to be recreated,
+        # see create_iscsi_target, so they don't count.
+        return dict((name, tid)
+                    for name, (tid, luns) in self._show_targets().iteritems()
+                    if '1' in luns)
+
+    def _missing_targets(self, targets, actual):
+        # The persistent config file is what brings a target back after
+        # tgtd restarts, so it must exist too, and a renamed one must go.
+        missing = []
+        for target in targets:
+            vol_id = target['name'].split(':')[1]
+            if (target['name'] not in actual or
+                    target.get('old_name') is not None or
+                    not os.path.exists(os.path.join(self.volumes_dir,
+                                                    vol_id))):
+                missing.append(target)
+        return missing
+
     def remove_iscsi_target(self, tid, lun, vol_id, vol_name, **kwargs):
         LOG.info(_('Removing iscsi_target for: %s') % vol_id)
         vol_uuid_file = vol_name
@@ -285,6 +445,7 @@ class TgtAdm(TargetAdmin):
 
 class IetAdm(TargetAdmin):
     """iSCSI target administration using ietadm."""
+    IET_VOLUMES = '/proc/net/iet/volume'
 
     def __init__(self, root_helper, iet_conf='/etc/iet/ietd.conf',
                  iscsi_iotype='fileio', execute=putils.execute):
@@ -324,67 +485,127 @@ class IetAdm(TargetAdmin):
                 putils.execute('chown', orig_uid, path,
                                root_helper=self._root_helper, run_as_root=True)
 
-    def create_iscsi_target(self, name, tid, lun, path,
-                            chap_auth=None, **kwargs):
-
-        # NOTE (jdg): Address bug: 1175207
-        kwargs.pop('old_name', None)
-
+    def _configure_target(self, name, tid, lun, path, chap_auth=None,
+                          **kwargs):
         self._new_target(name, tid, **kwargs)
         self._new_logicalunit(tid, lun, path, **kwargs)
         if chap_auth is not None:
             (type, username, password) = chap_auth.split()
             self._new_auth(tid, type, username, password, **kwargs)
 
+    def _append_conf(self, targets):
+        """Appends the targets to the config file, changing it only once."""
         conf_file = self.iet_conf
-        if os.path.exists(conf_file):
-            try:
-                volume_conf = """
+        if not os.path.exists(conf_file):
+            return
+        try:
+            volume_confs = []
+            for target in targets:
+                volume_confs.append("""
                         Target %s
                             %s
                             Lun 0 Path=%s,Type=%s
-                """ % (name, chap_auth, path, self._iotype(path))
+                """ % (target['name'], target.get('chap_auth'),
+                       target['path'], self._iotype(target['path'])))
 
-                with self.temporary_chown(conf_file):
-                    f = open(conf_file, 'a+')
-                    f.write(volume_conf)
-                    f.close()
-            except putils.ProcessExecutionError as e:
-                vol_id = name.split(':')[1]
-                LOG.error(_("Failed to create iscsi target for volume "
-                            "id:%(vol_id)s: %(e)s")
-                          % {'vol_id': vol_id, 'e': str(e)})
-                raise exception.ISCSITargetCreateFailed(volume_id=vol_id)
+            with self.temporary_chown(conf_file):
+                f = open(conf_file, 'a+')
+                f.write(''.join(volume_confs))
+                f.close()
+        except putils.ProcessExecutionError as e:
+            vol_id = ', '.join(target['name'].split(':')[1]
+                               for target in targets)
+            LOG.error(_("Failed to create iscsi target for volume "
+                        "id:%(vol_id)s: %(e)s")
+                      % {'vol_id': vol_id, 'e': str(e)})
+            raise exception.ISCSITargetCreateFailed(volume_id=vol_id)
+
+    def _remove_conf(self, vol_names):
+        """Removes the volumes from the config file, rewriting it once."""
+        conf_file = self.iet_conf
+        if not os.path.exists(conf_file):
+            return
+        with self.temporary_chown(conf_file):
+            try:
+                iet_conf_text = open(conf_file, 'r+')
+                full_txt = iet_conf_text.readlines()
+                new_iet_conf_txt = []
+                count = 0
+                for line in full_txt:
+                    if count > 0:
+                        count -= 1
+                        continue
+                    elif any(re.search(vol_uuid_file, line)
+                             for vol_uuid_file in vol_names):
+                        count = 2
+                        continue
+                    else:
+                        new_iet_conf_txt.append(line)
+
+                iet_conf_text.seek(0)
+                iet_conf_text.truncate(0)
+                iet_conf_text.writelines(new_iet_conf_txt)
+            finally:
+                iet_conf_text.close()
+
+    def create_iscsi_target(self, name, tid, lun, path,
+                            chap_auth=None, **kwargs):
+
+        # NOTE (jdg): Address bug: 1175207
+        kwargs.pop('old_name', None)
+
+        self._configure_target(name, tid, lun, path, chap_auth, **kwargs)
+        self._append_conf([{'name': name, 'path': path,
+                            'chap_auth': chap_auth}])
         return tid
 
     def remove_iscsi_target(self, tid, lun, vol_id, vol_name, **kwargs):
         LOG.info(_('Removing iscsi_target for volume: %s') % vol_id)
         self._delete_logicalunit(tid, lun, **kwargs)
         self._delete_target(tid, **kwargs)
-        vol_uuid_file = vol_name
-        conf_file = self.iet_conf
-        if os.path.exists(conf_file):
-            with self.temporary_chown(conf_file):
-                try:
-                    iet_conf_text = open(conf_file, 'r+')
-                    full_txt = iet_conf_text.readlines()
-                    new_iet_conf_txt = []
-                    count = 0
-                    for line in full_txt:
-                        if count > 0:
-                            count -= 1
-                            continue
-                        elif re.search(vol_uuid_file, line):
-                            count = 2
-                            continue
-                        else:
-                            new_iet_conf_txt.append(line)
-
-                    iet_conf_text.seek(0)
-                    iet_conf_text.truncate(0)
-                    iet_conf_text.writelines(new_iet_conf_txt)
-                finally:
-                    iet_conf_text.close()
+        self._remove_conf([vol_name])
+
+    def create_iscsi_targets(self, targets, **kwargs):
+        """Create many targets, appending them to the config file at once.
+
+        ietadm configures one target per invocation, but the config file
+        is chowned and written once for all of the targets.
+        """
+        kwargs.pop('old_name', None)
+        tids = {}
+        for target in targets:
+            self._configure_target(target['name'], target['tid'],
+                                   target['lun'], target['path'],
+                                   target.get('chap_auth'), **kwargs)
+            tids[target['name']] = target['tid']
+        if targets:
+            self._append_conf(targets)
+        return tids
+
+    def remove_iscsi_targets(self, targets, **kwargs):
+        """Remove many targets, rewriting the config file once."""
+        for target in targets:
+            LOG.info(_('Removing iscsi_target for volume: %s') %
+                     target['vol_id'])
+            self._delete_logicalunit(target['tid'], target['lun'], **kwargs)
+            self._delete_target(target['tid'], **kwargs)
+        if targets:
+            self._remove_conf([target['vol_name'] for target in targets])
+
+    def get_targets(self):
+        # The targets of the kernel module, no root needed to read them.
+        targets = {}
+        try:
+            with open(self.IET_VOLUMES) as f:
+                for line in f:
+                    m = re.match(r'tid:(\d+)\s+name:(\S+)', line)
+                    if m:
+                        targets[m.group(2)] = int(m.group(1))
+        except IOError as e:
+            LOG.warning(_("Could not read the iscsi targets from "
+                          "%(file)s: %(e)s") %
+                        {'file': self.IET_VOLUMES, 'e': str(e)})
+        return targets
 
     def _new_target(self, name, tid, **kwargs):
         self._run('--op', 'new',
@@ -435,9 +656,20 @@ class FakeIscsiHelper(object):
         self.tid += 1
         return self.tid
 
+    def create_iscsi_targets(self, targets, **kwargs):
+        return dict((target['name'], self.create_iscsi_target())
+                    for target in targets)
+
+    def reconcile_iscsi_targets(self, targets, remove_prefix=None, **kwargs):
+        return self.create_iscsi_targets(targets)
+
 
 class LioAdm(TargetAdmin):
     """iSCSI target administration for LIO using python-rtslib."""
+    # Targets configured by each cinder-rtstool invocation of a batch, which
+    # keeps the command line of the invocations well under the limits.
+    TARGETS_PER_COMMAND = 100
+
     def __init__(self, root_helper, lio_initiator_iqns='',
                  iscsi_target_prefix='iqn.2010-10.org.openstack:',
                  execute=putils.execute):
@@ -465,6 +697,16 @@ class LioAdm(TargetAdmin):
 
         return None
 
+    def _chap_credentials(self, chap_auth):
+        # rtstool requires chap_auth, but unit tests don't provide it
+        if chap_auth is None:
+            return ('test_id', 'test_pass')
+        return tuple(chap_auth.split(' ')[1:])
+
+    def _batches(self, items):
+        for i in xrange(0, len(items), self.TARGETS_PER_COMMAND):
+            yield items[i:i + self.TARGETS_PER_COMMAND]
+
     def create_iscsi_target(self, name, tid, lun, path,
                             chap_auth=None, **kwargs):
         # tid and lun are not used
@@ -473,12 +715,8 @@ class LioAdm(TargetAdmin):
 
         LOG.info(_('Creating iscsi_target for volume: %s') % vol_id)
 
-        # rtstool requires chap_auth, but unit tests don't provide it
-        chap_auth_userid = 'test_id'
-        chap_auth_password = 'test_pass'
-
-        if chap_auth is not None:
-            (chap_auth_userid, chap_auth_password) = chap_auth.split(' ')[1:]
+        (chap_auth_userid, chap_auth_password) = self._chap_credentials(
+            chap_auth)
 
         extra_args = []
         if self.lio_initiator_iqns:
@@ -526,6 +764,69 @@ class LioAdm(TargetAdmin):
             LOG.error("%s" % str(e))
             raise exception.ISCSITargetRemoveFailed(volume_id=vol_id)
 
+    def create_iscsi_targets(self, targets, **kwargs):
+        """Create many targets with one cinder-rtstool create-targets.
+
+        Larger batches are split in invocations of TARGETS_PER_COMMAND
+        targets.  The targets are then verified with one get-targets.
+        """
+        if not targets:
+            return {}
+
+        LOG.info(_('Creating %d iscsi_targets') % len(targets))
+        for batch in self._batches(targets):
+            command_args = ['cinder-rtstool', 'create-targets',
+                            self.lio_initiator_iqns or '']
+            for target in batch:
+                command_args.extend([target['path'], target['name']])
+                command_args.extend(self._chap_credentials(
+                    target.get('chap_auth')))
+            try:
+                self._execute(*command_args, run_as_root=True)
+            except putils.ProcessExecutionError as e:
+                vol_id = ', '.join(target['name'].split(':')[1]
+                                   for target in batch)
+                LOG.error(_("Failed to create iscsi target for volume "
+                            "id:%s.") % vol_id)
+                LOG.error("%s" % str(e))
+                raise exception.ISCSITargetCreateFailed(volume_id=vol_id)
+
+        actual = self.get_targets()
+        tids = {}
+        for target in targets:
+            if target['name'] not in actual:
+                LOG.error(_("Failed to create iscsi target for volume "
+                            "id:%s.") % target['name'].split(':')[1])
+                raise exception.NotFound()
+            tids[target['name']] = actual[target['name']]
+        return tids
+
+    def remove_iscsi_targets(self, targets, **kwargs):
+        """Remove many targets with one cinder-rtstool delete."""
+        for batch in self._batches(targets):
+            iqns = ['%s%s' % (self.iscsi_target_prefix, target['vol_name'])
+                    for target in batch]
+            LOG.info(_('Removing iscsi_targets: %s') %
+                     ', '.join(str(target['vol_id']) for target in batch))
+            try:
+                self._execute('cinder-rtstool', 'delete', *iqns,
+                              run_as_root=True)
+            except putils.ProcessExecutionError as e:
+                vol_id = ', '.join(str(target['vol_id']) for target in batch)
+                LOG.error(_("Failed to remove iscsi target for volume "
+                            "id:%s.") % vol_id)
+                LOG.error("%s" % str(e))
+                raise exception.ISCSITargetRemoveFailed(volume_id=vol_id)
+
+    def get_targets(self):
+        (out, err) = self._execute('cinder-rtstool',
+                                   'get-targets',
+                                   run_as_root=True)
+        # LIO has no tids, the target name stands in for it as in
+        # _get_target.
+        return dict((line.strip(), line.strip())
+                    for line in out.split('\n') if line.strip())
+
     def show_target(self, tid, iqn=None, **kwargs):
         if iqn is None:
             raise exception.InvalidParameterValue(
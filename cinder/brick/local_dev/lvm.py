@@ -29,6 +29,7 @@ from cinder.brick import executor
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils as putils
+from cinder.openstack.common import timeutils
 
 LOG = logging.getLogger(__name__)
 
@@ -38,7 +39,7 @@ class LVM(executor.Executor):
 
     def __init__(self, vg_name, root_helper, create_vg=False,
                  physical_volumes=None, lvm_type='default',
-                 executor=putils.execute):
+                 executor=putils.execute, inventory_max_age=0):
 
         """Initialize the LVM object.
 
@@ -52,6 +53,11 @@ class LVM(executor.Executor):
         :param physical_volumes: List of PVs to build VG on
         :param lvm_type: VG and Volume type (default, or thin)
         :param executor: Execute method to use, None uses common/processutils
+        :param inventory_max_age: Seconds the LV and VG info are cached for,
+                                  0 runs lvs/vgs on every lookup.  The
+                                  changes made through this object update
+                                  the cache, the others are seen once it
+                                  is older than this.
 
         """
         super(LVM, self).__init__(execute=executor, root_helper=root_helper)
@@ -68,6 +74,16 @@ class LVM(executor.Executor):
         self._supports_snapshot_lv_activation = None
         self._supports_lvchange_ignoreskipactivation = None
 
+        # LV inventory: the LVs by name as of the last full lvs, the LVs
+        # changed through this object since, which are looked up on their
+        # own, and the sets of the changes made during running refreshes.
+        self.inventory_max_age = inventory_max_age
+        self._lv_inventory = {}
+        self._lv_inventory_updated_at = None
+        self._stale_lvs = set()
+        self._lv_refreshes = []
+        self._vg_info_updated_at = None
+
         if create_vg and physical_volumes is not None:
             self.pv_list = physical_volumes
 
@@ -235,6 +251,35 @@ class LVM(executor.Executor):
 
         return self._supports_lvchange_ignoreskipactivation
 
+    def _is_fresh(self, updated_at):
+        return (self.inventory_max_age > 0 and updated_at is not None and
+                not timeutils.is_older_than(updated_at,
+                                            self.inventory_max_age))
+
+    def _lv_changed(self, name):
+        """Makes the next lookup of the LV query it, after a change."""
+        self._lv_inventory.pop(name, None)
+        self._stale_lvs.add(name)
+        for changes in self._lv_refreshes:
+            changes.add(name)
+        self._vg_info_updated_at = None
+
+    def _lv_removed(self, name):
+        self._lv_inventory.pop(name, None)
+        self._stale_lvs.discard(name)
+        for changes in self._lv_refreshes:
+            changes.add(name)
+        self._vg_info_updated_at = None
+
+    @staticmethod
+    def _parse_lvs(out):
+        lv_list = []
+        if out is not None:
+            volumes = out.split()
+            for vg, name, size in itertools.izip(*[iter(volumes)] * 3):
+                lv_list.append({"vg": vg, "name": name, "size": size})
+        return lv_list
+
     @staticmethod
     def get_all_volumes(root_helper, vg_name=None, no_suffix=True):
         """Static method to get all LV's on a system.
@@ -257,33 +302,65 @@ class LVM(executor.Executor):
                                     root_helper=root_helper,
                                     run_as_root=True)
 
-        lv_list = []
-        if out is not None:
-            volumes = out.split()
-            for vg, name, size in itertools.izip(*[iter(volumes)] * 3):
-                lv_list.append({"vg": vg, "name": name, "size": size})
-
-        return lv_list
+        return LVM._parse_lvs(out)
 
     def get_volumes(self):
         """Get all LV's associated with this instantiation (VG).
 
+        Refreshes the LV inventory.
+
         :returns: List of Dictionaries with LV info
 
         """
-        self.lv_list = self.get_all_volumes(self._root_helper, self.vg_name)
+        changes = set()
+        self._lv_refreshes.append(changes)
+        try:
+            self.lv_list = self.get_all_volumes(self._root_helper,
+                                                self.vg_name)
+        finally:
+            self._lv_refreshes.remove(changes)
+
+        self._lv_inventory = dict((lv['name'], lv) for lv in self.lv_list)
+        self._lv_inventory_updated_at = timeutils.utcnow()
+        # The LVs changed while lvs ran may be listed as they were before.
+        self._stale_lvs = changes
+        for name in changes:
+            self._lv_inventory.pop(name, None)
         return self.lv_list
 
+    def _get_lv(self, name):
+        cmd = ['lvs', '--noheadings', '--unit=g', '-o', 'vg_name,name,size',
+               '--nosuffix', '%s/%s' % (self.vg_name, name)]
+        (out, err) = self._execute(*cmd,
+                                   root_helper=self._root_helper,
+                                   run_as_root=True)
+        for lv in self._parse_lvs(out):
+            if lv['name'] == name:
+                return lv
+
     def get_volume(self, name):
         """Get reference object of volume specified by name.
 
+        The LV is looked up in the inventory, which is refreshed with one
+        lvs of the VG once older than inventory_max_age.  An LV changed
+        through this object since is queried on its own.
+
         :returns: dict representation of Logical Volume if exists
 
         """
-        ref_list = self.get_volumes()
-        for r in ref_list:
-            if r['name'] == name:
-                return r
+        if not self._is_fresh(self._lv_inventory_updated_at):
+            self.get_volumes()
+        elif name in self._stale_lvs:
+            try:
+                lv = self._get_lv(name)
+            except putils.ProcessExecutionError:
+                # lvs fails for a missing LV, the full listing tells.
+                self.get_volumes()
+            else:
+                self._stale_lvs.discard(name)
+                if lv is not None:
+                    self._lv_inventory[name] = lv
+        return self._lv_inventory.get(name)
 
     @staticmethod
     def get_all_physical_volumes(root_helper, vg_name=None, no_suffix=True):
@@ -371,11 +448,15 @@ class LVM(executor.Executor):
         """Update VG info for this instantiation.
 
         Used to update member fields of object and
-        provide a dict of info for caller.
+        provide a dict of info for caller.  The info is kept for
+        inventory_max_age, unless changed through this object.
 
         :returns: Dictionaries of VG info
 
         """
+        if self._is_fresh(self._vg_info_updated_at):
+            return
+
         vg_list = self.get_all_volume_groups(self._root_helper, self.vg_name)
 
         if len(vg_list) != 1:
@@ -388,12 +469,14 @@ class LVM(executor.Executor):
         self.vg_uuid = vg_list[0]['uuid']
 
         if self.vg_thin_pool is not None:
-            for lv in self.get_all_volumes(self._root_helper, self.vg_name):
-                if lv['name'] == self.vg_thin_pool:
-                    self.vg_thin_pool_size = lv['size']
-                    tpfs = self._get_thin_pool_free_space(self.vg_name,
-                                                          self.vg_thin_pool)
-                    self.vg_thin_pool_free_space = tpfs
+            lv = self.get_volume(self.vg_thin_pool)
+            if lv is not None:
+                self.vg_thin_pool_size = lv['size']
+                tpfs = self._get_thin_pool_free_space(self.vg_name,
+                                                      self.vg_thin_pool)
+                self.vg_thin_pool_free_space = tpfs
+
+        self._vg_info_updated_at = timeutils.utcnow()
 
     def _calculate_thin_pool_size(self):
         """Calculates the correct size for a thin pool.
@@ -444,9 +527,12 @@ class LVM(executor.Executor):
 
         cmd = ['lvcreate', '-T', '-L', size_str, self.vg_pool_name]
 
-        self._execute(*cmd,
-                      root_helper=self._root_helper,
-                      run_as_root=True)
+        try:
+            self._execute(*cmd,
+                          root_helper=self._root_helper,
+                          run_as_root=True)
+        finally:
+            self._lv_changed(name)
 
         self.vg_thin_pool = name
         return size_str
@@ -486,6 +572,8 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        finally:
+            self._lv_changed(name)
 
     def create_lv_snapshot(self, name, source_lv_name, lv_type='default'):
         """Creates a snapshot of a logical volume.
@@ -515,6 +603,8 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        finally:
+            self._lv_changed(name)
 
     def _mangle_lv_name(self, name):
         # Linux LVM reserves name that starts with snapshot, so that
@@ -570,6 +660,7 @@ class LVM(executor.Executor):
                           '-f',
                           '%s/%s' % (self.vg_name, name),
                           root_helper=self._root_helper, run_as_root=True)
+            self._lv_removed(name)
         except putils.ProcessExecutionError as err:
             mesg = (_('Error reported running lvremove: CMD: %(command)s, '
                     'RESPONSE: %(response)s') %
@@ -581,10 +672,38 @@ class LVM(executor.Executor):
                           root_helper=self._root_helper,
                           run_as_root=True)
 
-            self._execute('lvremove',
-                          '-f',
-                          '%s/%s' % (self.vg_name, name),
+            try:
+                self._execute('lvremove',
+                              '-f',
+                              '%s/%s' % (self.vg_name, name),
+                              root_helper=self._root_helper, run_as_root=True)
+            except putils.ProcessExecutionError:
+                self._lv_changed(name)
+                raise
+            self._lv_removed(name)
+
+    def rename_volume(self, lv_name, new_name):
+        """Change the name of an existing LV.
+
+        :param lv_name: Name of the LV to rename
+        :param new_name: New name for the LV
+
+        """
+        try:
+            self._execute('lvrename', self.vg_name, lv_name, new_name,
                           root_helper=self._root_helper, run_as_root=True)
+        except putils.ProcessExecutionError:
+            self._lv_changed(lv_name)
+            self._lv_changed(new_name)
+            raise
+
+        lv = self._lv_inventory.get(lv_name)
+        self._lv_removed(lv_name)
+        self._lv_changed(new_name)
+        if lv is not None:
+            # The same LV under its new name, no need to query it.
+            self._stale_lvs.discard(new_name)
+            self._lv_inventory[new_name] = dict(lv, name=new_name)
 
     def revert(self, snapshot_name):
         """Revert an LV from snapshot.
@@ -592,9 +711,14 @@ class LVM(executor.Executor):
         :param snapshot_name: Name of snapshot to revert
 
         """
-        self._execute('lvconvert', '--merge',
-                      snapshot_name, root_helper=self._root_helper,
-                      run_as_root=True)
+        try:
+            self._execute('lvconvert', '--merge',
+                          snapshot_name, root_helper=self._root_helper,
+                          run_as_root=True)
+        finally:
+            # The merge changes the origin, which isn't named here.
+            self._lv_inventory_updated_at = None
+            self._vg_info_updated_at = None
 
     def lv_has_snapshot(self, name):
         out, err = self._execute('lvdisplay', '--noheading',
@@ -622,3 +746,5 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        finally:
+            self._lv_changed(lv_name)
@@ -87,6 +87,8 @@ class RequestContext(object):
         if overwrite or not hasattr(local.store, 'context'):
             self.update_store()
         self.quota_committed = False
+        # Results of the policy checks of this request, see cinder.policy.
+        self.policy_results = {}
 
         if service_catalog:
             # Only include required parts of service_catalog
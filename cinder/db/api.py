@@ -87,6 +87,17 @@ class NoMoreTargets(exception.CinderException):
 ###################
 
 
+def dispose_engine():
+    """Close the connections of the database engine.
+
+    New connections are opened by the next database call.
+    """
+    return IMPL.dispose_engine()
+
+
+###################
+
+
 def service_destroy(context, service_id):
     """Destroy the service or raise if it does not exist."""
     return IMPL.service_destroy(context, service_id)
@@ -213,9 +224,11 @@ def volume_get(context, volume_id):
     return IMPL.volume_get(context, volume_id)
 
 
-def volume_get_all(context, marker, limit, sort_key, sort_dir):
-    """Get all volumes."""
-    return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir)
+def volume_get_all(context, marker, limit, sort_key, sort_dir,
+                   filters=None):
+    """Get all volumes matching the filters, a page at a time."""
+    return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir,
+                               filters=filters)
 
 
 def volume_get_all_by_host(context, host):
@@ -229,10 +242,10 @@ def volume_get_all_by_instance_uuid(context, instance_uuid):
 
 
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir):
-    """Get all volumes belonging to a project."""
+                              sort_dir, filters=None):
+    """Get the volumes of a project matching the filters, a page at a time."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
-                                          sort_key, sort_dir)
+                                          sort_key, sort_dir, filters=filters)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -267,14 +280,20 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context):
-    """Get all snapshots."""
-    return IMPL.snapshot_get_all(context)
+def snapshot_get_all(context, marker=None, limit=None, sort_key='created_at',
+                     sort_dir='desc', filters=None):
+    """Get all snapshots matching the filters, a page at a time."""
+    return IMPL.snapshot_get_all(context, marker, limit, sort_key, sort_dir,
+                                 filters=filters)
 
 
-def snapshot_get_all_by_project(context, project_id):
-    """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id)
+def snapshot_get_all_by_project(context, project_id, marker=None, limit=None,
+                                sort_key='created_at', sort_dir='desc',
+                                filters=None):
+    """Get the snapshots of a project matching the filters, paginated."""
+    return IMPL.snapshot_get_all_by_project(context, project_id, marker,
+                                            limit, sort_key, sort_dir,
+                                            filters=filters)
 
 
 def snapshot_get_all_for_volume(context, volume_id):
@@ -555,6 +574,11 @@ def volume_glance_metadata_get_all(context):
     return IMPL.volume_glance_metadata_get_all(context)
 
 
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the glance metadata for a list of volumes."""
+    return IMPL.volume_glance_metadata_list_get(context, volume_id_list)
+
+
 def volume_glance_metadata_get(context, volume_id):
     """Return the glance metadata for a volume."""
     return IMPL.volume_glance_metadata_get(context, volume_id)
@@ -725,6 +749,23 @@ def quota_reserve(context, resources, quotas, deltas, expire,
                               until_refresh, max_age, project_id=project_id)
 
 
+def quota_reserve_conditional(context, resources, quotas, deltas, expire,
+                              until_refresh, max_age, project_id=None):
+    """Check quotas and create reservations without locking usages.
+
+    Returns the reservation UUIDs and the resources to resync.
+    """
+    return IMPL.quota_reserve_conditional(context, resources, quotas,
+                                          deltas, expire, until_refresh,
+                                          max_age, project_id=project_id)
+
+
+def quota_usage_resync(context, resources, project_id, until_refresh):
+    """Refresh the usages of resources, returns the refreshed ones."""
+    return IMPL.quota_usage_resync(context, resources, project_id,
+                                   until_refresh)
+
+
 def reservation_commit(context, reservations, project_id=None):
     """Commit quota reservations."""
     return IMPL.reservation_commit(context, reservations,
@@ -743,10 +784,15 @@ def quota_destroy_all_by_project(context, project_id):
 
 
 def reservation_expire(context):
-    """Roll back any expired reservations."""
+    """Roll back any expired reservations, returns how many were."""
     return IMPL.reservation_expire(context)
 
 
+def quota_usage_reconcile(context, until_refresh):
+    """Correct the usages which drifted, returns the corrections."""
+    return IMPL.quota_usage_reconcile(context, until_refresh)
+
+
 ###################
 
 
@@ -755,9 +801,11 @@ def backup_get(context, backup_id):
     return IMPL.backup_get(context, backup_id)
 
 
-def backup_get_all(context):
-    """Get all backups."""
-    return IMPL.backup_get_all(context)
+def backup_get_all(context, marker=None, limit=None, sort_key='created_at',
+                   sort_dir='desc', filters=None):
+    """Get all backups matching the filters, a page at a time."""
+    return IMPL.backup_get_all(context, marker, limit, sort_key, sort_dir,
+                               filters=filters)
 
 
 def backup_get_all_by_host(context, host):
@@ -770,9 +818,17 @@ def backup_create(context, values):
     return IMPL.backup_create(context, values)
 
 
-def backup_get_all_by_project(context, project_id):
-    """Get all backups belonging to a project."""
-    return IMPL.backup_get_all_by_project(context, project_id)
+def backup_get_all_by_project(context, project_id, marker=None, limit=None,
+                              sort_key='created_at', sort_dir='desc',
+                              filters=None):
+    """Get the backups of a project matching the filters, paginated."""
+    return IMPL.backup_get_all_by_project(context, project_id, marker, limit,
+                                          sort_key, sort_dir, filters=filters)
+
+
+def backup_get_all_by_volume(context, volume_id):
+    """Get all backups of a volume."""
+    return IMPL.backup_get_all_by_volume(context, volume_id)
 
 
 def backup_update(context, backup_id, values):
@@ -25,9 +25,12 @@ import uuid
 import warnings
 
 from oslo.config import cfg
+from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import not_
 from sqlalchemy import or_
 from sqlalchemy.orm import joinedload, joinedload_all
+from sqlalchemy.sql.expression import exists
 from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.sql import func
 
@@ -53,6 +56,9 @@ get_session = db_session.get_session
 
 _DEFAULT_QUOTA_NAME = 'default'
 
+# Reservations expired by each transaction of reservation_expire().
+_EXPIRE_BATCH_SIZE = 500
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -60,6 +66,10 @@ def get_backend():
     return sys.modules[__name__]
 
 
+def dispose_engine():
+    db_session.cleanup()
+
+
 def is_admin_context(context):
     """Indicates if the request context is an administrator."""
     if not context:
@@ -699,6 +709,11 @@ def reservation_destroy(context, uuid):
 # cause under or over counting of resources. To avoid deadlocks, this
 # code always acquires the lock on quota_usages before acquiring the lock
 # on reservations.
+#
+# quota_reserve_conditional() and the reservation expiry do not lock rows
+# ahead.  They use conditional and relative UPDATE statements, which only
+# hold the row locks of the statements until the end of their short
+# transactions.
 
 def _get_quota_usages(context, session, project_id):
     # Broken out for testability
@@ -854,6 +869,176 @@ def quota_reserve(context, resources, quotas, deltas, expire,
     return reservations
 
 
+def _quota_usage_sync(elevated, resource, project_id, session=None):
+    """Run the sync routine of a resource, returns {resource: in_use}."""
+    sync = QUOTA_SYNC_FUNCTIONS[resource.sync]
+    return sync(elevated, project_id,
+                volume_type_id=getattr(resource, 'volume_type_id', None),
+                volume_type_name=getattr(resource, 'volume_type_name', None),
+                session=session)
+
+
+def _quota_usages_by_resource(context, project_id):
+    """Returns the usages of a project, the first ones of duplicates."""
+    rows = model_query(context, models.QuotaUsage, read_deleted="no").\
+        filter_by(project_id=project_id).\
+        order_by(models.QuotaUsage.id.desc()).\
+        all()
+    return dict((row.resource, row) for row in rows)
+
+
+def _quota_usage_needs_refresh(usage, max_age, now):
+    if usage.in_use < 0:
+        return True
+    if usage.until_refresh is not None and usage.until_refresh <= 1:
+        return True
+    return bool(max_age and usage.updated_at is not None and
+                timeutils.delta_seconds(usage.updated_at, now) >= max_age)
+
+
+def _quota_usages_create(elevated, resources, deltas, until_refresh,
+                         project_id):
+    """Creates the missing usages of deltas, returns all the usages.
+
+    Like quota_reserve(), the usages of the project are locked while the
+    missing ones are synced and created, so that concurrent reservations
+    do not create the same usages.  This only happens on the first
+    reservations of a resource.
+    """
+    session = get_session()
+    with session.begin():
+        usages = _get_quota_usages(elevated, session, project_id)
+        for resource in deltas:
+            if resource in usages:
+                continue
+            updates = _quota_usage_sync(elevated, resources[resource],
+                                        project_id, session=session)
+            for res, in_use in updates.items():
+                if res not in usages:
+                    usages[res] = _quota_usage_create(elevated, project_id,
+                                                      res, in_use, 0,
+                                                      until_refresh or None,
+                                                      session=session)
+    return usages
+
+
+@require_context
+def quota_reserve_conditional(context, resources, quotas, deltas, expire,
+                              until_refresh, max_age, project_id=None):
+    """Check quotas and create reservations without locking usage rows.
+
+    Each positive delta is added to the reserved count of its usage with
+    an UPDATE that only matches while the new total fits in the quota, so
+    concurrent reservations can not go over quota together.  Missing
+    usages are created and synced with the usages of the project locked;
+    the resources whose usage should be refreshed are returned instead,
+    for quota_usage_resync().
+
+    Returns a tuple of the reservation UUIDs and of the names of the
+    resources to refresh.
+    """
+    elevated = context.elevated()
+    if project_id is None:
+        project_id = context.project_id
+
+    usages = _quota_usages_by_resource(context, project_id)
+    if any(resource not in usages for resource in deltas):
+        usages = _quota_usages_create(elevated, resources, deltas,
+                                      until_refresh, project_id)
+
+    now = timeutils.utcnow()
+    refresh = sorted(r for r in deltas
+                     if _quota_usage_needs_refresh(usages[r], max_age, now))
+
+    unders = [r for r, delta in deltas.items()
+              if delta < 0 and delta + usages[r].in_use < 0]
+
+    reserved = models.QuotaUsage.reserved
+    until_refresh_col = models.QuotaUsage.until_refresh
+    overs = []
+    session = get_session()
+    with session.begin():
+        # Update the usages in id order, so that concurrent transactions
+        # do not deadlock.
+        for resource in sorted(deltas, key=lambda r: usages[r].id):
+            delta = deltas[resource]
+            query = model_query(context, models.QuotaUsage, session=session,
+                                read_deleted="no").\
+                filter_by(id=usages[resource].id)
+            values = {'until_refresh': until_refresh_col - 1}
+            # NOTE(Vek): Only positive increments are checked and
+            #            reserved, a project over quota must still be
+            #            able to reduce its usage.
+            if delta > 0:
+                values['reserved'] = reserved + delta
+                if quotas[resource] >= 0:
+                    query = query.filter(models.QuotaUsage.in_use +
+                                         reserved + delta <=
+                                         quotas[resource])
+            if not query.update(values, synchronize_session=False):
+                overs.append(resource)
+
+        if overs:
+            usages = dict((k, dict(in_use=v['in_use'],
+                                   reserved=v['reserved']))
+                          for k, v in usages.items())
+            # Raising in the transaction rolls back the reserved counts.
+            raise exception.OverQuota(overs=sorted(overs), quotas=quotas,
+                                      usages=usages)
+
+        reservations = []
+        rows = []
+        for resource, delta in deltas.items():
+            reservations.append(str(uuid.uuid4()))
+            rows.append({'uuid': reservations[-1],
+                         'usage_id': usages[resource].id,
+                         'project_id': project_id,
+                         'resource': resource,
+                         'delta': delta,
+                         'expire': expire,
+                         'created_at': now,
+                         'deleted': False})
+        session.execute(models.Reservation.__table__.insert(), rows)
+
+    if unders:
+        LOG.warning(_("Change will make usage less than 0 for the following "
+                      "resources: %s") % unders)
+
+    return reservations, refresh
+
+
+@require_admin_context
+def quota_usage_resync(context, resources, project_id, until_refresh):
+    """Refresh the in use counts of resources with their sync routines.
+
+    The sync routines run without locks.  A count is only replaced if it
+    did not change while its routine ran, otherwise it is left to the
+    next refresh.  Returns the names of the refreshed resources.
+    """
+    usages = _quota_usages_by_resource(context, project_id)
+
+    refreshed = []
+    done = set()
+    for name in sorted(resources):
+        if name in done:
+            continue
+        updates = _quota_usage_sync(context, resources[name], project_id)
+        for res, in_use in updates.items():
+            done.add(res)
+            if res not in usages:
+                continue
+            count = model_query(context, models.QuotaUsage,
+                                read_deleted="no").\
+                filter_by(id=usages[res].id).\
+                filter_by(in_use=usages[res].in_use).\
+                update({'in_use': in_use,
+                        'until_refresh': until_refresh or None},
+                       synchronize_session=False)
+            if count:
+                refreshed.append(res)
+    return sorted(refreshed)
+
+
 def _quota_reservations(session, context, reservations):
     """Return the relevant reservations."""
 
@@ -930,23 +1115,228 @@ def quota_destroy_all_by_project(context, project_id):
             reservation_ref.delete(session=session)
 
 
+def _reservations_apply(context, session, rows, commit):
+    """Claims and applies reservations, returns how many were claimed.
+
+    A reservation is claimed by the UPDATE that marks it deleted, which
+    only one caller can do, and its delta is then applied to the usage
+    with a relative UPDATE.
+    """
+    now = timeutils.utcnow()
+    count = 0
+    for reservation in sorted(rows, key=lambda r: (r.usage_id, r.id)):
+        claimed = model_query(context, models.Reservation, session=session,
+                              read_deleted="no").\
+            filter_by(id=reservation.id).\
+            update({'deleted': True,
+                    'deleted_at': now,
+                    'updated_at': literal_column('updated_at')},
+                   synchronize_session=False)
+        if not claimed:
+            continue
+        count += 1
+
+        values = {}
+        if reservation.delta >= 0:
+            values['reserved'] = (models.QuotaUsage.reserved -
+                                  reservation.delta)
+        if commit:
+            values['in_use'] = models.QuotaUsage.in_use + reservation.delta
+        if values:
+            model_query(context, models.QuotaUsage, session=session,
+                        read_deleted="no").\
+                filter_by(id=reservation.usage_id).\
+                update(values, synchronize_session=False)
+    return count
+
+
+class _ReservationsChanged(Exception):
+    pass
+
+
+def _reservations_expire_batch(context, rows, now):
+    session = get_session()
+    with session.begin():
+        claimed = model_query(context, models.Reservation, session=session,
+                              read_deleted="no").\
+            filter(models.Reservation.id.in_([row.id for row in rows])).\
+            update({'deleted': True,
+                    'deleted_at': now,
+                    'updated_at': literal_column('updated_at')},
+                   synchronize_session=False)
+        if claimed != len(rows):
+            raise _ReservationsChanged()
+
+        reserved = {}
+        for row in rows:
+            if row.delta >= 0:
+                reserved[row.usage_id] = (reserved.get(row.usage_id, 0) +
+                                          row.delta)
+        for usage_id in sorted(reserved):
+            model_query(context, models.QuotaUsage, session=session,
+                        read_deleted="no").\
+                filter_by(id=usage_id).\
+                update({'reserved': (models.QuotaUsage.reserved -
+                                     reserved[usage_id])},
+                       synchronize_session=False)
+    return claimed
+
+
 @require_admin_context
 def reservation_expire(context):
+    """Roll back the expired reservations, returns how many were.
+
+    The reservations are claimed with one UPDATE per batch and their
+    deltas removed with one UPDATE per usage.  A batch of which some
+    reservations were committed or rolled back meanwhile is rolled back
+    and its reservations expired one by one.
+    """
+    current_time = timeutils.utcnow()
+    rows = model_query(context, models.Reservation.id,
+                       models.Reservation.usage_id,
+                       models.Reservation.delta,
+                       read_deleted="no").\
+        filter(models.Reservation.expire < current_time).\
+        order_by(models.Reservation.id).\
+        all()
+
+    expired = 0
+    for i in xrange(0, len(rows), _EXPIRE_BATCH_SIZE):
+        batch = rows[i:i + _EXPIRE_BATCH_SIZE]
+        try:
+            expired += _reservations_expire_batch(context, batch,
+                                                  current_time)
+        except _ReservationsChanged:
+            session = get_session()
+            with session.begin():
+                reservations = model_query(context, models.Reservation,
+                                           session=session,
+                                           read_deleted="no").\
+                    filter(models.Reservation.id.in_(
+                        [row.id for row in batch])).\
+                    all()
+                expired += _reservations_apply(context, session,
+                                               reservations, False)
+    return expired
+
+
+def _quota_usage_totals(context, project_id=None, session=None):
+    """Returns the actual in use counts of a project, or of all of them.
+
+    The counts are keyed by (project_id, resource), for the resources of
+    the sync routines and of their volume types.
+    """
+    type_names = dict(model_query(context, models.VolumeTypes.id,
+                                  models.VolumeTypes.name,
+                                  session=session,
+                                  read_deleted="yes").all())
+    totals = {}
+
+    def _add(project_id, resource, volume_type_id, value):
+        keys = [(project_id, resource)]
+        if volume_type_id in type_names:
+            keys.append((project_id,
+                         '%s_%s' % (resource, type_names[volume_type_id])))
+        for key in keys:
+            totals[key] = totals.get(key, 0) + (value or 0)
+
+    volumes = model_query(context, models.Volume.project_id,
+                          models.Volume.volume_type_id,
+                          func.count(models.Volume.id),
+                          func.sum(models.Volume.size),
+                          session=session, read_deleted="no")
+    if project_id is not None:
+        volumes = volumes.filter(models.Volume.project_id == project_id)
+    volumes = volumes.group_by(models.Volume.project_id,
+                               models.Volume.volume_type_id)
+    for volume_project_id, volume_type_id, count, gigs in volumes:
+        _add(volume_project_id, 'volumes', volume_type_id, count)
+        _add(volume_project_id, 'gigabytes', volume_type_id, gigs)
+
+    snapshots = model_query(context, models.Snapshot.project_id,
+                            models.Volume.volume_type_id,
+                            func.count(models.Snapshot.id),
+                            func.sum(models.Snapshot.volume_size),
+                            session=session, read_deleted="no").\
+        outerjoin(models.Volume,
+                  models.Snapshot.volume_id == models.Volume.id)
+    if project_id is not None:
+        snapshots = snapshots.filter(
+            models.Snapshot.project_id == project_id)
+    snapshots = snapshots.group_by(models.Snapshot.project_id,
+                                   models.Volume.volume_type_id)
+    for snapshot_project_id, volume_type_id, count, gigs in snapshots:
+        _add(snapshot_project_id, 'snapshots', volume_type_id, count)
+        if not CONF.no_snapshot_gb_quota:
+            _add(snapshot_project_id, 'gigabytes', volume_type_id, gigs)
+    return totals
+
+
+def _quota_usage_reconcile_project(context, project_id, pending,
+                                   until_refresh):
     session = get_session()
     with session.begin():
-        current_time = timeutils.utcnow()
-        results = model_query(context, models.Reservation, session=session,
-                              read_deleted="no").\
-            filter(models.Reservation.expire < current_time).\
+        usages = model_query(context, models.QuotaUsage, session=session,
+                             read_deleted="no").\
+            filter_by(project_id=project_id).\
+            filter(not_(pending)).\
+            with_lockmode('update').\
             all()
+        if not usages:
+            return []
+        # NOTE: the actual counts are read after the usages, a reservation
+        # committed in between changes the in_use count of its usage, which
+        # then fails the compare-and-set below.
+        totals = _quota_usage_totals(context, project_id=project_id,
+                                     session=session)
 
-        if results:
-            for reservation in results:
-                if reservation.delta >= 0:
-                    reservation.usage.reserved -= reservation.delta
-                    reservation.usage.save(session=session)
+        drift = []
+        for usage in sorted(usages, key=lambda u: u.id):
+            actual = totals.get((usage.project_id, usage.resource), 0)
+            if usage.in_use == actual:
+                continue
+            count = model_query(context, models.QuotaUsage, session=session,
+                                read_deleted="no").\
+                filter_by(id=usage.id).\
+                filter_by(in_use=usage.in_use).\
+                filter(not_(pending)).\
+                update({'in_use': actual,
+                        'until_refresh': until_refresh or None},
+                       synchronize_session=False)
+            if count:
+                drift.append({'project_id': usage.project_id,
+                              'resource': usage.resource,
+                              'in_use': usage.in_use,
+                              'actual': actual})
+    return drift
+
+
+@require_admin_context
+def quota_usage_reconcile(context, until_refresh):
+    """Correct the in use counts of the usages which drifted.
+
+    Each project is reconciled in its own short transaction, which locks
+    the usages of the project only and computes its actual counts with
+    one grouped query on the volumes and one on the snapshots.  Usages
+    with pending reservations are left alone, the actual counts may
+    already include the resources of the reservations.
+
+    Returns a list of the corrections, dicts with the project_id, the
+    resource, the in_use count of the usage and the actual count.
+    """
+    pending = exists().where(and_(
+        models.Reservation.usage_id == models.QuotaUsage.id,
+        models.Reservation.deleted == False))
+    projects = model_query(context, models.QuotaUsage.project_id,
+                           read_deleted="no").\
+        distinct().\
+        all()
 
-                reservation.delete(session=session)
+    drift = []
+    for project_id, in sorted(projects):
+        drift.extend(_quota_usage_reconcile_project(context, project_id,
+                                                    pending, until_refresh))
+    return drift
 
 
 ###################
@@ -1150,22 +1540,90 @@ def volume_get(context, volume_id):
     return _volume_get(context, volume_id)
 
 
+def _filter_by_columns(query, model, filters):
+    """Filter a query on columns of model.
+
+    The rows must equal the value of each filter, or be one of its values
+    for a list of values.  Returns None if a filter key is not a column.
+    """
+    columns = model.__table__.columns
+    for key, value in filters.iteritems():
+        if key not in columns:
+            LOG.debug(_("'%(key)s' is not a %(model)s attribute that can be "
+                        "filtered on.") %
+                      {'key': key, 'model': model.__name__})
+            return None
+        column = getattr(model, key)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            query = query.filter(column.in_(value))
+        else:
+            query = query.filter(column == value)
+    return query
+
+
+def _process_volume_filters(query, filters):
+    """Apply volume list filters to a volume query.
+
+    Filter keys are volume columns, which the volumes must equal (or be
+    one of, for a list of values), and:
+      - 'metadata': dict of metadata items the volumes must all have
+      - 'no_migration_targets': hide the destination volumes of migrations
+      - 'no_secondary_replicas': hide secondary replicas
+
+    Returns None if the filters can not match any volume.
+    """
+    filters = filters.copy()
+
+    if filters.pop('no_migration_targets', False):
+        query = query.filter(or_(
+            models.Volume.migration_status == None,
+            not_(models.Volume.migration_status.startswith('target:'))))
+
+    if filters.pop('no_secondary_replicas', False):
+        query = query.filter(or_(
+            models.Volume.status == None,
+            not_(models.Volume.status.startswith('replica_'))))
+
+    metadata = filters.pop('metadata', None)
+    if metadata:
+        if not isinstance(metadata, dict):
+            LOG.debug(_("Volume metadata filter is not a dict: %s") %
+                      metadata)
+            return None
+        for key, value in metadata.iteritems():
+            query = query.filter(
+                models.Volume.volume_metadata.any(key=key, value=value))
+
+    return _filter_by_columns(query, models.Volume, filters)
+
+
+def _volume_get_all_paginated(context, session, query, marker, limit,
+                              sort_key, sort_dir, filters):
+    if filters:
+        query = _process_volume_filters(query, filters)
+        if query is None:
+            return []
+
+    marker_volume = None
+    if marker is not None:
+        marker_volume = _volume_get(context, marker, session)
+
+    query = sqlalchemyutils.paginate_query(query, models.Volume, limit,
+                                           [sort_key, 'created_at', 'id'],
+                                           marker=marker_volume,
+                                           sort_dir=sort_dir)
+
+    return query.all()
+
+
 @require_admin_context
-def volume_get_all(context, marker, limit, sort_key, sort_dir):
+def volume_get_all(context, marker, limit, sort_key, sort_dir,
+                   filters=None):
     session = get_session()
     with session.begin():
         query = _volume_get_query(context, session=session)
-
-        marker_volume = None
-        if marker is not None:
-            marker_volume = _volume_get(context, marker, session=session)
-
-        query = sqlalchemyutils.paginate_query(query, models.Volume, limit,
-                                               [sort_key, 'created_at', 'id'],
-                                               marker=marker_volume,
-                                               sort_dir=sort_dir)
-
-        return query.all()
+        return _volume_get_all_paginated(context, session, query, marker,
+                                         limit, sort_key, sort_dir, filters)
 
 
 @require_admin_context
@@ -1190,23 +1648,14 @@ def volume_get_all_by_instance_uuid(context, instance_uuid):
 
 @require_context
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir):
+                              sort_dir, filters=None):
     session = get_session()
     with session.begin():
         authorize_project_context(context, project_id)
         query = _volume_get_query(context, session).\
             filter_by(project_id=project_id)
-
-        marker_volume = None
-        if marker is not None:
-            marker_volume = _volume_get(context, marker, session)
-
-        query = sqlalchemyutils.paginate_query(query, models.Volume, limit,
-                                               [sort_key, 'created_at', 'id'],
-                                               marker=marker_volume,
-                                               sort_dir=sort_dir)
-
-        return query.all()
+        return _volume_get_all_paginated(context, session, query, marker,
+                                         limit, sort_key, sort_dir, filters)
 
 
 @require_admin_context
@@ -1481,11 +1930,34 @@ def snapshot_get(context, snapshot_id):
     return _snapshot_get(context, snapshot_id)
 
 
+def _snapshot_get_all_paginated(context, session, query, marker, limit,
+                                sort_key, sort_dir, filters):
+    if filters:
+        query = _filter_by_columns(query, models.Snapshot, filters)
+        if query is None:
+            return []
+
+    marker_snapshot = None
+    if marker is not None:
+        marker_snapshot = _snapshot_get(context, marker, session)
+
+    query = sqlalchemyutils.paginate_query(query, models.Snapshot, limit,
+                                           [sort_key, 'created_at', 'id'],
+                                           marker=marker_snapshot,
+                                           sort_dir=sort_dir)
+    return query.all()
+
+
 @require_admin_context
-def snapshot_get_all(context):
-    return model_query(context, models.Snapshot).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+def snapshot_get_all(context, marker=None, limit=None, sort_key='created_at',
+                     sort_dir='desc', filters=None):
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Snapshot, session=session).\
+            options(joinedload('snapshot_metadata'))
+        return _snapshot_get_all_paginated(context, session, query, marker,
+                                           limit, sort_key, sort_dir,
+                                           filters)
 
 
 @require_context
@@ -1498,12 +1970,18 @@ def snapshot_get_all_for_volume(context, volume_id):
 
 
 @require_context
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, marker=None, limit=None,
+                                sort_key='created_at', sort_dir='desc',
+                                filters=None):
     authorize_project_context(context, project_id)
-    return model_query(context, models.Snapshot).\
-        filter_by(project_id=project_id).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Snapshot, session=session).\
+            filter_by(project_id=project_id).\
+            options(joinedload('snapshot_metadata'))
+        return _snapshot_get_all_paginated(context, session, query, marker,
+                                           limit, sort_key, sort_dir,
+                                           filters)
 
 
 @require_context
@@ -1544,7 +2022,7 @@ def snapshot_get_active_by_window(context, begin, end=None, project_id=None):
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Snapshot.created_at, models.Snapshot.id).all()
 
 
 @require_context
@@ -1866,7 +2344,7 @@ def volume_get_active_by_window(context,
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Volume.created_at, models.Volume.id).all()
 
 
 ####################
@@ -2309,6 +2787,19 @@ def volume_glance_metadata_get_all(context):
     return _volume_glance_metadata_get_all(context)
 
 
+@require_context
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the glance metadata for a list of volumes.
+
+    The volumes are those of a page the caller was authorized to see, the
+    metadata has no project of its own to filter on.
+    """
+    return model_query(context, models.VolumeGlanceMetadata).\
+        filter(models.VolumeGlanceMetadata.volume_id.in_(volume_id_list)).\
+        filter_by(deleted=False).\
+        all()
+
+
 @require_context
 @require_volume_exists
 def _volume_glance_metadata_get(context, volume_id, session=None):
@@ -2476,8 +2967,9 @@ def volume_glance_metadata_delete_by_snapshot(context, snapshot_id):
 
 
 @require_context
-def backup_get(context, backup_id):
-    result = model_query(context, models.Backup, project_only=True).\
+def _backup_get(context, backup_id, session=None):
+    result = model_query(context, models.Backup, session=session,
+                         project_only=True).\
         filter_by(id=backup_id).\
         first()
 
@@ -2487,9 +2979,37 @@ def backup_get(context, backup_id):
     return result
 
 
+@require_context
+def backup_get(context, backup_id):
+    return _backup_get(context, backup_id)
+
+
+def _backup_get_all_paginated(context, session, query, marker, limit,
+                              sort_key, sort_dir, filters):
+    if filters:
+        query = _filter_by_columns(query, models.Backup, filters)
+        if query is None:
+            return []
+
+    marker_backup = None
+    if marker is not None:
+        marker_backup = _backup_get(context, marker, session)
+
+    query = sqlalchemyutils.paginate_query(query, models.Backup, limit,
+                                           [sort_key, 'created_at', 'id'],
+                                           marker=marker_backup,
+                                           sort_dir=sort_dir)
+    return query.all()
+
+
 @require_admin_context
-def backup_get_all(context):
-    return model_query(context, models.Backup).all()
+def backup_get_all(context, marker=None, limit=None, sort_key='created_at',
+                   sort_dir='desc', filters=None):
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Backup, session=session)
+        return _backup_get_all_paginated(context, session, query, marker,
+                                         limit, sort_key, sort_dir, filters)
 
 
 @require_admin_context
@@ -2498,11 +3018,22 @@ def backup_get_all_by_host(context, host):
 
 
 @require_context
-def backup_get_all_by_project(context, project_id):
+def backup_get_all_by_project(context, project_id, marker=None, limit=None,
+                              sort_key='created_at', sort_dir='desc',
+                              filters=None):
     authorize_project_context(context, project_id)
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Backup, session=session).\
+            filter_by(project_id=project_id)
+        return _backup_get_all_paginated(context, session, query, marker,
+                                         limit, sort_key, sort_dir, filters)
 
-    return model_query(context, models.Backup).\
-        filter_by(project_id=project_id).all()
+
+@require_context
+def backup_get_all_by_volume(context, volume_id):
+    return model_query(context, models.Backup, project_only=True).\
+        filter_by(volume_id=volume_id).all()
 
 
 @require_context
@@ -0,0 +1,39 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    backups = Table('backups', meta, autoload=True)
+    # SQLite integers are 64 bit already, and BIGINT columns can't be
+    # reflected by SQLite, which later migrations of the table rely on.
+    if migrate_engine.name == 'sqlite':
+        column_type = Integer
+    else:
+        column_type = BigInteger
+    progress_bytes = Column('progress_bytes', column_type)
+    backups.create_column(progress_bytes)
+    progress_rate = Column('progress_rate', column_type)
+    backups.create_column(progress_rate)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    backups = Table('backups', meta, autoload=True)
+    backups.drop_column('progress_bytes')
+    backups.drop_column('progress_rate')
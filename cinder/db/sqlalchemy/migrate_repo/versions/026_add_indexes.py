@@ -0,0 +1,86 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# (table, columns) of the indexes, for the queries of db/sqlalchemy/api.py.
+# Most queries skip deleted rows, so deleted follows the equality columns.
+# MySQL limits InnoDB keys of utf8 columns to 767 bytes, 3 per character:
+# an index holds at most one String(255) column.
+INDEXES = [
+    # volume_get_all_by_project, volume_get_all_by_host,
+    # volume_get_all_by_instance_uuid
+    ('volumes', ('project_id', 'deleted')),
+    ('volumes', ('host', 'deleted')),
+    ('volumes', ('instance_uuid', 'deleted')),
+    # snapshot_get_all_by_project, snapshot_get_all_for_volume
+    ('snapshots', ('project_id', 'deleted')),
+    ('snapshots', ('volume_id', 'deleted')),
+    # Metadata loaded with its volume or snapshot.  A volume or snapshot
+    # has few metadata items, which the key filters.
+    ('volume_metadata', ('volume_id', 'deleted')),
+    ('volume_admin_metadata', ('volume_id', 'deleted')),
+    ('snapshot_metadata', ('snapshot_id', 'deleted')),
+    ('volume_glance_metadata', ('volume_id', 'deleted')),
+    # backup_get_all_by_project, backup_get_all_by_volume
+    ('backups', ('project_id', 'deleted')),
+    ('backups', ('volume_id', 'deleted')),
+    # volume_allocate_iscsi_target, iscsi_target_count_by_host
+    ('iscsi_targets', ('host',)),
+    # service_get_all_by_host, service_get_by_host_and_topic; the few
+    # topics select most services.
+    ('services', ('host',)),
+]
+
+
+def _index_name(table_name, columns):
+    return '%s_%s_idx' % (table_name, '_'.join(columns))
+
+
+def _get_indexes(meta):
+    tables = {}
+    for table_name, columns in INDEXES:
+        if table_name not in tables:
+            tables[table_name] = Table(table_name, meta, autoload=True)
+        table = tables[table_name]
+        yield Index(_index_name(table_name, columns),
+                    *[table.c[column] for column in columns])
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _get_indexes(meta):
+        try:
+            index.create(migrate_engine)
+        except Exception:
+            LOG.error(_("Index %s not created!") % index.name)
+            raise
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _get_indexes(meta):
+        try:
+            index.drop(migrate_engine)
+        except Exception:
+            LOG.error(_("Index %s not dropped!") % index.name)
+            raise
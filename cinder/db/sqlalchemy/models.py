@@ -22,7 +22,7 @@ SQLAlchemy models for cinder data.
 """
 
 
-from sqlalchemy import Column, Integer, String, Text, schema
+from sqlalchemy import BigInteger, Column, Integer, String, Text, schema
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import ForeignKey, DateTime, Boolean, Enum
 from sqlalchemy.orm import relationship, backref
@@ -60,6 +60,9 @@ class Service(BASE, CinderBase):
     """Represents a running service on a host."""
 
     __tablename__ = 'services'
+    __table_args__ = (
+        schema.Index('services_host_idx', 'host'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     host = Column(String(255))  # , ForeignKey('hosts.id'))
     binary = Column(String(255))
@@ -68,11 +71,20 @@ class Service(BASE, CinderBase):
     disabled = Column(Boolean, default=False)
     availability_zone = Column(String(255), default='cinder')
     disabled_reason = Column(String(255))
+    # Volumes whose exports were recreated, while the service starts.
+    startup_progress = Column(String(255))
 
 
 class Volume(BASE, CinderBase):
     """Represents a block storage device that can be attached to a vm."""
     __tablename__ = 'volumes'
+    __table_args__ = (
+        schema.Index('volumes_project_id_deleted_idx',
+                     'project_id', 'deleted'),
+        schema.Index('volumes_host_deleted_idx', 'host', 'deleted'),
+        schema.Index('volumes_instance_uuid_deleted_idx',
+                     'instance_uuid', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(String(36), primary_key=True)
     _name_id = Column(String(36))  # Don't access/modify this directly!
 
@@ -127,6 +139,10 @@ class Volume(BASE, CinderBase):
 class VolumeMetadata(BASE, CinderBase):
     """Represents a metadata key/value pair for a volume."""
     __tablename__ = 'volume_metadata'
+    __table_args__ = (
+        schema.Index('volume_metadata_volume_id_deleted_idx',
+                     'volume_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     key = Column(String(255))
     value = Column(String(255))
@@ -141,6 +157,10 @@ class VolumeMetadata(BASE, CinderBase):
 class VolumeAdminMetadata(BASE, CinderBase):
     """Represents a administrator metadata key/value pair for a volume."""
     __tablename__ = 'volume_admin_metadata'
+    __table_args__ = (
+        schema.Index('volume_admin_metadata_volume_id_deleted_idx',
+                     'volume_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     key = Column(String(255))
     value = Column(String(255))
@@ -247,6 +267,10 @@ class QualityOfServiceSpecs(BASE, CinderBase):
 class VolumeGlanceMetadata(BASE, CinderBase):
     """Glance metadata for a bootable volume."""
     __tablename__ = 'volume_glance_metadata'
+    __table_args__ = (
+        schema.Index('volume_glance_metadata_volume_id_deleted_idx',
+                     'volume_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True, nullable=False)
     volume_id = Column(String(36), ForeignKey('volumes.id'))
     snapshot_id = Column(String(36), ForeignKey('snapshots.id'))
@@ -339,6 +363,12 @@ class Reservation(BASE, CinderBase):
 class Snapshot(BASE, CinderBase):
     """Represents a snapshot of volume."""
     __tablename__ = 'snapshots'
+    __table_args__ = (
+        schema.Index('snapshots_project_id_deleted_idx',
+                     'project_id', 'deleted'),
+        schema.Index('snapshots_volume_id_deleted_idx',
+                     'volume_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(String(36), primary_key=True)
 
     @property
@@ -373,6 +403,10 @@ class Snapshot(BASE, CinderBase):
 class SnapshotMetadata(BASE, CinderBase):
     """Represents a metadata key/value pair for a snapshot."""
     __tablename__ = 'snapshot_metadata'
+    __table_args__ = (
+        schema.Index('snapshot_metadata_snapshot_id_deleted_idx',
+                     'snapshot_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     key = Column(String(255))
     value = Column(String(255))
@@ -390,6 +424,7 @@ class IscsiTarget(BASE, CinderBase):
     """Represents an iscsi target for a given host."""
     __tablename__ = 'iscsi_targets'
     __table_args__ = (schema.UniqueConstraint("target_num", "host"),
+                      schema.Index('iscsi_targets_host_idx', 'host'),
                       {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     target_num = Column(Integer)
@@ -405,6 +440,11 @@ class IscsiTarget(BASE, CinderBase):
 class Backup(BASE, CinderBase):
     """Represents a backup of a volume to Swift."""
     __tablename__ = 'backups'
+    __table_args__ = (
+        schema.Index('backups_project_id_deleted_idx',
+                     'project_id', 'deleted'),
+        schema.Index('backups_volume_id_deleted_idx', 'volume_id', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
     id = Column(String(36), primary_key=True)
 
     @property
@@ -426,6 +466,9 @@ class Backup(BASE, CinderBase):
     service = Column(String(255))
     size = Column(Integer)
     object_count = Column(Integer)
+    parent_id = Column(String(36))
+    progress_bytes = Column(BigInteger)
+    progress_rate = Column(BigInteger)
 
 
 class Encryption(BASE, CinderBase):
@@ -0,0 +1,215 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Local cache of raw Glance images.
+
+Images are stored converted to raw, keyed by image id and checksum, so that
+creating further volumes from an image skips the download, the validation
+and the conversion.  An updated image gets a new checksum and therefore a new
+cache entry, while the stale entry ages out.
+
+The cache is shared between the volume services of a node.  Entries are
+filled under a lock per entry, so concurrent requests for the same image
+download it only once.  Entries being copied to volumes are share-locked
+with flock(), and the least recently used entries that are not in use are
+evicted when the cache grows beyond its size limit.
+"""
+
+import contextlib
+import errno
+import fcntl
+import os
+import tempfile
+
+from oslo.config import cfg
+
+from cinder.openstack.common import fileutils
+from cinder.openstack.common import log as logging
+from cinder import units
+from cinder import utils
+
+LOG = logging.getLogger(__name__)
+
+image_cache_opts = [
+    cfg.StrOpt('image_cache_dir',
+               default='$state_path/image-cache',
+               help='Directory where raw images are cached for creating '
+                    'volumes from images'),
+    cfg.IntOpt('image_cache_max_size_gb',
+               default=0,
+               help='Maximum size in GB of the image cache, 0 disables '
+                    'the cache'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(image_cache_opts)
+
+
+class ImageCache(object):
+    """LRU cache of raw images in a local directory."""
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.tmp_path = os.path.join(path, 'tmp')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_name(image_id, checksum):
+        return '%s-%s' % (image_id, checksum)
+
+    def _entries(self):
+        """Returns (mtime, size, path) of the cache entries, oldest first."""
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    continue
+                raise
+            if os.path.isfile(path):
+                entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def get_stats(self):
+        """Returns the hit, miss and eviction counts and the cache usage."""
+        entries = self._entries()
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'size': sum(size for _mtime, size, _path in entries),
+                'max_size': self.max_size}
+
+    @staticmethod
+    def _open_entry(path):
+        """Opens and share-locks a cache entry.
+
+        Returns None if the entry does not exist or is being evicted.
+        """
+        try:
+            entry = open(path, 'rb')
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+        try:
+            fcntl.flock(entry, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            # Make sure the entry was not evicted, and possibly filled
+            # again, while it was being opened.
+            if os.fstat(entry.fileno()).st_ino == os.stat(path).st_ino:
+                return entry
+        except (IOError, OSError):
+            pass
+        entry.close()
+        return None
+
+    def _evict(self, size):
+        """Evicts unused entries until there is room for size bytes."""
+        @utils.synchronized('image-cache-evict', external=True)
+        def _do_evict():
+            entries = self._entries()
+            total = sum(entry_size for _mtime, entry_size, _path in entries)
+            for _mtime, entry_size, path in entries:
+                if total + size <= self.max_size:
+                    break
+                with open(path, 'rb') as entry:
+                    try:
+                        fcntl.flock(entry, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except IOError:
+                        LOG.debug(_('Not evicting image cache entry %s, it '
+                                    'is in use.') % path)
+                        continue
+                    LOG.debug(_('Evicting image cache entry %s.') % path)
+                    os.unlink(path)
+                total -= entry_size
+                self.evictions += 1
+            return total + size <= self.max_size
+
+        return _do_evict()
+
+    def _fill(self, path, fill_func):
+        """Fills a cache entry and returns it opened and share-locked.
+
+        Returns None and the path of a temporary copy of the image if it
+        does not fit in the cache.
+        """
+        fileutils.ensure_tree(self.tmp_path)
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_path)
+        os.close(fd)
+        with fileutils.remove_path_on_error(tmp):
+            fill_func(tmp)
+            size = os.path.getsize(tmp)
+            if size > self.max_size or not self._evict(size):
+                LOG.warn(_('Image cache is full, not caching %s.') % path)
+                return None, tmp
+            entry = open(tmp, 'rb')
+            fcntl.flock(entry, fcntl.LOCK_SH)
+            os.rename(tmp, path)
+        return entry, path
+
+    @contextlib.contextmanager
+    def fetch(self, image_id, checksum, fill_func):
+        """Provides the path of a cached raw image.
+
+        fill_func(path) is called to write the raw image to path when the
+        image is not cached yet.  The entry is protected from eviction until
+        the with statement exits.
+        """
+        name = self._entry_name(image_id, checksum)
+        path = os.path.join(self.path, name)
+
+        @utils.synchronized('image-cache-%s' % name, external=True)
+        def _checkout():
+            entry = self._open_entry(path)
+            if entry is not None:
+                self.hits += 1
+                LOG.debug(_('Image cache hit for %s.') % name)
+                # Entries are evicted in least recently used order.
+                os.utime(path, None)
+                return entry, path
+            self.misses += 1
+            LOG.debug(_('Image cache miss for %s.') % name)
+            return self._fill(path, fill_func)
+
+        entry, entry_path = _checkout()
+        try:
+            yield entry_path
+        finally:
+            if entry is not None:
+                entry.close()
+            else:
+                fileutils.delete_if_exists(entry_path)
+            LOG.debug(_('Image cache stats: %s') % self.get_stats())
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the image cache of the node, or None if it is disabled."""
+    global _cache
+    if CONF.image_cache_max_size_gb <= 0:
+        return None
+    max_size = CONF.image_cache_max_size_gb * units.GiB
+    if (_cache is None or _cache.path != CONF.image_cache_dir or
+            _cache.max_size != max_size):
+        fileutils.ensure_tree(CONF.image_cache_dir)
+        _cache = ImageCache(CONF.image_cache_dir, max_size)
+    return _cache
@@ -33,6 +33,7 @@ import tempfile
 from oslo.config import cfg
 
 from cinder import exception
+from cinder.image import cache as image_cache
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import imageutils
 from cinder.openstack.common import log as logging
@@ -51,6 +52,10 @@ image_helper_opt = [cfg.StrOpt('image_conversion_dir',
 CONF = cfg.CONF
 CONF.register_opts(image_helper_opt)
 
+# Amount of data at the start of raw images that is checked with
+# 'qemu-img info' before the images are streamed to volumes.
+IMAGE_HEADER_SIZE = units.MiB
+
 
 def qemu_img_info(path):
     """Return a object containing the parsed output from qemu-img info."""
@@ -130,12 +135,53 @@ def fetch_to_raw(context, image_service,
 def fetch_to_volume_format(context, image_service,
                            image_id, dest, volume_format,
                            user_id=None, project_id=None, size=None):
+    image_meta = image_service.show(context, image_id)
+
+    cache = image_cache.get_cache()
+    if (cache is not None and volume_format == 'raw' and image_meta and
+            image_meta.get('checksum')):
+        _fetch_to_raw_cached(cache, context, image_service, image_id,
+                             image_meta, dest, user_id, project_id, size)
+        return
+
+    _fetch_to_volume_format(context, image_service, image_id, image_meta,
+                            dest, volume_format, user_id, project_id, size)
+
+
+def _fetch_to_raw_cached(cache, context, image_service, image_id, image_meta,
+                         dest, user_id=None, project_id=None, size=None):
+    """Copies a raw image from the image cache, filling it if needed."""
+    def _fill(path):
+        _fetch_to_volume_format(context, image_service, image_id,
+                                image_meta, path, 'raw', user_id, project_id)
+
+    with cache.fetch(image_id, image_meta['checksum'], _fill) as path:
+        image_size = os.path.getsize(path)
+        virt_size = image_size / units.GiB
+
+        # NOTE(xqueralt): If the image virtual size doesn't fit in the
+        # requested volume there is no point on resizing it because it will
+        # generate an unusable image.
+        if size is not None and virt_size > size:
+            params = {'image_size': virt_size, 'volume_size': size}
+            reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                       "volume of size %(volume_size)dGB.") % params
+            raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+
+        LOG.debug(_('Copying cached image %(image_id)s to volume %(dest)s') %
+                  {'image_id': image_id, 'dest': dest})
+        size_in_m = (image_size + units.MiB - 1) / units.MiB
+        volume_utils.copy_volume(path, dest, size_in_m)
+
+
+def _fetch_to_volume_format(context, image_service, image_id, image_meta,
+                            dest, volume_format,
+                            user_id=None, project_id=None, size=None):
     if (CONF.image_conversion_dir and not
             os.path.exists(CONF.image_conversion_dir)):
         os.makedirs(CONF.image_conversion_dir)
 
     qemu_img = True
-    image_meta = image_service.show(context, image_id)
 
     # NOTE(avishay): I'm not crazy about creating temp files which may be
     # large and cause disk full errors which would confuse users.
@@ -168,6 +214,15 @@ def fetch_to_volume_format(context, image_service,
                              "can be used if qemu-img is not installed."),
                     image_id=image_id)
 
+        if (volume_format == 'raw' and image_meta and
+                image_meta['disk_format'] == 'raw' and
+                not is_xenserver_format(image_meta)):
+            # Raw images need no conversion, so they are written straight
+            # to the volume once their header has been checked.
+            _stream_raw_image(context, image_service, image_id, image_meta,
+                              dest, tmp if qemu_img else None, size)
+            return
+
         fetch(context, image_service, image_id, tmp, user_id, project_id)
 
         if is_xenserver_image(context, image_service, image_id):
@@ -210,11 +265,6 @@ def fetch_to_volume_format(context, image_service,
 
         # NOTE(jdg): I'm using qemu-img convert to write
         # to the volume regardless if it *needs* conversion or not
-        # TODO(avishay): We can speed this up by checking if the image is raw
-        # and if so, writing directly to the device. However, we need to keep
-        # check via 'qemu-img info' that what we copied was in fact a raw
-        # image and not a different format with a backing file, which may be
-        # malicious.
         LOG.debug("%s was %s, converting to %s " % (image_id, fmt,
                                                     volume_format))
         convert_image(tmp, dest, volume_format)
@@ -229,6 +279,93 @@ def fetch_to_volume_format(context, image_service,
                                                    file_format})
 
 
+class _RawImageWriter(object):
+    """Writes image data to a file once the image header was checked.
+
+    The first IMAGE_HEADER_SIZE bytes of the image are held back and passed
+    to check_header before anything is written.
+    """
+
+    def __init__(self, image_file, check_header):
+        self.image_file = image_file
+        self.check_header = check_header
+        self._header = []
+        self._header_size = 0
+
+    def write(self, data):
+        if self._header is None:
+            self.image_file.write(data)
+            return
+        self._header.append(data)
+        self._header_size += len(data)
+        if self._header_size >= IMAGE_HEADER_SIZE:
+            self._write_header()
+
+    def _write_header(self):
+        header = ''.join(self._header)
+        self._header = None
+        self.check_header(header)
+        self.image_file.write(header)
+
+    def close(self):
+        if self._header is not None:
+            self._write_header()
+        self.image_file.flush()
+        os.fsync(self.image_file.fileno())
+
+
+def _stream_raw_image(context, image_service, image_id, image_meta, dest,
+                      header_path=None, size=None):
+    """Downloads a raw image straight to dest.
+
+    The image header is written to header_path and checked with 'qemu-img
+    info' before any data reaches dest, so that an image that claims to be
+    raw but is of another format, possibly with a malicious backing file,
+    is rejected.  The check is skipped when header_path is None, which is
+    the case when qemu-img is not installed.
+    """
+    virt_size = image_meta['size'] / units.GiB
+
+    # NOTE(xqueralt): If the image virtual size doesn't fit in the
+    # requested volume there is no point on resizing it because it will
+    # generate an unusable image.
+    if size is not None and virt_size > size:
+        params = {'image_size': virt_size, 'volume_size': size}
+        reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                   "volume of size %(volume_size)dGB.") % params
+        raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+
+    def _check_header(header):
+        if header_path is None:
+            return
+        with open(header_path, 'wb') as header_file:
+            header_file.write(header)
+        try:
+            data = qemu_img_info(header_path)
+        except processutils.ProcessExecutionError as ex:
+            raise exception.ImageUnacceptable(
+                image_id=image_id,
+                reason=_("'qemu-img info' failed on the image header: "
+                         "%s") % ex.stderr)
+        if data.file_format != 'raw':
+            raise exception.ImageUnacceptable(
+                image_id=image_id,
+                reason=_("Image is registered as raw, but its format is "
+                         "%s") % data.file_format)
+        if data.backing_file is not None:
+            raise exception.ImageUnacceptable(
+                image_id=image_id,
+                reason=_("fmt=raw backed by: %s") % data.backing_file)
+
+    LOG.debug(_('Streaming raw image %(image_id)s to %(dest)s') %
+              {'image_id': image_id, 'dest': dest})
+    with utils.temporary_chown(dest):
+        with open(dest, 'wb') as image_file:
+            writer = _RawImageWriter(image_file, _check_header)
+            image_service.download(context, image_id, writer)
+            writer.close()
+
+
 def upload_volume(context, image_service, image_meta, volume_path,
                   volume_format='raw'):
     image_id = image_meta['id']
@@ -15,14 +15,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-"""Policy Engine For Cinder"""
+"""Policy Engine For Cinder
 
+The rules of the policy brain are compiled into checks, functions of the
+target and credentials dicts, once per brain rather than parsed on each
+check.  The results of the checks are memoized in the request context,
+keyed by the rule and the values of the target and credentials which the
+rule reads.
+"""
+
+import functools
+import re
 
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
 from cinder.openstack.common import policy
+from cinder.openstack.common import timeutils
 from cinder import utils
 
 
@@ -32,30 +43,51 @@ policy_opts = [
                help=_('JSON file representing policy')),
     cfg.StrOpt('policy_default_rule',
                default='default',
-               help=_('Rule checked when requested rule is not found')), ]
+               help=_('Rule checked when requested rule is not found')),
+    cfg.IntOpt('policy_file_check_interval',
+               default=5,
+               help=_('Seconds between checks of the policy file for '
+                      'changes, 0 to check it on every policy check')), ]
 
 CONF = cfg.CONF
 CONF.register_opts(policy_opts)
 
+LOG = logging.getLogger(__name__)
+
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+_POLICY_CHECKED_AT = None
+_COMPILED = None
+
+# The keys which a generic match reads from the target, e.g. project_id
+# of "project_id:%(project_id)s".
+_TARGET_KEY = re.compile(r'%\(([^)]*)\)s')
 
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _POLICY_CHECKED_AT
+    global _COMPILED
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _POLICY_CHECKED_AT = None
+    _COMPILED = None
     policy.reset()
 
 
 def init():
     global _POLICY_PATH
-    global _POLICY_CACHE
+    global _POLICY_CHECKED_AT
     if not _POLICY_PATH:
         _POLICY_PATH = utils.find_config(CONF.policy_file)
+    now = timeutils.utcnow_ts()
+    if (_POLICY_CACHE and _POLICY_CHECKED_AT is not None and
+            now - _POLICY_CHECKED_AT < CONF.policy_file_check_interval):
+        return
     utils.read_cached_file(_POLICY_PATH, _POLICY_CACHE,
                            reload_func=_set_brain)
+    _POLICY_CHECKED_AT = now
 
 
 def _set_brain(data):
@@ -63,6 +95,193 @@ def _set_brain(data):
     policy.set_brain(policy.Brain.load_json(data, default_rule))
 
 
+def _allow(target, credentials):
+    return True
+
+
+def _deny(target, credentials):
+    return False
+
+
+class CompiledPolicy(object):
+    """The rules of a policy brain compiled into checks.
+
+    The rule, role and generic matches of the stock handlers are
+    compiled, any other match is left to the brain.  Rules checking the
+    latter are not memoized, their result may depend on anything.
+    """
+
+    def __init__(self, brain):
+        self.brain = brain
+        self._checks = {}
+        self._projections = {}
+        for name in brain.rules:
+            self.check(name)
+            self.projection(name)
+
+    def _match_list(self, name):
+        if name in self.brain.rules:
+            return self.brain.rules[name]
+        if self.brain.default_rule and name != self.brain.default_rule:
+            return ('rule:%s' % self.brain.default_rule,)
+        return None
+
+    def _handler(self, kind):
+        if hasattr(self.brain, '_check_%s' % kind):
+            return None
+        checks = self.brain._checks
+        return checks.get(kind, checks.get(None))
+
+    @staticmethod
+    def _split(match):
+        try:
+            return match.split(':', 1)
+        except Exception:
+            return None, None
+
+    @staticmethod
+    def _and_lists(match_list):
+        for and_list in match_list:
+            if isinstance(and_list, basestring):
+                and_list = (and_list,)
+            yield and_list
+
+    def check(self, name):
+        """Return the check of the rule name."""
+        try:
+            return self._checks[name]
+        except KeyError:
+            pass
+        match_list = self._match_list(name)
+        if match_list is None:
+            check = _deny
+        else:
+            check = self._compile(match_list)
+        self._checks[name] = check
+        return check
+
+    def _compile(self, match_list):
+        if not match_list:
+            return _allow
+        or_checks = [[self._compile_match(match) for match in and_list]
+                     for and_list in self._and_lists(match_list)]
+
+        def check(target, credentials):
+            for and_checks in or_checks:
+                for and_check in and_checks:
+                    if not and_check(target, credentials):
+                        break
+                else:
+                    return True
+            return False
+
+        return check
+
+    def _compile_match(self, match):
+        kind, value = self._split(match)
+        if kind is None:
+            LOG.error(_("Failed to understand rule %r"), match)
+            # If the rule is invalid, fail closed
+            return _deny
+
+        handler = self._handler(kind)
+        if handler is policy._check_rule:
+            return lambda target, credentials: self.check(value)(target,
+                                                                 credentials)
+        if handler is policy._check_role:
+            role = value.lower()
+            return lambda target, credentials: role in [
+                x.lower() for x in credentials['roles']]
+        if handler is policy._check_generic:
+            def check_generic(target, credentials):
+                if kind not in credentials:
+                    return False
+                return value % target == unicode(credentials[kind])
+            return check_generic
+        return functools.partial(self.brain._check, match)
+
+    def projection(self, name, _seen=None):
+        """Return the target and credentials keys which rule name reads.
+
+        :returns: tuple of the sorted target keys and credentials keys, or
+                  None if the result of the rule may depend on anything
+        """
+        if name in self._projections:
+            return self._projections[name]
+        seen = _seen or set()
+        if name in seen:
+            return None
+        seen.add(name)
+
+        target_keys = set()
+        credentials_keys = set()
+        projection = (target_keys, credentials_keys)
+        for and_list in self._and_lists(self._match_list(name) or ()):
+            for match in and_list:
+                kind, value = self._split(match)
+                if kind is None:
+                    continue
+                handler = self._handler(kind)
+                if handler is policy._check_rule:
+                    rule_projection = self.projection(value, seen)
+                    if rule_projection is None:
+                        projection = None
+                        break
+                    target_keys.update(rule_projection[0])
+                    credentials_keys.update(rule_projection[1])
+                elif handler is policy._check_role:
+                    credentials_keys.add('roles')
+                elif (handler is policy._check_generic and
+                        '%' not in _TARGET_KEY.sub('', value)):
+                    credentials_keys.add(kind)
+                    target_keys.update(_TARGET_KEY.findall(value))
+                else:
+                    projection = None
+                    break
+            if projection is None:
+                break
+
+        if projection is not None:
+            projection = (tuple(sorted(target_keys)),
+                          tuple(sorted(credentials_keys)))
+        if not _seen:
+            self._projections[name] = projection
+        return projection
+
+    def memo_key(self, name, target, context):
+        """Return the key of the result of rule name, or None."""
+        projection = self.projection(name)
+        if projection is None:
+            return None
+        target_keys, credentials_keys = projection
+        key = [self, name]
+        for target_key in target_keys:
+            key.append(target.get(target_key))
+        for credentials_key in credentials_keys:
+            value = getattr(context, credentials_key, None)
+            if isinstance(value, list):
+                value = tuple(value)
+            key.append(value)
+        key = tuple(key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+
+def _get_compiled():
+    """Return the compiled rules of the current policy brain."""
+    global _COMPILED
+    brain = policy._BRAIN
+    if brain is None:
+        brain = policy.Brain()
+        policy.set_brain(brain)
+    if _COMPILED is None or _COMPILED.brain is not brain:
+        _COMPILED = CompiledPolicy(brain)
+    return _COMPILED
+
+
 def enforce_action(context, action):
     """Checks that the action can be done by the given context.
 
@@ -96,11 +315,20 @@ def enforce(context, action, target):
     """
     init()
 
-    match_list = ('rule:%s' % action,)
-    credentials = context.to_dict()
+    compiled = _get_compiled()
+    results = getattr(context, 'policy_results', None)
+    key = None
+    if results is not None:
+        key = compiled.memo_key(action, target, context)
+    if key is not None and key in results:
+        result = results[key]
+    else:
+        result = compiled.check(action)(target, context.to_dict())
+        if key is not None:
+            results[key] = result
 
-    policy.enforce(match_list, target, credentials,
-                   exception.PolicyNotAuthorized, action=action)
+    if not result:
+        raise exception.PolicyNotAuthorized(action=action)
 
 
 def check_is_admin(roles):
@@ -110,7 +338,6 @@ def check_is_admin(roles):
     init()
 
     action = 'context_is_admin'
-    match_list = ('rule:%s' % action,)
     # include project_id on target to avoid KeyError if context_is_admin
     # policy definition is missing, and default admin_or_owner rule
     # attempts to apply.  Since our credentials dict does not include a
@@ -118,4 +345,4 @@ def check_is_admin(roles):
     target = {'project_id': ''}
     credentials = {'roles': roles}
 
-    return policy.enforce(match_list, target, credentials)
+    return _get_compiled().check(action)(target, credentials)
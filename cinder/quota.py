@@ -28,6 +28,7 @@ from cinder import db
 from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import loopingcall
 from cinder.openstack.common import timeutils
 
 
@@ -55,7 +56,19 @@ quota_opts = [
                help='number of seconds between subsequent usage refreshes'),
     cfg.StrOpt('quota_driver',
                default='cinder.quota.DbQuotaDriver',
-               help='default driver to use for quota checks'),
+               help='default driver to use for quota checks, '
+                    'cinder.quota.ConditionalDbQuotaDriver reserves '
+                    'without locking the usages'),
+    cfg.IntOpt('quota_usage_resync_interval',
+               default=10,
+               help='number of seconds between the resyncs of the usages '
+                    'which need a refresh, by ConditionalDbQuotaDriver. '
+                    '0 resyncs right after the reservation'),
+    cfg.IntOpt('quota_reconcile_interval',
+               default=600,
+               help='number of seconds between the reconciliations of the '
+                    'quota usages by the scheduler, which expire '
+                    'reservations and correct the usages, 0 to disable'),
     cfg.BoolOpt('use_default_quota_class',
                 default=True,
                 help='whether to use default quota class for default quota'), ]
@@ -327,6 +340,22 @@ class DbQuotaDriver(object):
                            common user's tenant.
         """
 
+        quotas, expire, project_id = self._prepare_reserve(
+            context, resources, deltas, expire, project_id)
+
+        # NOTE(Vek): Most of the work here has to be done in the DB
+        #            API, because we have to do it in a transaction,
+        #            which means access to the session.  Since the
+        #            session isn't available outside the DBAPI, we
+        #            have to do the work there.
+        return db.quota_reserve(context, resources, quotas, deltas, expire,
+                                CONF.until_refresh, CONF.max_age,
+                                project_id=project_id)
+
+    def _prepare_reserve(self, context, resources, deltas, expire,
+                         project_id):
+        """Returns the quotas, expiration time and project to reserve."""
+
         # Set up the reservation expiration
         if expire is None:
             expire = CONF.reservation_expire
@@ -348,14 +377,7 @@ class DbQuotaDriver(object):
         quotas = self._get_quotas(context, resources, deltas.keys(),
                                   has_sync=True, project_id=project_id)
 
-        # NOTE(Vek): Most of the work here has to be done in the DB
-        #            API, because we have to do it in a transaction,
-        #            which means access to the session.  Since the
-        #            session isn't available outside the DBAPI, we
-        #            have to do the work there.
-        return db.quota_reserve(context, resources, quotas, deltas, expire,
-                                CONF.until_refresh, CONF.max_age,
-                                project_id=project_id)
+        return quotas, expire, project_id
 
     def commit(self, context, reservations, project_id=None):
         """Commit reservations.
@@ -411,6 +433,90 @@ class DbQuotaDriver(object):
 
         db.reservation_expire(context)
 
+    def reconcile(self, context):
+        """Expire reservations and correct the usages which drifted.
+
+        The reservations are expired in bulk and the in use counts of
+        each project computed with grouped queries, so that usages do
+        not need to be refreshed by the reservations.
+
+        :param context: The request context, for access checks.
+        :returns: a dict with the number of expired reservations and
+                  the list of the usage corrections.
+        """
+
+        expired = db.reservation_expire(context)
+        drift = db.quota_usage_reconcile(context, CONF.until_refresh)
+        for usage in drift:
+            LOG.warning(_("Corrected the %(resource)s usage of project "
+                          "%(project_id)s from %(in_use)d to %(actual)d") %
+                        usage)
+        LOG.info(_("Quota reconciliation expired %(expired)d reservations "
+                   "and corrected %(drift)d usages") %
+                 {'expired': expired, 'drift': len(drift)})
+        return {'expired': expired, 'drift': drift}
+
+
+class ConditionalDbQuotaDriver(DbQuotaDriver):
+    """Database quota driver which reserves without locking usages.
+
+    Reservations are checked and added to the usages with conditional
+    updates, so concurrent reservations of a project do not wait on
+    each other's row locks.  Usages which need a refresh are resynced
+    after the reservation, every quota_usage_resync_interval seconds.
+    """
+
+    def __init__(self):
+        self._resync = {}
+        self._resync_timer = None
+
+    def reserve(self, context, resources, deltas, expire=None,
+                project_id=None):
+        """Check quotas and reserve resources.
+
+        See DbQuotaDriver.reserve(), usages are not refreshed before the
+        quotas are checked but queued to be resynced.
+        """
+        quotas, expire, project_id = self._prepare_reserve(
+            context, resources, deltas, expire, project_id)
+
+        reservations, refresh = db.quota_reserve_conditional(
+            context, resources, quotas, deltas, expire,
+            CONF.until_refresh, CONF.max_age, project_id=project_id)
+
+        if refresh:
+            self._queue_resync(project_id,
+                               dict((r, resources[r]) for r in refresh))
+        return reservations
+
+    def _queue_resync(self, project_id, resources):
+        self._resync.setdefault(project_id, {}).update(resources)
+        interval = CONF.quota_usage_resync_interval
+        if interval <= 0:
+            self.resync_usages()
+        elif self._resync_timer is None:
+            self._resync_timer = loopingcall.FixedIntervalLoopingCall(
+                self.resync_usages)
+            self._resync_timer.start(interval=interval,
+                                     initial_delay=interval)
+
+    def resync_usages(self):
+        """Refresh the queued usages with their sync routines."""
+        ctxt = context.get_admin_context()
+        while self._resync:
+            project_id, resources = self._resync.popitem()
+            try:
+                refreshed = db.quota_usage_resync(ctxt, resources,
+                                                  project_id,
+                                                  CONF.until_refresh)
+            except Exception:
+                LOG.exception(_("Failed to resync the quota usages of "
+                                "project %s") % project_id)
+                continue
+            LOG.debug(_("Resynced quota usages %(refreshed)s of project "
+                        "%(project_id)s") %
+                      {'refreshed': refreshed, 'project_id': project_id})
+
 
 class BaseResource(object):
     """Describe a single resource for quota checking."""
@@ -813,6 +919,14 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def reconcile(self, context):
+        """Expire reservations and correct the usages which drifted.
+
+        :param context: The request context, for access checks.
+        """
+
+        return self._driver.reconcile(context)
+
     def add_volume_type_opts(self, context, opts, volume_type_id):
         """Add volume type resource options.
 
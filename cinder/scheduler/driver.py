@@ -26,7 +26,7 @@ from oslo.config import cfg
 from cinder import db
 from cinder.openstack.common import importutils
 from cinder.openstack.common import timeutils
-from cinder import utils
+from cinder import servicegroup
 from cinder.volume import rpcapi as volume_rpcapi
 
 
@@ -76,6 +76,7 @@ class Scheduler(object):
         self.host_manager = importutils.import_object(
             CONF.scheduler_host_manager)
         self.volume_rpcapi = volume_rpcapi.VolumeAPI()
+        self.servicegroup_api = servicegroup.API()
 
     def update_service_capabilities(self, service_name, host, capabilities):
         """Process a capability update from a service node."""
@@ -89,7 +90,7 @@ class Scheduler(object):
         services = db.service_get_all_by_topic(context, topic)
         return [service['host']
                 for service in services
-                if utils.service_is_up(service)]
+                if self.servicegroup_api.service_is_up(service)]
 
     def host_passes_filters(self, context, volume_id, host, filter_properties):
         """Check if the specified host passes the filters."""
@@ -17,6 +17,10 @@
 Manage hosts in the current zone.
 """
 
+import bisect
+import collections
+import math
+import time
 import UserDict
 
 from oslo.config import cfg
@@ -27,7 +31,7 @@ from cinder.openstack.common import log as logging
 from cinder.openstack.common.scheduler import filters
 from cinder.openstack.common.scheduler import weights
 from cinder.openstack.common import timeutils
-from cinder import utils
+from cinder import servicegroup
 
 
 host_manager_opts = [
@@ -43,7 +47,14 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_service_refresh_interval',
+               default=10,
+               help='Seconds between reloads of the volume services from '
+                    'the database by the scheduler, which decides whether '
+                    'hosts are up or disabled. Capability updates are '
+                    'applied as they are received. 0 reloads the services '
+                    'for every request.'),
 ]
 
 CONF = cfg.CONF
@@ -150,6 +161,109 @@ class HostState(object):
                 (self.host, self.free_capacity_gb))
 
 
+class HostStateIndex(object):
+    """Host states indexed by the predicates of the common filters.
+
+    Lookups return the names of the candidate hosts, which include every
+    host passing the filter.  The capacity is indexed when a host state is
+    added, and consume_from_volume only lowers it, so a host that no longer
+    has the capacity may still be a candidate, never the other way round.
+    """
+
+    def __init__(self):
+        # host -> (availability zone, volume_backend_name, usable capacity)
+        self._entries = {}
+        self._zones = collections.defaultdict(set)
+        self._backend_names = collections.defaultdict(set)
+        # Sorted (usable free capacity in GB, host) of the hosts reporting
+        # their free capacity.
+        self._capacity = []
+        self._unlimited = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _usable_capacity(host_state):
+        """Free capacity as checked by CapacityFilter."""
+        free_space = host_state.free_capacity_gb
+        if free_space is None or free_space in ('infinite', 'unknown'):
+            return free_space
+        reserved = float(host_state.reserved_percentage) / 100
+        return math.floor(free_space * (1 - reserved))
+
+    def add(self, host_state):
+        """Index a host state, replacing its previous entry."""
+        host = host_state.host
+        self.remove(host)
+        zone = host_state.service.get('availability_zone')
+        backend_name = host_state.capabilities.get('volume_backend_name')
+        capacity = self._usable_capacity(host_state)
+
+        self._entries[host] = (zone, backend_name, capacity)
+        self._zones[zone].add(host)
+        self._backend_names[backend_name].add(host)
+        if capacity in ('infinite', 'unknown'):
+            self._unlimited.add(host)
+        elif capacity is not None:
+            bisect.insort(self._capacity, (capacity, host))
+
+    def remove(self, host):
+        """Remove a host from the index, if it is indexed."""
+        entry = self._entries.pop(host, None)
+        if entry is None:
+            return
+        zone, backend_name, capacity = entry
+        self._zones[zone].discard(host)
+        if not self._zones[zone]:
+            del self._zones[zone]
+        self._backend_names[backend_name].discard(host)
+        if not self._backend_names[backend_name]:
+            del self._backend_names[backend_name]
+        if capacity in ('infinite', 'unknown'):
+            self._unlimited.discard(host)
+        elif capacity is not None:
+            del self._capacity[bisect.bisect_left(self._capacity,
+                                                  (capacity, host))]
+
+    def hosts_in_zone(self, zone):
+        return set(self._zones.get(zone, ()))
+
+    def hosts_with_backend_name(self, backend_name):
+        return set(self._backend_names.get(backend_name, ()))
+
+    def hosts_with_capacity(self, size):
+        start = bisect.bisect_left(self._capacity, (size,))
+        hosts = set(host for _capacity, host in self._capacity[start:])
+        return hosts | self._unlimited
+
+
+class HostFilterHandler(filters.HostFilterHandler):
+    """Host filter handler which reuses one instance of each filter class.
+
+    The filters are shared by all the requests, so they must not keep
+    per-request state.
+    """
+
+    def __init__(self, namespace):
+        super(HostFilterHandler, self).__init__(namespace)
+        self._filters = {}
+
+    def get_filter(self, filter_cls):
+        """Return the shared instance of a filter class."""
+        filter_obj = self._filters.get(filter_cls)
+        if filter_obj is None:
+            filter_obj = self._filters.setdefault(filter_cls, filter_cls())
+        return filter_obj
+
+    def get_filtered_objects(self, filter_classes, objs,
+                             filter_properties):
+        for filter_cls in filter_classes:
+            objs = self.get_filter(filter_cls).filter_all(objs,
+                                                          filter_properties)
+        return list(objs)
+
+
 class HostManager(object):
     """Base HostManager class."""
 
@@ -158,12 +272,14 @@ class HostManager(object):
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
-        self.filter_handler = filters.HostFilterHandler('cinder.scheduler.'
-                                                        'filters')
+        self.host_state_index = HostStateIndex()
+        self._services_refreshed = None
+        self.filter_handler = HostFilterHandler('cinder.scheduler.filters')
         self.filter_classes = self.filter_handler.get_all_classes()
         self.weight_handler = weights.HostWeightHandler('cinder.scheduler.'
                                                         'weights')
         self.weight_classes = self.weight_handler.get_all_classes()
+        self.servicegroup_api = servicegroup.API()
 
     def _choose_host_filters(self, filter_cls_names):
         """Since the caller may specify which filters to use we need
@@ -222,10 +338,62 @@ class HostManager(object):
                            filter_class_names=None):
         """Filter hosts and return only ones passing all filters"""
         filter_classes = self._choose_host_filters(filter_class_names)
+        hosts = self._get_candidate_hosts(hosts, filter_classes,
+                                          filter_properties)
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
 
+    def _get_candidate_hosts(self, hosts, filter_classes, filter_properties):
+        """Narrow hosts down with the host state index.
+
+        Only the host states of host_state_map are indexed, any other
+        host is left to the filters.
+        """
+        filter_names = set(cls.__name__ for cls in filter_classes)
+        candidates = None
+        for filter_name, lookup in (
+                ('AvailabilityZoneFilter', self._zone_candidates),
+                ('CapacityFilter', self._capacity_candidates),
+                ('CapabilitiesFilter', self._backend_name_candidates)):
+            if filter_name not in filter_names:
+                continue
+            found = lookup(filter_properties)
+            if found is None:
+                continue
+            if candidates is None:
+                candidates = found
+            else:
+                candidates &= found
+        if candidates is None:
+            return hosts
+        return [host_state for host_state in hosts
+                if host_state.host in candidates or
+                self.host_state_map.get(host_state.host) is not host_state]
+
+    def _zone_candidates(self, filter_properties):
+        spec = filter_properties.get('request_spec') or {}
+        props = spec.get('resource_properties') or {}
+        availability_zone = props.get('availability_zone')
+        if availability_zone:
+            return self.host_state_index.hosts_in_zone(availability_zone)
+
+    def _capacity_candidates(self, filter_properties):
+        size = filter_properties.get('size')
+        if size is not None:
+            return self.host_state_index.hosts_with_capacity(size)
+
+    def _backend_name_candidates(self, filter_properties):
+        resource_type = filter_properties.get('resource_type') or {}
+        extra_specs = resource_type.get('extra_specs') or {}
+        for key in ('volume_backend_name',
+                    'capabilities:volume_backend_name'):
+            req = extra_specs.get(key)
+            # Requirements of more than one word may start with an
+            # operator, only plain names are compared for equality.
+            if req and len(req.split()) == 1:
+                return self.host_state_index.hosts_with_backend_name(req)
+
     def get_weighed_hosts(self, hosts, weight_properties,
                           weigher_class_names=None):
         """Weigh the hosts"""
@@ -251,22 +419,42 @@ class HostManager(object):
         capab_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capab_copy
 
+        host_state = self.host_state_map.get(host)
+        if host_state is not None:
+            host_state.update_capabilities(capab_copy, host_state.service)
+            host_state.update_from_volume_capability(capab_copy)
+            self.host_state_index.add(host_state)
+
     def get_all_host_states(self, context):
-        """Returns a dict of all the hosts the HostManager
+        """Returns a list of all the hosts the HostManager
           knows about. Also, each of the consumable resources in HostState
           are pre-populated and adjusted based on data in the db.
 
+          Host states are kept between requests and updated as capabilities
+          are received, the volume services are only reloaded from the db
+          every scheduler_service_refresh_interval seconds.
+
           For example:
-          {'192.168.1.100': HostState(), ...}
+          [HostState(), ...]
         """
-
+        interval = CONF.scheduler_service_refresh_interval
+        now = time.time()
+        if (self._services_refreshed is None or interval <= 0 or
+                now - self._services_refreshed >= interval):
+            self._refresh_services(context)
+            self._services_refreshed = now
+        return self.host_state_map.values()
+
+    def _refresh_services(self, context):
+        """Syncs the host states with the volume services in the db."""
         # Get resource usage across the available volume nodes:
         topic = CONF.volume_topic
         volume_services = db.service_get_all_by_topic(context, topic)
-        self.host_state_map.clear()
+        active_hosts = set()
         for service in volume_services:
             host = service['host']
-            if not utils.service_is_up(service) or service['disabled']:
+            if (not self.servicegroup_api.service_is_up(service) or
+                    service['disabled']):
                 LOG.warn(_("volume service is down or disabled. "
                            "(host: %s)") % host)
                 continue
@@ -284,5 +472,11 @@ class HostManager(object):
                 self.host_state_map[host] = host_state
             # update host_state
             host_state.update_from_volume_capability(capabilities)
-
-        return self.host_state_map.itervalues()
+            self.host_state_index.add(host_state)
+            active_hosts.add(host)
+
+        for host in set(self.host_state_map) - active_hosts:
+            LOG.debug(_("Removing inactive host %s from the scheduler "
+                        "cache.") % host)
+            del self.host_state_map[host]
+            self.host_state_index.remove(host)
@@ -31,6 +31,9 @@ from cinder.openstack.common import excutils
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common.notifier import api as notifier
+from cinder.openstack.common import periodic_task
+from cinder.openstack.common import timeutils
+from cinder import quota
 from cinder.volume.flows import create_volume
 from cinder.volume import rpcapi as volume_rpcapi
 
@@ -45,6 +48,8 @@ CONF.register_opt(scheduler_driver_opt)
 
 LOG = logging.getLogger(__name__)
 
+QUOTAS = quota.QUOTAS
+
 
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
@@ -57,6 +62,7 @@ class SchedulerManager(manager.Manager):
             scheduler_driver = CONF.scheduler_driver
         self.driver = importutils.import_object(scheduler_driver)
         super(SchedulerManager, self).__init__(*args, **kwargs)
+        self._last_quota_reconcile = None
 
     def init_host(self):
         ctxt = context.get_admin_context()
@@ -88,6 +94,22 @@ class SchedulerManager(manager.Manager):
                 _("Failed to create scheduler manager volume flow"))
         flow_engine.run()
 
+    @periodic_task.periodic_task
+    def _reconcile_quotas(self, context):
+        """Expire reservations and correct quota usages periodically."""
+        interval = CONF.quota_reconcile_interval
+        if interval <= 0:
+            return
+        if (self._last_quota_reconcile is not None and
+                not timeutils.is_older_than(self._last_quota_reconcile,
+                                            interval)):
+            return
+        self._last_quota_reconcile = timeutils.utcnow()
+        try:
+            QUOTAS.reconcile(context)
+        except Exception:
+            LOG.exception(_("Failed to reconcile the quota usages"))
+
     def request_service_capabilities(self, context):
         volume_rpcapi.VolumeAPI().publish_service_capabilities(context)
 
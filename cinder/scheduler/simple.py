@@ -27,7 +27,6 @@ from cinder import db
 from cinder import exception
 from cinder.scheduler import chance
 from cinder.scheduler import driver
-from cinder import utils
 
 
 simple_scheduler_opts = [
@@ -59,7 +58,7 @@ class SimpleScheduler(chance.ChanceScheduler):
         if host and context.is_admin:
             topic = CONF.volume_topic
             service = db.service_get_by_args(elevated, host, topic)
-            if not utils.service_is_up(service):
+            if not self.servicegroup_api.service_is_up(service):
                 raise exception.WillNotSchedule(host=host)
             updated_volume = driver.volume_update_db(context, volume_id, host)
             self.volume_rpcapi.create_volume(context, updated_volume, host,
@@ -77,7 +76,8 @@ class SimpleScheduler(chance.ChanceScheduler):
             if volume_gigabytes + volume_size > CONF.max_gigabytes:
                 msg = _("Not enough allocatable volume gigabytes remaining")
                 raise exception.NoValidHost(reason=msg)
-            if utils.service_is_up(service) and not service['disabled']:
+            if (self.servicegroup_api.service_is_up(service) and
+                    not service['disabled']):
                 updated_volume = driver.volume_update_db(context, volume_id,
                                                          service['host'])
                 self.volume_rpcapi.create_volume(context, updated_volume,
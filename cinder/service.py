@@ -38,6 +38,7 @@ from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import rpc
+from cinder import servicegroup
 from cinder import utils
 from cinder import version
 from cinder import wsgi
@@ -62,7 +63,13 @@ service_opts = [
                help='IP address for OpenStack Volume API to listen'),
     cfg.IntOpt('osapi_volume_listen_port',
                default=8776,
-               help='port for os volume api to listen'), ]
+               help='port for os volume api to listen'),
+    cfg.IntOpt('osapi_volume_workers',
+               default=1,
+               help='Number of worker processes of the OpenStack Volume '
+                    'API, which share its listen socket. The workers share '
+                    'the rate limits only with the memcached '
+                    'api_rate_limit_backend'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(service_opts)
@@ -218,6 +225,10 @@ class ProcessLauncher(object):
 
         wrap.forktimes.append(time.time())
 
+        # The children must not share the database connections of the
+        # parent, each of them connects on its first database call.
+        db.dispose_engine()
+
         pid = os.fork()
         if pid == 0:
             # NOTE(johannes): All exceptions are caught to ensure this
@@ -354,6 +365,7 @@ class Service(object):
         super(Service, self).__init__(*args, **kwargs)
         self.saved_args, self.saved_kwargs = args, kwargs
         self.timers = []
+        self.servicegroup_api = servicegroup.API()
 
     def start(self):
         version_string = version.version_string()
@@ -387,10 +399,8 @@ class Service(object):
         self.conn.consume_in_thread()
         self.manager.init_host()
 
-        if self.report_interval:
-            pulse = utils.LoopingCall(self.report_state)
-            pulse.start(interval=self.report_interval,
-                        initial_delay=self.report_interval)
+        pulse = self.servicegroup_api.join(self.host, self.topic, self)
+        if pulse:
             self.timers.append(pulse)
 
         if self.periodic_interval:
@@ -540,11 +550,22 @@ class WSGIService(object):
         self.app = self.loader.load_app(name)
         self.host = getattr(CONF, '%s_listen' % name, "0.0.0.0")
         self.port = getattr(CONF, '%s_listen_port' % name, 0)
+        self.workers = getattr(CONF, '%s_workers' % name, None) or 1
+        if self.workers < 1:
+            raise exception.InvalidInput(
+                reason=_('%(name)s_workers must be at least 1, got '
+                         '%(workers)d') % {'name': name,
+                                           'workers': self.workers})
         self.basic_config_check()
         self.server = wsgi.Server(name,
                                   self.app,
                                   host=self.host,
                                   port=self.port)
+        if self.workers > 1:
+            # Bound before the workers are forked, so that they all
+            # accept connections on the same socket.
+            self.server.listen()
+            self.port = self.server.port
 
     def basic_config_check(self):
         """Perform basic config checks before starting service."""
@@ -0,0 +1,39 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo.config import cfg
+
+from cinder.openstack.common import importutils
+
+servicegroup_opts = [
+    cfg.StrOpt('servicegroup_driver',
+               default='cinder.servicegroup.db_driver.DbDriver',
+               help='The full class name of the driver which keeps the '
+                    'heartbeats of the services and tells whether they '
+                    'are up'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(servicegroup_opts)
+
+# One driver per process, so that the heartbeats of the services of a
+# process can be reported together.
+_DRIVERS = {}
+
+
+def API():
+    driver_name = CONF.servicegroup_driver
+    if driver_name not in _DRIVERS:
+        _DRIVERS[driver_name] = importutils.import_object(driver_name)
+    return _DRIVERS[driver_name]
@@ -0,0 +1,40 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Service group driver keeping the heartbeats in the services table
+"""
+
+from cinder.servicegroup import driver
+from cinder import utils
+
+
+class DbDriver(driver.ServiceGroupDriver):
+    """Service group driver of the database.
+
+    The services update their report_count in the services table every
+    report_interval, and are up while the updated_at of their record is
+    younger than service_down_time.
+    """
+
+    def join(self, member_id, group_id, service):
+        if not service.report_interval:
+            return None
+        pulse = utils.LoopingCall(service.report_state)
+        pulse.start(interval=service.report_interval,
+                    initial_delay=service.report_interval)
+        return pulse
+
+    def service_is_up(self, member):
+        return utils.service_is_up(member)
@@ -0,0 +1,51 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Service group driver API
+"""
+
+import abc
+
+import six
+
+
+@six.add_metaclass(abc.ABCMeta)
+class ServiceGroupDriver(object):
+    """Base Service Group Driver Interface
+
+    A service group driver reports the heartbeats of the services running
+    in this process, and tells from the service records of the database
+    whether the services are up.
+    """
+
+    @abc.abstractmethod
+    def join(self, member_id, group_id, service):
+        """Starts reporting the heartbeats of a service.
+
+        :param member_id: the host of the service
+        :param group_id: the topic of the service
+        :param service: the cinder.service.Service which joins
+        :returns: a timer with stop() and wait() methods, stopped with the
+                  service, or None if the service reports no heartbeats
+        """
+        pass
+
+    @abc.abstractmethod
+    def service_is_up(self, member):
+        """Checks whether a service is up.
+
+        :param member: the service record of the database
+        """
+        pass
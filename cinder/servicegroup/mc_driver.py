@@ -0,0 +1,113 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Service group driver keeping the heartbeats in memcached
+"""
+
+from oslo.config import cfg
+
+from cinder.openstack.common import log as logging
+from cinder.openstack.common import memorycache
+from cinder.openstack.common import timeutils
+from cinder.servicegroup import driver
+from cinder import utils
+
+
+CONF = cfg.CONF
+CONF.import_opt('service_down_time', 'cinder.common.config')
+
+LOG = logging.getLogger(__name__)
+
+
+class _Membership(object):
+    """Timer of a service which joined, stopped with the service."""
+
+    def __init__(self, driver, key):
+        self.driver = driver
+        self.key = key
+
+    def stop(self):
+        self.driver.leave(self.key)
+
+    def wait(self):
+        pass
+
+
+class MemcachedDriver(driver.ServiceGroupDriver):
+    """Service group driver of memcached.
+
+    The heartbeats are cache keys which expire after service_down_time,
+    a service is up while its key exists.  The services table is not
+    updated, nor read for the liveness of the services.
+
+    The heartbeats of all the services of this process are written
+    together, by a single timer.  Without memcached_servers the cache is
+    kept in the memory of the process, which only suits a single process
+    running all the services.
+    """
+
+    def __init__(self):
+        self.mc = memorycache.get_client()
+        self._members = set()
+        self._pulse = None
+
+    @staticmethod
+    def _key(group_id, member_id):
+        return str('%s:%s' % (group_id, member_id))
+
+    def join(self, member_id, group_id, service):
+        if not service.report_interval:
+            return None
+        key = self._key(group_id, member_id)
+        self._members.add(key)
+        # Up from the start, rather than after the first report_interval.
+        self._report_states([key])
+        if self._pulse is None:
+            self._pulse = utils.LoopingCall(self._report_all)
+            self._pulse.start(interval=service.report_interval,
+                              initial_delay=service.report_interval)
+        return _Membership(self, key)
+
+    def leave(self, key):
+        """Stops reporting the heartbeat of a service."""
+        self._members.discard(key)
+        if not self._members and self._pulse is not None:
+            self._pulse.stop()
+            self._pulse = None
+
+    def _report_all(self):
+        self._report_states(list(self._members))
+
+    def _report_states(self, keys):
+        heartbeats = dict((key, timeutils.strtime()) for key in keys)
+        try:
+            if hasattr(self.mc, 'set_multi'):
+                failed = self.mc.set_multi(heartbeats,
+                                           time=CONF.service_down_time)
+            else:
+                failed = [key for key, value in heartbeats.items()
+                          if not self.mc.set(key, value,
+                                             time=CONF.service_down_time)]
+        except Exception:
+            LOG.exception(_('Failed to report the heartbeats of %s'),
+                          ', '.join(keys))
+            return
+        if failed:
+            LOG.warn(_('Failed to report the heartbeats of %s'),
+                     ', '.join(failed))
+
+    def service_is_up(self, member):
+        key = self._key(member['topic'], member['host'])
+        return self.mc.get(key) is not None
@@ -59,7 +59,7 @@ class BackupsAPITestCase(test.TestCase):
                        display_description='this is a test backup',
                        container='volumebackups',
                        status='creating',
-                       size=0, object_count=0):
+                       size=0, object_count=0, parent_id=None):
         """Create a backup object."""
         backup = {}
         backup['volume_id'] = volume_id
@@ -74,6 +74,7 @@ class BackupsAPITestCase(test.TestCase):
         backup['fail_reason'] = ''
         backup['size'] = size
         backup['object_count'] = object_count
+        backup['parent_id'] = parent_id
         return db.backup_create(context.get_admin_context(), backup)['id']
 
     @staticmethod
@@ -157,13 +158,13 @@ class BackupsAPITestCase(test.TestCase):
 
         self.assertEqual(res.status_int, 200)
         self.assertEqual(len(res_dict['backups'][0]), 3)
-        self.assertEqual(res_dict['backups'][0]['id'], backup_id1)
+        self.assertEqual(res_dict['backups'][0]['id'], backup_id3)
         self.assertEqual(res_dict['backups'][0]['name'], 'test_backup')
         self.assertEqual(len(res_dict['backups'][1]), 3)
         self.assertEqual(res_dict['backups'][1]['id'], backup_id2)
         self.assertEqual(res_dict['backups'][1]['name'], 'test_backup')
         self.assertEqual(len(res_dict['backups'][2]), 3)
-        self.assertEqual(res_dict['backups'][2]['id'], backup_id3)
+        self.assertEqual(res_dict['backups'][2]['id'], backup_id1)
         self.assertEqual(res_dict['backups'][2]['name'], 'test_backup')
 
         db.backup_destroy(context.get_admin_context(), backup_id3)
@@ -187,13 +188,13 @@ class BackupsAPITestCase(test.TestCase):
 
         self.assertEqual(backup_list.item(0).attributes.length, 2)
         self.assertEqual(backup_list.item(0).getAttribute('id'),
-                         backup_id1)
+                         backup_id3)
         self.assertEqual(backup_list.item(1).attributes.length, 2)
         self.assertEqual(backup_list.item(1).getAttribute('id'),
                          backup_id2)
         self.assertEqual(backup_list.item(2).attributes.length, 2)
         self.assertEqual(backup_list.item(2).getAttribute('id'),
-                         backup_id3)
+                         backup_id1)
 
         db.backup_destroy(context.get_admin_context(), backup_id3)
         db.backup_destroy(context.get_admin_context(), backup_id2)
@@ -220,7 +221,7 @@ class BackupsAPITestCase(test.TestCase):
                          'this is a test backup')
         self.assertEqual(res_dict['backups'][0]['name'],
                          'test_backup')
-        self.assertEqual(res_dict['backups'][0]['id'], backup_id1)
+        self.assertEqual(res_dict['backups'][0]['id'], backup_id3)
         self.assertEqual(res_dict['backups'][0]['object_count'], 0)
         self.assertEqual(res_dict['backups'][0]['size'], 0)
         self.assertEqual(res_dict['backups'][0]['status'], 'creating')
@@ -248,7 +249,7 @@ class BackupsAPITestCase(test.TestCase):
                          'this is a test backup')
         self.assertEqual(res_dict['backups'][2]['name'],
                          'test_backup')
-        self.assertEqual(res_dict['backups'][2]['id'], backup_id3)
+        self.assertEqual(res_dict['backups'][2]['id'], backup_id1)
         self.assertEqual(res_dict['backups'][2]['object_count'], 0)
         self.assertEqual(res_dict['backups'][2]['size'], 0)
         self.assertEqual(res_dict['backups'][2]['status'], 'creating')
@@ -284,7 +285,7 @@ class BackupsAPITestCase(test.TestCase):
         self.assertEqual(
             backup_detail.item(0).getAttribute('name'), 'test_backup')
         self.assertEqual(
-            backup_detail.item(0).getAttribute('id'), backup_id1)
+            backup_detail.item(0).getAttribute('id'), backup_id3)
         self.assertEqual(
             int(backup_detail.item(0).getAttribute('object_count')), 0)
         self.assertEqual(
@@ -326,7 +327,7 @@ class BackupsAPITestCase(test.TestCase):
         self.assertEqual(
             backup_detail.item(2).getAttribute('name'), 'test_backup')
         self.assertEqual(
-            backup_detail.item(2).getAttribute('id'), backup_id3)
+            backup_detail.item(2).getAttribute('id'), backup_id1)
         self.assertEqual(
             int(backup_detail.item(2).getAttribute('object_count')), 0)
         self.assertEqual(
@@ -340,6 +341,30 @@ class BackupsAPITestCase(test.TestCase):
         db.backup_destroy(context.get_admin_context(), backup_id2)
         db.backup_destroy(context.get_admin_context(), backup_id1)
 
+    def test_list_backups_with_filters_and_paging(self):
+        backup_ids = [self._create_backup(display_name='backup%d' % i,
+                                          status=('available', 'error')[i % 2])
+                      for i in xrange(4)]
+
+        def _list(query):
+            req = webob.Request.blank('/v2/fake/backups?%s' % query)
+            req.method = 'GET'
+            req.headers['Content-Type'] = 'application/json'
+            res = req.get_response(fakes.wsgi_app())
+            self.assertEqual(res.status_int, 200)
+            return [b['id'] for b in json.loads(res.body)['backups']]
+
+        self.assertEqual([backup_ids[2]], _list('name=backup2'))
+        self.assertEqual([backup_ids[0], backup_ids[2]],
+                         _list('status=available&sort_key=display_name'
+                               '&sort_dir=asc'))
+        self.assertEqual([backup_ids[1], backup_ids[2]],
+                         _list('marker=%s&limit=2&sort_key=display_name'
+                               '&sort_dir=asc' % backup_ids[0]))
+
+        for backup_id in backup_ids:
+            db.backup_destroy(context.get_admin_context(), backup_id)
+
     def test_create_backup_json(self):
         self.stubs.Set(cinder.db, 'service_get_all_by_topic',
                        self._stub_service_get_all_by_topic)
@@ -367,6 +392,65 @@ class BackupsAPITestCase(test.TestCase):
 
         db.volume_destroy(context.get_admin_context(), volume_id)
 
+    def test_create_incremental_backup_json(self):
+        self.stubs.Set(cinder.db, 'service_get_all_by_topic',
+                       self._stub_service_get_all_by_topic)
+
+        volume_id = utils.create_volume(self.context, size=5)['id']
+        parent_id = self._create_backup(volume_id, status='available')
+
+        body = {"backup": {"display_name": "nightly001",
+                           "volume_id": volume_id,
+                           "container": "nightlybackups",
+                           "incremental": True,
+                           }
+                }
+        req = webob.Request.blank('/v2/fake/backups')
+        req.method = 'POST'
+        req.headers['Content-Type'] = 'application/json'
+        req.body = json.dumps(body)
+        res = req.get_response(fakes.wsgi_app())
+
+        res_dict = json.loads(res.body)
+
+        self.assertEqual(res.status_int, 202)
+        backup_id = res_dict['backup']['id']
+        self.assertEqual(self._get_backup_attrib(backup_id, 'parent_id'),
+                         parent_id)
+
+        db.backup_destroy(context.get_admin_context(), backup_id)
+        db.backup_destroy(context.get_admin_context(), parent_id)
+        db.volume_destroy(context.get_admin_context(), volume_id)
+
+    def test_create_incremental_backup_without_parent(self):
+        self.stubs.Set(cinder.db, 'service_get_all_by_topic',
+                       self._stub_service_get_all_by_topic)
+
+        volume_id = utils.create_volume(self.context, size=5)['id']
+
+        body = {"backup": {"display_name": "nightly001",
+                           "volume_id": volume_id,
+                           "incremental": True,
+                           }
+                }
+        req = webob.Request.blank('/v2/fake/backups')
+        req.method = 'POST'
+        req.headers['Content-Type'] = 'application/json'
+        req.body = json.dumps(body)
+        res = req.get_response(fakes.wsgi_app())
+
+        res_dict = json.loads(res.body)
+
+        self.assertEqual(res.status_int, 400)
+        self.assertEqual(res_dict['badRequest']['message'],
+                         'Invalid backup: No backups available to do an '
+                         'incremental backup')
+        self.assertEqual(self.volume_api.get(self.context,
+                                             volume_id)['status'],
+                         'available')
+
+        db.volume_destroy(context.get_admin_context(), volume_id)
+
     def test_create_backup_xml(self):
         self.stubs.Set(cinder.db, 'service_get_all_by_topic',
                        self._stub_service_get_all_by_topic)
@@ -601,6 +685,27 @@ class BackupsAPITestCase(test.TestCase):
 
         db.backup_destroy(context.get_admin_context(), backup_id)
 
+    def test_delete_backup_with_incremental_backups(self):
+        parent_id = self._create_backup(status='available')
+        backup_id = self._create_backup(status='available',
+                                        parent_id=parent_id)
+        req = webob.Request.blank('/v2/fake/backups/%s' %
+                                  parent_id)
+        req.method = 'DELETE'
+        req.headers['Content-Type'] = 'application/json'
+        res = req.get_response(fakes.wsgi_app())
+        res_dict = json.loads(res.body)
+
+        self.assertEqual(res.status_int, 400)
+        self.assertEqual(res_dict['badRequest']['message'],
+                         'Invalid backup: Incremental backups exist for '
+                         'this backup')
+        self.assertEqual(self._get_backup_attrib(parent_id, 'status'),
+                         'available')
+
+        db.backup_destroy(context.get_admin_context(), backup_id)
+        db.backup_destroy(context.get_admin_context(), parent_id)
+
     def test_delete_backup_with_backup_NotFound(self):
         req = webob.Request.blank('/v2/fake/backups/9999')
         req.method = 'DELETE'
@@ -46,7 +46,8 @@ def fake_snapshot_get(self, context, snapshot_id):
     return param
 
 
-def fake_snapshot_get_all(self, context, search_opts=None):
+def fake_snapshot_get_all(self, context, search_opts=None, marker=None,
+                          limit=None, sort_key='created_at', sort_dir='desc'):
     param = _get_default_snapshot_param()
     return [param]
 
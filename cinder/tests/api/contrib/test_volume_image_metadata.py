@@ -63,8 +63,9 @@ def fake_get_volume_image_metadata(*args, **kwargs):
     return fake_image_metadata
 
 
-def fake_get_volumes_image_metadata(*args, **kwargs):
-    return {'fake': fake_image_metadata}
+def fake_get_list_volumes_image_metadata(self, context, volume_id_list):
+    return dict((volume_id, fake_image_metadata)
+                for volume_id in volume_id_list if volume_id == 'fake')
 
 
 class VolumeImageMetadataTest(test.TestCase):
@@ -76,8 +77,8 @@ class VolumeImageMetadataTest(test.TestCase):
         self.stubs.Set(volume.API, 'get_all', fake_volume_get_all)
         self.stubs.Set(volume.API, 'get_volume_image_metadata',
                        fake_get_volume_image_metadata)
-        self.stubs.Set(volume.API, 'get_volumes_image_metadata',
-                       fake_get_volumes_image_metadata)
+        self.stubs.Set(volume.API, 'get_list_volumes_image_metadata',
+                       fake_get_list_volumes_image_metadata)
         self.stubs.Set(db, 'volume_get', fake_volume_get)
         self.UUID = uuid.uuid4()
 
@@ -108,6 +109,20 @@ class VolumeImageMetadataTest(test.TestCase):
         self.assertEqual(self._get_image_metadata_list(res.body)[0],
                          fake_image_metadata)
 
+    def test_list_detail_volumes_loads_page_metadata(self):
+        calls = []
+
+        def fake_get_list(self, context, volume_id_list):
+            calls.append(volume_id_list)
+            return fake_get_list_volumes_image_metadata(self, context,
+                                                        volume_id_list)
+        self.stubs.Set(volume.API, 'get_list_volumes_image_metadata',
+                       fake_get_list)
+
+        res = self._make_request('/v2/fake/volumes/detail')
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual([['fake']], calls)
+
 
 class ImageMetadataXMLDeserializer(common.MetadataXMLDeserializer):
     metadata_node_name = "volume_image_metadata"
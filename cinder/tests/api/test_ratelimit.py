@@ -0,0 +1,174 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Tests of the stores of the rate limits of the users.
+"""
+
+from cinder.api import ratelimit
+from cinder.api.v2 import limits
+from cinder.openstack.common import memorycache
+from cinder.openstack.common import timeutils
+from cinder import test
+
+
+class FakeCasClient(memorycache.Client):
+    """In process cache with the compare-and-set of python-memcached."""
+
+    def __init__(self, *args, **kwargs):
+        super(FakeCasClient, self).__init__(*args, **kwargs)
+        self.cache_cas = False
+        self.cas_ids = {}
+        self.conflicts = 0
+
+    def gets(self, key):
+        value = self.get(key)
+        self.cas_ids[key] = value
+        return value
+
+    def cas(self, key, value, time=0, min_compress_len=0):
+        if self.conflicts:
+            self.conflicts -= 1
+            return False
+        if self.get(key) != self.cas_ids.pop(key, None):
+            return False
+        return self.set(key, value, time, min_compress_len)
+
+
+class LiteralPrefixTestCase(test.TestCase):
+
+    def test_literal_prefix(self):
+        self.assertEqual('/volumes', ratelimit.literal_prefix('^/volumes'))
+        self.assertEqual('/volumes', ratelimit.literal_prefix('/volumes.*'))
+        self.assertEqual('', ratelimit.literal_prefix('.*'))
+        self.assertEqual('/volume', ratelimit.literal_prefix('^/volumes?'))
+        self.assertEqual('/volume', ratelimit.literal_prefix('^/volumes{2}'))
+        self.assertEqual('/volumes', ratelimit.literal_prefix('^/volumes+'))
+        self.assertEqual('', ratelimit.literal_prefix('^/volumes|^/snap'))
+        self.assertEqual('', ratelimit.literal_prefix('(?i)/volumes'))
+
+
+class LimitIndexTestCase(test.TestCase):
+
+    def test_match(self):
+        index = ratelimit.LimitIndex([
+            limits.Limit("POST", "*", ".*", 10, limits.PER_MINUTE),
+            limits.Limit("POST", "/volumes", "^/volumes", 5,
+                         limits.PER_MINUTE),
+            limits.Limit("PUT", "*", ".*", 10, limits.PER_MINUTE),
+            limits.Limit("POST", "*changes", ".*changes.*", 5,
+                         limits.PER_MINUTE),
+        ])
+        self.assertEqual([0, 1], sorted(position for position, _limit in
+                                        index.match("POST", "/volumes/1")))
+        self.assertEqual([0, 3], sorted(position for position, _limit in
+                                        index.match("POST", "/x?changes")))
+        self.assertEqual([2], [position for position, _limit in
+                               index.match("PUT", "/volumes")])
+        self.assertEqual([], list(index.match("GET", "/volumes")))
+
+
+class MemoryBackendTestCase(test.TestCase):
+
+    def setUp(self):
+        super(MemoryBackendTestCase, self).setUp()
+        self.limit = limits.Limit("GET", "*", ".*", 2, limits.PER_MINUTE)
+
+    def test_consume(self):
+        backend = ratelimit.MemoryBackend()
+        self.assertIsNone(backend.consume(('user1', 0), self.limit, 0))
+        self.assertIsNone(backend.consume(('user1', 0), self.limit, 0))
+        self.assertEqual(30.0, backend.consume(('user1', 0), self.limit, 0))
+        self.assertEqual(60.0, backend.get(('user1', 0), 0))
+        self.assertIsNone(backend.consume(('user1', 0), self.limit, 30))
+
+    def test_idle_buckets_evicted(self):
+        backend = ratelimit.MemoryBackend(max_buckets=10)
+        backend.consume(('user1', 0), self.limit, 0)
+        backend.consume(('user2', 0), self.limit, 10)
+        # The bucket of user1 is empty again at 30.
+        backend.consume(('user3', 0), self.limit, 35)
+        self.assertIsNone(backend.get(('user1', 0), 35))
+        self.assertEqual(40.0, backend.get(('user2', 0), 35))
+
+    def test_max_buckets(self):
+        backend = ratelimit.MemoryBackend(max_buckets=2)
+        for i in xrange(5):
+            backend.consume(('user%d' % i, 0), self.limit, 0)
+        self.assertEqual(2, len(backend._buckets))
+        self.assertIsNone(backend.get(('user2', 0), 0))
+        self.assertEqual(30.0, backend.get(('user4', 0), 0))
+
+    def test_recently_used_kept(self):
+        backend = ratelimit.MemoryBackend(max_buckets=2)
+        backend.consume(('user1', 0), self.limit, 0)
+        backend.consume(('user2', 0), self.limit, 0)
+        backend.consume(('user1', 0), self.limit, 0)
+        backend.consume(('user3', 0), self.limit, 0)
+        self.assertIsNone(backend.get(('user2', 0), 0))
+        self.assertEqual(60.0, backend.get(('user1', 0), 0))
+
+
+class MemcachedBackendTestCase(test.TestCase):
+
+    def setUp(self):
+        super(MemcachedBackendTestCase, self).setUp()
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        self.limit = limits.Limit("GET", "*", ".*", 2, limits.PER_MINUTE)
+
+    def _backend(self, client):
+        self.stubs.Set(memorycache, 'get_client', lambda: client)
+        return ratelimit.MemcachedBackend()
+
+    def test_shared_between_workers(self):
+        client = memorycache.Client()
+        worker1 = limits.Limiter([self.limit],
+                                 backend=self._backend(client))
+        worker2 = limits.Limiter([self.limit],
+                                 backend=self._backend(client))
+        self.assertEqual((None, None),
+                         worker1.check_for_delay("GET", "/volumes", "user1"))
+        self.assertEqual((None, None),
+                         worker2.check_for_delay("GET", "/volumes", "user1"))
+        delay, _error = worker1.check_for_delay("GET", "/volumes", "user1")
+        self.assertTrue(delay)
+        self.assertEqual((None, None),
+                         worker2.check_for_delay("GET", "/volumes", "user2"))
+
+    def test_buckets_expire(self):
+        backend = self._backend(memorycache.Client())
+        backend.consume(('user1', 0), self.limit, 0)
+        self.assertEqual(30.0, backend.get(('user1', 0), 0))
+        timeutils.advance_time_seconds(32)
+        self.assertIsNone(backend.get(('user1', 0), 32))
+
+    def test_compare_and_set(self):
+        client = FakeCasClient()
+        backend = self._backend(client)
+        self.assertTrue(client.cache_cas)
+        backend.consume(('user1', 0), self.limit, 0)
+        client.conflicts = 2
+        self.assertIsNone(backend.consume(('user1', 0), self.limit, 0))
+        self.assertEqual(0, client.conflicts)
+        self.assertEqual(60.0, backend.get(('user1', 0), 0))
+
+    def test_compare_and_set_gives_up(self):
+        self.flags(api_rate_limit_cas_retries=3)
+        client = FakeCasClient()
+        backend = self._backend(client)
+        backend.consume(('user1', 0), self.limit, 0)
+        client.conflicts = 3
+        self.assertIsNone(backend.consume(('user1', 0), self.limit, 0))
+        self.assertEqual(30.0, backend.get(('user1', 0), 0))
@@ -70,7 +70,8 @@ def stub_snapshot_get(self, context, snapshot_id):
     return param
 
 
-def stub_snapshot_get_all(self, context, search_opts=None):
+def stub_snapshot_get_all(self, context, search_opts=None, marker=None,
+                          limit=None, sort_key='created_at', sort_dir='desc'):
     param = _get_default_snapshot_param()
     return [param]
 
@@ -246,8 +247,10 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(resp_snapshot['id'], UUID)
 
     def test_snapshot_list_by_status(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id, marker,
+                                             limit, sort_key, sort_dir,
+                                             filters=None):
+            snapshots = [
                 stubs.stub_snapshot(1, display_name='backup1',
                                     status='available'),
                 stubs.stub_snapshot(2, display_name='backup2',
@@ -255,6 +258,8 @@ class SnapshotApiTest(test.TestCase):
                 stubs.stub_snapshot(3, display_name='backup3',
                                     status='creating'),
             ]
+            return [s for s in snapshots
+                    if all(s[k] == v for k, v in filters.iteritems())]
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -279,12 +284,16 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(len(resp['snapshots']), 0)
 
     def test_snapshot_list_by_volume(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id, marker,
+                                             limit, sort_key, sort_dir,
+                                             filters=None):
+            snapshots = [
                 stubs.stub_snapshot(1, volume_id='vol1', status='creating'),
                 stubs.stub_snapshot(2, volume_id='vol1', status='available'),
                 stubs.stub_snapshot(3, volume_id='vol2', status='available'),
             ]
+            return [s for s in snapshots
+                    if all(s[k] == v for k, v in filters.iteritems())]
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -308,12 +317,16 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(resp['snapshots'][0]['status'], 'available')
 
     def test_snapshot_list_by_name(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id, marker,
+                                             limit, sort_key, sort_dir,
+                                             filters=None):
+            snapshots = [
                 stubs.stub_snapshot(1, display_name='backup1'),
                 stubs.stub_snapshot(2, display_name='backup2'),
                 stubs.stub_snapshot(3, display_name='backup3'),
             ]
+            return [s for s in snapshots
+                    if all(s[k] == v for k, v in filters.iteritems())]
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -331,6 +344,25 @@ class SnapshotApiTest(test.TestCase):
         resp = self.controller.index(req)
         self.assertEqual(len(resp['snapshots']), 0)
 
+    def test_snapshot_list_with_marker_and_sort(self):
+        calls = []
+
+        def stub_snapshot_get_all_by_project(context, project_id, marker,
+                                             limit, sort_key, sort_dir,
+                                             filters=None):
+            calls.append((marker, limit, sort_key, sort_dir, filters))
+            return [stubs.stub_snapshot(2, display_name='backup2')]
+        self.stubs.Set(db, 'snapshot_get_all_by_project',
+                       stub_snapshot_get_all_by_project)
+
+        req = fakes.HTTPRequest.blank('/v2/snapshots?marker=1&limit=1'
+                                      '&sort_key=display_name&sort_dir=asc'
+                                      '&status=available')
+        resp = self.controller.index(req)
+        self.assertEqual(len(resp['snapshots']), 1)
+        self.assertEqual(calls, [('1', 1, 'display_name', 'asc',
+                                  {'status': 'available'})])
+
     def test_admin_list_snapshots_limited_to_project(self):
         req = fakes.HTTPRequest.blank('/v2/fake/snapshots',
                                       use_admin_context=True)
@@ -341,7 +373,9 @@ class SnapshotApiTest(test.TestCase):
 
     def test_list_snapshots_with_limit_and_offset(self):
         def list_snapshots_with_limit_and_offset(is_admin):
-            def stub_snapshot_get_all_by_project(context, project_id):
+            def stub_snapshot_get_all_by_project(context, project_id,
+                                                 marker, limit, sort_key,
+                                                 sort_dir, filters=None):
                 return [
                     stubs.stub_snapshot(1, display_name='backup1'),
                     stubs.stub_snapshot(2, display_name='backup2'),
@@ -48,6 +48,9 @@ class mock_rados(object):
         def connect(self, *args, **kwargs):
             pass
 
+        def get_fsid(self, *args, **kwargs):
+            return 'fsid'
+
         def open_ioctx(self, *args, **kwargs):
             return mock_rados.ioctx()
 
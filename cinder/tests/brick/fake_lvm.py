@@ -62,6 +62,9 @@ class FakeBrickLVM(object):
     def delete(self, name):
         pass
 
+    def rename_volume(self, lv_name, new_name):
+        pass
+
     def revert(self, snapshot_name):
         pass
 
@@ -21,6 +21,7 @@ import mox
 from cinder.brick.local_dev import lvm as brick
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder.openstack.common import timeutils
 from cinder import test
 from cinder.volume import configuration as conf
 
@@ -271,3 +272,101 @@ class BrickLvmTestCase(test.TestCase):
         self.vg.activate_lv('my-lv')
 
         self._mox.VerifyAll()
+
+    def test_rename_volume(self):
+        self._mox.StubOutWithMock(self.vg, '_execute')
+
+        self.vg._execute('lvrename', 'fake-volumes', 'my-lv', 'new-lv',
+                         root_helper='sudo', run_as_root=True)
+
+        self._mox.ReplayAll()
+
+        self.vg.rename_volume('my-lv', 'new-lv')
+
+        self._mox.VerifyAll()
+
+    def _cached_vg(self):
+        """Returns a VG caching its inventory, which records its commands."""
+        self.cmds = []
+
+        def executor(*cmd, **kwargs):
+            self.cmds.append(' '.join(cmd))
+            if cmd[0] == 'lvs' and cmd[-1].startswith('fake-volumes/'):
+                if cmd[-1] != 'fake-volumes/new-lv':
+                    raise processutils.ProcessExecutionError()
+                return ('  fake-volumes new-lv 1.00\n', '')
+            elif cmd[0] in ('lvcreate', 'lvremove', 'lvrename'):
+                return ('', '')
+            return self.fake_execute(*cmd, **kwargs)
+
+        self.stubs.Set(processutils, 'execute', executor)
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        return brick.LVM('fake-volumes', 'sudo', False, None, 'default',
+                         executor, inventory_max_age=60)
+
+    def _count_cmds(self, prefix):
+        return len([cmd for cmd in self.cmds if cmd.startswith(prefix)])
+
+    def test_get_volume_inventory(self):
+        vg = self._cached_vg()
+        lvs = 'lvs --noheadings --unit=g -o vg_name,name,size'
+
+        self.assertEqual('fake-1', vg.get_volume('fake-1')['name'])
+        self.assertEqual('fake-2', vg.get_volume('fake-2')['name'])
+        self.assertIsNone(vg.get_volume('fake-3'))
+        self.assertEqual(1, self._count_cmds(lvs))
+
+        timeutils.advance_time_seconds(61)
+        self.assertEqual('fake-1', vg.get_volume('fake-1')['name'])
+        self.assertEqual(2, self._count_cmds(lvs))
+
+    def test_get_volume_after_changes(self):
+        vg = self._cached_vg()
+        vg.get_volumes()
+        self.cmds = []
+
+        vg.create_volume('new-lv', '1g')
+        self.assertEqual('new-lv', vg.get_volume('new-lv')['name'])
+        self.assertEqual('new-lv', vg.get_volume('new-lv')['name'])
+        self.assertEqual(['lvcreate -n new-lv fake-volumes -L 1g',
+                          'lvs --noheadings --unit=g -o vg_name,name,size '
+                          '--nosuffix fake-volumes/new-lv'], self.cmds)
+
+        self.cmds = []
+        vg.delete('fake-1')
+        vg.rename_volume('fake-2', 'wipe-fake-2')
+        self.assertIsNone(vg.get_volume('fake-1'))
+        self.assertIsNone(vg.get_volume('fake-2'))
+        self.assertEqual('wipe-fake-2', vg.get_volume('wipe-fake-2')['name'])
+        self.assertEqual(0, self._count_cmds('lvs'))
+
+        # A changed LV which lvs can't find is looked for in a full listing.
+        vg.extend_volume('fake-1', '2g')
+        self.assertEqual('fake-1', vg.get_volume('fake-1')['name'])
+        self.assertEqual(2, self._count_cmds('lvs'))
+
+    def test_get_volume_without_inventory(self):
+        vg = self._cached_vg()
+        vg.inventory_max_age = 0
+
+        vg.get_volume('fake-1')
+        vg.get_volume('fake-1')
+        self.assertEqual(2, self._count_cmds('lvs'))
+
+    def test_update_volume_group_info_cached(self):
+        vg = self._cached_vg()
+        vgs = 'env LC_ALL=C vgs'
+
+        vg.update_volume_group_info()
+        vg.update_volume_group_info()
+        self.assertEqual(1, self._count_cmds(vgs))
+        self.assertEqual('10.00', vg.vg_free_space)
+
+        vg.create_volume('new-lv', '1g')
+        vg.update_volume_group_info()
+        self.assertEqual(2, self._count_cmds(vgs))
+
+        timeutils.advance_time_seconds(61)
+        vg.update_volume_group_info()
+        self.assertEqual(3, self._count_cmds(vgs))
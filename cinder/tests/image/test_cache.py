@@ -0,0 +1,131 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Unit tests for the image cache."""
+
+import os
+import shutil
+import tempfile
+
+import eventlet
+
+from cinder.image import cache
+from cinder import test
+from cinder import units
+
+
+class ImageCacheTestCase(test.TestCase):
+    """Test cases for ImageCache."""
+
+    def setUp(self):
+        super(ImageCacheTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.cache = cache.ImageCache(self.path, 10)
+        self.fills = []
+
+    def _fill_func(self, data):
+        def _fill(path):
+            self.fills.append(data)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return _fill
+
+    def _fetch(self, image_id, data, checksum='sum'):
+        with self.cache.fetch(image_id, checksum,
+                              self._fill_func(data)) as path:
+            with open(path, 'rb') as f:
+                return path, f.read()
+
+    def test_miss_then_hit(self):
+        path, data = self._fetch('image', 'abcd')
+        self.assertEqual(data, 'abcd')
+        self.assertEqual(path, os.path.join(self.path, 'image-sum'))
+        path, data = self._fetch('image', 'other')
+        self.assertEqual(data, 'abcd')
+        self.assertEqual(self.fills, ['abcd'])
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['size'], 4)
+
+    def test_new_checksum_is_a_miss(self):
+        self._fetch('image', 'abcd')
+        path, data = self._fetch('image', 'efgh', checksum='new')
+        self.assertEqual(data, 'efgh')
+        self.assertEqual(self.fills, ['abcd', 'efgh'])
+
+    def test_lru_eviction(self):
+        self._fetch('image1', 'aaaa')
+        self._fetch('image2', 'bbbb')
+        os.utime(os.path.join(self.path, 'image1-sum'), (1, 1))
+        os.utime(os.path.join(self.path, 'image2-sum'), (2, 2))
+        # image1 was used last, so image2 is evicted.
+        self._fetch('image1', 'aaaa')
+        self._fetch('image3', 'cccc')
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['image1-sum', 'image3-sum', 'tmp'])
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+    def test_entries_in_use_are_not_evicted(self):
+        self._fetch('image1', 'aaaa')
+        with self.cache.fetch('image2', 'sum', self._fill_func('bbbbbbbb')):
+            path, data = self._fetch('image3', 'cccc')
+        self.assertEqual(data, 'cccc')
+        # The cache is full of entries in use, image3 is not cached.
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['image2-sum', 'tmp'])
+        self.assertEqual(os.listdir(self.cache.tmp_path), [])
+
+    def test_too_large_image_is_not_cached(self):
+        path, data = self._fetch('image', 'a' * 11)
+        self.assertEqual(data, 'a' * 11)
+        self.assertNotEqual(path, os.path.join(self.path, 'image-sum'))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.cache.tmp_path), [])
+
+    def test_failed_fill(self):
+        def _fill(path):
+            raise ValueError()
+
+        def _fetch():
+            with self.cache.fetch('image', 'sum', _fill):
+                pass
+
+        self.assertRaises(ValueError, _fetch)
+        self.assertEqual(os.listdir(self.path), ['tmp'])
+        self.assertEqual(os.listdir(self.cache.tmp_path), [])
+
+    def test_single_fill(self):
+        def _slow_fill(path):
+            eventlet.sleep(0.01)
+            self._fill_func('abcd')(path)
+
+        def _fetch():
+            with self.cache.fetch('image', 'sum', _slow_fill) as path:
+                with open(path, 'rb') as f:
+                    return f.read()
+
+        threads = [eventlet.spawn(_fetch) for i in range(3)]
+        self.assertEqual([t.wait() for t in threads], ['abcd'] * 3)
+        self.assertEqual(self.fills, ['abcd'])
+
+    def test_get_cache(self):
+        self.flags(image_cache_max_size_gb=0)
+        self.assertIsNone(cache.get_cache())
+        self.flags(image_cache_max_size_gb=2, image_cache_dir=self.path)
+        image_cache = cache.get_cache()
+        self.assertEqual(image_cache.path, self.path)
+        self.assertEqual(image_cache.max_size, 2 * units.GiB)
+        self.assertIs(cache.get_cache(), image_cache)
@@ -25,6 +25,7 @@ from cinder.openstack.common import timeutils
 from cinder.scheduler import host_manager
 from cinder import test
 from cinder.tests.scheduler import fakes
+from cinder import utils
 
 
 CONF = cfg.CONF
@@ -136,12 +137,13 @@ class HostManagerTestCase(test.TestCase):
         self.assertDictMatch(service_states, expected)
 
     def test_get_all_host_states(self):
+        self.flags(scheduler_service_refresh_interval=0)
         context = 'fake_context'
         topic = CONF.volume_topic
 
         self.mox.StubOutWithMock(db, 'service_get_all_by_topic')
         self.mox.StubOutWithMock(host_manager.LOG, 'warn')
-        self.mox.StubOutWithMock(host_manager.utils, 'service_is_up')
+        self.mox.StubOutWithMock(utils, 'service_is_up')
 
         services = [
             dict(id=1, host='host1', topic='volume', disabled=False,
@@ -158,24 +160,24 @@ class HostManagerTestCase(test.TestCase):
         ]
 
         db.service_get_all_by_topic(context, topic).AndReturn(services)
-        host_manager.utils.service_is_up(services[0]).AndReturn(True)
-        host_manager.utils.service_is_up(services[1]).AndReturn(True)
-        host_manager.utils.service_is_up(services[2]).AndReturn(True)
-        host_manager.utils.service_is_up(services[3]).AndReturn(True)
-        host_manager.utils.service_is_up(services[4]).AndReturn(True)
+        utils.service_is_up(services[0]).AndReturn(True)
+        utils.service_is_up(services[1]).AndReturn(True)
+        utils.service_is_up(services[2]).AndReturn(True)
+        utils.service_is_up(services[3]).AndReturn(True)
+        utils.service_is_up(services[4]).AndReturn(True)
         # Disabled service
         host_manager.LOG.warn("volume service is down or disabled. "
                               "(host: host5)")
 
         db.service_get_all_by_topic(context, topic).AndReturn(services)
-        host_manager.utils.service_is_up(services[0]).AndReturn(True)
-        host_manager.utils.service_is_up(services[1]).AndReturn(True)
-        host_manager.utils.service_is_up(services[2]).AndReturn(True)
-        host_manager.utils.service_is_up(services[3]).AndReturn(False)
+        utils.service_is_up(services[0]).AndReturn(True)
+        utils.service_is_up(services[1]).AndReturn(True)
+        utils.service_is_up(services[2]).AndReturn(True)
+        utils.service_is_up(services[3]).AndReturn(False)
         # Stopped service
         host_manager.LOG.warn("volume service is down or disabled. "
                               "(host: host4)")
-        host_manager.utils.service_is_up(services[4]).AndReturn(True)
+        utils.service_is_up(services[4]).AndReturn(True)
         # Disabled service
         host_manager.LOG.warn("volume service is down or disabled. "
                               "(host: host5)")
@@ -202,6 +204,131 @@ class HostManagerTestCase(test.TestCase):
             self.assertEqual(host_state_map[host].service,
                              volume_node)
 
+    def test_get_all_host_states_cached(self):
+        self.flags(scheduler_service_refresh_interval=60)
+        context = 'fake_context'
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        self.mox.StubOutWithMock(db, 'service_get_all_by_topic')
+        db.service_get_all_by_topic(context,
+                                    CONF.volume_topic).AndReturn(services)
+        self.mox.ReplayAll()
+
+        host_states = self.host_manager.get_all_host_states(context)
+        self.assertEqual([h.host for h in host_states], ['host1'])
+        self.assertIsNone(host_states[0].free_capacity_gb)
+
+        # Capabilities are applied to the cached host state right away.
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1',
+            dict(total_capacity_gb=100, free_capacity_gb=50,
+                 reserved_percentage=0))
+        self.assertEqual(self.host_manager.get_all_host_states(context),
+                         host_states)
+        self.assertEqual(host_states[0].free_capacity_gb, 50)
+        self.assertEqual(
+            self.host_manager.host_state_index.hosts_with_capacity(50),
+            set(['host1']))
+
+    def test_get_filtered_hosts_indexed(self):
+        hosts = []
+        for x in xrange(1, 5):
+            host_state = host_manager.HostState(
+                'host%s' % x,
+                capabilities={'volume_backend_name':
+                              'backend%s' % (x % 2)},
+                service={'availability_zone': 'zone%s' % (x // 3)})
+            host_state.free_capacity_gb = x * 100
+            self.host_manager.host_state_map[host_state.host] = host_state
+            self.host_manager.host_state_index.add(host_state)
+            hosts.append(host_state)
+        # Hosts that are not in host_state_map are left to the filters.
+        other = host_manager.HostState(
+            'other', capabilities={'volume_backend_name': 'backend1'},
+            service={'availability_zone': 'zone1'})
+        other.free_capacity_gb = 1000
+
+        filter_props = {
+            'size': 250,
+            'request_spec': {'resource_properties':
+                             {'availability_zone': 'zone1'}},
+            'resource_type': {'extra_specs': {'volume_backend_name':
+                                              'backend1'}}}
+        info = {'expected_objs': hosts[2:] + [other],
+                'expected_fprops': filter_props}
+        self._mock_get_filtered_hosts(info)
+        self.mox.ReplayAll()
+
+        # Only the candidates of the capacity index reach the filter.
+        self.stubs.Set(FakeFilterClass1, '__name__', 'CapacityFilter')
+        result = self.host_manager.get_filtered_hosts(hosts + [other],
+                                                      filter_props)
+        self._verify_result(info, result)
+
+        self.mox.UnsetStubs()
+        host_filters = self.host_manager._choose_host_filters(
+            ['AvailabilityZoneFilter', 'CapacityFilter',
+             'CapabilitiesFilter'])
+        self.stubs.Set(self.host_manager, '_choose_host_filters',
+                       lambda names: host_filters)
+        result = self.host_manager.get_filtered_hosts(hosts + [other],
+                                                      filter_props)
+        self.assertEqual(result, [hosts[2], other])
+
+    def test_filters_are_reused(self):
+        handler = self.host_manager.filter_handler
+        self.assertIs(handler.get_filter(FakeFilterClass1),
+                      handler.get_filter(FakeFilterClass1))
+
+
+class HostStateIndexTestCase(test.TestCase):
+    """Test case for HostStateIndex class"""
+
+    def _host_state(self, host, free_capacity_gb, reserved_percentage=0,
+                    zone='zone1', backend_name='lvm'):
+        host_state = host_manager.HostState(
+            host, capabilities={'volume_backend_name': backend_name},
+            service={'availability_zone': zone})
+        host_state.free_capacity_gb = free_capacity_gb
+        host_state.reserved_percentage = reserved_percentage
+        return host_state
+
+    def test_lookups(self):
+        index = host_manager.HostStateIndex()
+        index.add(self._host_state('host1', 100, reserved_percentage=10))
+        index.add(self._host_state('host2', 200, zone='zone2'))
+        index.add(self._host_state('host3', 'infinite', backend_name='nfs'))
+        index.add(self._host_state('host4', None))
+        self.assertEqual(len(index), 4)
+
+        self.assertEqual(index.hosts_in_zone('zone1'),
+                         set(['host1', 'host3', 'host4']))
+        self.assertEqual(index.hosts_in_zone('zone3'), set())
+        self.assertEqual(index.hosts_with_backend_name('nfs'),
+                         set(['host3']))
+        self.assertEqual(index.hosts_with_capacity(90),
+                         set(['host1', 'host2', 'host3']))
+        self.assertEqual(index.hosts_with_capacity(91),
+                         set(['host2', 'host3']))
+        self.assertEqual(index.hosts_with_capacity(201), set(['host3']))
+
+    def test_add_replaces_and_remove(self):
+        index = host_manager.HostStateIndex()
+        index.add(self._host_state('host1', 100))
+        index.add(self._host_state('host1', 10, zone='zone2'))
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.hosts_in_zone('zone1'), set())
+        self.assertEqual(index.hosts_with_capacity(50), set())
+        self.assertEqual(index.hosts_with_capacity(10), set(['host1']))
+
+        index.remove('host1')
+        index.remove('host1')
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.hosts_with_capacity(0), set())
+        self.assertEqual(index.hosts_in_zone('zone2'), set())
+
 
 class HostStateTestCase(test.TestCase):
     """Test case for HostState class"""
@@ -130,6 +130,27 @@ class SchedulerManagerTestCase(test.TestCase):
                                             request_spec=request_spec,
                                             filter_properties={})
 
+    def test_reconcile_quotas(self):
+        self.flags(quota_reconcile_interval=600)
+        self.mox.StubOutWithMock(manager.QUOTAS, 'reconcile')
+        manager.QUOTAS.reconcile(self.context)
+        manager.QUOTAS.reconcile(self.context).AndRaise(self.AnException())
+        self.mox.ReplayAll()
+
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        self.manager._reconcile_quotas(self.context)
+        # Not run again before the interval, failures are only logged.
+        self.manager._reconcile_quotas(self.context)
+        timeutils.advance_time_seconds(601)
+        self.manager._reconcile_quotas(self.context)
+
+    def test_reconcile_quotas_disabled(self):
+        self.flags(quota_reconcile_interval=0)
+        self.mox.StubOutWithMock(manager.QUOTAS, 'reconcile')
+        self.mox.ReplayAll()
+        self.manager._reconcile_quotas(self.context)
+
     def _mox_schedule_method_helper(self, method_name):
         # Make sure the method exists that we're going to test call
         def stub_method(*args, **kwargs):
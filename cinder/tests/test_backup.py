@@ -17,10 +17,13 @@ Tests for Backup code.
 
 """
 
+import StringIO
 import tempfile
 
+import eventlet
 from oslo.config import cfg
 
+from cinder.backup import jobs
 from cinder import context
 from cinder import db
 from cinder import exception
@@ -189,6 +192,56 @@ class BackupTestCase(test.TestCase):
         self.assertEqual(backup['status'], 'available')
         self.assertEqual(backup['size'], vol_size)
 
+    def test_create_backup_progress(self):
+        """Test that backups are throttled and report their progress"""
+        vol_id = self._create_volume_db_entry(size=1)
+        backup_id = self._create_backup_db_entry(volume_id=vol_id)
+        consumed = []
+
+        def fake_backup(backup, volume_file):
+            volume_file.read()
+
+        def fake_backup_volume(context, backup, backup_service):
+            self.assertIsInstance(backup_service, jobs.JobBackupDriver)
+            self.stubs.Set(backup_service.driver, 'backup', fake_backup)
+            backup_service.backup(backup, StringIO.StringIO('x' * 1024))
+
+        self.stubs.Set(self.backup_mgr.driver, 'backup_volume',
+                       fake_backup_volume)
+        self.stubs.Set(self.backup_mgr.throttle, 'consume', consumed.append)
+
+        self.backup_mgr.create_backup(self.ctxt, backup_id)
+        backup = db.backup_get(self.ctxt, backup_id)
+        self.assertEqual(backup['status'], 'available')
+        self.assertEqual(backup['progress_bytes'], 1024)
+        self.assertEqual(consumed, [1024])
+
+    def test_create_backup_queued(self):
+        """Test that backups wait for a free job slot"""
+        vol_id = self._create_volume_db_entry(size=1)
+        backup_id = self._create_backup_db_entry(volume_id=vol_id)
+        self.backup_mgr.job_queue.max_jobs = 1
+        self.backup_mgr.job_queue.running = 1
+
+        def fake_backup_volume(context, backup, backup_service):
+            pass
+
+        self.stubs.Set(self.backup_mgr.driver, 'backup_volume',
+                       fake_backup_volume)
+
+        thread = eventlet.spawn(self.backup_mgr.create_backup, self.ctxt,
+                                backup_id)
+        while not (self.backup_mgr.job_queue.waiting or thread.dead):
+            eventlet.sleep(0)
+        backup = db.backup_get(self.ctxt, backup_id)
+        self.assertEqual(backup['status'], 'creating')
+        self.assertEqual(self.backup_mgr.job_queue.waiting, 1)
+
+        self.backup_mgr.job_queue._release()
+        thread.wait()
+        backup = db.backup_get(self.ctxt, backup_id)
+        self.assertEqual(backup['status'], 'available')
+
     def test_restore_backup_with_bad_volume_status(self):
         """Test error handling when restoring a backup to a volume
         with a bad status
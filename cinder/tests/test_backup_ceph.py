@@ -97,6 +97,7 @@ class BackupCephTestCase(test.TestCase):
         # Setup librbd stubs
         self.stubs.Set(ceph, 'rados', mock_rados)
         self.stubs.Set(ceph, 'rbd', mock_rbd)
+        self.stubs.Set(ceph, '_RADOS_POOLS', {})
 
         self._create_backup_db_entry(self.backup_id, self.volume_id, 1)
 
@@ -155,6 +156,16 @@ class BackupCephTestCase(test.TestCase):
         self.assertFalse(oldformat)
         self.assertEqual(features, 1 | 2)
 
+    def test_connect_to_rados_pooled(self):
+        client, ioctx = self.service._connect_to_rados()
+        self.service._disconnect_from_rados(client, ioctx)
+
+        # The drivers made for the other backups reuse the connection.
+        service = ceph.CephBackupDriver(self.ctxt)
+        self.assertEqual(client, service._connect_to_rados('volumes')[0])
+        service._disconnect_from_rados(client, ioctx, discard=True)
+        self.assertNotEqual(client, self.service._connect_to_rados()[0])
+
     def _set_common_backup_stubs(self, service):
         self.stubs.Set(self.service, '_get_rbd_support', lambda: (True, 3))
         self.stubs.Set(self.service, 'get_backup_snaps',
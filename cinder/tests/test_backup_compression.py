@@ -0,0 +1,69 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Tests for the backup compression algorithms."""
+
+import zlib
+
+from cinder.backup import compression
+from cinder.openstack.common import importutils
+from cinder import test
+
+
+DATA = 'cinder backup data ' * 4096
+
+
+class BackupCompressionTestCase(test.TestCase):
+    """Test cases for backup compressors."""
+
+    def _check_round_trip(self, algorithm, level=None):
+        compressor = compression.get_compressor(algorithm, level)
+        compressed = compressor.compress(DATA)
+        self.assertTrue(len(compressed) < len(DATA))
+        self.assertEqual(compressor.decompress(compressed), DATA)
+        return compressed
+
+    def _skip_unless_importable(self, module):
+        try:
+            importutils.import_module(module)
+        except ImportError:
+            self.skipTest('%s is not installed' % module)
+
+    def test_none(self):
+        for algorithm in ('none', 'None', 'off', 'no'):
+            self.assertIsNone(compression.get_compressor(algorithm))
+
+    def test_unknown_algorithm(self):
+        self.assertRaises(ValueError, compression.get_compressor, 'fake')
+
+    def test_zlib(self):
+        compressed = self._check_round_trip('zlib')
+        self.assertEqual(zlib.decompress(compressed), DATA)
+        self._check_round_trip('gzip')
+
+    def test_zlib_level(self):
+        compressed = self._check_round_trip('zlib', level=1)
+        self.assertEqual(compressed, zlib.compress(DATA, 1))
+
+    def test_bz2(self):
+        self._check_round_trip('bz2')
+        self._check_round_trip('bzip2', level=1)
+
+    def test_lz4(self):
+        self._skip_unless_importable('lz4.frame')
+        self._check_round_trip('lz4')
+
+    def test_zstd(self):
+        self._skip_unless_importable('zstandard')
+        self._check_round_trip('zstd')
+        self._check_round_trip('zstd', level=3)
@@ -0,0 +1,172 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Tests for the scheduling and throttling of backup jobs."""
+
+import StringIO
+
+import eventlet
+
+from cinder.backup import jobs
+from cinder import test
+
+
+class JobQueueTestCase(test.TestCase):
+    """Test cases for the backup JobQueue."""
+
+    def _run_jobs(self, queue, projects):
+        started = []
+        done = eventlet.event.Event()
+
+        def _job(project_id, index):
+            with queue.job(project_id):
+                started.append((project_id, index))
+                done.wait()
+
+        threads = [eventlet.spawn(_job, project_id, index)
+                   for index, project_id in enumerate(projects)]
+        eventlet.sleep(0)
+        return started, done, threads
+
+    def test_limit(self):
+        queue = jobs.JobQueue(2)
+        started, done, threads = self._run_jobs(queue, ['a', 'a', 'a'])
+        self.assertEqual(len(started), 2)
+        self.assertEqual(queue.running, 2)
+        self.assertEqual(queue.waiting, 1)
+        done.send()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(len(started), 3)
+        self.assertEqual(queue.running, 0)
+        self.assertEqual(queue.waiting, 0)
+
+    def test_no_limit(self):
+        queue = jobs.JobQueue(0)
+        started, done, threads = self._run_jobs(queue, ['a'] * 10)
+        self.assertEqual(len(started), 10)
+        done.send()
+        for thread in threads:
+            thread.wait()
+
+    def test_fair_across_projects(self):
+        queue = jobs.JobQueue(1)
+        order = []
+
+        def _job(project_id):
+            with queue.job(project_id):
+                order.append(project_id)
+                eventlet.sleep(0)
+
+        threads = [eventlet.spawn(_job, project_id)
+                   for project_id in ['a', 'a', 'a', 'b', 'c', 'b']]
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(order, ['a', 'a', 'b', 'c', 'a', 'b'])
+
+    def test_release_on_error(self):
+        queue = jobs.JobQueue(1)
+
+        def _fail():
+            with queue.job('a'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, _fail)
+        self.assertEqual(queue.running, 0)
+
+
+class ThrottleTestCase(test.TestCase):
+    """Test cases for the backup Throttle."""
+
+    def setUp(self):
+        super(ThrottleTestCase, self).setUp()
+        self.now = 100.0
+        self.sleeps = []
+        self.stubs.Set(jobs.time, 'time', lambda: self.now)
+        self.stubs.Set(jobs.eventlet, 'sleep', self.sleeps.append)
+
+    def test_rate(self):
+        throttle = jobs.Throttle(1000)
+        throttle.consume(500)
+        throttle.consume(1000)
+        self.assertEqual(self.sleeps, [0.5, 1.5])
+
+    def test_idle_time_is_not_saved_up(self):
+        throttle = jobs.Throttle(1000)
+        throttle.consume(1000)
+        self.now += 10
+        throttle.consume(1000)
+        self.assertEqual(self.sleeps, [1.0, 1.0])
+
+    def test_disabled(self):
+        throttle = jobs.Throttle(0)
+        throttle.consume(1000)
+        self.assertEqual(self.sleeps, [])
+
+
+class ProgressFileTestCase(test.TestCase):
+    """Test cases for the backup ProgressFile."""
+
+    def test_read_write(self):
+        reports = []
+        volume_file = StringIO.StringIO('x' * 100)
+        progress_file = jobs.ProgressFile(
+            volume_file, progress_cb=lambda b, r: reports.append(b),
+            interval=0)
+        self.assertEqual(progress_file.read(60), 'x' * 60)
+        progress_file.write('y' * 10)
+        self.assertEqual(progress_file.bytes, 70)
+        self.assertEqual(progress_file.tell(), 70)
+        self.assertEqual(reports, [])
+        progress_file.report()
+        self.assertEqual(reports, [70])
+
+    def test_report_interval(self):
+        now = [100.0]
+        reports = []
+        self.stubs.Set(jobs.time, 'time', lambda: now[0])
+        progress_file = jobs.ProgressFile(
+            StringIO.StringIO('x' * 100),
+            progress_cb=lambda b, r: reports.append((b, r)), interval=10)
+        progress_file.read(10)
+        now[0] += 10
+        progress_file.read(10)
+        progress_file.read(10)
+        self.assertEqual(reports, [(20, 2)])
+
+    def test_report_failure_is_ignored(self):
+        def _fail(nbytes, rate):
+            raise ValueError()
+
+        progress_file = jobs.ProgressFile(StringIO.StringIO('x'),
+                                          progress_cb=_fail)
+        progress_file.read()
+        progress_file.report()
+
+    def test_job_backup_driver(self):
+        reports = []
+
+        class FakeDriver(object):
+            def backup(self, backup, volume_file):
+                self.backup_id = backup['id']
+                volume_file.read()
+
+            def delete(self, backup):
+                return 'deleted'
+
+        driver = jobs.JobBackupDriver(
+            FakeDriver(), progress_cb=lambda b, r: reports.append(b))
+        driver.backup({'id': 'fake'}, StringIO.StringIO('x' * 100))
+        self.assertEqual(driver.backup_id, 'fake')
+        self.assertEqual(reports, [100])
+        self.assertEqual(driver.delete({}), 'deleted')
@@ -17,14 +17,18 @@ Tests for Backup swift code.
 
 """
 
-import bz2
+import errno
+import fcntl
 import hashlib
 import os
+import stat
 import tempfile
-import zlib
 
+import eventlet
 from swiftclient import client as swift
 
+from cinder.backup import compression
+from cinder.backup.drivers import swift as swift_dr
 from cinder.backup.drivers.swift import SwiftBackupDriver
 from cinder import context
 from cinder import db
@@ -32,6 +36,7 @@ from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder.tests.backup.fake_swift_client import FakeSwiftClient
+from cinder.tests.backup.fake_swift_client import FakeSwiftConnection
 
 
 LOG = logging.getLogger(__name__)
@@ -55,11 +60,13 @@ class BackupSwiftTestCase(test.TestCase):
                'status': 'available'}
         return db.volume_create(self.ctxt, vol)['id']
 
-    def _create_backup_db_entry(self, container='test-container'):
-        backup = {'id': 123,
+    def _create_backup_db_entry(self, container='test-container',
+                                backup_id=123, parent_id=None):
+        backup = {'id': backup_id,
                   'size': 1,
                   'container': container,
-                  'volume_id': '1234-5678-1234-8888'}
+                  'volume_id': '1234-5678-1234-8888',
+                  'parent_id': parent_id}
         return db.backup_create(self.ctxt, backup)['id']
 
     def setUp(self):
@@ -121,6 +128,246 @@ class BackupSwiftTestCase(test.TestCase):
         backup = db.backup_get(self.ctxt, 123)
         self.assertEqual(backup['container'], container_name)
 
+    def test_backup_concurrent_uploads(self):
+        self._create_backup_db_entry()
+        self.flags(backup_swift_object_size=8 * 1024)
+        self.flags(backup_swift_upload_concurrency=4)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+
+        # Complete the uploads out of order
+        delays = iter([0.01 * (i % 3) for i in xrange(16)])
+        put_object = FakeSwiftConnection.put_object
+
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            eventlet.sleep(next(delays))
+            return put_object(conn, container, name, reader, **kwargs)
+
+        written = {}
+
+        def fake_write_metadata(backup, volume_id, container, object_list):
+            written['objects'] = object_list
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        self.stubs.Set(service, '_write_metadata', fake_write_metadata)
+        service.backup(backup, self.volume_file)
+
+        objects = written['objects']
+        self.assertEqual(len(objects), 16)
+        names = [obj.keys()[0] for obj in objects]
+        self.assertEqual(names, sorted(names))
+        offsets = [obj.values()[0]['offset'] for obj in objects]
+        self.assertEqual(offsets, sorted(offsets))
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertEqual(backup['object_count'], 17)
+
+    def test_backup_concurrent_uploads_failure(self):
+        container_name = 'socket_error_on_put'
+        self._create_backup_db_entry(container=container_name)
+        self.flags(backup_swift_object_size=8 * 1024)
+        self.flags(backup_swift_upload_concurrency=4)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertRaises(exception.SwiftConnectionFailed,
+                          service.backup,
+                          backup, self.volume_file)
+
+    def test_backup_incremental(self):
+        self.flags(backup_swift_object_size=8 * 1024)
+        written = {}
+
+        def fake_write_metadata(backup, volume_id, container, object_list):
+            written[backup['id']] = object_list
+
+        def fake_read_metadata(backup):
+            return {'version': '2.0.0', 'objects': written[backup['id']]}
+
+        self._create_backup_db_entry(container='parent-container')
+        service = SwiftBackupDriver(self.ctxt)
+        self.stubs.Set(service, '_write_metadata', fake_write_metadata)
+        self.stubs.Set(service, '_read_metadata', fake_read_metadata)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        # Change the data of the second object only
+        self.volume_file.seek(8 * 1024)
+        self.volume_file.write(os.urandom(1024))
+        self._create_backup_db_entry(backup_id=124, parent_id=123)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 124)
+        service.backup(backup, self.volume_file)
+
+        parent_objects = written['123']
+        objects = written['124']
+        self.assertEqual(len(objects), 16)
+        for i, obj in enumerate(objects):
+            if i == 1:
+                self.assertNotEqual(obj.keys(), parent_objects[i].keys())
+                self.assertNotIn('container', obj.values()[0])
+            else:
+                self.assertEqual(obj.keys(), parent_objects[i].keys())
+                self.assertEqual(obj.values()[0]['container'],
+                                 'parent-container')
+        backup = db.backup_get(self.ctxt, 124)
+        self.assertEqual(backup['parent_id'], '123')
+
+    def test_backup_incremental_unreadable_parent(self):
+        self._create_backup_db_entry(container='missing_parent')
+        self._create_backup_db_entry(backup_id=124, parent_id=123)
+        service = SwiftBackupDriver(self.ctxt)
+
+        def fake_read_metadata(backup):
+            raise swift.ClientException('fake exception', http_status=404)
+
+        self.stubs.Set(service, '_read_metadata', fake_read_metadata)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 124)
+        service.backup(backup, self.volume_file)
+        backup = db.backup_get(self.ctxt, 124)
+        self.assertIsNone(backup['parent_id'])
+
+    def test_restore_v2_reads_parent_objects(self):
+        self._create_backup_db_entry()
+        service = SwiftBackupDriver(self.ctxt)
+        metadata = {'version': '2.0.0',
+                    'objects': [
+                        {'parent_001': {'compression': 'zlib',
+                                        'container': 'parent-container'}},
+                        {'backup_001': {'compression': 'zlib'}},
+                        {'backup_002': {'compression': 'zlib'}},
+                        {'backup_003': {'compression': 'zlib'}}]}
+        self.stubs.Set(service, '_read_metadata', lambda backup: metadata)
+
+        get_object = FakeSwiftConnection.get_object
+        reads = []
+
+        def fake_get_object(conn, container, name):
+            reads.append((container, name))
+            return get_object(conn, container, name)
+
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            backup = db.backup_get(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+        self.assertEqual(reads, [('parent-container', 'parent_001'),
+                                 ('test-container', 'backup_001'),
+                                 ('test-container', 'backup_002'),
+                                 ('test-container', 'backup_003')])
+
+    def test_backup_zero_chunks_are_holes(self):
+        self._create_backup_db_entry()
+        self.flags(backup_swift_object_size=8 * 1024)
+        self.volume_file.seek(16 * 1024)
+        self.volume_file.write('\0' * 8 * 1024)
+        self.volume_file.seek(120 * 1024)
+        self.volume_file.write('\0' * 8 * 1024)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+
+        put_object = FakeSwiftConnection.put_object
+        stored = []
+
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            stored.append(name)
+            return put_object(conn, container, name, reader, **kwargs)
+
+        written = {}
+
+        def fake_write_metadata(backup, volume_id, container, object_list):
+            written['objects'] = object_list
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        self.stubs.Set(service, '_write_metadata', fake_write_metadata)
+        service.backup(backup, self.volume_file)
+
+        objects = written['objects']
+        self.assertEqual(len(objects), 16)
+        holes = [i for i, obj in enumerate(objects)
+                 if obj.values()[0].get('hole')]
+        self.assertEqual(holes, [2, 15])
+        self.assertEqual(len(stored), 14)
+        self.assertNotIn(objects[2].keys()[0], stored)
+
+    def test_is_zero_chunk(self):
+        service = SwiftBackupDriver(self.ctxt)
+        self.assertTrue(service._is_zero_chunk('\0' * 100000))
+        self.assertTrue(service._is_zero_chunk(''))
+        self.assertFalse(service._is_zero_chunk('\0' * 99999 + '\1'))
+
+    def test_restore_holes_sparse_file(self):
+        self._create_backup_db_entry()
+        service = SwiftBackupDriver(self.ctxt)
+        hole_size = 1024 * 1024
+        metadata = {'version': '2.0.0',
+                    'objects': [
+                        {'backup_001': {'compression': 'zlib'}},
+                        {'hole_001': {'hole': True, 'length': hole_size}},
+                        {'backup_002': {'compression': 'zlib'}},
+                        {'backup_003': {'compression': 'zlib'}},
+                        {'hole_002': {'hole': True, 'length': hole_size}}]}
+        self.stubs.Set(service, '_read_metadata', lambda backup: metadata)
+
+        with tempfile.NamedTemporaryFile() as volume_file:
+            backup = db.backup_get(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+            self.assertEqual(os.path.getsize(volume_file.name),
+                             3 * 1024 * 1024 + 2 * hole_size)
+            volume_file.seek(1024 * 1024)
+            self.assertEqual(volume_file.read(hole_size), '\0' * hole_size)
+
+    def test_restore_fsync_batched(self):
+        self._create_backup_db_entry()
+        self.flags(backup_swift_restore_fsync_bytes=2 * 1024 * 1024)
+        service = SwiftBackupDriver(self.ctxt)
+        metadata = {'version': '2.0.0',
+                    'objects': [
+                        {'backup_001': {'compression': 'zlib'}},
+                        {'backup_002': {'compression': 'zlib'}},
+                        {'backup_003': {'compression': 'zlib'}}]}
+        self.stubs.Set(service, '_read_metadata', lambda backup: metadata)
+        fsyncs = []
+        self.stubs.Set(os, 'fsync', lambda fileno: fsyncs.append(fileno))
+
+        with tempfile.NamedTemporaryFile() as volume_file:
+            backup = db.backup_get(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+        # One batch after two of the three objects, and one at the end
+        self.assertEqual(len(fsyncs), 2)
+
+    def test_restore_hole_block_device(self):
+        service = SwiftBackupDriver(self.ctxt)
+        ioctls = []
+
+        def fake_ioctl(fd, request, arg):
+            ioctls.append((request, arg))
+
+        self.stubs.Set(fcntl, 'ioctl', fake_ioctl)
+        self.volume_file.seek(8192)
+        written = service._restore_hole(self.volume_file, 4096,
+                                        stat.S_IFBLK)
+        self.assertEqual(written, 0)
+        self.assertEqual(self.volume_file.tell(), 8192 + 4096)
+        self.assertEqual(ioctls, [(swift_dr.BLKZEROOUT,
+                                   swift_dr.struct.pack('=QQ', 8192, 4096))])
+
+    def test_restore_hole_block_device_without_zeroout(self):
+        service = SwiftBackupDriver(self.ctxt)
+
+        def fake_ioctl(fd, request, arg):
+            raise IOError(errno.ENOTTY, 'Inappropriate ioctl for device')
+
+        self.stubs.Set(fcntl, 'ioctl', fake_ioctl)
+        self.volume_file.seek(8192)
+        written = service._restore_hole(self.volume_file, 4096,
+                                        stat.S_IFBLK)
+        self.assertEqual(written, 4096)
+        self.volume_file.seek(8192)
+        self.assertEqual(self.volume_file.read(4096), '\0' * 4096)
+
     def test_create_backup_container_check_wraps_socket_error(self):
         container_name = 'socket_error_on_head'
         self._create_backup_db_entry(container=container_name)
@@ -191,11 +438,28 @@ class BackupSwiftTestCase(test.TestCase):
         compressor = service._get_compressor('None')
         self.assertIsNone(compressor)
         compressor = service._get_compressor('zlib')
-        self.assertEqual(compressor, zlib)
+        self.assertIsInstance(compressor, compression.ZlibCompressor)
         compressor = service._get_compressor('bz2')
-        self.assertEqual(compressor, bz2)
+        self.assertIsInstance(compressor, compression.Bz2Compressor)
         self.assertRaises(ValueError, service._get_compressor, 'fake')
 
+    def test_get_compressor_level(self):
+        self.flags(backup_compression_level=1)
+        service = SwiftBackupDriver(self.ctxt)
+        compressor = service._get_compressor('zlib')
+        self.assertEqual(compressor.level, 1)
+
+    def test_backup_without_native_threads(self):
+        self._create_backup_db_entry()
+        self.flags(backup_compression_native_threads=False)
+        self.mox.StubOutWithMock(swift_dr.tpool, 'execute')
+        self.mox.ReplayAll()
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+        self.mox.VerifyAll()
+
     def test_check_container_exists(self):
         service = SwiftBackupDriver(self.ctxt)
         exists = service._check_container_exists('fake_container')
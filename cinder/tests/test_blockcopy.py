@@ -0,0 +1,110 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Tests for the in-process block copy engine."""
+
+import __builtin__
+import os
+import shutil
+import tempfile
+
+from cinder.openstack.common import gettextutils
+from cinder import test
+from cinder.volume import blockcopy
+
+
+class BlockCopierTestCase(test.TestCase):
+    """Test cases for BlockCopier."""
+
+    def setUp(self):
+        super(BlockCopierTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.src = os.path.join(self.tmpdir, 'src')
+        self.dest = os.path.join(self.tmpdir, 'dest')
+        # Three blocks of data, one of zeros, and an unaligned tail.
+        self.data = ('a' * 4096 + 'b' * 4096 + '\0' * 4096 + 'c' * 4096 +
+                     'd' * 100)
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def _read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_copy(self):
+        copier = blockcopy.BlockCopier(blocksize=4096)
+        written = copier.copy(self.src, self.dest, len(self.data))
+        self.assertEqual(written, len(self.data))
+        self.assertEqual(self._read_dest(), self.data)
+
+    def test_copy_lazy_gettext(self):
+        self.stubs.Set(__builtin__, '_',
+                       lambda msg: gettextutils.Message(msg, 'cinder'))
+        copier = blockcopy.BlockCopier(blocksize=4096)
+        copier.copy(self.src, self.dest, len(self.data))
+        self.assertEqual(self._read_dest(), self.data)
+
+    def test_copy_part(self):
+        copier = blockcopy.BlockCopier(blocksize=4096)
+        copier.copy(self.src, self.dest, 5000)
+        self.assertEqual(self._read_dest(), self.data[:5000])
+
+    def test_copy_stops_at_end_of_source(self):
+        copier = blockcopy.BlockCopier(blocksize=4096)
+        written = copier.copy(self.src, self.dest, 10 * len(self.data))
+        self.assertEqual(written, len(self.data))
+        self.assertEqual(self._read_dest(), self.data)
+
+    def test_sparse_copy(self):
+        with open(self.dest, 'wb') as f:
+            f.write('x' * 100)
+        copier = blockcopy.BlockCopier(blocksize=4096, sparse=True)
+        written = copier.copy(self.src, self.dest, len(self.data))
+        self.assertEqual(written, len(self.data) - 4096)
+        self.assertEqual(self._read_dest(), self.data)
+
+    def test_sparse_copy_extends_file(self):
+        with open(self.src, 'wb') as f:
+            f.write('a' * 4096 + '\0' * 8192)
+        copier = blockcopy.BlockCopier(blocksize=4096, sparse=True)
+        written = copier.copy(self.src, self.dest, 3 * 4096)
+        self.assertEqual(written, 4096)
+        self.assertEqual(self._read_dest(), 'a' * 4096 + '\0' * 8192)
+
+    def test_zero(self):
+        with open(self.dest, 'wb') as f:
+            f.write('x' * 10000)
+        copier = blockcopy.BlockCopier(blocksize=4096, sparse=True)
+        written = copier.copy(None, self.dest, 8192)
+        self.assertEqual(written, 8192)
+        self.assertEqual(self._read_dest(), '\0' * 8192 + 'x' * 1808)
+
+    def test_progress_and_throttle(self):
+        now = [100.0]
+        sleeps = []
+        progress = []
+
+        def fake_sleep(delay):
+            sleeps.append(delay)
+            now[0] += delay
+
+        self.stubs.Set(blockcopy.time, 'time', lambda: now[0])
+        self.stubs.Set(blockcopy.eventlet, 'sleep', fake_sleep)
+        self.stubs.Set(blockcopy, 'PROGRESS_INTERVAL', 2)
+        copier = blockcopy.BlockCopier(
+            blocksize=4096, rate=4096,
+            progress_cb=lambda copied, size: progress.append(copied))
+        copier.copy(self.src, self.dest, 4 * 4096)
+        self.assertEqual(sleeps, [1.0, 1.0, 1.0, 1.0])
+        self.assertEqual(progress, [8192, 16384, 16384])
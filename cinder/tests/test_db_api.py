@@ -19,6 +19,8 @@ from oslo.config import cfg
 
 from cinder import context
 from cinder import db
+from cinder.db.sqlalchemy import api as sqlalchemy_api
+from cinder.db.sqlalchemy import models
 from cinder import exception
 from cinder.openstack.common import uuidutils
 from cinder.quota import ReservableResource
@@ -410,6 +412,51 @@ class DBAPIVolumeTestCase(BaseTest):
                                             self.ctxt, 'p%d' % i, None,
                                             None, 'host', None))
 
+    def test_volume_get_all_by_project_with_filters(self):
+        vols = [db.volume_create(self.ctxt,
+                                 {'project_id': 'p1',
+                                  'display_name': 'vol%d' % i,
+                                  'status': status,
+                                  'metadata': {'key1': 'value%d' % (i % 2)}})
+                for i, status in enumerate(['available', 'available',
+                                            'in-use', 'replica_active'])]
+        ids = [vol['id'] for vol in vols]
+        db.volume_create(self.ctxt, {'project_id': 'p1',
+                                     'migration_status': 'target:fake'})
+        db.volume_create(self.ctxt, {'project_id': 'p2',
+                                     'status': 'available'})
+
+        def _get_ids(filters, limit=None):
+            volumes = db.volume_get_all_by_project(self.ctxt, 'p1', None,
+                                                   limit, 'display_name',
+                                                   'asc', filters=filters)
+            return [volume['id'] for volume in volumes]
+
+        self.assertEqual(ids[:2], _get_ids({'status': 'available'}))
+        self.assertEqual([ids[0], ids[2]],
+                         _get_ids({'metadata': {'key1': 'value0'}}))
+        self.assertEqual([ids[2]], _get_ids({'metadata': {'key1': 'value0'},
+                                             'status': 'in-use'}))
+        self.assertEqual([ids[2]],
+                         _get_ids({'no_migration_targets': True,
+                                   'no_secondary_replicas': True,
+                                   'display_name': ['vol2', 'vol3']}))
+        self.assertEqual([], _get_ids({'metadata': {'key1': 'value2'}}))
+        self.assertEqual([], _get_ids({'no_such_attribute': 'value'}))
+
+        # Pages are full when filters are set.
+        self.assertEqual([ids[1]],
+                         _get_ids({'metadata': {'key1': 'value1'}}, limit=1))
+
+    def test_volume_get_all_with_filters(self):
+        vols = [db.volume_create(self.ctxt, {'project_id': 'p%d' % i,
+                                             'host': 'h%d' % (i % 2)})
+                for i in xrange(4)]
+        self._assertEqualListsOfObjects(
+            [vols[1], vols[3]],
+            db.volume_get_all(self.ctxt, None, None, 'host', None,
+                              filters={'host': 'h1'}))
+
     def test_volume_get_iscsi_target_num(self):
         target = db.iscsi_target_create_safe(self.ctxt, {'volume_id': 42,
                                                          'target_num': 43})
@@ -487,6 +534,43 @@ class DBAPISnapshotTestCase(BaseTest):
                                         db.snapshot_get_all(self.ctxt),
                                         ignored_keys=['metadata', 'volume'])
 
+    def test_snapshot_get_all_by_project_with_filters(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        ids = [db.snapshot_create(self.ctxt,
+                                  {'volume_id': 1, 'project_id': 'p1',
+                                   'display_name': 'snap%d' % i,
+                                   'status': ('available', 'error')[i % 2]}
+                                  )['id']
+               for i in xrange(4)]
+        db.snapshot_create(self.ctxt, {'volume_id': 1, 'project_id': 'p2',
+                                       'display_name': 'snap0'})
+
+        def _get_ids(filters, marker=None, limit=None):
+            snapshots = db.snapshot_get_all_by_project(self.ctxt, 'p1',
+                                                       marker, limit,
+                                                       'display_name', 'asc',
+                                                       filters=filters)
+            return [snapshot['id'] for snapshot in snapshots]
+
+        self.assertEqual(ids, _get_ids(None))
+        self.assertEqual([ids[0], ids[2]], _get_ids({'status': 'available'}))
+        self.assertEqual([ids[1]], _get_ids({'display_name': 'snap1'}))
+        self.assertEqual([], _get_ids({'no_such_attribute': 'value'}))
+        self.assertEqual([ids[2]],
+                         _get_ids({'status': 'available'}, ids[0], 1))
+        self.assertEqual([ids[1], ids[2]], _get_ids(None, ids[0], 2))
+
+    def test_snapshot_get_all_with_filters(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        db.volume_create(self.ctxt, {'id': 2})
+        snapshots = [db.snapshot_create(self.ctxt,
+                                        {'volume_id': i % 2 + 1,
+                                         'project_id': 'p%d' % i})
+                     for i in xrange(4)]
+        result = db.snapshot_get_all(self.ctxt, filters={'volume_id': 2})
+        self.assertEqual(sorted([snapshots[1]['id'], snapshots[3]['id']]),
+                         sorted([snapshot['id'] for snapshot in result]))
+
     def test_snapshot_metadata_get(self):
         metadata = {'a': 'b', 'c': 'd'}
         db.volume_create(self.ctxt, {'id': 1})
@@ -743,6 +827,240 @@ class DBAPIReservationTestCase(BaseTest):
             self.ctxt, 'project1'))
 
 
+class DBAPIQuotaReserveConditionalTestCase(BaseTest):
+
+    """Tests for db.api.quota_reserve_conditional and its helpers."""
+
+    def setUp(self):
+        super(DBAPIQuotaReserveConditionalTestCase, self).setUp()
+        self.resources = {
+            'volumes': ReservableResource('volumes', '_sync_volumes'),
+            'gigabytes': ReservableResource('gigabytes', '_sync_gigabytes')}
+        self.quotas = {'volumes': 10, 'gigabytes': 100}
+        self.expire = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+        db.volume_create(self.ctxt, {'project_id': 'project1', 'size': 5})
+
+    def _reserve(self, deltas, until_refresh=0, quotas=None):
+        return db.quota_reserve_conditional(
+            self.ctxt, self.resources, quotas or self.quotas, deltas,
+            self.expire, until_refresh, 0, project_id='project1')
+
+    def test_quota_reserve_conditional(self):
+        reservations, refresh = self._reserve({'volumes': 1,
+                                               'gigabytes': 2})
+        self.assertEqual([], refresh)
+        self.assertEqual(2, len(reservations))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 1, 'in_use': 1},
+                    'gigabytes': {'reserved': 2, 'in_use': 5}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 2},
+                    'gigabytes': {'reserved': 0, 'in_use': 7}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+    def test_quota_reserve_conditional_usage_created_concurrently(self):
+        self._reserve({'volumes': 1})
+        # The usage was created by another reservation after it was read.
+        self.stubs.Set(sqlalchemy_api, '_quota_usages_by_resource',
+                       lambda context, project_id: {})
+        self._reserve({'volumes': 1})
+        usages = sqlalchemy_api.model_query(
+            self.ctxt, models.QuotaUsage, read_deleted="yes").\
+            filter_by(project_id='project1', resource='volumes').\
+            all()
+        self.assertEqual(1, len(usages))
+        self.assertEqual(2, usages[0].reserved)
+
+    def test_quota_reserve_conditional_over_quota(self):
+        self._reserve({'volumes': 1, 'gigabytes': 2})
+        self.assertRaises(exception.OverQuota, self._reserve,
+                          {'volumes': 1, 'gigabytes': 2},
+                          quotas={'volumes': 2, 'gigabytes': 100})
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 1, 'in_use': 1},
+                    'gigabytes': {'reserved': 2, 'in_use': 5}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        reservations = db.reservation_get_all_by_project(self.ctxt,
+                                                         'project1')
+        self.assertEqual(1, len(reservations['volumes']))
+
+    def test_quota_reserve_conditional_unlimited(self):
+        self._reserve({'volumes': 100, 'gigabytes': 2},
+                      quotas={'volumes': -1, 'gigabytes': 100})
+        self.assertEqual(
+            100, db.quota_usage_get(self.ctxt, 'project1',
+                                    'volumes')['reserved'])
+
+    def test_quota_reserve_conditional_refresh(self):
+        self._reserve({'volumes': 1}, until_refresh=2)
+        _reservations, refresh = self._reserve({'volumes': 1},
+                                               until_refresh=2)
+        self.assertEqual(['volumes'], refresh)
+
+        db.volume_create(self.ctxt, {'project_id': 'project1', 'size': 1})
+        refreshed = db.quota_usage_resync(self.ctxt, self.resources,
+                                          'project1', 2)
+        self.assertEqual(['volumes'], refreshed)
+        usage = db.quota_usage_get(self.ctxt, 'project1', 'volumes')
+        self.assertEqual(2, usage['in_use'])
+        self.assertEqual(2, usage['until_refresh'])
+
+    def test_quota_usage_resync_changed_usage(self):
+        reservations, _refresh = self._reserve({'volumes': 1})
+        sync = sqlalchemy_api._quota_usage_sync
+
+        def fake_sync(*args, **kwargs):
+            result = sync(*args, **kwargs)
+            db.reservation_commit(self.ctxt, reservations, 'project1')
+            return result
+
+        self.stubs.Set(sqlalchemy_api, '_quota_usage_sync', fake_sync)
+        refreshed = db.quota_usage_resync(
+            self.ctxt, {'volumes': self.resources['volumes']}, 'project1', 0)
+        self.assertEqual([], refreshed)
+        self.assertEqual(
+            2, db.quota_usage_get(self.ctxt, 'project1', 'volumes')['in_use'])
+
+    def test_reservation_expire_batches(self):
+        self.stubs.Set(sqlalchemy_api, '_EXPIRE_BATCH_SIZE', 1)
+        self.expire = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        self._reserve({'volumes': 1, 'gigabytes': 2})
+        self._reserve({'volumes': 1, 'gigabytes': 2})
+
+        self.assertEqual(4, db.reservation_expire(self.ctxt))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 1},
+                    'gigabytes': {'reserved': 0, 'in_use': 5}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        self.assertEqual(0, db.reservation_expire(self.ctxt))
+
+    def test_reservation_expire_changed(self):
+        self.expire = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        committed, _refresh = self._reserve({'volumes': 1})
+        self._reserve({'volumes': 1})
+        expire_batch = sqlalchemy_api._reservations_expire_batch
+
+        def fake_expire_batch(*args, **kwargs):
+            db.reservation_commit(self.ctxt, committed, 'project1')
+            return expire_batch(*args, **kwargs)
+
+        self.stubs.Set(sqlalchemy_api, '_reservations_expire_batch',
+                       fake_expire_batch)
+        self.assertEqual(1, db.reservation_expire(self.ctxt))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 2}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+    def test_quota_usage_reconcile(self):
+        volume_type = db.volume_type_create(self.ctxt, {'name': 'gold'})
+        resources = dict(self.resources)
+        resources['volumes_gold'] = ReservableResource('volumes_gold',
+                                                       '_sync_volumes')
+        resources['volumes_gold'].volume_type_id = volume_type['id']
+        resources['volumes_gold'].volume_type_name = 'gold'
+        self.resources = resources
+        self.quotas['volumes_gold'] = 10
+        reservations, _refresh = self._reserve({'volumes': 1,
+                                                'gigabytes': 1,
+                                                'volumes_gold': 1})
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        db.volume_create(self.ctxt, {'project_id': 'project1', 'size': 2,
+                                     'volume_type_id': volume_type['id']})
+        volume = db.volume_create(self.ctxt, {'project_id': 'project1',
+                                              'size': 3})
+        db.snapshot_create(self.ctxt, {'project_id': 'project1',
+                                       'volume_id': volume['id'],
+                                       'volume_size': 3})
+
+        drift = db.quota_usage_reconcile(self.ctxt, 0)
+        self.assertEqual([
+            {'project_id': 'project1', 'resource': 'gigabytes',
+             'in_use': 6, 'actual': 13},
+            {'project_id': 'project1', 'resource': 'volumes',
+             'in_use': 2, 'actual': 3}],
+            sorted(drift, key=lambda d: d['resource']))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 3},
+                    'gigabytes': {'reserved': 0, 'in_use': 13},
+                    'volumes_gold': {'reserved': 0, 'in_use': 1}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        self.assertEqual([], db.quota_usage_reconcile(self.ctxt, 0))
+
+    def test_quota_usage_reconcile_per_project(self):
+        for project_id in ('project1', 'project2'):
+            reservations, _refresh = db.quota_reserve_conditional(
+                self.ctxt, self.resources, self.quotas, {'volumes': 1},
+                self.expire, 0, 0, project_id=project_id)
+            db.reservation_commit(self.ctxt, reservations, project_id)
+        for _i in xrange(2):
+            db.volume_create(self.ctxt, {'project_id': 'project1',
+                                         'size': 1})
+        real_totals = sqlalchemy_api._quota_usage_totals
+        projects = []
+
+        def fake_totals(context, project_id=None, session=None):
+            projects.append(project_id)
+            return real_totals(context, project_id=project_id,
+                               session=session)
+
+        self.stubs.Set(sqlalchemy_api, '_quota_usage_totals', fake_totals)
+        drift = db.quota_usage_reconcile(self.ctxt, 0)
+        self.assertEqual(['project1', 'project2'], projects)
+        self.assertEqual([
+            {'project_id': 'project1', 'resource': 'volumes',
+             'in_use': 2, 'actual': 3},
+            {'project_id': 'project2', 'resource': 'volumes',
+             'in_use': 1, 'actual': 0}], drift)
+
+    def test_quota_usage_reconcile_pending(self):
+        self._reserve({'volumes': 1})
+        db.volume_create(self.ctxt, {'project_id': 'project1', 'size': 1})
+        self.assertEqual([], db.quota_usage_reconcile(self.ctxt, 0))
+        self.assertEqual(
+            1, db.quota_usage_get(self.ctxt, 'project1', 'volumes')['in_use'])
+
+    def test_quota_usage_reconcile_concurrent_commit(self):
+        def create_volume():
+            reservations, _refresh = self._reserve({'volumes': 1})
+            db.volume_create(self.ctxt, {'project_id': 'project1',
+                                         'size': 0})
+            db.reservation_commit(self.ctxt, reservations, 'project1')
+
+        create_volume()
+        real_totals = sqlalchemy_api._quota_usage_totals
+
+        def fake_totals(*args, **kwargs):
+            # A volume is committed between the reads of the usages and
+            # of the actual counts.
+            totals = real_totals(*args, **kwargs)
+            create_volume()
+            return totals
+
+        self.stubs.Set(sqlalchemy_api, '_quota_usage_totals', fake_totals)
+        db.quota_usage_reconcile(self.ctxt, 0)
+        self.assertEqual(
+            3, db.quota_usage_get(self.ctxt, 'project1', 'volumes')['in_use'])
+
+    def test_reservation_commit_once(self):
+        reservations, _refresh = self._reserve({'volumes': 1})
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        db.reservation_rollback(self.ctxt, reservations, 'project1')
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 2}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+
 class DBAPIQuotaClassTestCase(BaseTest):
 
     """Tests for db.api.quota_class_* methods."""
@@ -946,7 +1264,10 @@ class DBAPIBackupTestCase(BaseTest):
             'service_metadata': 'metadata',
             'service': 'service',
             'size': 1000,
-            'object_count': 100}
+            'object_count': 100,
+            'parent_id': 'parent',
+            'progress_bytes': 1024,
+            'progress_rate': 512}
         if one:
             return base_values
 
@@ -973,6 +1294,33 @@ class DBAPIBackupTestCase(BaseTest):
         all_backups = db.backup_get_all(self.ctxt)
         self._assertEqualListsOfObjects(self.created, all_backups)
 
+    def test_backup_get_all_with_filters(self):
+        result = db.backup_get_all(self.ctxt, None, None, 'display_name',
+                                   'desc', filters={'status': ['status1',
+                                                               'status3']})
+        self.assertEqual([self.created[2]['id'], self.created[0]['id']],
+                         [backup['id'] for backup in result])
+        self.assertEqual([], db.backup_get_all(
+            self.ctxt, filters={'no_such_attribute': 'value'}))
+
+    def test_backup_get_all_paginated(self):
+        for backup in self.created:
+            db.backup_update(self.ctxt, backup['id'],
+                             {'project_id': 'project'})
+        ids = [backup['id'] for backup in self.created]
+
+        def _get_ids(marker, limit):
+            backups = db.backup_get_all_by_project(self.ctxt, 'project',
+                                                   marker, limit,
+                                                   'display_name', 'asc')
+            return [backup['id'] for backup in backups]
+
+        self.assertEqual(ids[:2], _get_ids(None, 2))
+        self.assertEqual(ids[2:], _get_ids(ids[1], 2))
+        backups = db.backup_get_all_by_project(
+            self.ctxt, 'project', filters={'volume_id': 'volume2'})
+        self.assertEqual([ids[1]], [backup['id'] for backup in backups])
+
     def test_backup_get_all_by_host(self):
         byhost = db.backup_get_all_by_host(self.ctxt,
                                            self.created[1]['host'])
@@ -983,6 +1331,11 @@ class DBAPIBackupTestCase(BaseTest):
                                               self.created[1]['project_id'])
         self._assertEqualObjects(self.created[1], byproj[0])
 
+    def test_backup_get_all_by_volume(self):
+        byvol = db.backup_get_all_by_volume(self.ctxt,
+                                            self.created[1]['volume_id'])
+        self._assertEqualListsOfObjects([self.created[1]], byvol)
+
     def test_backup_update_nonexistent(self):
         self.assertRaises(exception.BackupNotFound,
                           db.backup_update,
@@ -0,0 +1,197 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests of the pools of kept-alive HTTP connections of the drivers."""
+
+import cookielib
+import errno
+import httplib
+import socket
+import StringIO
+
+import eventlet
+
+from cinder import test
+from cinder.volume import http_pool
+
+
+class FakeResponse(object):
+    def __init__(self, status=200, body='', headers='', will_close=False):
+        self.status = status
+        self.reason = 'OK'
+        self.msg = httplib.HTTPMessage(StringIO.StringIO(headers + '\r\n'))
+        self.will_close = will_close
+        self._body = body
+
+    def read(self):
+        return self._body
+
+
+class FakeHTTPConnection(object):
+    """A fake httplib.HTTPConnection recording the requests it sends."""
+
+    connections = []
+    # Responses of the next requests, or exceptions they raise.
+    responses = []
+    # Exceptions raised by the next requests while they are sent.
+    send_errors = []
+    active = 0
+    max_active = 0
+
+    def __init__(self, host, port=None, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.requests = []
+        self.closed = False
+        FakeHTTPConnection.connections.append(self)
+
+    def request(self, method, url, body=None, headers=None):
+        if FakeHTTPConnection.send_errors:
+            raise FakeHTTPConnection.send_errors.pop(0)
+        self.requests.append((method, url, body, headers))
+
+    def getresponse(self):
+        cls = FakeHTTPConnection
+        cls.active += 1
+        cls.max_active = max(cls.max_active, cls.active)
+        eventlet.sleep(0)
+        cls.active -= 1
+        response = cls.responses.pop(0) if cls.responses else FakeResponse()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHTTPSConnection(FakeHTTPConnection):
+    pass
+
+
+class HTTPPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(HTTPPoolTestCase, self).setUp()
+        FakeHTTPConnection.connections = []
+        FakeHTTPConnection.responses = []
+        FakeHTTPConnection.send_errors = []
+        FakeHTTPConnection.max_active = 0
+        self.stubs.Set(httplib, 'HTTPConnection', FakeHTTPConnection)
+        self.stubs.Set(httplib, 'HTTPSConnection', FakeHTTPSConnection)
+        self.pool = http_pool.HTTPPool()
+
+    def test_connection_kept_alive(self):
+        FakeHTTPConnection.responses = [FakeResponse(body='one'),
+                                        FakeResponse(body='two')]
+        _response, data = self.pool.request('GET', 'http://array:8080/a')
+        self.assertEqual('one', data)
+        _response, data = self.pool.request('POST', 'http://array:8080/b?c',
+                                            'body', {'X-Key': 'value'})
+        self.assertEqual('two', data)
+
+        self.assertEqual(1, len(FakeHTTPConnection.connections))
+        connection = FakeHTTPConnection.connections[0]
+        self.assertEqual(('array', 8080), (connection.host, connection.port))
+        self.assertEqual([('GET', '/a', None, {}),
+                          ('POST', '/b?c', 'body',
+                           {'X-Key': 'value', 'Content-Length': '4'})],
+                         connection.requests)
+
+    def test_endpoints(self):
+        self.pool.request('GET', 'http://array:8080/a')
+        self.pool.request('GET', 'https://array:8080/a')
+        self.pool.request('GET', 'http://array2/a')
+        connections = FakeHTTPConnection.connections
+        self.assertEqual(3, len(connections))
+        self.assertIsInstance(connections[1], FakeHTTPSConnection)
+        self.assertEqual(('array2', None),
+                         (connections[2].host, connections[2].port))
+
+    def test_closed_by_server(self):
+        FakeHTTPConnection.responses = [FakeResponse(will_close=True)]
+        self.pool.request('GET', 'http://array/a')
+        self.pool.request('GET', 'http://array/a')
+        connections = FakeHTTPConnection.connections
+        self.assertEqual(2, len(connections))
+        self.assertTrue(connections[0].closed)
+
+    def test_kept_alive_connection_closed(self):
+        self.pool.request('GET', 'http://array/a')
+        FakeHTTPConnection.responses = [httplib.BadStatusLine('')]
+        self.pool.request('GET', 'http://array/a')
+        connections = FakeHTTPConnection.connections
+        self.assertEqual(2, len(connections))
+        self.assertTrue(connections[0].closed)
+        self.assertEqual(1, len(connections[1].requests))
+
+    def test_reset_while_sending(self):
+        self.pool.request('POST', 'http://array/a', '{}')
+        FakeHTTPConnection.send_errors = [
+            socket.error(errno.ECONNRESET, 'Connection reset by peer')]
+        self.pool.request('POST', 'http://array/a', '{}')
+        connections = FakeHTTPConnection.connections
+        self.assertEqual(2, len(connections))
+        self.assertEqual(1, len(connections[1].requests))
+
+    def test_timeout_not_retried(self):
+        self.pool.request('POST', 'http://array/a', '{}')
+        FakeHTTPConnection.responses = [socket.timeout('timed out')]
+        self.assertRaises(socket.timeout,
+                          self.pool.request, 'POST', 'http://array/a', '{}')
+        self.assertEqual(1, len(FakeHTTPConnection.connections))
+
+    def test_partial_response_not_retried(self):
+        self.pool.request('POST', 'http://array/a', '{}')
+        FakeHTTPConnection.responses = [httplib.IncompleteRead('{"res')]
+        self.assertRaises(httplib.IncompleteRead,
+                          self.pool.request, 'POST', 'http://array/a', '{}')
+        FakeHTTPConnection.responses = [httplib.BadStatusLine('HTTP/1.1 2')]
+        self.assertRaises(httplib.BadStatusLine,
+                          self.pool.request, 'POST', 'http://array/a', '{}')
+        self.assertEqual(2, len(FakeHTTPConnection.connections))
+
+    def test_new_connection_error_not_retried(self):
+        FakeHTTPConnection.responses = [socket.error('refused')]
+        self.assertRaises(socket.error,
+                          self.pool.request, 'GET', 'http://array/a')
+        self.assertEqual(1, len(FakeHTTPConnection.connections))
+
+    def test_retries(self):
+        self.pool = http_pool.HTTPPool(retries=0)
+        self.pool.request('GET', 'http://array/a')
+        FakeHTTPConnection.responses = [httplib.BadStatusLine('')]
+        self.assertRaises(httplib.BadStatusLine,
+                          self.pool.request, 'GET', 'http://array/a')
+
+    def test_max_connections(self):
+        self.pool = http_pool.HTTPPool(max_connections=2)
+        threads = [eventlet.spawn(self.pool.request, 'GET', 'http://array/a')
+                   for _i in xrange(5)]
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(2, FakeHTTPConnection.max_active)
+        self.assertEqual(2, len(FakeHTTPConnection.connections))
+
+    def test_cookies(self):
+        cookies = cookielib.CookieJar()
+        FakeHTTPConnection.responses = [
+            FakeResponse(headers='Set-Cookie: session=abc; path=/\r\n')]
+        self.pool.request('POST', 'http://array/login', '{}',
+                          cookies=cookies)
+        self.pool.request('GET', 'http://array/luns', cookies=cookies)
+        requests = FakeHTTPConnection.connections[0].requests
+        self.assertNotIn('Cookie', requests[0][3])
+        self.assertEqual('session=abc', requests[1][3]['Cookie'])
@@ -18,15 +18,19 @@
 
 import contextlib
 import mox
+import os
+import shutil
 import tempfile
 
 from cinder import context
 from cinder import exception
 from cinder.image import image_utils
+from cinder.openstack.common import imageutils
 from cinder.openstack.common import processutils
 from cinder import test
 from cinder import units
 from cinder import utils
+from cinder.volume import utils as volume_utils
 
 
 class FakeImageService:
@@ -324,6 +328,108 @@ class TestUtils(test.TestCase):
                           self.TEST_IMAGE_ID, self.TEST_DEV_PATH,
                           size=TEST_VOLUME_SIZE)
 
+    def _test_fetch_raw_image(self, header_info, data='x' * 100):
+        conversion_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, conversion_dir)
+        self.flags(image_conversion_dir=conversion_dir)
+        image_meta = {'size': len(data), 'disk_format': 'raw',
+                      'container_format': 'bare'}
+        dest = os.path.join(conversion_dir, 'volume')
+        with open(dest, 'wb') as f:
+            f.write('volume')
+
+        self._mox.StubOutWithMock(self._image_service, 'show')
+        self._mox.StubOutWithMock(image_utils, 'qemu_img_info')
+        self._image_service.show(context,
+                                 self.TEST_IMAGE_ID).MultipleTimes().AndReturn(
+                                     image_meta)
+        image_utils.qemu_img_info(mox.IgnoreArg())
+
+        def _download(context, image_id, image_file):
+            for i in range(0, len(data), 10):
+                image_file.write(data[i:i + 10])
+
+        def _header_info(path):
+            header_size = image_utils.IMAGE_HEADER_SIZE
+            with open(path) as f:
+                self.assertEqual(f.read(), data[:header_size])
+
+        self.stubs.Set(self._image_service, 'download', _download)
+
+        image_utils.qemu_img_info(mox.IgnoreArg()).WithSideEffects(
+            _header_info).AndReturn(imageutils.QemuImgInfo(header_info))
+        self._mox.ReplayAll()
+        return dest
+
+    def test_fetch_to_raw_streams_raw_image(self):
+        self.stubs.Set(image_utils, 'IMAGE_HEADER_SIZE', 10)
+        dest = self._test_fetch_raw_image("image: header\n"
+                                          "file format: raw\n"
+                                          "virtual size: 10 (10 bytes)\n")
+        image_utils.fetch_to_raw(context, self._image_service,
+                                 self.TEST_IMAGE_ID, dest)
+        self._mox.VerifyAll()
+        with open(dest) as f:
+            self.assertEqual(f.read(), 'x' * 100)
+
+    def test_fetch_to_raw_streams_small_raw_image(self):
+        dest = self._test_fetch_raw_image("image: header\n"
+                                          "file format: raw\n"
+                                          "virtual size: 3 (3 bytes)\n",
+                                          data='abc')
+        image_utils.fetch_to_raw(context, self._image_service,
+                                 self.TEST_IMAGE_ID, dest)
+        self._mox.VerifyAll()
+        with open(dest) as f:
+            self.assertEqual(f.read(), 'abc')
+
+    def test_fetch_to_raw_rejects_fake_raw_image(self):
+        dest = self._test_fetch_raw_image("image: header\n"
+                                          "file format: qcow2\n"
+                                          "virtual size: 1G (1073741824 "
+                                          "bytes)\n"
+                                          "backing file: /etc/shadow\n")
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils.fetch_to_raw,
+                          context, self._image_service,
+                          self.TEST_IMAGE_ID, dest)
+        self._mox.VerifyAll()
+        with open(dest) as f:
+            self.assertEqual(f.read(), '')
+
+    def test_fetch_to_raw_cached(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.flags(image_cache_dir=cache_dir, image_cache_max_size_gb=1)
+        image_meta = {'size': 3 * units.MiB, 'checksum': 'fake_checksum',
+                      'disk_format': 'qcow2', 'container_format': 'bare'}
+        self._mox.StubOutWithMock(self._image_service, 'show')
+        self._mox.StubOutWithMock(image_utils, '_fetch_to_volume_format')
+        self._mox.StubOutWithMock(volume_utils, 'copy_volume')
+
+        def _fill(context, image_service, image_id, image_meta, path, fmt,
+                  user_id, project_id):
+            with open(path, 'wb') as f:
+                f.truncate(3 * units.MiB - 1)
+
+        for i in range(2):
+            self._image_service.show(
+                context, self.TEST_IMAGE_ID).AndReturn(image_meta)
+            if i == 0:
+                image_utils._fetch_to_volume_format(
+                    context, self._image_service, self.TEST_IMAGE_ID,
+                    image_meta, mox.IgnoreArg(), 'raw', None,
+                    None).WithSideEffects(_fill)
+            volume_utils.copy_volume(mox.IgnoreArg(), self.TEST_DEV_PATH,
+                                     3)
+        self._mox.ReplayAll()
+
+        for i in range(2):
+            image_utils.fetch_to_raw(context, self._image_service,
+                                     self.TEST_IMAGE_ID, self.TEST_DEV_PATH,
+                                     size=1)
+        self._mox.VerifyAll()
+
     def _test_fetch_verify_image(self, qemu_info, volume_size=1):
         fake_image_service = FakeImageService()
         mox = self._mox
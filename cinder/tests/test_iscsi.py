@@ -125,6 +125,92 @@ class TgtAdmTestCase(test.TestCase, TargetAdminTestCase):
             pass
         super(TgtAdmTestCase, self).tearDown()
 
+    def _targets(self, *vol_names):
+        return [{'name': 'iqn.2010-10.org.openstack:%s' % vol_name,
+                 'tid': 1, 'lun': 0, 'path': '/dev/vg/%s' % vol_name}
+                for vol_name in vol_names]
+
+    def _stub_show_targets(self, *shows):
+        shows = list(shows)
+        self.stubs.Set(iscsi.TgtAdm, '_show_targets',
+                       lambda obj: shows.pop(0))
+
+    def test_create_iscsi_targets(self):
+        self._stub_show_targets({
+            'iqn.2010-10.org.openstack:volume-1': ('1', ['0', '1']),
+            'iqn.2010-10.org.openstack:volume-2': ('2', ['0', '1'])})
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+
+        tids = tgtadm.create_iscsi_targets(self._targets('volume-1',
+                                                         'volume-2'))
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': '1',
+                          'iqn.2010-10.org.openstack:volume-2': '2'}, tids)
+        self.assertEqual(['tgt-admin --update ALL'], self.cmds)
+        self.assertEqual(['volume-1', 'volume-2'],
+                         sorted(os.listdir(self.persist_tempdir)))
+
+    def test_create_iscsi_targets_without_backing_lun(self):
+        self._stub_show_targets({
+            'iqn.2010-10.org.openstack:volume-1': ('1', ['0', '1']),
+            'iqn.2010-10.org.openstack:volume-2': ('2', ['0'])})
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+
+        tids = tgtadm.create_iscsi_targets(self._targets('volume-1',
+                                                         'volume-2'))
+
+        # The target without its backing lun is created again on its own.
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': '1',
+                          'iqn.2010-10.org.openstack:volume-2': 1}, tids)
+        self.assertEqual(['tgt-admin --update ALL',
+                          'tgt-admin --update '
+                          'iqn.2010-10.org.openstack:volume-2',
+                          'tgtadm --lld iscsi --op show --mode target'],
+                         self.cmds)
+
+    def test_reconcile_iscsi_targets(self):
+        open(os.path.join(self.persist_tempdir, 'volume-1'), 'w').close()
+        self._stub_show_targets(
+            {'iqn.2010-10.org.openstack:volume-1': ('1', ['0', '1']),
+             'iqn.2010-10.org.openstack:volume-3': ('3', ['0', '1']),
+             'iqn.2010-10.org.other:volume-4': ('4', ['0', '1'])},
+            {'iqn.2010-10.org.openstack:volume-1': ('1', ['0', '1']),
+             'iqn.2010-10.org.openstack:volume-2': ('2', ['0', '1']),
+             'iqn.2010-10.org.openstack:volume-3': ('3', ['0', '1']),
+             'iqn.2010-10.org.other:volume-4': ('4', ['0', '1'])})
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+
+        tids = tgtadm.reconcile_iscsi_targets(
+            self._targets('volume-1', 'volume-2'),
+            remove_prefix='iqn.2010-10.org.openstack:')
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': '1',
+                          'iqn.2010-10.org.openstack:volume-2': '2'}, tids)
+        self.assertEqual(['tgt-admin --update ALL',
+                          'tgt-admin --force --delete '
+                          'iqn.2010-10.org.openstack:volume-3'], self.cmds)
+
+    def test_show_targets(self):
+        out = "\n".join([
+            'Target 1: iqn.2010-10.org.openstack:volume-1',
+            '    System information:',
+            '    LUN information:',
+            '        LUN: 0',
+            '            Type: controller',
+            '        LUN: 1',
+            '            Type: disk',
+            'Target 2: iqn.2010-10.org.openstack:volume-2',
+            '    LUN information:',
+            '        LUN: 0'])
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(lambda *cmd, **kwargs: (out, None))
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': '1'},
+                         tgtadm.get_targets())
+
 
 class IetAdmTestCase(test.TestCase, TargetAdminTestCase):
 
@@ -139,6 +225,76 @@ class IetAdmTestCase(test.TestCase, TargetAdminTestCase):
             'ietadm --op show --tid=%(tid)s',
             'ietadm --op delete --tid=%(tid)s --lun=%(lun)s',
             'ietadm --op delete --tid=%(tid)s'])
+        self.tempdir = tempfile.mkdtemp()
+        self.iet_conf = os.path.join(self.tempdir, 'ietd.conf')
+        open(self.iet_conf, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super(IetAdmTestCase, self).tearDown()
+
+    def _targets(self, *tids):
+        return [{'name': 'iqn.2010-10.org.openstack:volume-%d' % tid,
+                 'tid': tid, 'lun': 0, 'path': '/dev/vg/volume-%d' % tid}
+                for tid in tids]
+
+    def test_create_remove_iscsi_targets(self):
+        self.flags(iet_conf=self.iet_conf)
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+
+        tids = tgtadm.create_iscsi_targets(self._targets(1, 2, 3))
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': 1,
+                          'iqn.2010-10.org.openstack:volume-2': 2,
+                          'iqn.2010-10.org.openstack:volume-3': 3}, tids)
+        self.assertEqual(6, len(self.cmds))
+        conf = open(self.iet_conf).read()
+        for tid in (1, 2, 3):
+            self.assertTrue('Target iqn.2010-10.org.openstack:volume-%d' %
+                            tid in conf)
+
+        self.clear_cmds()
+        tgtadm.remove_iscsi_targets(
+            [{'tid': tid, 'lun': 0, 'vol_id': tid,
+              'vol_name': 'volume-%d' % tid} for tid in (1, 3)])
+
+        self.assertEqual(['ietadm --op delete --tid=1 --lun=0',
+                          'ietadm --op delete --tid=1',
+                          'ietadm --op delete --tid=3 --lun=0',
+                          'ietadm --op delete --tid=3'], self.cmds)
+        conf = open(self.iet_conf).read()
+        self.assertFalse('volume-1' in conf)
+        self.assertTrue('Target iqn.2010-10.org.openstack:volume-2' in conf)
+        self.assertFalse('volume-3' in conf)
+
+    def test_get_targets(self):
+        volumes = os.path.join(self.tempdir, 'volume')
+        with open(volumes, 'w') as f:
+            f.write('tid:1 name:iqn.2010-10.org.openstack:volume-1\n'
+                    '\tlun:0 state:0 iotype:fileio path:/dev/vg/volume-1\n'
+                    'tid:2 name:iqn.2010-10.org.openstack:volume-2\n')
+        self.stubs.Set(iscsi.IetAdm, 'IET_VOLUMES', volumes)
+        tgtadm = self.driver.get_target_admin()
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': 1,
+                          'iqn.2010-10.org.openstack:volume-2': 2},
+                         tgtadm.get_targets())
+
+    def test_reconcile_iscsi_targets(self):
+        self.stubs.Set(iscsi.IetAdm, 'get_targets', lambda obj: {
+            'iqn.2010-10.org.openstack:volume-1': 1})
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+
+        tids = tgtadm.reconcile_iscsi_targets(self._targets(1, 2))
+
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': 1,
+                          'iqn.2010-10.org.openstack:volume-2': 2}, tids)
+        self.assertEqual(['ietadm --op new --tid=2 --params '
+                          'Name=iqn.2010-10.org.openstack:volume-2',
+                          'ietadm --op new --tid=2 --lun=0 --params '
+                          'Path=/dev/vg/volume-2,Type=fileio'], self.cmds)
 
 
 class IetAdmBlockIOTestCase(test.TestCase, TargetAdminTestCase):
@@ -202,6 +358,42 @@ class LioAdmTestCase(test.TestCase, TargetAdminTestCase):
             '/foo iqn.2011-09.org.foo.bar:blaa test_id test_pass',
             'cinder-rtstool delete iqn.2010-10.org.openstack:volume-blaa'])
 
+    def test_create_remove_iscsi_targets(self):
+        self.stubs.Set(iscsi.LioAdm, 'get_targets', lambda obj: {
+            'iqn.2010-10.org.openstack:volume-1':
+            'iqn.2010-10.org.openstack:volume-1',
+            'iqn.2010-10.org.openstack:volume-2':
+            'iqn.2010-10.org.openstack:volume-2'})
+        tgtadm = self.driver.get_target_admin()
+        tgtadm.set_execute(self.fake_execute)
+        targets = [{'name': 'iqn.2010-10.org.openstack:volume-%d' % i,
+                    'tid': 1, 'lun': 0, 'path': '/dev/vg/volume-%d' % i,
+                    'chap_auth': 'IncomingUser user%d pass%d' % (i, i)}
+                   for i in (1, 2)]
+
+        tids = tgtadm.create_iscsi_targets(targets)
+
+        self.assertEqual(['iqn.2010-10.org.openstack:volume-1',
+                          'iqn.2010-10.org.openstack:volume-2'],
+                         sorted(tids))
+        self.assertEqual(['cinder-rtstool create-targets  '
+                          '/dev/vg/volume-1 '
+                          'iqn.2010-10.org.openstack:volume-1 user1 pass1 '
+                          '/dev/vg/volume-2 '
+                          'iqn.2010-10.org.openstack:volume-2 user2 pass2'],
+                         self.cmds)
+
+        self.clear_cmds()
+        tgtadm.TARGETS_PER_COMMAND = 1
+        tgtadm.remove_iscsi_targets(
+            [{'tid': 1, 'lun': 0, 'vol_id': i, 'vol_name': 'volume-%d' % i}
+             for i in (1, 2)])
+
+        self.assertEqual(['cinder-rtstool delete '
+                          'iqn.2010-10.org.openstack:volume-1',
+                          'cinder-rtstool delete '
+                          'iqn.2010-10.org.openstack:volume-2'], self.cmds)
+
 
 class ISERTgtAdmTestCase(TgtAdmTestCase):
 
@@ -32,6 +32,7 @@ import uuid
 
 from migrate.versioning import repository
 import sqlalchemy
+from sqlalchemy.engine import reflection
 import testtools
 
 import cinder.db.migration as migration
@@ -1105,3 +1106,144 @@ class TestMigrations(test.TestCase):
 
             self.assertFalse(engine.dialect.has_table(
                 engine.connect(), 'replication_relationships'))
+
+    def test_migration_024(self):
+        """Test that adding parent_id column to backups works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 23)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 24)
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertIsInstance(backups.c.parent_id.type,
+                                  sqlalchemy.types.VARCHAR)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 23)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertNotIn('parent_id', backups.c)
+
+    def test_migration_025(self):
+        """Test that adding progress columns to backups works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 24)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 25)
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            if engine.name == 'sqlite':
+                column_type = sqlalchemy.types.INTEGER
+            else:
+                column_type = sqlalchemy.types.BIGINT
+            self.assertIsInstance(backups.c.progress_bytes.type, column_type)
+            self.assertIsInstance(backups.c.progress_rate.type, column_type)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 24)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertNotIn('progress_bytes', backups.c)
+            self.assertNotIn('progress_rate', backups.c)
+
+    def test_migration_026(self):
+        """Test that adding indexes for the hot query paths works."""
+        indexes = {'volumes': ['volumes_project_id_deleted_idx',
+                               'volumes_host_deleted_idx',
+                               'volumes_instance_uuid_deleted_idx'],
+                   'snapshots': ['snapshots_project_id_deleted_idx',
+                                 'snapshots_volume_id_deleted_idx'],
+                   'volume_metadata': [
+                       'volume_metadata_volume_id_deleted_idx'],
+                   'snapshot_metadata': [
+                       'snapshot_metadata_snapshot_id_deleted_idx'],
+                   'backups': ['backups_project_id_deleted_idx',
+                               'backups_volume_id_deleted_idx'],
+                   'iscsi_targets': ['iscsi_targets_host_idx'],
+                   'services': ['services_host_idx']}
+
+        def _get_index_names(engine, table_name):
+            inspector = reflection.Inspector.from_engine(engine)
+            return [index['name']
+                    for index in inspector.get_indexes(table_name)]
+
+        def _get_key_lengths(engine, table_name):
+            # MySQL limits InnoDB keys to 767 bytes, 3 per utf8 character.
+            inspector = reflection.Inspector.from_engine(engine)
+            lengths = {}
+            for column in inspector.get_columns(table_name):
+                if isinstance(column['type'], sqlalchemy.Boolean):
+                    lengths[column['name']] = 1
+                elif isinstance(column['type'], sqlalchemy.String):
+                    lengths[column['name']] = 3 * column['type'].length
+                else:
+                    lengths[column['name']] = 8
+            return dict((index['name'],
+                         sum(lengths[name] for name in index['column_names']))
+                        for index in inspector.get_indexes(table_name))
+
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 25)
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 26)
+            for table_name, names in indexes.items():
+                table_indexes = _get_index_names(engine, table_name)
+                key_lengths = _get_key_lengths(engine, table_name)
+                for name in names:
+                    self.assertIn(name, table_indexes)
+                    self.assertTrue(key_lengths[name] <= 767,
+                                    '%s is %d bytes long' %
+                                    (name, key_lengths[name]))
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 25)
+            for table_name, names in indexes.items():
+                table_indexes = _get_index_names(engine, table_name)
+                for name in names:
+                    self.assertNotIn(name, table_indexes)
+
+    def test_migration_027(self):
+        """Test that adding startup_progress to services works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 26)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 27)
+            services = sqlalchemy.Table('services',
+                                        metadata,
+                                        autoload=True)
+            self.assertIsInstance(services.c.startup_progress.type,
+                                  sqlalchemy.types.VARCHAR)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 26)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            services = sqlalchemy.Table('services',
+                                        metadata,
+                                        autoload=True)
+            self.assertNotIn('startup_progress', services.c)
@@ -479,6 +479,9 @@ class FakeDirectCmodeHTTPConnection(object):
     def getresponsebody(self):
         return self.sock.result
 
+    def close(self):
+        pass
+
 
 class NetAppDirectCmodeISCSIDriverTestCase(test.TestCase):
     """Test case for NetAppISCSIDriver"""
@@ -1095,6 +1098,9 @@ class FakeDirect7modeHTTPConnection(object):
     def getresponsebody(self):
         return self.sock.result
 
+    def close(self):
+        pass
+
 
 class NetAppDirect7modeISCSIDriverTestCase_NV(
         NetAppDirectCmodeISCSIDriverTestCase):
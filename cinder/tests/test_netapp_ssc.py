@@ -296,6 +296,9 @@ class FakeDirectCmodeHTTPConnection(object):
     def getresponsebody(self):
         return self.sock.result
 
+    def close(self):
+        pass
+
 
 def createNetAppVolume(**kwargs):
     vol = ssc_utils.NetAppVolume(kwargs['name'], kwargs['vs'])
@@ -19,7 +19,6 @@ Unit tests for OpenStack Cinder volume driver
 """
 
 import base64
-import urllib2
 
 import mox as mox_lib
 
@@ -343,84 +342,91 @@ class TestNexentaJSONRPC(test.TestCase):
         'Basic %s' % base64.b64encode('%s:%s' % (USER, PASSWORD)),
         'Content-Type': 'application/json'
     }
-    REQUEST = 'the request'
 
     def setUp(self):
         super(TestNexentaJSONRPC, self).setUp()
         self.proxy = jsonrpc.NexentaJSONProxy(
             'http', self.HOST, 2000, '/', self.USER, self.PASSWORD, auto=True)
-        self.mox.StubOutWithMock(urllib2, 'Request', True)
-        self.mox.StubOutWithMock(urllib2, 'urlopen')
+        self.mox.StubOutWithMock(self.proxy.pool, 'request')
         self.resp_mock = self.mox.CreateMockAnything()
-        self.resp_info_mock = self.mox.CreateMockAnything()
-        self.resp_mock.info().AndReturn(self.resp_info_mock)
-        urllib2.urlopen(self.REQUEST).AndReturn(self.resp_mock)
+        self.resp_mock.msg = self.mox.CreateMockAnything()
+        self.resp_mock.status = 200
 
     def test_call(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
             '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
+            self.HEADERS).AndReturn(
+                (self.resp_mock, '{"error": null, "result": "the result"}'))
+        self.resp_mock.msg.status = ''
         self.mox.ReplayAll()
         result = self.proxy('arg1', 'arg2')
         self.assertEqual("the result", result)
 
     def test_call_deep(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
             '{"object": "obj1.subobj", "params": ["arg1", "arg2"],'
             ' "method": "meth"}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
+            self.HEADERS).AndReturn(
+                (self.resp_mock, '{"error": null, "result": "the result"}'))
+        self.resp_mock.msg.status = ''
         self.mox.ReplayAll()
         result = self.proxy.obj1.subobj.meth('arg1', 'arg2')
         self.assertEqual("the result", result)
 
     def test_call_auto(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
             '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        urllib2.Request(
-            'https://%s:2000/' % self.HOST,
+            self.HEADERS).AndReturn((self.resp_mock, ''))
+        self.proxy.pool.request(
+            'POST', 'https://%s:2000/' % self.HOST,
             '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = 'EOF in headers'
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
-        urllib2.urlopen(self.REQUEST).AndReturn(self.resp_mock)
+            self.HEADERS).AndReturn(
+                (self.resp_mock, '{"error": null, "result": "the result"}'))
+        self.resp_mock.msg.status = 'EOF in headers'
         self.mox.ReplayAll()
         result = self.proxy('arg1', 'arg2')
         self.assertEqual("the result", result)
 
     def test_call_error(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
             '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
-            '{"error": {"message": "the error"}, "result": "the result"}')
+            self.HEADERS).AndReturn(
+                (self.resp_mock, '{"error": {"message": "the error"}, '
+                                 '"result": "the result"}'))
+        self.resp_mock.msg.status = ''
         self.mox.ReplayAll()
         self.assertRaises(jsonrpc.NexentaJSONException,
                           self.proxy, 'arg1', 'arg2')
 
     def test_call_fail(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
             '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = 'EOF in headers'
+            self.HEADERS).AndReturn((self.resp_mock, ''))
+        self.resp_mock.msg.status = 'EOF in headers'
         self.proxy.auto = False
         self.mox.ReplayAll()
         self.assertRaises(jsonrpc.NexentaJSONException,
                           self.proxy, 'arg1', 'arg2')
 
+    def test_call_bad_status(self):
+        self.proxy.pool.request(
+            'POST', 'http://%s:2000/' % self.HOST,
+            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
+            self.HEADERS).AndReturn((self.resp_mock, 'Unauthorized'))
+        self.resp_mock.msg.status = ''
+        self.resp_mock.status = 401
+        self.mox.ReplayAll()
+        self.assertRaises(jsonrpc.NexentaJSONException,
+                          self.proxy, 'arg1', 'arg2')
+
+    def test_proxies_share_pool(self):
+        self.assertIs(self.proxy.pool, self.proxy.obj1.subobj.meth.pool)
+
 
 class TestNexentaNfsDriver(test.TestCase):
     TEST_EXPORT1 = 'host1:/volumes/stack/share'
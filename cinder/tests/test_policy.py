@@ -27,6 +27,7 @@ from cinder import context
 from cinder import exception
 import cinder.openstack.common.policy
 from cinder.openstack.common import policy as common_policy
+from cinder.openstack.common import timeutils
 from cinder import policy
 from cinder import test
 from cinder import utils
@@ -64,6 +65,29 @@ class PolicyFileTestCase(test.TestCase):
             self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
                               self.context, action, self.target)
 
+    def test_modified_policy_reloads_after_interval(self):
+        self.flags(policy_file_check_interval=5)
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        with utils.tempdir() as tmpdir:
+            tmpfilename = os.path.join(tmpdir, 'policy')
+            self.flags(policy_file=tmpfilename)
+
+            action = "example:test"
+            with open(tmpfilename, "w") as policyfile:
+                policyfile.write("""{"example:test": []}""")
+            policy.enforce(self.context, action, self.target)
+            with open(tmpfilename, "w") as policyfile:
+                policyfile.write("""{"example:test": ["false:false"]}""")
+            mtime = os.path.getmtime(tmpfilename) + 10
+            os.utime(tmpfilename, (mtime, mtime))
+
+            context2 = context.RequestContext('fake', 'fake')
+            policy.enforce(context2, action, self.target)
+            timeutils.advance_time_seconds(5)
+            self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                              context2, action, self.target)
+
 
 class PolicyTestCase(test.TestCase):
     def setUp(self):
@@ -143,6 +167,51 @@ class PolicyTestCase(test.TestCase):
         action = "example:early_or_success"
         policy.enforce(self.context, action, self.target)
 
+    def test_results_memoized_per_request(self):
+        calls = []
+        to_dict = self.context.to_dict
+
+        def fake_to_dict():
+            calls.append(1)
+            return to_dict()
+
+        self.stubs.Set(self.context, 'to_dict', fake_to_dict)
+        action = "example:my_file"
+        policy.enforce(self.context, action, {'project_id': 'fake'})
+        policy.enforce(self.context, action, {'project_id': 'fake',
+                                              'size': 1})
+        self.assertEqual(1, len(calls))
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertEqual(2, len(calls))
+
+        # The roles are part of the key of the results.
+        self.context.roles.append('compute_admin')
+        policy.enforce(self.context, action, {'project_id': 'another'})
+        self.assertEqual(3, len(calls))
+
+    def test_http_results_not_memoized(self):
+        urls = []
+
+        def fakeurlopen(url, post_data):
+            urls.append(url)
+            return StringIO.StringIO("True")
+
+        self.stubs.Set(urllib2, 'urlopen', fakeurlopen)
+        action = "example:get_http"
+        policy.enforce(self.context, action, {})
+        policy.enforce(self.context, action, {})
+        self.assertEqual(2, len(urls))
+
+    def test_rule_projection(self):
+        compiled = policy._get_compiled()
+        self.assertEqual((('project_id',), ('project_id', 'roles')),
+                         compiled.projection('example:my_file'))
+        self.assertEqual(((), ()), compiled.projection('example:allowed'))
+        self.assertIsNone(compiled.projection('example:get_http'))
+
     def test_ignore_case_role_check(self):
         lowercase_action = "example:lowercase_admin"
         uppercase_action = "example:uppercase_admin"
@@ -276,6 +276,10 @@ class FakeDriver(object):
     def expire(self, context):
         self.called.append(('expire', context))
 
+    def reconcile(self, context):
+        self.called.append(('reconcile', context))
+        return {'expired': 0, 'drift': []}
+
 
 class BaseResourceTestCase(test.TestCase):
     def test_no_flag(self):
@@ -675,6 +679,15 @@ class QuotaEngineTestCase(test.TestCase):
 
         self.assertEqual(driver.called, [('expire', context), ])
 
+    def test_reconcile(self):
+        context = FakeContext(None, None)
+        driver = FakeDriver()
+        quota_obj = self._make_quota_obj(driver)
+        result = quota_obj.reconcile(context)
+
+        self.assertEqual(driver.called, [('reconcile', context), ])
+        self.assertEqual(result, {'expired': 0, 'drift': []})
+
     def test_resource_names(self):
         quota_obj = self._make_quota_obj(None)
 
@@ -1079,6 +1092,115 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual(self.calls, [('quota_destroy_all_by_project',
                                       ('test_project')), ])
 
+    def test_reconcile(self):
+        drift = [{'project_id': 'test_project', 'resource': 'volumes',
+                  'in_use': 3, 'actual': 2}]
+
+        def fake_reservation_expire(context):
+            self.calls.append('reservation_expire')
+            return 4
+
+        def fake_quota_usage_reconcile(context, until_refresh):
+            self.calls.append(('quota_usage_reconcile', until_refresh))
+            return drift
+
+        self.stubs.Set(db, 'reservation_expire', fake_reservation_expire)
+        self.stubs.Set(db, 'quota_usage_reconcile',
+                       fake_quota_usage_reconcile)
+        result = self.driver.reconcile(FakeContext('test_project',
+                                                   'test_class'))
+
+        self.assertEqual(self.calls, ['reservation_expire',
+                                      ('quota_usage_reconcile', 0), ])
+        self.assertEqual(result, {'expired': 4, 'drift': drift})
+
+
+class ConditionalDbQuotaDriverTestCase(test.TestCase):
+    def setUp(self):
+        super(ConditionalDbQuotaDriverTestCase, self).setUp()
+
+        self.flags(reservation_expire=86400,
+                   until_refresh=5,
+                   max_age=0,
+                   quota_usage_resync_interval=0)
+
+        self.driver = quota.ConditionalDbQuotaDriver()
+
+        self.calls = []
+
+        timeutils.set_time_override()
+
+    def tearDown(self):
+        timeutils.clear_time_override()
+        super(ConditionalDbQuotaDriverTestCase, self).tearDown()
+
+    def _stub_get_project_quotas(self):
+        def fake_get_project_quotas(context, resources, project_id,
+                                    quota_class=None, defaults=True,
+                                    usages=True):
+            return dict((k, dict(limit=v.default))
+                        for k, v in resources.items())
+
+        self.stubs.Set(self.driver, 'get_project_quotas',
+                       fake_get_project_quotas)
+
+    def _stub_quota_reserve_conditional(self, refresh):
+        def fake_quota_reserve_conditional(context, resources, quotas,
+                                           deltas, expire, until_refresh,
+                                           max_age, project_id=None):
+            self.calls.append(('quota_reserve_conditional', project_id,
+                               expire, until_refresh))
+            return ['resv-1'], refresh
+
+        def fake_quota_usage_resync(context, resources, project_id,
+                                    until_refresh):
+            self.calls.append(('quota_usage_resync', project_id,
+                               sorted(resources), until_refresh))
+            return sorted(resources)
+
+        self.stubs.Set(db, 'quota_reserve_conditional',
+                       fake_quota_reserve_conditional)
+        self.stubs.Set(db, 'quota_usage_resync', fake_quota_usage_resync)
+
+    def test_reserve(self):
+        self._stub_get_project_quotas()
+        self._stub_quota_reserve_conditional([])
+        result = self.driver.reserve(FakeContext('test_project', 'test_class'),
+                                     quota.QUOTAS.resources,
+                                     dict(volumes=2))
+
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=86400)
+        self.assertEqual(self.calls, [('quota_reserve_conditional',
+                                       'test_project', expire, 5), ])
+        self.assertEqual(result, ['resv-1'])
+
+    def test_reserve_resync(self):
+        self._stub_get_project_quotas()
+        self._stub_quota_reserve_conditional(['volumes'])
+        self.driver.reserve(FakeContext('test_project', 'test_class'),
+                            quota.QUOTAS.resources,
+                            dict(volumes=2, gigabytes=2))
+
+        self.assertEqual(self.calls[1:], [('quota_usage_resync',
+                                           'test_project', ['volumes'], 5), ])
+
+    def test_reserve_resync_later(self):
+        self.flags(quota_usage_resync_interval=60)
+        self._stub_get_project_quotas()
+        self._stub_quota_reserve_conditional(['volumes'])
+        self.stubs.Set(self.driver, '_resync_timer', 'running')
+        self.driver.reserve(FakeContext('test_project', 'test_class'),
+                            quota.QUOTAS.resources,
+                            dict(volumes=2))
+        self.driver.reserve(FakeContext('test_project', 'test_class'),
+                            quota.QUOTAS.resources,
+                            dict(gigabytes=2))
+        self.assertEqual(len(self.calls), 2)
+
+        self.driver.resync_usages()
+        self.assertEqual(self.calls[2:], [
+            ('quota_usage_resync', 'test_project', ['volumes'], 5), ])
+
 
 class FakeSession(object):
     def begin(self):
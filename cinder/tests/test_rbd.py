@@ -531,33 +531,184 @@ class RBDTestCase(test.TestCase):
                           driver.RBDVolumeProxy, self.driver, name)
 
     def test_connect_to_rados(self):
-        mock_client = self.mox.CreateMockAnything()
-        mock_ioctx = self.mox.CreateMockAnything()
-        self.stubs.Set(self.rados, 'Error', test.TestingException)
+        self.configuration.rbd_connection_pool_size = 1
+        self.configuration.rbd_connection_pool_max_idle = 0
+        rados = FakeRados()
+        self.driver.rados = rados
+
+        client, ioctx = self.driver._connect_to_rados()
+        self.assertEqual('rbd', ioctx.pool)
+        self.assertEqual((None, None), (client.rados_id, client.conffile))
+        self.driver._disconnect_from_rados(client, ioctx)
+
+        # The connection is reused for the other pools.
+        self.assertEqual(client, self.driver._connect_to_rados('images')[0])
+        self.assertEqual(['images', 'rbd'], sorted(client.ioctxs))
+        self.driver._disconnect_from_rados(client, ioctx, discard=True)
+        self.assertTrue(client.shut_down)
+        self.assertEqual(1, len(rados.clients))
+
+        self.stubs.Set(FakeRadosClient, 'open_ioctx', FakeRados.fail)
+        self.assertRaises(test.TestingException, self.driver._connect_to_rados)
+
+    def test_rados_client_discards_on_error(self):
+        self.configuration.rbd_connection_pool_size = 1
+        self.configuration.rbd_connection_pool_max_idle = 0
+        rados = FakeRados()
+        self.driver.rados = rados
+
+        with driver.RADOSClient(self.driver):
+            pass
+        try:
+            with driver.RADOSClient(self.driver):
+                raise test.TestingException()
+        except test.TestingException:
+            pass
+        with driver.RADOSClient(self.driver):
+            pass
 
-        # default configured pool
-        self.rados.Rados(rados_id=None, conffile=None).AndReturn(mock_client)
-        mock_client.connect()
-        mock_client.open_ioctx('rbd').AndReturn(mock_ioctx)
+        self.assertEqual(2, len(rados.clients))
+        self.assertTrue(rados.clients[0].shut_down)
+        self.assertFalse(rados.clients[1].shut_down)
 
-        # different pool
-        self.rados.Rados(rados_id=None, conffile=None).AndReturn(mock_client)
-        mock_client.connect()
-        mock_client.open_ioctx('images').AndReturn(mock_ioctx)
 
-        # error
-        self.rados.Rados(rados_id=None, conffile=None).AndReturn(mock_client)
-        mock_client.connect()
-        mock_client.open_ioctx('rbd').AndRaise(test.TestingException)
-        mock_client.shutdown()
+class FakeRadosIoctx(object):
+    def __init__(self, pool):
+        self.pool = pool
+        self.closed = False
 
-        self.mox.ReplayAll()
+    def close(self):
+        self.closed = True
 
-        self.assertEqual((mock_client, mock_ioctx),
-                         self.driver._connect_to_rados())
-        self.assertEqual((mock_client, mock_ioctx),
-                         self.driver._connect_to_rados('images'))
-        self.assertRaises(test.TestingException, self.driver._connect_to_rados)
+
+class FakeRadosClient(object):
+    def __init__(self, rados_id=None, conffile=None):
+        self.rados_id = rados_id
+        self.conffile = conffile
+        self.state = 'configuring'
+        self.shut_down = False
+        self.ioctxs = {}
+
+    def connect(self):
+        self.state = 'connected'
+
+    def get_fsid(self):
+        return 'fsid'
+
+    def open_ioctx(self, pool):
+        self.ioctxs[pool] = FakeRadosIoctx(pool)
+        return self.ioctxs[pool]
+
+    def shutdown(self):
+        self.state = 'shutdown'
+        self.shut_down = True
+
+
+class FakeRados(object):
+    Error = test.TestingException
+
+    def __init__(self):
+        self.clients = []
+
+    def Rados(self, **kwargs):
+        self.clients.append(FakeRadosClient(**kwargs))
+        return self.clients[-1]
+
+    @staticmethod
+    def fail(*args, **kwargs):
+        raise test.TestingException()
+
+
+class RADOSConnectionPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RADOSConnectionPoolTestCase, self).setUp()
+        self.rados = FakeRados()
+        self.pool = driver.RADOSConnectionPool(self.rados, 'user', 'conf',
+                                               'rbd', 2, 60)
+        timeutils.set_time_override()
+
+    def tearDown(self):
+        timeutils.clear_time_override()
+        super(RADOSConnectionPoolTestCase, self).tearDown()
+
+    def test_get_put(self):
+        client1, ioctx1 = self.pool.get()
+        client2, ioctx2 = self.pool.get('images')
+        client3, ioctx3 = self.pool.get()
+        self.assertEqual(3, len(self.rados.clients))
+        self.assertEqual(('rbd', 'images', 'rbd'),
+                         (ioctx1.pool, ioctx2.pool, ioctx3.pool))
+
+        for client in (client1, client2, client3):
+            self.pool.put(client)
+        # Only max_size idle clients are kept.
+        self.assertTrue(client3.shut_down)
+        self.assertTrue(ioctx3.closed)
+
+        # The idle clients are reused, with their ioctxs.
+        self.assertEqual((client2, ioctx2), self.pool.get('images'))
+        self.assertEqual(client1, self.pool.get('images')[0])
+        self.assertEqual(3, len(self.rados.clients))
+        self.assertEqual(ioctx1, client1.ioctxs['rbd'])
+        self.assertFalse(ioctx1.closed)
+
+    def test_discard(self):
+        client, ioctx = self.pool.get()
+        self.pool.put(client, discard=True)
+        self.assertTrue(client.shut_down)
+        self.assertTrue(ioctx.closed)
+        self.assertNotEqual(client, self.pool.get()[0])
+
+    def test_disconnected_client_not_reused(self):
+        client, _ioctx = self.pool.get()
+        self.pool.put(client)
+        client.state = 'shutdown'
+
+        self.assertNotEqual(client, self.pool.get()[0])
+        self.assertEqual(2, len(self.rados.clients))
+
+    def test_dead_client_not_reused(self):
+        client, _ioctx = self.pool.get()
+        self.pool.put(client)
+        # The connection broke while the client was idle.
+        self.stubs.Set(client, 'get_fsid', FakeRados.fail)
+
+        self.assertNotEqual(client, self.pool.get()[0])
+        self.assertTrue(client.shut_down)
+        self.assertEqual(2, len(self.rados.clients))
+
+    def test_idle_client_expired(self):
+        client1, _ioctx = self.pool.get()
+        client2, _ioctx = self.pool.get()
+        self.pool.put(client1)
+        timeutils.advance_time_seconds(50)
+        self.pool.put(client2)
+        timeutils.advance_time_seconds(20)
+
+        self.assertEqual(client2, self.pool.get()[0])
+        self.assertTrue(client1.shut_down)
+        self.assertFalse(client2.shut_down)
+        self.assertEqual([], self.pool._idle)
+
+    def test_connect_error(self):
+        self.stubs.Set(FakeRadosClient, 'connect', FakeRados.fail)
+        self.assertRaises(test.TestingException, self.pool.get)
+        self.assertTrue(self.rados.clients[0].shut_down)
+
+    def test_open_ioctx_error(self):
+        self.stubs.Set(FakeRadosClient, 'open_ioctx', FakeRados.fail)
+        self.assertRaises(test.TestingException, self.pool.get)
+        # The connection itself is fine and kept.
+        self.assertFalse(self.rados.clients[0].shut_down)
+        self.assertEqual([self.rados.clients[0]],
+                         [client for client, _released_at in self.pool._idle])
+
+    def test_no_pooling(self):
+        self.pool.max_size = 0
+        client, _ioctx = self.pool.get()
+        self.pool.put(client)
+        self.assertTrue(client.shut_down)
 
 
 class ManagedRBDTestCase(DriverTestCase):
@@ -21,6 +21,8 @@ Unit Tests for remote procedure calls using queue
 """
 
 
+import os
+
 import mox
 from oslo.config import cfg
 
@@ -210,6 +212,23 @@ class TestWSGIService(test.TestCase):
         self.assertNotEqual(0, test_service.port)
         test_service.stop()
 
+    def test_service_workers_share_socket(self):
+        self.flags(osapi_volume_listen='127.0.0.1',
+                   osapi_volume_listen_port=0,
+                   osapi_volume_workers=2)
+        test_service = service.WSGIService("osapi_volume")
+        self.assertEqual(2, test_service.workers)
+        self.assertNotEqual(0, test_service.port)
+        port = test_service.port
+        test_service.start()
+        self.assertEqual(port, test_service.port)
+        test_service.stop()
+
+    def test_service_invalid_workers(self):
+        self.flags(osapi_volume_workers=-1)
+        self.assertRaises(exception.InvalidInput,
+                          service.WSGIService, "osapi_volume")
+
     def test_service_with_min_down_time(self):
         CONF.set_override('service_down_time', 10)
         CONF.set_override('report_interval', 10)
@@ -230,3 +249,28 @@ class TestLauncher(test.TestCase):
         launcher.launch_server(self.service)
         self.assertEqual(0, self.service.port)
         launcher.stop()
+
+
+class TestProcessLauncher(test.TestCase):
+
+    def setUp(self):
+        super(TestProcessLauncher, self).setUp()
+        self.stubs.Set(service.signal, 'signal', lambda *args: None)
+        self.launcher = service.ProcessLauncher()
+        self.addCleanup(self.launcher.readpipe.close)
+        self.addCleanup(os.close, self.launcher.writepipe)
+
+    def test_start_child_disposes_engine(self):
+        calls = []
+        self.stubs.Set(db, 'dispose_engine',
+                       lambda: calls.append('dispose_engine'))
+
+        def fake_fork():
+            calls.append('fork')
+            return 42
+
+        self.stubs.Set(service.os, 'fork', fake_fork)
+        wrap = service.ServerWrapper(None, 2)
+        self.assertEqual(42, self.launcher._start_child(wrap))
+        self.assertEqual(['dispose_engine', 'fork'], calls)
+        self.assertEqual(set([42]), wrap.children)
@@ -0,0 +1,166 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the service group drivers."""
+
+import datetime
+
+from cinder.openstack.common import timeutils
+from cinder import servicegroup
+from cinder.servicegroup import db_driver
+from cinder.servicegroup import mc_driver
+from cinder import test
+from cinder import utils
+
+
+class FakeService(object):
+    def __init__(self, report_interval=10):
+        self.report_interval = report_interval
+        self.reports = 0
+
+    def report_state(self):
+        self.reports += 1
+
+
+class FakeLoopingCall(object):
+    def __init__(self, f=None, *args, **kw):
+        self.f = f
+        self.interval = None
+        self.running = False
+
+    def start(self, interval, initial_delay=None):
+        self.interval = interval
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def wait(self):
+        pass
+
+
+class ServiceGroupAPITestCase(test.TestCase):
+
+    def setUp(self):
+        super(ServiceGroupAPITestCase, self).setUp()
+        self.stubs.Set(servicegroup, '_DRIVERS', {})
+
+    def test_default_driver(self):
+        self.assertIsInstance(servicegroup.API(), db_driver.DbDriver)
+
+    def test_driver_shared(self):
+        self.flags(servicegroup_driver='cinder.servicegroup.mc_driver.'
+                                       'MemcachedDriver')
+        api = servicegroup.API()
+        self.assertIsInstance(api, mc_driver.MemcachedDriver)
+        self.assertIs(api, servicegroup.API())
+
+
+class DbDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DbDriverTestCase, self).setUp()
+        self.stubs.Set(utils, 'LoopingCall', FakeLoopingCall)
+        self.driver = db_driver.DbDriver()
+
+    def test_join(self):
+        service = FakeService()
+        pulse = self.driver.join('host1', 'cinder-volume', service)
+        self.assertEqual(service.report_state, pulse.f)
+        self.assertEqual(10, pulse.interval)
+
+    def test_join_without_report_interval(self):
+        service = FakeService(report_interval=0)
+        self.assertIsNone(self.driver.join('host1', 'cinder-volume',
+                                           service))
+
+    def test_service_is_up(self):
+        self.flags(service_down_time=60)
+        now = timeutils.utcnow()
+        service = {'updated_at': now - datetime.timedelta(seconds=30),
+                   'created_at': now - datetime.timedelta(days=1)}
+        self.assertTrue(self.driver.service_is_up(service))
+        service['updated_at'] = now - datetime.timedelta(seconds=90)
+        self.assertFalse(self.driver.service_is_up(service))
+
+
+class MemcachedDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(MemcachedDriverTestCase, self).setUp()
+        self.flags(service_down_time=60)
+        self.stubs.Set(utils, 'LoopingCall', FakeLoopingCall)
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        self.driver = mc_driver.MemcachedDriver()
+
+    def _member(self, host):
+        return {'host': host, 'topic': 'cinder-volume',
+                'updated_at': None, 'created_at': None}
+
+    def test_join_reports_at_once(self):
+        self.assertFalse(self.driver.service_is_up(self._member('host1')))
+        self.driver.join('host1', 'cinder-volume', FakeService())
+        self.assertTrue(self.driver.service_is_up(self._member('host1')))
+        self.assertFalse(self.driver.service_is_up(self._member('host2')))
+
+    def test_heartbeats_expire(self):
+        self.driver.join('host1', 'cinder-volume', FakeService())
+        timeutils.advance_time_seconds(61)
+        self.assertFalse(self.driver.service_is_up(self._member('host1')))
+
+    def test_one_pulse_reports_all(self):
+        membership1 = self.driver.join('host1', 'cinder-volume',
+                                       FakeService())
+        pulse = self.driver._pulse
+        self.driver.join('host2', 'cinder-volume', FakeService())
+        self.assertIs(pulse, self.driver._pulse)
+        self.assertTrue(pulse.running)
+
+        timeutils.advance_time_seconds(50)
+        pulse.f()
+        timeutils.advance_time_seconds(50)
+        self.assertTrue(self.driver.service_is_up(self._member('host1')))
+        self.assertTrue(self.driver.service_is_up(self._member('host2')))
+
+        membership1.stop()
+        self.assertTrue(pulse.running)
+        pulse.f()
+        timeutils.advance_time_seconds(50)
+        self.assertFalse(self.driver.service_is_up(self._member('host1')))
+        self.assertTrue(self.driver.service_is_up(self._member('host2')))
+
+    def test_pulse_stops_with_last_member(self):
+        membership = self.driver.join('host1', 'cinder-volume',
+                                      FakeService())
+        pulse = self.driver._pulse
+        membership.stop()
+        self.assertFalse(pulse.running)
+        self.assertIsNone(self.driver._pulse)
+
+    def test_join_without_report_interval(self):
+        service = FakeService(report_interval=0)
+        self.assertIsNone(self.driver.join('host1', 'cinder-volume',
+                                           service))
+        self.assertFalse(self.driver.service_is_up(self._member('host1')))
+
+    def test_report_failure_keeps_pulse(self):
+        self.driver.join('host1', 'cinder-volume', FakeService())
+
+        def fake_set(*args, **kwargs):
+            raise Exception('memcached went away')
+
+        self.stubs.Set(self.driver.mc, 'set', fake_set)
+        self.driver._report_all()
+        self.assertTrue(self.driver._pulse.running)
@@ -20,6 +20,7 @@ Tests for Volume Code.
 
 """
 
+import __builtin__
 import datetime
 import mock
 import os
@@ -41,6 +42,7 @@ from cinder import exception
 from cinder.image import image_utils
 from cinder import keymgr
 from cinder.openstack.common import fileutils
+from cinder.openstack.common import gettextutils
 from cinder.openstack.common import importutils
 from cinder.openstack.common.notifier import api as notifier_api
 from cinder.openstack.common.notifier import test_notifier
@@ -145,6 +147,86 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.assertEqual(volume['status'], "error")
         self.volume.delete_volume(self.context, volume_id)
 
+    def _init_host_with_volumes(self, count):
+        volume_ids = [tests_utils.create_volume(self.context,
+                                                status='available',
+                                                size=0, host=CONF.host)['id']
+                      for _i in range(count)]
+        service = db.service_create(self.context,
+                                    {'host': CONF.host,
+                                     'binary': 'cinder-volume',
+                                     'topic': CONF.volume_topic})
+        progress = []
+
+        def fake_service_update(context, service_id, values):
+            self.assertEqual(service['id'], service_id)
+            progress.append(values['startup_progress'])
+
+        self.stubs.Set(db, 'service_update', fake_service_update)
+        self.volume.driver._initialized = False
+        self.volume.init_host()
+        return volume_ids, progress
+
+    def _no_ensure_exports(self, context, volumes):
+        raise NotImplementedError()
+
+    def test_init_host_ensure_export(self):
+        """Test that init_host recreates the exports one by one."""
+        self.flags(volume_service_inithost_export_workers=2)
+        exported = []
+
+        def fake_ensure_export(context, volume):
+            exported.append(volume['id'])
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       self._no_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export',
+                       fake_ensure_export)
+        volume_ids, progress = self._init_host_with_volumes(3)
+
+        self.assertEqual(sorted(volume_ids), sorted(exported))
+        self.assertEqual(['0/3', '1/3', '2/3', '3/3', None], progress)
+        self.assertTrue(self.volume.driver.initialized)
+
+    def test_init_host_ensure_exports(self):
+        """Test that init_host recreates the exports in one batch."""
+        exported = []
+
+        def fake_ensure_exports(context, volumes):
+            exported.append([volume['id'] for volume in volumes])
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export', None)
+        volume_ids, progress = self._init_host_with_volumes(2)
+
+        self.assertEqual([sorted(volume_ids)], map(sorted, exported))
+        self.assertEqual(['0/2', None], progress)
+        self.assertTrue(self.volume.driver.initialized)
+
+    def test_init_host_ensure_exports_lazy_gettext(self):
+        """Test that init_host logs with lazy translation enabled."""
+        self.stubs.Set(__builtin__, '_',
+                       lambda msg: gettextutils.Message(msg, 'cinder'))
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       lambda context, volumes: None)
+        self._init_host_with_volumes(1)
+        self.assertTrue(self.volume.driver.initialized)
+
+    def test_init_host_ensure_export_fails(self):
+        """Test that the driver is not initialized if an export fails."""
+        def fake_ensure_export(context, volume):
+            raise exception.VolumeBackendAPIException(data='fake')
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       self._no_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export',
+                       fake_ensure_export)
+        _volume_ids, progress = self._init_host_with_volumes(2)
+
+        self.assertEqual(['0/2', None], progress)
+        self.assertFalse(self.volume.driver.initialized)
+
     def test_create_delete_volume(self):
         """Test volume can be created and deleted."""
         # Need to stub out reserve, commit, and rollback
@@ -2352,6 +2434,38 @@ class LVMISCSIVolumeDriverTestCase(DriverTestCase):
         self.output = 'x'
         self.volume.driver.delete_volume({'name': 'test1', 'size': 1024})
 
+    def test_ensure_exports(self):
+        """Test that the exports are reconciled in one batch."""
+        reconciled = []
+
+        def fake_get_iscsi_target_num(context, volume_id):
+            if volume_id == 'no-target':
+                raise exception.ISCSITargetNotFoundForVolume(
+                    volume_id=volume_id)
+            return 7
+
+        def fake_reconcile(targets, remove_prefix=None, **kwargs):
+            reconciled.append((targets, remove_prefix))
+
+        self.stubs.Set(db, 'volume_get_iscsi_target_num',
+                       fake_get_iscsi_target_num)
+        self.stubs.Set(self.volume.driver.tgtadm, 'reconcile_iscsi_targets',
+                       fake_reconcile)
+        volumes = [{'id': 'fake-id', 'name': 'volume-fake-id',
+                    'provider_location': 'iqn:volume-fake-id 0',
+                    'status': 'available'},
+                   {'id': 'no-target', 'name': 'volume-no-target',
+                    'provider_location': None, 'status': 'available'}]
+        self.volume.driver.ensure_exports(self.context, volumes)
+
+        prefix = CONF.iscsi_target_prefix
+        self.assertEqual([([{'name': prefix + 'volume-fake-id',
+                             'tid': 7, 'lun': 0,
+                             'path': '/dev/%s/volume-fake-id' %
+                                     CONF.volume_group,
+                             'chap_auth': None,
+                             'old_name': None}], None)], reconciled)
+
     def test_lvm_migrate_volume_no_loc_info(self):
         host = {'capabilities': {}}
         vol = {'name': 'test', 'id': 1, 'size': 1, 'status': 'available'}
@@ -2415,7 +2529,8 @@ class LVMISCSIVolumeDriverTestCase(DriverTestCase):
         self.stubs.Set(self.volume.driver, '_execute', fake_execute)
 
         self.stubs.Set(volutils, 'copy_volume',
-                       lambda x, y, z, sync=False, execute='foo': None)
+                       lambda x, y, z, sync=False, execute='foo',
+                       sparse=False: None)
 
         self.stubs.Set(volutils, 'get_all_volume_groups',
                        get_all_volume_groups)
@@ -2455,11 +2570,13 @@ class LVMVolumeDriverTestCase(DriverTestCase):
 
         os.path.exists(mox.IgnoreArg()).AndReturn(True)
         volutils.copy_volume('/dev/zero', mox.IgnoreArg(), 123 * 1024,
-                             execute=lvm_driver._execute, sync=True)
+                             execute=lvm_driver._execute, sync=True,
+                             ionice=None, rate=0)
 
         os.path.exists(mox.IgnoreArg()).AndReturn(True)
         volutils.copy_volume('/dev/zero', mox.IgnoreArg(), 123 * 1024,
-                             execute=lvm_driver._execute, sync=True)
+                             execute=lvm_driver._execute, sync=True,
+                             ionice=None, rate=0)
 
         os.path.exists(mox.IgnoreArg()).AndReturn(True)
 
@@ -2545,6 +2662,87 @@ class LVMVolumeDriverTestCase(DriverTestCase):
 
         lvm_driver.clear_volume(fake_snapshot, is_snapshot=True)
 
+    def test_clear_volume_ionice_bps_limit(self):
+        self.stubs.Set(os.path, 'exists', lambda x: True)
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.volume_clear_size = 0
+        configuration.volume_clear_ionice = '-c3'
+        configuration.volume_clear_bps_limit = 1024
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration)
+        copies = []
+
+        def fake_copy_volume(srcstr, deststr, size, **kwargs):
+            copies.append((srcstr, size, kwargs['ionice'], kwargs['rate']))
+
+        self.stubs.Set(volutils, 'copy_volume', fake_copy_volume)
+
+        lvm_driver.clear_volume({'name': 'test1', 'id': 'test1', 'size': 2})
+        self.assertEqual(copies, [('/dev/zero', 2 * 1024, '-c3', 1024)])
+
+    def test_delete_volume_background_wipe(self):
+        self.stubs.Set(os.path, 'exists', lambda x: True)
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.volume_clear_size = 0
+        configuration.volume_clear_workers = 1
+        vg = FakeBrickLVM('cinder-volumes', False, None, 'default')
+        lvm_driver = lvm.LVMVolumeDriver(vg_obj=vg,
+                                         configuration=configuration)
+        calls = []
+        self.stubs.Set(vg, 'rename_volume',
+                       lambda name, new_name: calls.append(('rename', name,
+                                                            new_name)))
+        self.stubs.Set(vg, 'delete', lambda name: calls.append(('delete',
+                                                                name)))
+        self.stubs.Set(lvm_driver, '_clear_device',
+                       lambda path, size: calls.append(('clear', path,
+                                                        size)))
+
+        lvm_driver.delete_volume({'name': 'test1', 'id': 'test1',
+                                  'size': 2})
+        # The volume is only renamed before delete_volume returns.
+        self.assertEqual(calls, [('rename', 'test1', 'wipe-test1')])
+
+        lvm_driver._wipe_pool.waitall()
+        self.assertEqual(calls,
+                         [('rename', 'test1', 'wipe-test1'),
+                          ('clear', '/dev/mapper/cinder--volumes-wipe--test1',
+                           2 * 1024),
+                          ('delete', 'wipe-test1')])
+
+    def test_resume_wipes(self):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.volume_clear_size = 0
+        vg = FakeBrickLVM('cinder-volumes', False, None, 'default')
+        lvm_driver = lvm.LVMVolumeDriver(vg_obj=vg,
+                                         configuration=configuration)
+        calls = []
+        self.stubs.Set(os.path, 'exists', lambda x: False)
+        self.stubs.Set(vg, 'get_volumes',
+                       lambda: [{'name': 'volume-1', 'size': '1.00'},
+                                {'name': 'wipe-volume-2', 'size': '1.00'}])
+        self.stubs.Set(vg, 'delete', lambda name: calls.append(('delete',
+                                                                name)))
+        self.stubs.Set(lvm_driver, '_clear_device',
+                       lambda path, size: calls.append(('clear', path,
+                                                        size)))
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd)
+            return str(units.GiB + 5), ''
+
+        lvm_driver.set_execute(fake_execute)
+
+        lvm_driver._resume_wipes()
+        lvm_driver._wipe_pool.waitall()
+        dev_path = '/dev/mapper/cinder--volumes-wipe--volume--2'
+        self.assertEqual(calls,
+                         [('blockdev', '--getsize64', dev_path),
+                          ('clear', dev_path, 1024),
+                          ('delete', 'wipe-volume-2')])
+
 
 class ISCSITestCase(DriverTestCase):
     """Test Case for ISCSIDriver"""
@@ -88,6 +88,33 @@ class VolumeGlanceMetadataTestCase(test.TestCase):
         for key, value in expected_metadata_1.items():
             self.assertEqual(metadata[0][key], value)
 
+    def test_vol_glance_metadata_list_get(self):
+        ctxt = context.get_admin_context()
+        for volume_id in (1, 2, 3):
+            db.volume_create(ctxt, {'id': volume_id})
+            db.volume_glance_metadata_create(ctxt, volume_id, 'key1',
+                                             'value%d' % volume_id)
+        db.volume_glance_metadata_create(ctxt, 2, 'key2', 'value')
+
+        metadata = db.volume_glance_metadata_list_get(ctxt, ['1', '2'])
+        self.assertEqual([('1', 'key1', 'value1'),
+                          ('2', 'key1', 'value2'),
+                          ('2', 'key2', 'value')],
+                         sorted((meta['volume_id'], meta['key'],
+                                 meta['value']) for meta in metadata))
+        self.assertEqual([], db.volume_glance_metadata_list_get(ctxt, ['4']))
+
+    def test_vol_glance_metadata_list_get_non_admin(self):
+        ctxt = context.get_admin_context()
+        db.volume_create(ctxt, {'id': '1', 'project_id': 'project1'})
+        db.volume_glance_metadata_create(ctxt, '1', 'key1', 'value1')
+
+        user_ctxt = context.RequestContext('user1', 'project1')
+        metadata = db.volume_glance_metadata_list_get(user_ctxt, ['1'])
+        self.assertEqual([('1', 'key1', 'value1')],
+                         [(meta['volume_id'], meta['key'], meta['value'])
+                          for meta in metadata])
+
     def test_vols_get_glance_metadata(self):
         ctxt = context.get_admin_context()
         db.volume_create(ctxt, {'id': '1'})
@@ -18,6 +18,9 @@
 """Tests For miscellaneous util methods used with volume."""
 
 
+import contextlib
+import os
+
 from oslo.config import cfg
 
 from cinder import context
@@ -26,7 +29,10 @@ from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common.notifier import api as notifier_api
 from cinder.openstack.common.notifier import test_notifier
+from cinder.openstack.common import processutils
+from cinder.openstack.common.rootwrap import wrapper
 from cinder import test
+from cinder import units
 from cinder.volume import utils as volume_utils
 
 
@@ -155,3 +161,189 @@ class LVMVolumeDriverTestCase(test.TestCase):
         bs, count = volume_utils._calculate_count(1024)
         self.assertEqual(bs, '1M')
         self.assertEqual(count, 1024)
+
+    def test_copy_volume_dd(self):
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd)
+
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 2,
+                                 execute=fake_execute, sparse=True)
+        self.assertEqual(calls[-1],
+                         ('dd', 'if=/dev/src', 'of=/dev/dest', 'count=2',
+                          'bs=1M', 'iflag=direct', 'oflag=direct',
+                          'conv=sparse'))
+
+    def test_copy_volume_dd_sparse_unsupported(self):
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            if 'count=0' in cmd and 'conv=sparse' in cmd:
+                raise processutils.ProcessExecutionError()
+            calls.append(cmd)
+
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 2,
+                                 execute=fake_execute, sparse=True)
+        self.assertEqual(calls[-1],
+                         ('dd', 'if=/dev/src', 'of=/dev/dest', 'count=2',
+                          'bs=1M', 'iflag=direct', 'oflag=direct'))
+
+    def test_copy_volume_native(self):
+        self.flags(volume_copy_method='native', volume_copy_bps_limit=10)
+        copies = []
+
+        class FakeBlockCopier(object):
+            def __init__(self, blocksize, sparse, rate, progress_cb):
+                copies.append((blocksize, sparse, rate, progress_cb))
+
+            def copy(self, src, dest, size):
+                copies.append((src, dest, size))
+
+        chowns = []
+
+        @contextlib.contextmanager
+        def fake_temporary_chown(path):
+            chowns.append(path)
+            yield
+
+        self.stubs.Set(volume_utils.blockcopy, 'BlockCopier', FakeBlockCopier)
+        self.stubs.Set(volume_utils.utils, 'temporary_chown',
+                       fake_temporary_chown)
+
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 2, sparse=True,
+                                 progress_cb=len)
+        volume_utils.copy_volume('/dev/zero', '/dev/dest', 2)
+        self.assertEqual(copies,
+                         [(units.MiB, True, 10, len),
+                          ('/dev/src', '/dev/dest', 2 * units.MiB),
+                          (units.MiB, False, 10, None),
+                          (None, '/dev/dest', 2 * units.MiB)])
+        self.assertEqual(chowns, ['/dev/src', '/dev/dest', '/dev/dest'])
+
+    def test_copy_volume_dd_rate_limited(self):
+        calls = []
+        sleeps = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd)
+
+        self.stubs.Set(volume_utils, 'DD_CHUNK_SECONDS', 2)
+        self.stubs.Set(volume_utils.eventlet, 'sleep', sleeps.append)
+
+        volume_utils.copy_volume('/dev/zero', '/dev/dest', 5,
+                                 execute=fake_execute, ionice='-c3',
+                                 rate=units.MiB)
+        dd = ('ionice', '-c3', 'dd', 'if=/dev/zero', 'of=/dev/dest')
+        flags = ('iflag=direct', 'oflag=direct')
+        self.assertEqual(calls[1:],
+                         [dd + ('count=2', 'bs=1M', 'skip=0', 'seek=0') +
+                          flags,
+                          dd + ('count=2', 'bs=1M', 'skip=2', 'seek=2') +
+                          flags,
+                          dd + ('count=1', 'bs=1M', 'skip=4', 'seek=4') +
+                          flags])
+        self.assertEqual(len(sleeps), 3)
+
+    def test_clear_volume_offload(self):
+        self.stubs.Set(volume_utils, '_zero_offload_ioctl',
+                       lambda path: volume_utils.BLKZEROOUT)
+        offloads = []
+        self.stubs.Set(volume_utils, '_zero_offload',
+                       lambda *args: offloads.append(args))
+        self.stubs.Set(volume_utils, 'copy_volume', self.fail)
+
+        volume_utils.clear_volume(1024, '/dev/dest', 'zero',
+                                  volume_clear_size=10)
+        self.assertEqual(offloads,
+                         [('/dev/dest', volume_utils.BLKZEROOUT,
+                           10 * units.MiB)])
+
+    def test_clear_volume_offload_fails(self):
+        self.stubs.Set(volume_utils, '_zero_offload_ioctl',
+                       lambda path: volume_utils.BLKDISCARD)
+
+        def fake_zero_offload(path, request, length):
+            raise IOError(95, 'Operation not supported')
+
+        copies = []
+
+        def fake_copy_volume(srcstr, deststr, size_in_m, **kwargs):
+            copies.append((srcstr, deststr, size_in_m, kwargs))
+
+        self.stubs.Set(volume_utils, '_zero_offload', fake_zero_offload)
+        self.stubs.Set(volume_utils, 'copy_volume', fake_copy_volume)
+
+        volume_utils.clear_volume(1024, '/dev/dest', 'zero',
+                                  volume_clear_ionice='-c3',
+                                  volume_clear_bps_limit=units.MiB,
+                                  execute=len)
+        self.assertEqual(copies,
+                         [('/dev/zero', '/dev/dest', 1024,
+                           {'sync': True, 'execute': len, 'ionice': '-c3',
+                            'rate': units.MiB})])
+
+    def test_clear_volume_shred(self):
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd)
+
+        volume_utils.clear_volume(1024, '/dev/dest', 'shred',
+                                  volume_clear_size=1,
+                                  volume_clear_ionice='-c3',
+                                  execute=fake_execute)
+        self.assertEqual(calls, [('ionice', '-c3', 'shred', '-n3', '-s1MiB',
+                                  '/dev/dest')])
+
+    def test_ionice_rootwrap_filters(self):
+        filters = wrapper.load_filters([os.path.join(
+            os.path.dirname(__file__), '..', '..', 'etc', 'cinder',
+            'rootwrap.d')])
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd)
+
+        def fake_execute_no_direct(*cmd, **kwargs):
+            if 'count=0' in cmd:
+                raise processutils.ProcessExecutionError()
+            calls.append(cmd)
+
+        self.stubs.Set(volume_utils, 'DD_CHUNK_SECONDS', 2)
+        self.stubs.Set(volume_utils.eventlet, 'sleep', lambda delay: None)
+        for execute in (fake_execute, fake_execute_no_direct):
+            for rate in (0, units.MiB):
+                volume_utils.copy_volume('/dev/zero', '/dev/vg/volume-1', 5,
+                                         sync=True, execute=execute,
+                                         ionice='-c3', rate=rate)
+        for clear_size in (0, 1):
+            volume_utils.clear_volume(1024, '/dev/vg/volume-1', 'shred',
+                                      volume_clear_size=clear_size,
+                                      volume_clear_ionice='-n7',
+                                      execute=fake_execute)
+
+        ionice_calls = [cmd for cmd in calls if cmd[0] == 'ionice']
+        self.assertEqual(10, len(ionice_calls))
+        for cmd in ionice_calls:
+            self.assertTrue([f for f in filters if f.match(list(cmd))],
+                            cmd)
+
+        for cmd in (['ionice', '-c3', 'sh', '-c', 'id'],
+                    ['ionice', '-c3', 'dd', 'if=/etc/shadow', 'of=/dev/sdb',
+                     'count=1', 'bs=1M', 'conv=fdatasync'],
+                    ['ionice', '-c3', 'shred', '-n3', '/dev/../etc/passwd'],
+                    ['ionice', '-c3 -t', 'shred', '-n3', '/dev/sdb']):
+            self.assertFalse([f for f in filters if f.match(cmd)], cmd)
+
+    def test_zero_offload_ioctl(self):
+        limits = {}
+        self.stubs.Set(volume_utils, '_queue_limit',
+                       lambda path, name: limits.get(name, 0))
+        self.assertIsNone(volume_utils._zero_offload_ioctl('/dev/dest'))
+        limits['write_same_max_bytes'] = 33553920
+        self.assertEqual(volume_utils._zero_offload_ioctl('/dev/dest'),
+                         volume_utils.BLKZEROOUT)
+        limits['discard_zeroes_data'] = 1
+        self.assertEqual(volume_utils._zero_offload_ioctl('/dev/dest'),
+                         volume_utils.BLKDISCARD)
@@ -109,6 +109,22 @@ class TestWSGIServer(test.TestCase):
         server.stop()
         server.wait()
 
+    def test_start_listening_socket(self):
+        server = cinder.wsgi.Server("test_listen", None, host="127.0.0.1")
+        server.listen()
+        port = server.port
+        self.assertNotEqual(0, port)
+        self.mox.StubOutWithMock(server, '_get_socket')
+        self.mox.ReplayAll()
+        server.start()
+        self.assertEqual(port, server.port)
+        server.stop()
+        server.wait()
+
+    def test_listen_invalid_backlog(self):
+        server = cinder.wsgi.Server("test_listen", None, host="127.0.0.1")
+        self.assertRaises(exception.InvalidInput, server.listen, backlog=0)
+
     @testtools.skipIf(not _ipv6_configured(),
                       "Test requires an IPV6 configured interface")
     def test_start_random_port_with_ipv6(self):
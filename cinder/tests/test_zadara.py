@@ -94,6 +94,7 @@ class FakeRequest(object):
         self.url = url
         self.body = body
         self.status = RUNTIME_VARS['status']
+        self.will_close = False
 
     def read(self):
         ops = {'POST': [('/api/users/login.xml', self._login),
@@ -455,7 +456,7 @@ class FakeHTTPConnection(object):
         self.use_ssl = use_ssl
         self.req = None
 
-    def request(self, method, url, body):
+    def request(self, method, url, body, headers=None):
         LOG.debug('Enter: request')
         self.req = FakeRequest(method, url, body)
 
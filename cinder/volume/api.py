@@ -37,6 +37,7 @@ from cinder.openstack.common import timeutils
 import cinder.policy
 from cinder import quota
 from cinder.scheduler import rpcapi as scheduler_rpcapi
+from cinder import servicegroup
 from cinder import utils
 from cinder.volume.flows import create_volume
 from cinder.volume import rpcapi as volume_rpcapi
@@ -86,6 +87,20 @@ def check_policy(context, action, target_obj=None):
     cinder.policy.enforce(context, _action, target)
 
 
+def _check_limit(limit):
+    """Returns limit as an integer, or None if it is None."""
+    try:
+        if limit is not None:
+            limit = int(limit)
+            if limit < 0:
+                msg = _('limit param must be positive')
+                raise exception.InvalidInput(reason=msg)
+    except ValueError:
+        msg = _('limit param must be an integer')
+        raise exception.InvalidInput(reason=msg)
+    return limit
+
+
 class API(base.Base):
     """API for interacting with the volume manager."""
 
@@ -96,6 +111,7 @@ class API(base.Base):
         self.volume_rpcapi = volume_rpcapi.VolumeAPI()
         self.availability_zone_names = ()
         self.key_manager = keymgr.API()
+        self.servicegroup_api = servicegroup.API()
         super(API, self).__init__(db_driver)
 
     def _valid_availability_zone(self, availability_zone):
@@ -254,26 +270,12 @@ class API(base.Base):
                 sort_dir='desc', filters={}):
         check_policy(context, 'get_all')
 
-        try:
-            if limit is not None:
-                limit = int(limit)
-                if limit < 0:
-                    msg = _('limit param must be positive')
-                    raise exception.InvalidInput(reason=msg)
-        except ValueError:
-            msg = _('limit param must be an integer')
-            raise exception.InvalidInput(reason=msg)
+        limit = _check_limit(limit)
 
-        if (context.is_admin and 'all_tenants' in filters):
-            # Need to remove all_tenants to pass the filtering below.
-            del filters['all_tenants']
-            volumes = self.db.volume_get_all(context, marker, limit, sort_key,
-                                             sort_dir)
-        else:
-            volumes = self.db.volume_get_all_by_project(context,
-                                                        context.project_id,
-                                                        marker, limit,
-                                                        sort_key, sort_dir)
+        # The filters are applied by the database, so that pages are full.
+        filters = dict(filters or {})
+        all_tenants = (context.is_admin and
+                       filters.pop('all_tenants', None) is not None)
 
         # Non-admin shouldn't see temporary target of a volume migration
         if not context.is_admin:
@@ -283,48 +285,15 @@ class API(base.Base):
         if filters:
             LOG.debug(_("Searching by: %s") % str(filters))
 
-            def _check_metadata_match(volume, searchdict):
-                volume_metadata = {}
-                for i in volume.get('volume_metadata'):
-                    volume_metadata[i['key']] = i['value']
-
-                for k, v in searchdict.iteritems():
-                    if (k not in volume_metadata.keys() or
-                            volume_metadata[k] != v):
-                        return False
-                return True
-
-            def _check_migration_target(volume, searchdict):
-                status = volume['migration_status']
-                if status and status.startswith('target:'):
-                    return False
-                return True
-
-            def _check_secondary(volume, searchdict):
-                if volume['status'].startswith('replica_'):
-                    return False
-                return True
-
-            # search_option to filter_name mapping.
-            filter_mapping = {'metadata': _check_metadata_match,
-                              'no_migration_targets': _check_migration_target,
-                              'no_secondary_replicas': _check_secondary}
-
-            result = []
-            not_found = object()
-            for volume in volumes:
-                # go over all filters in the list
-                for opt, values in filters.iteritems():
-                    try:
-                        filter_func = filter_mapping[opt]
-                    except KeyError:
-                        def filter_func(volume, value):
-                            return volume.get(opt, not_found) == value
-                    if not filter_func(volume, values):
-                        break  # volume doesn't match this filter
-                else:  # did not break out loop
-                    result.append(volume)  # volume matches all filters
-            volumes = result
+        if all_tenants:
+            volumes = self.db.volume_get_all(context, marker, limit, sort_key,
+                                             sort_dir, filters=filters)
+        else:
+            volumes = self.db.volume_get_all_by_project(context,
+                                                        context.project_id,
+                                                        marker, limit,
+                                                        sort_key, sort_dir,
+                                                        filters=filters)
 
         return volumes
 
@@ -338,31 +307,29 @@ class API(base.Base):
         rv = self.db.volume_get(context, volume_id)
         return dict(rv.iteritems())
 
-    def get_all_snapshots(self, context, search_opts=None):
+    def get_all_snapshots(self, context, search_opts=None, marker=None,
+                          limit=None, sort_key='created_at', sort_dir='desc'):
         check_policy(context, 'get_all_snapshots')
 
-        search_opts = search_opts or {}
+        limit = _check_limit(limit)
+
+        # The filters are applied by the database, so that pages are full.
+        filters = dict(search_opts or {})
+        all_tenants = (context.is_admin and
+                       filters.pop('all_tenants', None) is not None)
 
-        if (context.is_admin and 'all_tenants' in search_opts):
-            # Need to remove all_tenants to pass the filtering below.
-            del search_opts['all_tenants']
-            snapshots = self.db.snapshot_get_all(context)
+        if filters:
+            LOG.debug(_("Searching by: %s") % str(filters))
+
+        if all_tenants:
+            snapshots = self.db.snapshot_get_all(context, marker, limit,
+                                                 sort_key, sort_dir,
+                                                 filters=filters)
         else:
             snapshots = self.db.snapshot_get_all_by_project(
-                context, context.project_id)
-
-        if search_opts:
-            LOG.debug(_("Searching by: %s") % str(search_opts))
-
-            results = []
-            not_found = object()
-            for snapshot in snapshots:
-                for opt, value in search_opts.iteritems():
-                    if snapshot.get(opt, not_found) != value:
-                        break
-                else:
-                    results.append(snapshot)
-            snapshots = results
+                context, context.project_id, marker, limit, sort_key,
+                sort_dir, filters=filters)
+
         return snapshots
 
     @wrap_check_policy
@@ -717,6 +684,18 @@ class API(base.Base):
                                                      meta_entry['value']})
         return results
 
+    def get_list_volumes_image_metadata(self, context, volume_id_list):
+        check_policy(context, 'get_volumes_image_metadata')
+        results = collections.defaultdict(dict)
+        if not volume_id_list:
+            return results
+        db_data = self.db.volume_glance_metadata_list_get(context,
+                                                          volume_id_list)
+        for meta_entry in db_data:
+            results[meta_entry['volume_id']].update({meta_entry['key']:
+                                                     meta_entry['value']})
+        return results
+
     @wrap_check_policy
     def get_volume_image_metadata(self, context, volume):
         db_data = self.db.volume_glance_metadata_get(context, volume['id'])
@@ -801,7 +780,8 @@ class API(base.Base):
         services = self.db.service_get_all_by_topic(elevated, topic)
         found = False
         for service in services:
-            if utils.service_is_up(service) and service['host'] == host:
+            if (self.servicegroup_api.service_is_up(service) and
+                    service['host'] == host):
                 found = True
         if not found:
             msg = (_('No available service named %s') % host)
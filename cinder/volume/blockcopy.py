@@ -0,0 +1,180 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process block copy engine for volume data.
+
+BlockCopier copies data between block devices or files using O_DIRECT
+where the device supports it, through a page aligned buffer.  Compared to
+dd it can skip writing zero blocks to destinations that are known to read
+back zeros, limit its transfer rate and report its progress.
+
+Reads and writes are done in native threads, one block at a time, so that
+other green threads keep running during long copies.
+"""
+
+import ctypes
+import errno
+import fcntl
+import io
+import mmap
+import os
+import stat
+import time
+
+import eventlet
+from eventlet import tpool
+
+from cinder.openstack.common import log as logging
+from cinder import units
+
+
+LOG = logging.getLogger(__name__)
+
+# O_DIRECT transfers must be aligned to the logical block size of the device.
+SECTOR_SIZE = 512
+
+# Seconds between progress reports.
+PROGRESS_INTERVAL = 10
+
+
+def _align(length):
+    return (length + SECTOR_SIZE - 1) // SECTOR_SIZE * SECTOR_SIZE
+
+
+class BlockCopier(object):
+    """Copies volume data with large aligned blocks.
+
+    :param blocksize: size in bytes of the blocks read and written
+    :param sparse: skip writing zero blocks, only use this if the
+                   destination reads back zeros where it is not written
+    :param rate: maximum transfer rate in bytes/sec, 0 for no limit
+    :param progress_cb: called with the bytes copied and the total bytes
+                        every PROGRESS_INTERVAL seconds and at the end
+    """
+
+    def __init__(self, blocksize=units.MiB, sparse=False, rate=0,
+                 progress_cb=None):
+        self.blocksize = _align(blocksize)
+        self.sparse = sparse
+        self.rate = rate
+        self.progress_cb = progress_cb
+        self._zeros = buffer('\0' * self.blocksize)
+
+    @staticmethod
+    def _open(path, flags):
+        """Opens path with O_DIRECT if it is supported."""
+        try:
+            fd = os.open(path, flags | os.O_DIRECT, 0o644)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            fd = os.open(path, flags, 0o644)
+        return io.FileIO(fd, 'r' if flags == os.O_RDONLY else 'w')
+
+    @staticmethod
+    def _clear_direct(f):
+        flags = fcntl.fcntl(f.fileno(), fcntl.F_GETFL)
+        fcntl.fcntl(f.fileno(), fcntl.F_SETFL, flags & ~os.O_DIRECT)
+
+    def _read(self, src_file, buf, length):
+        """Reads up to length bytes into buf, returns the bytes read."""
+        count = 0
+        while count < length:
+            # Request whole sectors, the source may end before them.
+            request = min(_align(length - count), len(buf) - count)
+            view = (ctypes.c_char * request).from_buffer(buf, count)
+            n = src_file.readinto(view)
+            del view
+            if not n:
+                break
+            count += n
+        return min(count, length)
+
+    def _write(self, dest_file, buf, length):
+        if length % SECTOR_SIZE:
+            # O_DIRECT can't write the unaligned tail of the data.
+            self._clear_direct(dest_file)
+        count = 0
+        while count < length:
+            count += dest_file.write(buffer(buf, count, length - count))
+
+    def _is_zero(self, buf, length):
+        return buffer(buf, 0, length) == buffer(self._zeros, 0, length)
+
+    def _throttle(self, copied, start):
+        if self.rate <= 0:
+            return
+        delay = float(copied) / self.rate - (time.time() - start)
+        if delay > 0:
+            eventlet.sleep(delay)
+
+    def _report(self, copied, size):
+        if self.progress_cb is not None:
+            self.progress_cb(copied, size)
+
+    def copy(self, src, dest, size):
+        """Copies size bytes from src to dest.
+
+        Zeros are written if src is None.  Returns the bytes written, which
+        may be less than the bytes copied for sparse copies.
+        """
+        buf = mmap.mmap(-1, self.blocksize)
+        src_file = None
+        if src is not None:
+            src_file = self._open(src, os.O_RDONLY)
+        try:
+            dest_file = self._open(dest, os.O_WRONLY | os.O_CREAT)
+            try:
+                return self._copy(src_file, dest_file, buf, size)
+            finally:
+                dest_file.close()
+        finally:
+            if src_file is not None:
+                src_file.close()
+            buf.close()
+
+    def _copy(self, src_file, dest_file, buf, size):
+        start = last_report = time.time()
+        copied = written = 0
+        while copied < size:
+            length = min(self.blocksize, size - copied)
+            if src_file is not None:
+                length = tpool.execute(self._read, src_file, buf, length)
+                if not length:
+                    break
+            if (self.sparse and src_file is not None and
+                    self._is_zero(buf, length)):
+                dest_file.seek(length, os.SEEK_CUR)
+            else:
+                tpool.execute(self._write, dest_file, buf, length)
+                written += length
+            copied += length
+
+            self._throttle(copied, start)
+            if time.time() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.time()
+                self._report(copied, size)
+
+        if stat.S_ISREG(os.fstat(dest_file.fileno()).st_mode):
+            # Skipped zero blocks at the end of a file do not extend it.
+            if os.fstat(dest_file.fileno()).st_size < copied:
+                dest_file.truncate(copied)
+        tpool.execute(os.fsync, dest_file.fileno())
+
+        elapsed = '%.1f' % (time.time() - start)
+        LOG.debug(_('Copied %(copied)d bytes, wrote %(written)d bytes in '
+                    '%(elapsed)s seconds') %
+                  {'copied': copied, 'written': written, 'elapsed': elapsed})
+        self._report(copied, size)
+        return written
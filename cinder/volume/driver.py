@@ -32,6 +32,7 @@ from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder import units
 from cinder import utils
 from cinder.volume import rpcapi as volume_rpcapi
 from cinder.volume import utils as volume_utils
@@ -76,6 +77,19 @@ volume_opts = [
     cfg.IntOpt('volume_clear_size',
                default=0,
                help='Size in MiB to wipe at start of old volumes. 0 => all'),
+    cfg.StrOpt('volume_clear_ionice',
+               default=None,
+               help='The flag to pass to ionice to alter the i/o priority '
+                    'of the process used to zero a volume after deletion, '
+                    'for example "-c3" for idle only priority'),
+    cfg.IntOpt('volume_clear_bps_limit',
+               default=0,
+               help='Maximum rate in bytes per second at which zeros are '
+                    'written to wipe old volumes, 0 means no limit'),
+    cfg.IntOpt('volume_clear_workers',
+               default=0,
+               help='Number of old volumes wiped at once in the background. '
+                    'delete_volume waits for the wipe to finish when 0'),
     cfg.StrOpt('iscsi_helper',
                default='tgtadm',
                help='iscsi target user-land tool to use'),
@@ -224,6 +238,14 @@ class VolumeDriver(object):
         """Synchronously recreates an export for a volume."""
         raise NotImplementedError()
 
+    def ensure_exports(self, context, volumes):
+        """Synchronously recreates the exports of many volumes at once.
+
+        Optional, the volume manager calls ensure_export() for each of the
+        volumes if it is not implemented.
+        """
+        raise NotImplementedError()
+
     def create_export(self, context, volume):
         """Exports the volume. Can optionally return a Dictionary of changes
         to the volume object to be persisted.
@@ -312,11 +334,19 @@ class VolumeDriver(object):
                                                dest_attach_info, dest_remote,
                                                force=True)
 
+        def _log_progress(copied, total):
+            LOG.info(_("Copied %(copied)d of %(total)d MB of volume %(src)s "
+                       "to %(dest)s.") %
+                     {'copied': copied / units.MiB,
+                      'total': total / units.MiB,
+                      'src': src_vol['id'], 'dest': dest_vol['id']})
+
         try:
             size_in_mb = int(src_vol['size']) * 1024    # vol size is in GB
             volume_utils.copy_volume(src_attach_info['device']['path'],
                                      dest_attach_info['device']['path'],
-                                     size_in_mb)
+                                     size_in_mb,
+                                     progress_cb=_log_progress)
             copy_error = False
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -21,7 +21,6 @@ import base64
 import cookielib
 import json
 import time
-import urllib2
 import uuid
 
 from xml.etree import ElementTree as ET
@@ -33,6 +32,7 @@ from cinder.openstack.common import log as logging
 from cinder import units
 from cinder import utils
 from cinder.volume.drivers.huawei import huawei_utils
+from cinder.volume import http_pool
 from cinder.volume import volume_types
 
 
@@ -48,6 +48,7 @@ class HVSCommon():
     def __init__(self, configuration):
         self.configuration = configuration
         self.cookie = cookielib.CookieJar()
+        self.http_pool = http_pool.HTTPPool(timeout=720)
         self.url = None
         self.xml_conf = self.configuration.cinder_huawei_conf_file
 
@@ -63,15 +64,18 @@ class HVSCommon():
 
         headers = {"Connection": "keep-alive",
                    "Content-Type": "application/json"}
-        opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(self.cookie))
-        urllib2.install_opener(opener)
+        if not method:
+            method = 'POST' if data is not None else 'GET'
 
         try:
-            urllib2.socket.setdefaulttimeout(720)
-            req = urllib2.Request(url, data, headers)
-            if method:
-                req.get_method = lambda: method
-            res = urllib2.urlopen(req).read().decode("utf-8")
+            response, res = self.http_pool.request(method, url, data,
+                                                   headers,
+                                                   cookies=self.cookie)
+            if not 200 <= response.status < 300:
+                raise exception.CinderException(
+                    _('HTTP status %(status)s %(reason)s') %
+                    {'status': response.status, 'reason': response.reason})
+            res = res.decode("utf-8")
             LOG.debug(_('HVS Response Data: %(res)s') % {'res': res})
         except Exception as err:
             err_msg = _('Bad response from server: %s') % err
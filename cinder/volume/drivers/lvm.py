@@ -24,6 +24,7 @@ import os
 import re
 import socket
 
+import eventlet
 from oslo.config import cfg
 
 from cinder.brick import exception as brick_exception
@@ -34,6 +35,7 @@ from cinder.image import image_utils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder import units
 from cinder import utils
 from cinder.volume import driver
 from cinder.volume import utils as volutils
@@ -51,11 +53,21 @@ volume_opts = [
     cfg.StrOpt('lvm_type',
                default='default',
                help='Type of LVM volumes to deploy; (default or thin)'),
+    cfg.IntOpt('lvm_inventory_max_age',
+               default=30,
+               help='Seconds the LVs and the free space of the volume group '
+                    'are cached for. The changes made by the driver update '
+                    'the cache, other changes are seen once it is older than '
+                    'this. 0 runs lvs/vgs on every lookup'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(volume_opts)
 
+# Deleted volumes are renamed with this prefix until they are wiped in the
+# background, so that wipes interrupted by a restart can be resumed.
+WIPE_PREFIX = 'wipe-'
+
 
 class LVMVolumeDriver(driver.VolumeDriver):
     """Executes commands relating to Volumes."""
@@ -70,6 +82,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
         self.backend_name =\
             self.configuration.safe_get('volume_backend_name') or 'LVM'
         self.protocol = 'local'
+        self._wipe_pool = eventlet.GreenPool(
+            max(1, self.configuration.volume_clear_workers))
 
     def set_execute(self, execute):
         self._execute = execute
@@ -79,10 +93,13 @@ class LVMVolumeDriver(driver.VolumeDriver):
         if self.vg is None:
             root_helper = utils.get_root_helper()
             try:
-                self.vg = lvm.LVM(self.configuration.volume_group,
-                                  root_helper,
-                                  lvm_type=self.configuration.lvm_type,
-                                  executor=self._execute)
+                self.vg = lvm.LVM(
+                    self.configuration.volume_group,
+                    root_helper,
+                    lvm_type=self.configuration.lvm_type,
+                    executor=self._execute,
+                    inventory_max_age=(
+                        self.configuration.lvm_inventory_max_age))
             except brick_exception.VolumeGroupNotFound:
                 message = ("Volume Group %s does not exist" %
                            self.configuration.volume_group)
@@ -115,6 +132,41 @@ class LVMVolumeDriver(driver.VolumeDriver):
                     raise exception.VolumeBackendAPIException(
                         data=exception_message)
 
+        eventlet.spawn_n(self._resume_wipes)
+
+    def _resume_wipes(self):
+        """Wipes the deleted volumes left over from before a restart."""
+        try:
+            lvs = self.vg.get_volumes()
+        except Exception:
+            LOG.exception(_('Failed to look for unfinished volume wipes.'))
+            return
+        for lv in lvs:
+            if lv['name'].startswith(WIPE_PREFIX):
+                LOG.info(_('Resuming wipe of deleted volume %s.') %
+                         lv['name'])
+                self._wipe_pool.spawn_n(self._wipe_and_delete, lv['name'])
+
+    def _wipe_and_delete(self, name, dev_path=None, size_in_m=None):
+        """Wipes and deletes an LV renamed for a background wipe."""
+        try:
+            if self._needs_clear():
+                if dev_path is None:
+                    # Snapshots are wiped through their COW device.
+                    dev_path = self.local_path({'name': name})
+                    if os.path.exists(dev_path + '-cow'):
+                        dev_path += '-cow'
+                if size_in_m is None:
+                    out, _err = self._execute('blockdev', '--getsize64',
+                                              dev_path, run_as_root=True)
+                    size_in_m = int(out.strip()) // units.MiB
+                self._clear_device(dev_path, size_in_m)
+            self.vg.delete(name)
+        except Exception:
+            LOG.exception(_('Failed to wipe deleted volume %s, the wipe '
+                            'will be retried when the service '
+                            'restarts.') % name)
+
     def _sizestr(self, size_in_g):
         if int(size_in_g) == 0:
             return '100m'
@@ -126,12 +178,25 @@ class LVMVolumeDriver(driver.VolumeDriver):
     def _delete_volume(self, volume, is_snapshot=False):
         """Deletes a logical volume."""
 
-        # zero out old volumes to prevent data leaking between users
-        # TODO(ja): reclaiming space should be done lazy and low priority
-        self.clear_volume(volume, is_snapshot)
         name = volume['name']
         if is_snapshot:
             name = self._escape_snapshot(volume['name'])
+
+        if self.configuration.volume_clear_workers > 0 and \
+                self._needs_clear():
+            # Return right away and wipe the volume in the background,
+            # the pool blocks when too many wipes are already running.
+            size_in_m = self._clear_size(volume)
+            wipe_name = WIPE_PREFIX + name
+            self.vg.rename_volume(name, wipe_name)
+            dev_path = self._clear_path(dict(volume, name=wipe_name),
+                                        is_snapshot)
+            self._wipe_pool.spawn_n(self._wipe_and_delete, wipe_name,
+                                    dev_path, size_in_m)
+            return
+
+        # zero out old volumes to prevent data leaking between users
+        self.clear_volume(volume, is_snapshot)
         self.vg.delete(name)
 
     def _escape_snapshot(self, snapshot_name):
@@ -159,6 +224,10 @@ class LVMVolumeDriver(driver.VolumeDriver):
                             self.configuration.lvm_type,
                             mirror_count)
 
+    def _sparse_copy_volume(self):
+        """Zero blocks need not be written to new thin LVs."""
+        return self.configuration.lvm_type == 'thin'
+
     def create_volume_from_snapshot(self, volume, snapshot):
         """Creates a volume from a snapshot."""
         self._create_volume(volume['name'],
@@ -173,7 +242,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
         volutils.copy_volume(self.local_path(snapshot),
                              self.local_path(volume),
                              snapshot['volume_size'] * 1024,
-                             execute=self._execute)
+                             execute=self._execute,
+                             sparse=self._sparse_copy_volume())
 
     def delete_volume(self, volume):
         """Deletes a logical volume."""
@@ -193,15 +263,13 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
         self._delete_volume(volume)
 
-    def clear_volume(self, volume, is_snapshot=False):
-        """unprovision old volumes to prevent data leaking between users."""
-
+    def _needs_clear(self):
         # NOTE(jdg): Don't write the blocks of thin provisioned
         # volumes
-        if self.configuration.volume_clear == 'none' or \
-                self.configuration.lvm_type == 'thin':
-            return
+        return (self.configuration.volume_clear != 'none' and
+                self.configuration.lvm_type != 'thin')
 
+    def _clear_path(self, volume, is_snapshot):
         if is_snapshot:
             # if the volume to be cleared is a snapshot of another volume
             # we need to clear out the volume using the -cow instead of the
@@ -216,36 +284,36 @@ class LVMVolumeDriver(driver.VolumeDriver):
             msg = (_('Volume device file path %s does not exist.') % dev_path)
             LOG.error(msg)
             raise exception.VolumeBackendAPIException(data=msg)
+        return dev_path
 
+    def _clear_size(self, volume):
         size_in_g = volume.get('size', volume.get('volume_size', None))
         if size_in_g is None:
             msg = (_("Size for volume: %s not found, "
                      "cannot secure delete.") % volume['id'])
             LOG.error(msg)
             raise exception.InvalidParameterValue(msg)
-        size_in_m = self.configuration.volume_clear_size
+        return size_in_g * 1024
 
-        LOG.info(_("Performing secure delete on volume: %s") % volume['id'])
+    def _clear_device(self, dev_path, size_in_m):
+        volutils.clear_volume(
+            size_in_m, dev_path,
+            volume_clear=self.configuration.volume_clear,
+            volume_clear_size=self.configuration.volume_clear_size,
+            volume_clear_ionice=self.configuration.volume_clear_ionice,
+            volume_clear_bps_limit=self.configuration.volume_clear_bps_limit,
+            execute=self._execute)
 
-        if self.configuration.volume_clear == 'zero':
-            if size_in_m == 0:
-                return volutils.copy_volume('/dev/zero',
-                                            dev_path, size_in_g * 1024,
-                                            sync=True,
-                                            execute=self._execute)
-            else:
-                clear_cmd = ['shred', '-n0', '-z', '-s%dMiB' % size_in_m]
-        elif self.configuration.volume_clear == 'shred':
-            clear_cmd = ['shred', '-n3']
-            if size_in_m:
-                clear_cmd.append('-s%dMiB' % size_in_m)
-        else:
-            raise exception.InvalidConfigurationValue(
-                option='volume_clear',
-                value=self.configuration.volume_clear)
+    def clear_volume(self, volume, is_snapshot=False):
+        """unprovision old volumes to prevent data leaking between users."""
+        if not self._needs_clear():
+            return
 
-        clear_cmd.append(dev_path)
-        self._execute(*clear_cmd, run_as_root=True)
+        dev_path = self._clear_path(volume, is_snapshot)
+        size_in_m = self._clear_size(volume)
+
+        LOG.info(_("Performing secure delete on volume: %s") % volume['id'])
+        self._clear_device(dev_path, size_in_m)
 
     def create_snapshot(self, snapshot):
         """Creates a snapshot."""
@@ -313,7 +381,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
             volutils.copy_volume(self.local_path(temp_snapshot),
                                  self.local_path(volume),
                                  src_vref['size'] * 1024,
-                                 execute=self._execute)
+                                 execute=self._execute,
+                                 sparse=self._sparse_copy_volume())
         finally:
             self.delete_snapshot(temp_snapshot)
 
@@ -450,8 +519,12 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
                                   'creation for target: %s') % iscsi_name)
         return tid
 
-    def ensure_export(self, context, volume):
-        """Synchronously recreates an export for a logical volume."""
+    def _export_target(self, context, volume):
+        """Returns the iscsi target of a volume to recreate its export.
+
+        The target is a dict as taken by the create_iscsi_targets of the
+        target admin, or None if the volume has no target provisioned.
+        """
         # NOTE(jdg): tgtadm doesn't use the iscsi_targets table
         # TODO(jdg): In the future move all of the dependent stuff into the
         # cooresponding target admin class
@@ -469,18 +542,15 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
                 LOG.debug(_("volume_info:%s"), volume_info)
                 LOG.info(_("Skipping ensure_export. No iscsi_target "
                            "provision for volume: %s"), volume['id'])
-                return
+                return None
 
             iscsi_name = "%s%s" % (self.configuration.iscsi_target_prefix,
                                    volume['name'])
             volume_path = "/dev/%s/%s" % (self.configuration.volume_group,
                                           volume['name'])
-            iscsi_target = 1
-
-            self._create_tgtadm_target(iscsi_name, iscsi_target,
-                                       volume_path, chap_auth)
-
-            return
+            return {'name': iscsi_name, 'tid': 1, 'lun': 0,
+                    'path': volume_path, 'chap_auth': chap_auth,
+                    'old_name': None}
 
         if not isinstance(self.tgtadm, iscsi.TgtAdm):
             try:
@@ -490,7 +560,7 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
             except exception.NotFound:
                 LOG.info(_("Skipping ensure_export. No iscsi_target "
                            "provisioned for volume: %s"), volume['id'])
-                return
+                return None
         else:
             iscsi_target = 1  # dummy value when using TgtAdm
 
@@ -516,13 +586,37 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
 
         # NOTE(jdg): For TgtAdm case iscsi_name is the ONLY param we need
         # should clean this all up at some point in the future
-        self._create_tgtadm_target(iscsi_name, iscsi_target,
-                                   volume_path, chap_auth,
-                                   lun=0,
+        return {'name': iscsi_name, 'tid': iscsi_target, 'lun': 0,
+                'path': volume_path, 'chap_auth': chap_auth,
+                'old_name': old_name}
+
+    def ensure_export(self, context, volume):
+        """Synchronously recreates an export for a logical volume."""
+        target = self._export_target(context, volume)
+        if target is None:
+            return
+
+        self._create_tgtadm_target(target['name'], target['tid'],
+                                   target['path'], target['chap_auth'],
+                                   lun=target['lun'],
                                    check_exit_code=False,
-                                   old_name=old_name)
+                                   old_name=target['old_name'])
+
+    def ensure_exports(self, context, volumes):
+        """Recreates the exports of the logical volumes in one batch.
+
+        The targets which are not configured already are created with one
+        batch of the target admin.
+        """
+        targets = []
+        for volume in volumes:
+            target = self._export_target(context, volume)
+            if target is not None:
+                targets.append(target)
 
-        return
+        # NOTE: the stale targets are not removed, the target daemon may
+        # be shared with the other backends of the host.
+        self.tgtadm.reconcile_iscsi_targets(targets, check_exit_code=False)
 
     def _fix_id_migration(self, context, volume):
         """Fix provider_location and dev files to address bug 1065702.
@@ -724,8 +818,9 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
 
         volutils.copy_volume(self.local_path(volume),
                              self.local_path(volume, vg=dest_vg),
-                             volume['size'],
-                             execute=self._execute)
+                             volume['size'] * 1024,
+                             execute=self._execute,
+                             sparse=(lvm_type == 'thin'))
         self._delete_volume(volume)
         model_update = self._create_export(ctxt, volume, vg=dest_vg)
 
@@ -21,10 +21,12 @@ NetApp api for ONTAP and OnCommand DFM.
 Contains classes required to issue api calls to ONTAP and OnCommand DFM.
 """
 
+import base64
+
 from lxml import etree
-import urllib2
 
 from cinder.openstack.common import log as logging
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -149,6 +151,7 @@ class NaServer(object):
             self._timeout = int(seconds)
         except ValueError:
             raise ValueError('timeout in seconds must be integer')
+        self._refresh_conn = True
 
     def get_timeout(self):
         """Gets the timeout in seconds if set."""
@@ -187,19 +190,15 @@ class NaServer(object):
         if na_element and not isinstance(na_element, NaElement):
             ValueError('NaElement must be supplied to invoke api')
         request = self._create_request(na_element, enable_tunneling)
-        if not hasattr(self, '_opener') or not self._opener \
-                or self._refresh_conn:
-            self._build_opener()
+        if not hasattr(self, '_http_pool') or self._refresh_conn:
+            self._build_pool()
         try:
-            if hasattr(self, '_timeout'):
-                response = self._opener.open(request, timeout=self._timeout)
-            else:
-                response = self._opener.open(request)
-        except urllib2.HTTPError as e:
-            raise NaApiError(e.code, e.msg)
+            response, xml = self._http_pool.request(
+                'POST', self._get_url(), request, self._get_headers())
         except Exception as e:
             raise NaApiError('Unexpected error', e)
-        xml = response.read()
+        if not 200 <= response.status < 300:
+            raise NaApiError(response.status, response.reason)
         return self._get_result(xml)
 
     def invoke_successfully(self, na_element, enable_tunneling=False):
@@ -230,11 +229,7 @@ class NaServer(object):
         if enable_tunneling:
             self._enable_tunnel_request(netapp_elem)
         netapp_elem.add_child_elem(na_element)
-        request_d = netapp_elem.to_string()
-        request = urllib2.Request(
-            self._get_url(), data=request_d,
-            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'})
-        return request
+        return netapp_elem.to_string()
 
     def _enable_tunnel_request(self, netapp_elem):
         """Enables vserver or vfiler tunneling."""
@@ -273,22 +268,25 @@ class NaServer(object):
         return '%s://%s:%s/%s' % (self._protocol, self._host, self._port,
                                   self._url)
 
-    def _build_opener(self):
+    def _build_pool(self):
+        # Copies of the server with another timeout get their own pool,
+        # the connections of the original one are left open.
+        self._http_pool = http_pool.HTTPPool(timeout=self.get_timeout())
+        self._refresh_conn = False
+
+    def _get_headers(self):
+        headers = {'Content-Type': 'text/xml', 'charset': 'utf-8'}
         if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
-            auth_handler = self._create_basic_auth_handler()
+            headers['Authorization'] = self._create_basic_auth_header()
         else:
-            auth_handler = self._create_certificate_auth_handler()
-        opener = urllib2.build_opener(auth_handler)
-        self._opener = opener
-
-    def _create_basic_auth_handler(self):
-        password_man = urllib2.HTTPPasswordMgrWithDefaultRealm()
-        password_man.add_password(None, self._get_url(), self._username,
-                                  self._password)
-        auth_handler = urllib2.HTTPBasicAuthHandler(password_man)
-        return auth_handler
-
-    def _create_certificate_auth_handler(self):
+            headers.update(self._create_certificate_auth_header())
+        return headers
+
+    def _create_basic_auth_header(self):
+        credentials = '%s:%s' % (self._username, self._password)
+        return 'Basic %s' % base64.b64encode(credentials)
+
+    def _create_certificate_auth_header(self):
         raise NotImplementedError()
 
     def __str__(self):
@@ -23,11 +23,10 @@
 .. moduleauthor:: Victor Rodionov <victor.rodionov@nexenta.com>
 """
 
-import urllib2
-
 from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder.volume.drivers import nexenta
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -39,7 +38,7 @@ class NexentaJSONException(nexenta.NexentaException):
 class NexentaJSONProxy(object):
 
     def __init__(self, scheme, host, port, path, user, password, auto=False,
-                 obj=None, method=None):
+                 obj=None, method=None, pool=None):
         self.scheme = scheme.lower()
         self.host = host
         self.port = port
@@ -49,6 +48,8 @@ class NexentaJSONProxy(object):
         self.auto = auto
         self.obj = obj
         self.method = method
+        # The proxies of the objects and methods share the connections.
+        self.pool = pool or http_pool.HTTPPool()
 
     def __getattr__(self, name):
         if not self.obj:
@@ -59,7 +60,7 @@ class NexentaJSONProxy(object):
             obj, method = '%s.%s' % (self.obj, self.method), name
         return NexentaJSONProxy(self.scheme, self.host, self.port, self.path,
                                 self.user, self.password, self.auto, obj,
-                                method)
+                                method, self.pool)
 
     @property
     def url(self):
@@ -83,18 +84,22 @@ class NexentaJSONProxy(object):
             'Authorization': 'Basic %s' % auth
         }
         LOG.debug(_('Sending JSON data: %s'), data)
-        request = urllib2.Request(self.url, data, headers)
-        response_obj = urllib2.urlopen(request)
-        if response_obj.info().status == 'EOF in headers':
+        response_obj, response_data = self.pool.request('POST', self.url,
+                                                        data, headers)
+        if response_obj.msg.status == 'EOF in headers':
             if not self.auto or self.scheme != 'http':
                 LOG.error(_('No headers in server response'))
                 raise NexentaJSONException(_('Bad response from server'))
             LOG.info(_('Auto switching to HTTPS connection to %s'), self.url)
             self.scheme = 'https'
-            request = urllib2.Request(self.url, data, headers)
-            response_obj = urllib2.urlopen(request)
+            response_obj, response_data = self.pool.request(
+                'POST', self.url, data, headers)
+
+        if response_obj.status != 200:
+            LOG.error(_('Bad HTTP response status from server: %s'),
+                      response_obj.status)
+            raise NexentaJSONException(_('Bad response from server'))
 
-        response_data = response_obj.read()
         LOG.debug(_('Got response: %s'), response_data)
         response = jsonutils.loads(response_data)
         if response.get('error') is not None:
@@ -38,6 +38,7 @@ from cinder.volume.drivers.nexenta import jsonrpc
 from cinder.volume.drivers.nexenta import options
 from cinder.volume.drivers.nexenta import utils
 from cinder.volume.drivers import nfs
+from cinder.volume import http_pool
 
 VERSION = '1.1.3'
 LOG = logging.getLogger(__name__)
@@ -72,6 +73,9 @@ class NexentaNfsDriver(nfs.NfsDriver):  # pylint: disable=R0921
         self.nms_cache_volroot = conf.nexenta_nms_cache_volroot
         self._nms2volroot = {}
         self.share2nms = {}
+        # The NMS of the shares keep their connections when the shares
+        # config is reloaded.
+        self.http_pool = http_pool.HTTPPool()
 
     def do_setup(self, context):
         super(NexentaNfsDriver, self).do_setup(context)
@@ -417,7 +421,8 @@ class NexentaNfsDriver(nfs.NfsDriver):  # pylint: disable=R0921
         auto, scheme, user, password, host, port, path =\
             utils.parse_nms_url(url)
         return jsonrpc.NexentaJSONProxy(scheme, host, port, path, user,
-                                        password, auto=auto)
+                                        password, auto=auto,
+                                        pool=self.http_pool)
 
     def _get_snapshot_volume(self, snapshot):
         ctxt = context.get_admin_context()
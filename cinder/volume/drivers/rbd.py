@@ -26,6 +26,7 @@ from cinder import exception
 from cinder.image import image_utils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import timeutils
 from cinder import units
 from cinder.volume import driver
 
@@ -66,7 +67,17 @@ rbd_opts = [
                default=5,
                help='maximum number of nested clones that can be taken of a '
                     'volume before enforcing a flatten prior to next clone. '
-                    'A value of zero disables cloning')]
+                    'A value of zero disables cloning'),
+    cfg.IntOpt('rbd_connection_pool_size',
+               default=4,
+               help='maximum number of idle connections to the ceph cluster '
+                    'kept for reuse by the volume operations. Zero connects '
+                    'for each operation'),
+    cfg.IntOpt('rbd_connection_pool_max_idle',
+               default=300,
+               help='number of seconds an idle connection to the ceph '
+                    'cluster is kept for reuse before it is shut down. Zero '
+                    'keeps idle connections until they fail')]
 
 CONF = cfg.CONF
 CONF.register_opts(rbd_opts)
@@ -190,6 +201,103 @@ class RBDImageIOWrapper(io.RawIOBase):
         pass
 
 
+class RADOSConnectionPool(object):
+    """Connected RADOS clients shared by the operations of a driver.
+
+    Connecting a client costs a round trip to the monitors and the cephx
+    handshake, so released clients stay connected for the next operation,
+    along with the ioctx of each pool they opened.  Up to max_size idle
+    clients are kept; more are connected when the operations need them
+    and shut down when released.  Clients idle for more than max_idle
+    seconds, which raised a rados.Error, or which fail a liveness check
+    when they are reused, are shut down rather than reused.
+    """
+
+    def __init__(self, rados_module, rados_id, conffile, default_pool,
+                 max_size, max_idle=0):
+        self.rados = rados_module
+        self.rados_id = rados_id
+        self.conffile = conffile
+        self.default_pool = default_pool
+        self.max_size = max_size
+        self.max_idle = max_idle
+        # The idle clients and the times they were released, oldest first.
+        self._idle = []
+        # The ioctxs opened by each client, by pool name.
+        self._ioctxs = {}
+
+    def _connect(self):
+        client = self.rados.Rados(rados_id=self.rados_id,
+                                  conffile=self.conffile)
+        try:
+            client.connect()
+        except self.rados.Error:
+            # shutdown cannot raise an exception
+            client.shutdown()
+            raise
+        self._ioctxs[client] = {}
+        return client
+
+    def _shutdown(self, client):
+        # closing an ioctx cannot raise an exception
+        for ioctx in self._ioctxs.pop(client, {}).values():
+            ioctx.close()
+        client.shutdown()
+
+    def _is_healthy(self, client):
+        if getattr(client, 'state', 'connected') != 'connected':
+            return False
+        # A cheap call to the cluster, which fails once the connection
+        # is broken.
+        try:
+            client.get_fsid()
+        except self.rados.Error:
+            return False
+        return True
+
+    def _expire_idle(self):
+        while (self.max_idle and self._idle and
+               timeutils.is_older_than(self._idle[0][1], self.max_idle)):
+            client, _released_at = self._idle.pop(0)
+            LOG.debug(_("shutting down idle rados client"))
+            self._shutdown(client)
+
+    def get(self, pool=None):
+        """Returns a connected client and its ioctx for the given pool."""
+        self._expire_idle()
+        client = None
+        while self._idle:
+            client, _released_at = self._idle.pop()
+            if self._is_healthy(client):
+                break
+            LOG.debug(_("discarding disconnected rados client"))
+            self._shutdown(client)
+            client = None
+        if client is None:
+            client = self._connect()
+
+        pool = str(pool or self.default_pool)
+        ioctxs = self._ioctxs[client]
+        if pool not in ioctxs:
+            try:
+                ioctxs[pool] = client.open_ioctx(pool)
+            except self.rados.Error:
+                self.put(client)
+                raise
+        return client, ioctxs[pool]
+
+    def put(self, client, discard=False):
+        """Releases a client got from the pool.
+
+        :param discard: shut the client down, e.g. after a rados.Error
+        """
+        self._expire_idle()
+        if discard or len(self._idle) >= self.max_size:
+            self._shutdown(client)
+        else:
+            self._idle.append((client, timeutils.utcnow()))
+
+
 class RBDVolumeProxy(object):
     """Context manager for dealing with an existing rbd volume.
 
@@ -221,7 +329,9 @@ class RBDVolumeProxy(object):
         try:
             self.volume.close()
         finally:
-            self.driver._disconnect_from_rados(self.client, self.ioctx)
+            self.driver._disconnect_from_rados(
+                self.client, self.ioctx,
+                discard=_is_rados_error(self.driver, value))
 
     def __getattr__(self, attrib):
         return getattr(self.volume, attrib)
@@ -237,7 +347,14 @@ class RADOSClient(object):
         return self
 
     def __exit__(self, type_, value, traceback):
-        self.driver._disconnect_from_rados(self.cluster, self.ioctx)
+        self.driver._disconnect_from_rados(
+            self.cluster, self.ioctx,
+            discard=_is_rados_error(self.driver, value))
+
+
+def _is_rados_error(driver, exc):
+    """Whether the connection an operation used may be broken by exc."""
+    return exc is not None and isinstance(exc, driver.rados.Error)
 
 
 class RBDDriver(driver.VolumeDriver):
@@ -252,6 +369,7 @@ class RBDDriver(driver.VolumeDriver):
         # allow overrides for testing
         self.rados = kwargs.get('rados', rados)
         self.rbd = kwargs.get('rbd', rbd)
+        self._rados_pool = None
 
     def check_for_setup_error(self):
         """Returns an error if prerequisites aren't met."""
@@ -275,23 +393,19 @@ class RBDDriver(driver.VolumeDriver):
         return args
 
     def _connect_to_rados(self, pool=None):
-        ascii_user = ascii_str(self.configuration.rbd_user)
-        ascii_conf = ascii_str(self.configuration.rbd_ceph_conf)
-        client = self.rados.Rados(rados_id=ascii_user, conffile=ascii_conf)
-        try:
-            client.connect()
-            pool_to_open = str(pool or self.configuration.rbd_pool)
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
-        except self.rados.Error:
-            # shutdown cannot raise an exception
-            client.shutdown()
-            raise
-
-    def _disconnect_from_rados(self, client, ioctx):
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+        if self._rados_pool is None:
+            self._rados_pool = RADOSConnectionPool(
+                self.rados,
+                ascii_str(self.configuration.rbd_user),
+                ascii_str(self.configuration.rbd_ceph_conf),
+                self.configuration.rbd_pool,
+                self.configuration.rbd_connection_pool_size,
+                self.configuration.rbd_connection_pool_max_idle)
+        return self._rados_pool.get(pool)
+
+    def _disconnect_from_rados(self, client, ioctx, discard=False):
+        # The ioctx stays open with its client in the pool.
+        self._rados_pool.put(client, discard=discard)
 
     def _get_backup_snaps(self, rbd_image):
         """Get list of any backup snapshots that exist on this volume.
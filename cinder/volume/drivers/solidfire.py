@@ -16,7 +16,6 @@
 #    under the License.
 
 import base64
-import httplib
 import json
 import math
 import random
@@ -32,6 +31,7 @@ from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder.volume.drivers.san.san import SanISCSIDriver
+from cinder.volume import http_pool
 from cinder.volume import volume_types
 
 LOG = logging.getLogger(__name__)
@@ -92,6 +92,7 @@ class SolidFireDriver(SanISCSIDriver):
     def __init__(self, *args, **kwargs):
         super(SolidFireDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(sf_opts)
+        self.http_pool = http_pool.HTTPPool()
         try:
             self._update_cluster_status()
         except exception.SolidFireAPIException:
@@ -141,21 +142,18 @@ class SolidFireDriver(SanISCSIDriver):
 
             LOG.debug(_("Payload for SolidFire API call: %s"), payload)
 
-            api_endpoint = '/json-rpc/%s' % version
-            connection = httplib.HTTPSConnection(host, port)
+            url = 'https://%s:%s/json-rpc/%s' % (host, port, version)
             try:
-                connection.request('POST', api_endpoint, payload, header)
+                response, data = self.http_pool.request('POST', url, payload,
+                                                        header)
             except Exception as ex:
                 LOG.error(_('Failed to make httplib connection '
                             'SolidFire Cluster: %s (verify san_ip '
                             'settings)') % ex.message)
                 msg = _("Failed to make httplib connection: %s") % ex.message
                 raise exception.SolidFireAPIException(msg)
-            response = connection.getresponse()
 
-            data = {}
             if response.status != 200:
-                connection.close()
                 LOG.error(_('Request to SolidFire cluster returned '
                             'bad status: %(status)s / %(reason)s (check '
                             'san_login/san_password settings)') %
@@ -166,17 +164,12 @@ class SolidFireDriver(SanISCSIDriver):
                        {'status': response.status, 'reason': response.reason})
                 raise exception.SolidFireAPIException(msg)
 
-            else:
-                data = response.read()
-                try:
-                    data = json.loads(data)
-                except (TypeError, ValueError) as exc:
-                    connection.close()
-                    msg = _("Call to json.loads() raised "
-                            "an exception: %s") % exc
-                    raise exception.SfJsonEncodeFailure(msg)
-
-                connection.close()
+            try:
+                data = json.loads(data)
+            except (TypeError, ValueError) as exc:
+                msg = _("Call to json.loads() raised "
+                        "an exception: %s") % exc
+                raise exception.SfJsonEncodeFailure(msg)
 
             LOG.debug(_("Results of SolidFire API call: %s"), data)
 
@@ -22,14 +22,13 @@ This driver requires VPSA with API ver.13.07 or higher.
 """
 
 
-import httplib
-
 from lxml import etree
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder.volume import driver
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -87,6 +86,7 @@ class ZadaraVPSAConnection(object):
     def __init__(self, conf):
         self.conf = conf
         self.access_key = None
+        self.http_pool = http_pool.HTTPPool()
 
         self.ensure_connection()
 
@@ -244,20 +244,15 @@ class ZadaraVPSAConnection(object):
         LOG.debug(_('Sending %(method)s to %(url)s. Body "%(body)s"'),
                   {'method': method, 'url': url, 'body': body})
 
-        if self.conf.zadara_vpsa_use_ssl:
-            connection = httplib.HTTPSConnection(self.conf.zadara_vpsa_ip,
-                                                 self.conf.zadara_vpsa_port)
-        else:
-            connection = httplib.HTTPConnection(self.conf.zadara_vpsa_ip,
-                                                self.conf.zadara_vpsa_port)
-        connection.request(method, url, body)
-        response = connection.getresponse()
+        scheme = 'https' if self.conf.zadara_vpsa_use_ssl else 'http'
+        netloc = self.conf.zadara_vpsa_ip
+        if self.conf.zadara_vpsa_port:
+            netloc = '%s:%s' % (netloc, self.conf.zadara_vpsa_port)
+        response, data = self.http_pool.request(
+            method, '%s://%s%s' % (scheme, netloc, url), body)
 
         if response.status != 200:
-            connection.close()
             raise exception.BadHTTPResponseStatus(status=response.status)
-        data = response.read()
-        connection.close()
 
         xml_tree = etree.fromstring(data)
         status = xml_tree.findtext('status')
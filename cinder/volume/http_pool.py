@@ -0,0 +1,208 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Kept-alive HTTP connections to the management APIs of the arrays.
+
+The REST and JSON-RPC drivers used to open a new TCP, and mostly TLS,
+connection for each call to their array, which costs more than the small
+calls themselves.  HTTPPool keeps the connections to each endpoint open
+between the calls, and lets at most http_pool_max_connections calls use
+an endpoint at once.
+
+An array may close a kept-alive connection at any time.  A request is
+only sent again on a new connection when the array closed the connection
+before it got the request, never once it may have run it: the drivers
+send requests which create or delete things.
+"""
+
+import errno
+import httplib
+import socket
+import urllib2
+import urlparse
+
+from eventlet import semaphore
+from oslo.config import cfg
+
+from cinder.openstack.common import log as logging
+
+
+http_pool_opts = [
+    cfg.IntOpt('http_pool_max_connections',
+               default=10,
+               help='Maximum number of concurrent HTTP connections of a '
+                    'volume driver to each management endpoint of its '
+                    'array'),
+    cfg.IntOpt('http_pool_retries',
+               default=2,
+               help='Number of times a request to the management endpoint '
+                    'of an array is sent again on a new connection when '
+                    'the array had closed the kept-alive connection before '
+                    'the request reached it'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(http_pool_opts)
+
+LOG = logging.getLogger(__name__)
+
+
+def _closed_before_request(error, sending):
+    """Whether error shows a kept-alive connection was already closed.
+
+    A reset or broken pipe while sending the request, or the connection
+    closed without any status line of a response.  Timeouts and partial
+    responses are not, the array may have run the request.
+    """
+    if sending:
+        return (isinstance(error, socket.error) and
+                not isinstance(error, socket.timeout) and
+                error.errno in (errno.ECONNRESET, errno.EPIPE))
+    return (isinstance(error, httplib.BadStatusLine) and
+            error.line in ('', "''"))
+
+
+class _CookieResponse(object):
+    """The part of the urllib2 responses which cookielib reads."""
+
+    def __init__(self, response):
+        self._response = response
+
+    def info(self):
+        return self._response.msg
+
+
+class _Endpoint(object):
+    """The idle connections to a scheme, host and port."""
+
+    def __init__(self, scheme, host, port, timeout, max_connections):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = []
+        self.semaphore = semaphore.Semaphore(max_connections)
+
+    def connect(self):
+        kwargs = {}
+        if self.timeout is not None:
+            kwargs['timeout'] = self.timeout
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.host, self.port, **kwargs)
+        return httplib.HTTPConnection(self.host, self.port, **kwargs)
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+class HTTPPool(object):
+    """Connections of a driver to the endpoints of its array.
+
+    :param timeout: socket timeout in seconds of the connections, None
+                    for the default timeout
+    :param max_connections: maximum number of concurrent requests to each
+                            endpoint, http_pool_max_connections by default
+    :param retries: number of times a request is sent again when a
+                    kept-alive connection was closed before the request
+                    was sent, http_pool_retries by default
+    """
+
+    def __init__(self, timeout=None, max_connections=None, retries=None):
+        self.timeout = timeout
+        self.max_connections = (max_connections or
+                                CONF.http_pool_max_connections)
+        if retries is None:
+            retries = CONF.http_pool_retries
+        self.retries = retries
+        self._endpoints = {}
+
+    def _endpoint(self, scheme, host, port):
+        key = (scheme, host, port)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = _Endpoint(scheme, host, port, self.timeout,
+                                 self.max_connections)
+            self._endpoints[key] = endpoint
+        return endpoint
+
+    def request(self, method, url, body=None, headers=None, cookies=None):
+        """Send a request and read its response.
+
+        :param cookies: cookielib.CookieJar of the session, whose cookies
+                        are sent with the request and updated from the
+                        response
+        :returns: the httplib response and its body
+        """
+        parsed = urlparse.urlsplit(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path = '%s?%s' % (path, parsed.query)
+        headers = dict(headers or {})
+        if body is not None and 'content-length' not in [
+                name.lower() for name in headers]:
+            headers['Content-Length'] = str(len(body))
+        if cookies is not None:
+            cookie_request = urllib2.Request(url, headers=headers)
+            cookies.add_cookie_header(cookie_request)
+            headers.update(cookie_request.unredirected_hdrs)
+
+        endpoint = self._endpoint(parsed.scheme.lower(), parsed.hostname,
+                                  parsed.port)
+        with endpoint.semaphore:
+            response, data = self._send(endpoint, method, path, body,
+                                        headers)
+
+        if cookies is not None:
+            cookies.extract_cookies(_CookieResponse(response),
+                                    cookie_request)
+        return response, data
+
+    def _send(self, endpoint, method, path, body, headers):
+        retries = self.retries
+        while True:
+            reused = bool(endpoint.idle)
+            if reused:
+                connection = endpoint.idle.pop()
+            else:
+                connection = endpoint.connect()
+            sending = True
+            try:
+                connection.request(method, path, body, headers)
+                sending = False
+                response = connection.getresponse()
+                data = response.read()
+            except (socket.error, httplib.HTTPException) as e:
+                connection.close()
+                if (not reused or retries <= 0 or
+                        not _closed_before_request(e, sending)):
+                    raise
+                # The other idle connections were most likely closed too.
+                endpoint.close()
+                retries -= 1
+                LOG.debug(_('Kept-alive connection to %(host)s closed, '
+                            'sending the request again: %(error)r'),
+                          {'host': endpoint.host, 'error': e})
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                endpoint.idle.append(connection)
+            return response, data
+
+    def close(self):
+        """Close the idle connections."""
+        for endpoint in self._endpoints.values():
+            endpoint.close()
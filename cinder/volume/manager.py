@@ -79,6 +79,13 @@ volume_manager_opts = [
                 default=False,
                 help='Offload pending volume delete during '
                      'volume service startup'),
+    cfg.IntOpt('volume_service_inithost_export_workers',
+               default=1,
+               help='Number of volumes whose exports are recreated in '
+                    'parallel during volume service startup, for drivers '
+                    'which can not recreate them in one batch. Only raise '
+                    'it for drivers whose ensure_export can be called '
+                    'concurrently'),
 ]
 
 CONF = cfg.CONF
@@ -218,6 +225,58 @@ class VolumeManager(manager.SchedulerDependentManager):
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
 
+    def _report_startup_progress(self, ctxt, service_id, progress):
+        if service_id is None:
+            return
+        try:
+            self.db.service_update(ctxt, service_id,
+                                   {'startup_progress': progress})
+        except exception.ServiceNotFound:
+            pass
+
+    def _ensure_exports(self, ctxt, volumes):
+        """Recreates the exports of volumes after a restart.
+
+        The driver recreates them in one batch if it implements
+        ensure_exports(), otherwise they are recreated by
+        volume_service_inithost_export_workers green threads, one at a
+        time by default since most drivers' ensure_export is not safe to
+        call concurrently.  The progress is reported in the
+        startup_progress of the service.
+        """
+        try:
+            service_id = self.db.service_get_by_args(ctxt, self.host,
+                                                     'cinder-volume')['id']
+        except exception.HostBinaryNotFound:
+            service_id = None
+
+        total = len(volumes)
+        done = [0]
+        # Report about every 5% of the volumes.
+        step = max(1, total // 20)
+
+        def _ensure_export(volume):
+            self.driver.ensure_export(ctxt, volume)
+            done[0] += 1
+            if done[0] % step == 0:
+                self._report_startup_progress(ctxt, service_id,
+                                              '%d/%d' % (done[0], total))
+
+        self._report_startup_progress(ctxt, service_id, '0/%d' % total)
+        start = time.time()
+        try:
+            try:
+                self.driver.ensure_exports(ctxt, volumes)
+            except NotImplementedError:
+                workers = CONF.volume_service_inithost_export_workers
+                pool = GreenPool(max(1, workers))
+                for _result in pool.imap(_ensure_export, volumes):
+                    pass
+        finally:
+            self._report_startup_progress(ctxt, service_id, None)
+        LOG.info(_("Re-exported %(total)d volumes in %(elapsed)s seconds") %
+                 {'total': total, 'elapsed': '%.1f' % (time.time() - start)})
+
     def init_host(self):
         """Do any initialization that needs to be run if this is a
            standalone service.
@@ -243,9 +302,10 @@ class VolumeManager(manager.SchedulerDependentManager):
         LOG.debug(_("Re-exporting %s volumes"), len(volumes))
 
         try:
+            exports = []
             for volume in volumes:
                 if volume['status'] in ['available', 'in-use']:
-                    self.driver.ensure_export(ctxt, volume)
+                    exports.append(volume)
                 elif volume['status'] == 'downloading':
                     LOG.info(_("volume %s stuck in a downloading state"),
                              volume['id'])
@@ -255,6 +315,7 @@ class VolumeManager(manager.SchedulerDependentManager):
                                           {'status': 'error'})
                 else:
                     LOG.info(_("volume %s: skipping export"), volume['id'])
+            self._ensure_exports(ctxt, exports)
         except Exception as ex:
             LOG.error(_("Error encountered during "
                         "re-exporting phase of driver initialization: "
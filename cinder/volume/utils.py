@@ -17,10 +17,16 @@
 """Volume-related Utilities and helpers."""
 
 
+import contextlib
+import fcntl
 import math
 import os
 import stat
+import struct
+import time
 
+import eventlet
+from eventlet import tpool
 from oslo.config import cfg
 
 from cinder.brick.local_dev import lvm as brick_lvm
@@ -32,6 +38,7 @@ from cinder.openstack.common import strutils
 from cinder.openstack.common import timeutils
 from cinder import units
 from cinder import utils
+from cinder.volume import blockcopy
 
 
 volume_opts = [
@@ -39,6 +46,16 @@ volume_opts = [
                default='1M',
                help='The default block size used when copying/clearing '
                     'volumes'),
+    cfg.StrOpt('volume_copy_method',
+               default='dd',
+               help='Method used to copy and clear volume data: dd, or '
+                    'native for the in-process copy engine, which can skip '
+                    'zero blocks on sparse destinations, limit its rate '
+                    'and report its progress'),
+    cfg.IntOpt('volume_copy_bps_limit',
+               default=0,
+               help='Maximum rate in bytes per second of each volume '
+                    'copy, 0 means no limit'),
 ]
 
 CONF = cfg.CONF
@@ -169,8 +186,50 @@ def _calculate_count(size_in_m):
     return blocksize, int(count)
 
 
+def _copy_volume_native(srcstr, deststr, size_in_m, sparse=False,
+                        progress_cb=None, rate=0):
+    blocksize, count = _calculate_count(size_in_m)
+    src = None if srcstr == '/dev/zero' else srcstr
+    copier = blockcopy.BlockCopier(blocksize=strutils.to_bytes(blocksize),
+                                   sparse=sparse,
+                                   rate=rate,
+                                   progress_cb=progress_cb)
+
+    @contextlib.contextmanager
+    def _chown(path):
+        if path is None:
+            yield
+        else:
+            with utils.temporary_chown(path):
+                yield
+
+    with _chown(src):
+        with _chown(deststr):
+            copier.copy(src, deststr, size_in_m * units.MiB)
+
+
+# Seconds of data copied by each dd run of a rate limited copy.
+DD_CHUNK_SECONDS = 5
+
+
 def copy_volume(srcstr, deststr, size_in_m, sync=False,
-                execute=utils.execute):
+                execute=utils.execute, sparse=False, progress_cb=None,
+                ionice=None, rate=None):
+    """Copies size_in_m MB from srcstr to deststr.
+
+    Sparse copies skip writing the zero blocks of the source, which is only
+    correct if the destination reads back zeros.  progress_cb(copied, total)
+    is called periodically by the native copy method.  ionice is passed to
+    ionice(1) to set the I/O scheduling class of dd, for example '-c3'.
+    rate is the maximum rate in bytes/sec, volume_copy_bps_limit by default.
+    """
+    if rate is None:
+        rate = CONF.volume_copy_bps_limit
+
+    if CONF.volume_copy_method == 'native':
+        return _copy_volume_native(srcstr, deststr, size_in_m, sparse=sparse,
+                                   progress_cb=progress_cb, rate=rate)
+
     # Use O_DIRECT to avoid thrashing the system buffer cache
     extra_flags = ['iflag=direct', 'oflag=direct']
 
@@ -187,13 +246,138 @@ def copy_volume(srcstr, deststr, size_in_m, sync=False,
     if sync and not extra_flags:
         extra_flags.append('conv=fdatasync')
 
+    # conv=sparse needs coreutils 8.16 or later, copy every block with an
+    # older dd.
+    if sparse and srcstr != '/dev/zero':
+        try:
+            execute('dd', 'count=0', 'if=%s' % srcstr, 'of=%s' % deststr,
+                    'conv=sparse', run_as_root=True)
+            extra_flags.append('conv=sparse')
+        except processutils.ProcessExecutionError:
+            LOG.debug(_('dd does not support conv=sparse, the copy to '
+                        '%s writes the zero blocks'), deststr)
+
     blocksize, count = _calculate_count(size_in_m)
 
-    # Perform the copy
-    execute('dd', 'if=%s' % srcstr, 'of=%s' % deststr,
-            'count=%d' % count,
-            'bs=%s' % blocksize,
-            *extra_flags, run_as_root=True)
+    cmd = ['dd', 'if=%s' % srcstr, 'of=%s' % deststr]
+    if ionice:
+        cmd = ['ionice', ionice] + cmd
+
+    if rate <= 0:
+        # Perform the copy
+        execute(*(cmd + ['count=%d' % count, 'bs=%s' % blocksize] +
+                  extra_flags), run_as_root=True)
+        return
+
+    # Copy in chunks of a few seconds worth of data, sleeping between them
+    # to keep to the rate.
+    bs = strutils.to_bytes(blocksize)
+    chunk = max(1, rate * DD_CHUNK_SECONDS // bs)
+    start = time.time()
+    copied = 0
+    while copied < count:
+        blocks = min(chunk, count - copied)
+        execute(*(cmd + ['count=%d' % blocks, 'bs=%s' % blocksize,
+                         'skip=%d' % copied, 'seek=%d' % copied] +
+                  extra_flags), run_as_root=True)
+        copied += blocks
+        delay = float(copied * bs) / rate - (time.time() - start)
+        if delay > 0:
+            eventlet.sleep(delay)
+
+
+# Block device ioctls, from linux/fs.h.
+BLKDISCARD = 0x1277
+BLKZEROOUT = 0x127f
+
+
+def _queue_limit(path, name):
+    """Returns a request queue limit of a block device, 0 if unknown."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0
+    if not stat.S_ISBLK(st.st_mode):
+        return 0
+    attr = '/sys/dev/block/%d:%d/queue/%s' % (os.major(st.st_rdev),
+                                              os.minor(st.st_rdev), name)
+    try:
+        with open(attr) as f:
+            return int(f.read().strip())
+    except (IOError, ValueError):
+        return 0
+
+
+def _zero_offload_ioctl(path):
+    """Returns an ioctl that zeroes the device without host writes, or None.
+
+    Discarded blocks only read back as zeros on devices that guarantee it,
+    and BLKZEROOUT falls back to writing zero pages in the kernel unless the
+    device supports WRITE SAME or WRITE ZEROES.
+    """
+    if _queue_limit(path, 'discard_zeroes_data'):
+        return BLKDISCARD
+    if (_queue_limit(path, 'write_zeroes_max_bytes') or
+            _queue_limit(path, 'write_same_max_bytes')):
+        return BLKZEROOUT
+    return None
+
+
+def _zero_offload(path, request, length):
+    with utils.temporary_chown(path):
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            tpool.execute(fcntl.ioctl, fd, request,
+                          struct.pack('QQ', 0, length))
+        finally:
+            os.close(fd)
+
+
+def clear_volume(volume_size_in_m, volume_path, volume_clear,
+                 volume_clear_size=0, volume_clear_ionice=None,
+                 volume_clear_bps_limit=0, execute=utils.execute):
+    """Wipes the data of a volume.
+
+    Zeroing is offloaded to the device with a discard or zero-out ioctl
+    when it supports one, otherwise zeros are written with copy_volume at
+    volume_clear_bps_limit bytes/sec and the volume_clear_ionice I/O class.
+    volume_clear_size limits the wipe to the first MB of the volume.
+    """
+    size_in_m = volume_size_in_m
+    if volume_clear_size:
+        size_in_m = min(volume_clear_size, volume_size_in_m)
+
+    if volume_clear == 'zero':
+        request = _zero_offload_ioctl(volume_path)
+        if request is not None:
+            try:
+                _zero_offload(volume_path, request, size_in_m * units.MiB)
+                LOG.debug(_('Cleared %(size)d MB of %(path)s with ioctl '
+                            '%(request)#x.') %
+                          {'size': size_in_m, 'path': volume_path,
+                           'request': request})
+                return
+            except (IOError, OSError) as e:
+                LOG.warn(_('Failed to offload clearing %(path)s to the '
+                           'device, writing zeros instead: %(err)s') %
+                         {'path': volume_path, 'err': e})
+        return copy_volume('/dev/zero', volume_path, size_in_m,
+                           sync=True, execute=execute,
+                           ionice=volume_clear_ionice,
+                           rate=volume_clear_bps_limit)
+    elif volume_clear == 'shred':
+        clear_cmd = ['shred', '-n3']
+        if volume_clear_size:
+            clear_cmd.append('-s%dMiB' % size_in_m)
+    else:
+        raise exception.InvalidConfigurationValue(
+            option='volume_clear',
+            value=volume_clear)
+
+    if volume_clear_ionice:
+        clear_cmd = ['ionice', volume_clear_ionice] + clear_cmd
+    clear_cmd.append(volume_path)
+    execute(*clear_cmd, run_as_root=True)
 
 
 def supports_thin_provisioning():
@@ -188,14 +188,19 @@ class Server(object):
                              custom_pool=self._pool,
                              log=self._wsgi_logger)
 
-    def start(self, backlog=128):
-        """Start serving a WSGI application.
+    def listen(self, backlog=128):
+        """Bind the listen socket of the server, unless it is already bound.
+
+        A socket bound before forking is shared by the forked workers,
+        which all accept connections on it.
 
         :param backlog: Maximum number of queued connections.
         :returns: None
         :raises: cinder.exception.InvalidInput
 
         """
+        if self._socket:
+            return
         if backlog < 1:
             raise exception.InvalidInput(
                 reason='The backlog must be more than 1')
@@ -203,8 +208,18 @@ class Server(object):
         self._socket = self._get_socket(self._host,
                                         self._port,
                                         backlog=backlog)
-        self._server = eventlet.spawn(self._start)
         (self._host, self._port) = self._socket.getsockname()[0:2]
+
+    def start(self, backlog=128):
+        """Start serving a WSGI application.
+
+        :param backlog: Maximum number of queued connections.
+        :returns: None
+        :raises: cinder.exception.InvalidInput
+
+        """
+        self.listen(backlog=backlog)
+        self._server = eventlet.spawn(self._start)
         LOG.info(_("Started %(name)s on %(host)s:%(port)s") %
                  {'name': self.name, 'host': self.host, 'port': self.port})
 
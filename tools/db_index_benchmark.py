@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the hot list/get queries before and after the indexes.
+
+Migrates an empty database to the version before the indexes migration,
+fills it with generated volumes, snapshots, volume metadata and services,
+and times the queries of cinder/db/sqlalchemy/api.py that the indexes are
+for.  The indexes migration is then applied and the queries timed again.
+
+    tools/db_index_benchmark.py --connection sqlite:////tmp/bench.db
+    tools/db_index_benchmark.py --connection mysql://u:p@host/bench
+
+The database must be empty, it is left migrated and filled.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+import uuid
+
+from migrate.versioning import api as versioning_api
+import sqlalchemy
+from sqlalchemy import and_, desc, select
+
+POSSIBLE_TOPDIR = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                                os.pardir, os.pardir))
+sys.path.insert(0, POSSIBLE_TOPDIR)
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder.db.sqlalchemy import migrate_repo
+from cinder import quota  # noqa, the migrations use the quota options
+
+INDEXES_VERSION = 26
+INIT_VERSION = 0
+BATCH = 10000
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _fill(engine, meta, args):
+    volumes = meta.tables['volumes']
+    snapshots = meta.tables['snapshots']
+    volume_metadata = meta.tables['volume_metadata']
+    services = meta.tables['services']
+    now = datetime.datetime.utcnow()
+    volume_ids = []
+
+    def _volumes():
+        for i in xrange(args.rows):
+            volume_id = str(uuid.uuid4())
+            volume_ids.append(volume_id)
+            instance_uuid = None
+            if i % 10 == 0:
+                instance_uuid = str(uuid.uuid4())
+            yield {'id': volume_id,
+                   'created_at': now - datetime.timedelta(seconds=i),
+                   'deleted': i % 5 == 0,
+                   'project_id': 'project-%d' % (i % args.projects),
+                   'host': 'host-%d' % (i % args.hosts),
+                   'instance_uuid': instance_uuid,
+                   'size': 1,
+                   'status': 'available'}
+
+    for batch in _batches(_volumes()):
+        engine.execute(volumes.insert(), batch)
+
+    def _snapshots():
+        for i, volume_id in enumerate(volume_ids):
+            yield {'id': str(uuid.uuid4()),
+                   'created_at': now - datetime.timedelta(seconds=i),
+                   'deleted': i % 5 == 0,
+                   'project_id': 'project-%d' % (i % args.projects),
+                   'volume_id': volume_id,
+                   'volume_size': 1,
+                   'status': 'available'}
+
+    for batch in _batches(_snapshots()):
+        engine.execute(snapshots.insert(), batch)
+
+    def _metadata():
+        for i, volume_id in enumerate(volume_ids):
+            yield {'created_at': now,
+                   'deleted': False,
+                   'volume_id': volume_id,
+                   'key': 'key-%d' % (i % 10),
+                   'value': 'value'}
+
+    for batch in _batches(_metadata()):
+        engine.execute(volume_metadata.insert(), batch)
+
+    engine.execute(services.insert(),
+                   [{'created_at': now,
+                     'deleted': False,
+                     'host': 'host-%d' % i,
+                     'binary': 'cinder-volume',
+                     'topic': 'cinder-volume',
+                     'report_count': 0,
+                     'disabled': False} for i in xrange(args.services)])
+    return volume_ids
+
+
+def _queries(meta, args, volume_ids):
+    """Returns (name, query factory) of the queries of the db api."""
+    volumes = meta.tables['volumes']
+    snapshots = meta.tables['snapshots']
+    volume_metadata = meta.tables['volume_metadata']
+    services = meta.tables['services']
+
+    def _project():
+        return 'project-%d' % random.randrange(args.projects)
+
+    def _host():
+        return 'host-%d' % random.randrange(args.hosts)
+
+    def _volume_id():
+        return random.choice(volume_ids)
+
+    return [
+        ('volume_get_all_by_project (page of %d)' % args.limit,
+         lambda: select([volumes]).where(and_(
+             volumes.c.project_id == _project(),
+             volumes.c.deleted == False)).order_by(
+                 desc(volumes.c.created_at)).limit(args.limit)),
+        ('volume_get_all_by_host',
+         lambda: select([volumes]).where(and_(
+             volumes.c.host == _host(),
+             volumes.c.deleted == False))),
+        ('volume_get_all_by_instance_uuid',
+         lambda: select([volumes]).where(and_(
+             volumes.c.instance_uuid == str(uuid.uuid4()),
+             volumes.c.deleted == False))),
+        ('snapshot_get_all_for_volume',
+         lambda: select([snapshots]).where(and_(
+             snapshots.c.volume_id == _volume_id(),
+             snapshots.c.deleted == False))),
+        ('snapshot_get_all_by_project (page of %d)' % args.limit,
+         lambda: select([snapshots]).where(and_(
+             snapshots.c.project_id == _project(),
+             snapshots.c.deleted == False)).order_by(
+                 desc(snapshots.c.created_at)).limit(args.limit)),
+        ('volume_metadata_get_item',
+         lambda: select([volume_metadata]).where(and_(
+             volume_metadata.c.volume_id == _volume_id(),
+             volume_metadata.c.key == 'key-1',
+             volume_metadata.c.deleted == False))),
+        ('service_get_by_host_and_topic',
+         lambda: select([services]).where(and_(
+             services.c.disabled == False,
+             services.c.host == _host(),
+             services.c.topic == 'cinder-volume'))),
+    ]
+
+
+def _time_queries(engine, queries, repeat):
+    results = []
+    for name, query in queries:
+        timings = []
+        for _i in xrange(repeat):
+            start = time.time()
+            engine.execute(query()).fetchall()
+            timings.append(time.time() - start)
+        timings.sort()
+        results.append((name, timings[len(timings) // 2] * 1000))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--connection', default='sqlite:///bench.db',
+                        help='SQLAlchemy connection string of an empty '
+                             'database')
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='number of volumes, and of snapshots and '
+                             'volume metadata items')
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--services', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=1000,
+                        help='page size of the list queries')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='runs of each query, the median is reported')
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine(args.connection)
+    repository = os.path.dirname(migrate_repo.__file__)
+    versioning_api.version_control(engine, repository, INIT_VERSION)
+    versioning_api.upgrade(engine, repository, INDEXES_VERSION - 1)
+
+    meta = sqlalchemy.MetaData(bind=engine)
+    meta.reflect()
+
+    print('Filling %s with %d rows per table...' % (engine.name, args.rows))
+    start = time.time()
+    volume_ids = _fill(engine, meta, args)
+    print('Filled in %.1f seconds.' % (time.time() - start))
+
+    queries = _queries(meta, args, volume_ids)
+    before = _time_queries(engine, queries, args.repeat)
+
+    start = time.time()
+    versioning_api.upgrade(engine, repository, INDEXES_VERSION)
+    print('Created the indexes in %.1f seconds.' % (time.time() - start))
+    after = _time_queries(engine, queries, args.repeat)
+
+    print('%-45s %12s %12s' % ('query', 'before (ms)', 'after (ms)'))
+    for (name, before_ms), (_name, after_ms) in zip(before, after):
+        print('%-45s %12.2f %12.2f' % (name, before_ms, after_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark of the policy checks of the admin_or_owner rules.
+
+Times the checks of rules of etc/cinder/policy.json which fall back to
+admin_or_owner, for the owner of the target and for another project:
+
+- brain, the match list walk of the common policy brain,
+- compiled, the compiled rules, with a new request context per check,
+- memoized, the compiled rules, with one request context for all checks,
+  as the checks of a single request.
+
+    tools/policy_benchmark.py --checks 100000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+POSSIBLE_TOPDIR = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                                os.pardir, os.pardir))
+sys.path.insert(0, POSSIBLE_TOPDIR)
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from oslo.config import cfg
+
+from cinder.common import config  # noqa, options of the config paths
+from cinder import context
+from cinder import exception
+from cinder.openstack.common import policy as common_policy
+from cinder import policy
+from cinder import utils
+
+CONF = cfg.CONF
+
+ACTIONS = ['volume:get', 'volume:delete', 'volume:attach',
+           'volume_extension:volume_encryption_metadata']
+
+
+def _brain(ctxt, action, target):
+    # The checks before the rules were compiled: a stat of the policy
+    # file and a walk of the match lists of the brain on every check.
+    utils.read_cached_file(policy._POLICY_PATH, policy._POLICY_CACHE)
+    common_policy.enforce(('rule:%s' % action,), target, ctxt.to_dict())
+
+
+def _compiled(ctxt, action, target):
+    try:
+        policy.enforce(ctxt, action, target)
+    except exception.PolicyNotAuthorized:
+        pass
+
+
+def _time(check, make_context, target, checks):
+    start = time.time()
+    for i in xrange(checks):
+        if i % len(ACTIONS) == 0:
+            ctxt = make_context()
+        check(ctxt, ACTIONS[i % len(ACTIONS)], target)
+    return (time.time() - start) / checks * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--checks', type=int, default=100000,
+                        help='number of policy checks of each variant')
+    parser.add_argument('--policy-file',
+                        default=os.path.join(POSSIBLE_TOPDIR, 'etc',
+                                             'cinder', 'policy.json'))
+    args = parser.parse_args()
+
+    CONF([], project='cinder', default_config_files=[])
+    CONF.set_override('policy_file', args.policy_file)
+    policy.init()
+
+    def new_context():
+        return context.RequestContext('user', 'owner', roles=['member'])
+
+    request_context = new_context()
+    targets = [('owner', {'project_id': 'owner', 'user_id': 'user'}),
+               ('other project', {'project_id': 'other', 'user_id': 'x'})]
+    variants = [('brain', _brain, new_context),
+                ('compiled', _compiled, new_context),
+                ('memoized', _compiled, lambda: request_context)]
+
+    print('%-15s %-10s %12s' % ('target', 'variant', 'usec/check'))
+    for target_name, target in targets:
+        for name, check, make_context in variants:
+            usec = _time(check, make_context, target, args.checks)
+            print('%-15s %-10s %12.2f' % (target_name, name, usec))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of concurrent quota reservations of one project.
+
+Runs N threads which reserve and commit (or roll back) volumes and
+gigabytes of the same project, with each of the quota drivers, and
+reports the reservations per second and the database errors, such as
+deadlocks, of the threads.
+
+    tools/quota_contention_benchmark.py --connection mysql://u:p@host/bench
+
+The database is migrated to the latest version and its quota tables are
+emptied before each driver runs.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+POSSIBLE_TOPDIR = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                                os.pardir, os.pardir))
+sys.path.insert(0, POSSIBLE_TOPDIR)
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from oslo.config import cfg
+
+from cinder.common import config  # noqa, options of the sync routines
+from cinder import context
+from cinder.db import migration
+from cinder.db.sqlalchemy import api as sqlalchemy_api
+from cinder.db.sqlalchemy import models
+from cinder import exception
+from cinder import quota
+
+CONF = cfg.CONF
+
+DRIVERS = ['cinder.quota.DbQuotaDriver',
+           'cinder.quota.ConditionalDbQuotaDriver']
+PROJECT_ID = 'bench-project'
+
+
+def _clear_quotas():
+    session = sqlalchemy_api.get_session()
+    with session.begin():
+        for model in (models.Reservation, models.QuotaUsage):
+            session.query(model).delete()
+
+
+def _reserver(engine, ctxt, args, stats, lock):
+    reserved = overs = errors = 0
+    for i in xrange(args.reservations):
+        try:
+            reservations = engine.reserve(ctxt, volumes=1, gigabytes=1)
+        except exception.OverQuota:
+            overs += 1
+            continue
+        except Exception:
+            errors += 1
+            continue
+        reserved += 1
+        try:
+            if i % 2:
+                engine.rollback(ctxt, reservations)
+            else:
+                engine.commit(ctxt, reservations)
+        except Exception:
+            errors += 1
+    with lock:
+        stats['reserved'] += reserved
+        stats['overs'] += overs
+        stats['errors'] += errors
+
+
+def _run(driver, args):
+    _clear_quotas()
+    engine = quota.QuotaEngine(quota_driver_class=driver)
+    engine.register_resources([
+        quota.ReservableResource('volumes', '_sync_volumes',
+                                 'quota_volumes'),
+        quota.ReservableResource('gigabytes', '_sync_gigabytes',
+                                 'quota_gigabytes')])
+    ctxt = context.RequestContext('bench-user', PROJECT_ID, is_admin=True)
+
+    stats = {'reserved': 0, 'overs': 0, 'errors': 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=_reserver,
+                                args=(engine, ctxt, args, stats, lock))
+               for _i in xrange(args.threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats['elapsed'] = time.time() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--connection', default='sqlite:///bench.db',
+                        help='SQLAlchemy connection string of the database')
+    parser.add_argument('--threads', type=int, default=16,
+                        help='number of parallel reservers')
+    parser.add_argument('--reservations', type=int, default=200,
+                        help='reservations made by each reserver')
+    args = parser.parse_args()
+
+    CONF([], project='cinder', default_config_files=[])
+    CONF.set_override('connection', args.connection, group='database')
+    CONF.set_override('max_pool_size', args.threads, group='database')
+    # Enough quota for every reservation, the drivers are compared on
+    # the same work.
+    CONF.set_override('quota_volumes', -1)
+    CONF.set_override('quota_gigabytes', -1)
+    CONF.set_override('quota_usage_resync_interval', 0)
+    migration.db_sync()
+
+    print('%-40s %10s %10s %8s %8s' % ('driver', 'reserved', 'resv/sec',
+                                       'overs', 'errors'))
+    for driver in DRIVERS:
+        stats = _run(driver, args)
+        print('%-40s %10d %10.1f %8d %8d' %
+              (driver, stats['reserved'],
+               stats['reserved'] / stats['elapsed'],
+               stats['overs'], stats['errors']))
+
+
+if __name__ == '__main__':
+    main()